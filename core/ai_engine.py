@@ -16,6 +16,8 @@ from dataclasses import dataclass
 from enum import Enum
 import httpx
 
+from core.cancellation import checkpoint
+
 # Gemini API支持
 try:
     import google.generativeai as genai
@@ -673,6 +675,9 @@ class AIEngine:
         # 依次尝试各个提供商
         for attempt in range(self.config.max_retries):
             for provider in providers:
+                # 所属发布任务已取消时不再发起新请求
+                await checkpoint()
+                
                 if provider == AIProvider.OLLAMA:
                     response = await self._call_ollama(
                         prompt=prompt,
@@ -256,10 +256,10 @@ class SessionManager:
     ):
         """创建平台会话"""
         
-        import aiohttp
+        from core.http_client import HttpSession, get_http_client
         
-        # 创建会话
-        session = aiohttp.ClientSession()
+        # 会话只保存认证信息，请求通过共享连接池发出
+        session = HttpSession(get_http_client())
         
         # 根据认证类型配置
         if cred.auth_type == "api_key":
@@ -272,8 +272,7 @@ class SessionManager:
         elif cred.auth_type == "cookie":
             # Cookie认证
             cookies = cred.credentials.get("cookies", {})
-            for name, value in cookies.items():
-                session.cookie_jar.update_cookies({name: value})
+            session.cookies.update(cookies)
         
         elif cred.auth_type == "oauth":
             # OAuth认证
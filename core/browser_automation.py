@@ -7,40 +7,174 @@
 """
 
 import asyncio
-from typing import Optional, Dict, Any, List
+import re
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, AsyncIterator
 from pathlib import Path
 
+from core.cancellation import PublishCancelledError, checkpoint
+from core.request_interceptor import RequestInterceptor
+from core.session_cache import SessionCache, SessionRefresher
+from core.step_tracer import StepTracer
+
+
+# 各类等待的默认超时（毫秒）
+DEFAULT_STEP_TIMEOUTS = {
+    "open_page": 30000,     # 打开页面直到关键元素可见
+    "action": 10000,        # 点击、填写等单个操作
+    "upload": 30000,        # 单张图片上传完成
+    "dom_change": 3000,     # 点击后等待页面响应（如弹出下拉框）
+    "confirm": 15000,       # 提交后等待发布结果
+    "login_check": 5000,    # 检查登录状态
+}
+
+
+# 核对已发布商品时允许的本地时钟与平台时钟误差
+ITEM_TIME_TOLERANCE = timedelta(minutes=2)
+
+_RELATIVE_TIME_UNITS = {"秒": 1, "分钟": 60, "小时": 3600, "天": 86400}
+
+
+def parse_item_time(text: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    解析商品列表中显示的发布时间（刚刚、3分钟前、今天 12:30、10-18、2025-10-18 12:30）
+    
+    显示的时间只精确到某个单位，返回可能的最晚时间，用于判断商品是否晚于某个时间点发布。
+    
+    Args:
+        text: 时间文本（整段匹配）
+        now: 当前本地时间（默认datetime.now()）
+        
+    Returns:
+        本地时间，无法识别时返回None
+    """
+    now = now or datetime.now()
+    text = text.strip()
+    
+    if text in ("刚刚", "刚发布"):
+        return now
+    
+    match = re.fullmatch(r"(\d+)\s*(秒|分钟|小时|天)前", text)
+    if match:
+        return now - timedelta(seconds=int(match.group(1)) * _RELATIVE_TIME_UNITS[match.group(2)])
+    
+    match = re.fullmatch(r"(今天|昨天)\s*(\d{1,2}):(\d{2})", text)
+    if match:
+        day = now if match.group(1) == "今天" else now - timedelta(days=1)
+        return day.replace(hour=int(match.group(2)), minute=int(match.group(3)), second=59, microsecond=0)
+    
+    match = re.fullmatch(r"(?:(\d{4})[-/年])?(\d{1,2})[-/月](\d{1,2})日?(?:\s+(\d{1,2}):(\d{2}))?", text)
+    if match:
+        year, month, day, hour, minute = match.groups()
+        try:
+            if hour is None:
+                value = datetime(int(year or now.year), int(month), int(day), 23, 59, 59)
+            else:
+                value = datetime(int(year or now.year), int(month), int(day), int(hour), int(minute), 59)
+        except ValueError:
+            return None
+        # 不带年份的日期晚于今天，说明是去年的
+        if year is None and value - now > timedelta(days=1):
+            value = value.replace(year=value.year - 1)
+        return value
+    
+    return None
+
+
+def parse_item_price(text: str) -> Optional[float]:
+    """解析商品列表中显示的价格（¥99、￥99.5），无法识别时返回None"""
+    match = re.search(r"[¥￥]\s*(\d+(?:\.\d+)?)", text)
+    return float(match.group(1)) if match else None
+
+
+# 浏览器上下文默认参数
+CONTEXT_OPTIONS = {
+    "viewport": {"width": 1920, "height": 1080},
+    "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+}
+
+
+async def launch_browser(headless: bool = False):
+    """
+    启动Playwright和Chromium
+    
+    Returns:
+        (playwright, browser)
+    """
+    try:
+        from playwright.async_api import async_playwright
+    except ImportError:
+        raise ImportError(
+            "需要安装playwright:\n"
+            "pip install playwright\n"
+            "playwright install chromium"
+        )
+    
+    playwright = await async_playwright().start()
+    try:
+        browser = await playwright.chromium.launch(
+            headless=headless,
+            args=['--start-maximized']
+        )
+    except Exception:
+        await playwright.stop()
+        raise
+    
+    return playwright, browser
+
 
 class BrowserAutomation:
     """浏览器自动化基类"""
     
-    def __init__(self, headless: bool = False):
+    def __init__(self, headless: bool = False, interceptor: Optional[RequestInterceptor] = None):
         self.headless = headless
+        self.interceptor = interceptor
+        self.playwright = None
         self.browser = None
         self.context = None
         self.page = None
         
+        # 由BrowserPool提供的浏览器不在stop()中关闭
+        self.owns_browser = True
+        # 页面出错等情况下，归还给浏览器池时重建页面
+        self.needs_recycle = False
+        
+        # 等待超时（毫秒）和各步骤实际耗时（秒）
+        self.step_timeouts: Dict[str, int] = dict(DEFAULT_STEP_TIMEOUTS)
+        self.step_latencies: Dict[str, List[float]] = {}
+        
         print(f"🌐 浏览器自动化初始化 (headless={headless})")
     
+    def attach(self, browser, context, page):
+        """
+        使用已有的浏览器上下文和页面（由BrowserPool管理生命周期）
+        
+        Args:
+            browser: 浏览器
+            context: 浏览器上下文
+            page: 页面
+        """
+        self.browser = browser
+        self.context = context
+        self.page = page
+        self.owns_browser = False
+        self.needs_recycle = False
+    
     async def start(self):
         """启动浏览器"""
         
         try:
-            from playwright.async_api import async_playwright
-            
-            self.playwright = await async_playwright().start()
-            
             # 启动浏览器
-            self.browser = await self.playwright.chromium.launch(
-                headless=self.headless,
-                args=['--start-maximized']
-            )
+            self.playwright, self.browser = await launch_browser(self.headless)
             
             # 创建上下文（带Cookie持久化）
-            self.context = await self.browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            )
+            self.context = await self.browser.new_context(**CONTEXT_OPTIONS)
+            
+            # 拦截不需要的资源
+            if self.interceptor:
+                await self.interceptor.attach(self.context)
             
             # 创建页面
             self.page = await self.context.new_page()
@@ -48,11 +182,7 @@ class BrowserAutomation:
             print("✅ 浏览器启动成功")
         
         except ImportError:
-            raise ImportError(
-                "需要安装playwright:\n"
-                "pip install playwright\n"
-                "playwright install chromium"
-            )
+            raise
         except Exception as e:
             print(f"❌ 浏览器启动失败: {e}")
             raise
@@ -60,6 +190,10 @@ class BrowserAutomation:
     async def stop(self):
         """停止浏览器"""
         
+        if not self.owns_browser:
+            # 页面和上下文由浏览器池回收
+            return
+        
         if self.page:
             await self.page.close()
         if self.context:
@@ -71,14 +205,31 @@ class BrowserAutomation:
         
         print("✅ 浏览器关闭")
     
-    async def goto(self, url: str, wait_until: str = "networkidle"):
-        """导航到URL"""
+    async def goto(
+        self,
+        url: str,
+        wait_until: str = "domcontentloaded",
+        wait_for: Optional[str] = None,
+        timeout: Optional[int] = None
+    ):
+        """
+        导航到URL
+        
+        Args:
+            url: 地址
+            wait_until: 导航完成的判定（默认DOM加载完成，不等待所有网络请求结束）
+            wait_for: 导航后等待该选择器可见（页面真正可操作的标志）
+            timeout: 超时（毫秒，默认使用open_page步骤的超时）
+        """
         
         if not self.page:
             raise RuntimeError("浏览器未启动")
         
+        timeout = timeout or self.step_timeouts["open_page"]
         try:
-            await self.page.goto(url, wait_until=wait_until, timeout=30000)
+            await self.page.goto(url, wait_until=wait_until, timeout=timeout)
+            if wait_for:
+                await self.page.wait_for_selector(wait_for, state="visible", timeout=timeout)
             print(f"✅ 导航到: {url}")
         except Exception as e:
             print(f"❌ 导航失败: {e}")
@@ -87,45 +238,188 @@ class BrowserAutomation:
     async def wait_for_selector(
         self,
         selector: str,
-        timeout: int = 10000
+        timeout: int = 10000,
+        state: str = "visible"
     ):
-        """等待元素出现"""
+        """
+        等待元素达到指定状态
+        
+        Args:
+            selector: 选择器
+            timeout: 超时（毫秒）
+            state: attached/detached/visible/hidden
+        """
         
         try:
-            await self.page.wait_for_selector(selector, timeout=timeout)
+            await self.page.wait_for_selector(selector, state=state, timeout=timeout)
             return True
         except Exception as e:
-            print(f"⚠️  等待元素超时: {selector}")
+            print(f"⚠️  等待元素超时: {selector} ({state})")
+            return False
+    
+    async def wait_for_count(self, selector: str, count: int, timeout: int = 10000) -> bool:
+        """等待匹配选择器的元素数量达到count（如已上传图片的预览）"""
+        
+        try:
+            await self.page.wait_for_function(
+                "([selector, count]) => document.querySelectorAll(selector).length >= count",
+                arg=[selector, count],
+                timeout=timeout
+            )
+            return True
+        except Exception:
+            print(f"⚠️  等待元素数量超时: {selector} >= {count}")
+            return False
+    
+    async def wait_for_dom_change(self, selector: str = "body", timeout: int = 5000) -> bool:
+        """等待元素内发生DOM变化（如点击后弹出的下拉框）"""
+        
+        try:
+            return bool(await self.page.evaluate(
+                """([selector, timeout]) => new Promise(resolve => {
+                    const target = document.querySelector(selector) || document.body;
+                    const observer = new MutationObserver(() => {
+                        observer.disconnect();
+                        resolve(true);
+                    });
+                    observer.observe(target, {childList: true, subtree: true, attributes: true});
+                    setTimeout(() => { observer.disconnect(); resolve(false); }, timeout);
+                })""",
+                [selector, timeout]
+            ))
+        except Exception as e:
+            print(f"⚠️  等待DOM变化失败: {e}")
+            return False
+    
+    async def wait_for_url(self, predicate, timeout: int = 10000) -> bool:
+        """等待页面URL满足条件（predicate接收URL字符串）"""
+        
+        try:
+            await self.page.wait_for_url(predicate, timeout=timeout)
+            return True
+        except Exception:
             return False
     
-    async def click(self, selector: str):
-        """点击元素"""
+    async def wait_for_response(self, url_part: str, timeout: int = 10000):
+        """
+        等待URL包含url_part的网络响应
+        
+        Returns:
+            响应对象，超时返回None
+        """
+        
+        try:
+            return await self.page.wait_for_event(
+                "response",
+                predicate=lambda response: url_part in response.url,
+                timeout=timeout
+            )
+        except Exception:
+            return None
+    
+    async def wait_for_any(self, *conditions, timeout: int = 10000) -> int:
+        """
+        等待多个条件中最先满足的一个
+        
+        Args:
+            *conditions: 等待条件（协程，返回False/None表示未满足）
+            timeout: 超时（毫秒）
+            
+        Returns:
+            最先满足的条件序号，全部未满足或超时返回-1
+        """
+        tasks = [asyncio.ensure_future(c) for c in conditions]
+        pending = set(tasks)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout / 1000
+        
+        try:
+            while pending:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in tasks:
+                    if task in done and not task.cancelled() and task.exception() is None and task.result():
+                        return tasks.index(task)
+            return -1
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+    
+    @asynccontextmanager
+    async def step(self, name: str):
+        """记录一个步骤的实际耗时（用于get_step_stats统计）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.step_latencies.setdefault(name, []).append(time.perf_counter() - start)
+    
+    def get_step_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        获取各步骤的耗时统计
+        
+        Returns:
+            {步骤名: {"count": 次数, "avg": 平均秒数, "max": 最大秒数}}
+        """
+        return {
+            name: {
+                "count": len(values),
+                "avg": sum(values) / len(values),
+                "max": max(values),
+            }
+            for name, values in self.step_latencies.items() if values
+        }
+    
+    async def click(self, selector: str, timeout: Optional[int] = None):
+        """点击元素（Playwright会等待元素可见、稳定、可点击）"""
         
         try:
-            await self.page.click(selector)
-            await asyncio.sleep(0.5)  # 等待动画
+            await self.page.click(selector, timeout=timeout or self.step_timeouts["action"])
             return True
         except Exception as e:
             print(f"❌ 点击失败: {selector} - {e}")
             return False
     
-    async def fill(self, selector: str, value: str):
-        """填充输入框"""
+    async def fill(self, selector: str, value: str, timeout: Optional[int] = None):
+        """填充输入框（Playwright会等待元素可编辑）"""
         
         try:
-            await self.page.fill(selector, value)
-            await asyncio.sleep(0.3)
+            await self.page.fill(selector, value, timeout=timeout or self.step_timeouts["action"])
             return True
         except Exception as e:
             print(f"❌ 填充失败: {selector} - {e}")
             return False
     
-    async def upload_file(self, selector: str, file_path: str):
-        """上传文件"""
+    async def upload_file(
+        self,
+        selector: str,
+        file_path: str,
+        done_selector: Optional[str] = None,
+        done_count: int = 1,
+        timeout: Optional[int] = None
+    ):
+        """
+        上传文件
+        
+        Args:
+            selector: 文件输入框选择器
+            file_path: 文件路径
+            done_selector: 上传完成标志（如图片预览）的选择器，提供时等待其数量达到done_count
+            done_count: 上传完成后done_selector应匹配的元素数量
+            timeout: 超时（毫秒）
+        """
         
+        timeout = timeout or self.step_timeouts["upload"]
         try:
-            await self.page.set_input_files(selector, file_path)
-            await asyncio.sleep(0.5)
+            await self.page.set_input_files(selector, file_path, timeout=timeout)
+            if done_selector:
+                return await self.wait_for_count(done_selector, done_count, timeout)
             return True
         except Exception as e:
             print(f"❌ 上传失败: {file_path} - {e}")
@@ -195,6 +489,7 @@ class XianyuAutomation(BrowserAutomation):
     XIANYU_URL = "https://2.taobao.com"
     LOGIN_URL = "https://login.taobao.com"
     PUBLISH_URL = "https://2.taobao.com/publish/index.htm"
+    MY_ITEMS_URL = "https://2.taobao.com/list/mine.htm"
     
     # 选择器配置（根据实际页面可能需要调整）
     SELECTORS = {
@@ -209,36 +504,114 @@ class XianyuAutomation(BrowserAutomation):
         "category_btn": "button.category-btn, .category-select, [class*='category']",
         "publish_btn": "button.publish-btn, button[type='submit'], .submit-btn, [class*='publish']",
         
+        "upload_done": "[class*='upload'] img, .upload-item img, [class*='image-item'] img",
+        
         # 发布结果
-        "success_indicator": ".success, [class*='success'], .result-success"
+        "success_indicator": ".success, [class*='success'], .result-success",
+        
+        # 我发布的商品列表
+        "my_item": ".item-card, [class*='item-card'], [class*='feeds-item']",
+        "my_item_link": "a[href*='id=']",
+        "my_item_title": "[class*='title']",
+        "my_item_price": "[class*='price']",
+        "my_item_time": "[class*='time'], [class*='date']"
     }
     
-    def __init__(self, headless: bool = False, progress_callback = None):
+    # 发布提交接口（URL片段），提交后等待其响应
+    PUBLISH_API = "publish"
+    
+    # 发布步骤名称（与进度回调的step_index对应，用于耗时统计）
+    PUBLISH_STEPS = [
+        "open_page", "upload_images", "fill_title", "fill_price", "fill_description",
+        "select_category", "submit", "wait_result", "verify",
+    ]
+    
+    def __init__(
+        self,
+        headless: bool = False,
+        progress_callback = None,
+        interceptor: Optional[RequestInterceptor] = None,
+        session_cache: Optional[SessionCache] = None,
+        tracer: Optional[StepTracer] = None
+    ):
         """
         初始化闲鱼自动化
         
         Args:
             headless: 是否无头模式
             progress_callback: 进度回调函数 callback(step_index, status, message, elapsed_time, screenshot_path)
+            interceptor: 请求拦截器（可选，拦截图片、字体、统计脚本等）
+            session_cache: 登录会话缓存（可选，有效期内跳过登录检查）
+            tracer: 步骤追踪器（默认只在出错时保存缩略图）
         """
-        super().__init__(headless=headless)
+        super().__init__(headless=headless, interceptor=interceptor)
         self.progress_callback = progress_callback
+        self.session_cache = session_cache
+        self.session_key: Optional[str] = None
+        self.logged_in = False
+        self.tracer = tracer or StepTracer()
+        
+        # 当前发布的步骤耗时 [(步骤名, 状态, 耗时)]，以及正在执行的步骤 (索引, 开始时间)
+        self._item_timings: List[tuple] = []
+        self._running_step: Optional[tuple] = None
     
-    async def login(self, cookies_file: Optional[str] = None):
-        """登录闲鱼"""
+    async def login(
+        self,
+        cookies_file: Optional[str] = None,
+        allow_manual: bool = True,
+        force_check: bool = False
+    ):
+        """
+        登录闲鱼
         
-        # 尝试加载Cookie
-        if cookies_file and await self.load_cookies(cookies_file):
-            # 验证登录状态
+        Args:
+            cookies_file: Cookie文件路径（同时作为会话缓存的账号标识）
+            allow_manual: Cookie无效时是否等待手动登录
+            force_check: 忽略已登录标记和会话有效期，重新验证登录
+            
+        Returns:
+            是否已登录
+        """
+        self.session_key = cookies_file
+        
+        # 浏览器池中已登录的上下文直接复用
+        if self.logged_in and not force_check:
+            return True
+        
+        cache = self.session_cache if cookies_file else None
+        
+        # 有效期内的会话：加载保存的状态，不再打开首页检查
+        if cache and not force_check and cache.use(cookies_file) and await self._load_session(cookies_file):
+            print("✅ 使用缓存的登录会话")
+            self.logged_in = True
+            return True
+        
+        # 尝试加载保存的会话或Cookie
+        if cookies_file and (
+            (cache and await self._load_session(cookies_file)) or await self.load_cookies(cookies_file)
+        ):
+            # 验证登录状态（等待用户信息元素出现，未登录时最多等待login_check）
             await self.goto(self.XIANYU_URL)
-            await asyncio.sleep(2)
+            await self.wait_for_selector(
+                self.SELECTORS["user_info"], timeout=self.step_timeouts["login_check"], state="attached"
+            )
             
             # 检查是否已登录
             is_logged_in = await self._check_login_status()
             if is_logged_in:
                 print("✅ 使用Cookie登录成功")
+                if cache:
+                    await cache.save_state(self.context, cookies_file)
+                self.logged_in = True
                 return True
         
+        if cache:
+            cache.invalidate(cookies_file)
+        self.logged_in = False
+        
+        if not allow_manual:
+            return False
+        
         # 需要手动登录
         print("⚠️  需要手动登录")
         await self.goto(self.LOGIN_URL)
@@ -247,21 +620,40 @@ class XianyuAutomation(BrowserAutomation):
         print("📱 请在浏览器中完成登录（扫码或密码登录）")
         print("⏳ 等待登录完成...")
         
-        # 等待登录成功（检测URL变化或特定元素）
-        for _ in range(60):  # 等待最多60秒
-            await asyncio.sleep(1)
-            if await self._check_login_status():
-                print("✅ 登录成功")
-                
-                # 保存Cookie
-                if cookies_file:
-                    await self.save_cookies(cookies_file)
-                
-                return True
+        # 等待登录成功（离开登录页后立即检查，最多等待60秒）
+        if (
+            await self.wait_for_url(lambda url: "login" not in url.lower(), timeout=60000)
+            and await self._check_login_status()
+        ):
+            print("✅ 登录成功")
+            
+            # 保存Cookie
+            if cookies_file:
+                await self.save_cookies(cookies_file)
+            if cache:
+                await cache.save_state(self.context, cookies_file)
+            
+            self.logged_in = True
+            return True
         
         print("❌ 登录超时")
         return False
     
+    async def _load_session(self, key: str) -> bool:
+        """把缓存的登录状态（storage state中的Cookie）加载到当前上下文"""
+        state = self.session_cache.load_state(key)
+        if not state:
+            return False
+        
+        await self.context.add_cookies(state.get("cookies", []))
+        return True
+    
+    def report_auth_failure(self):
+        """登录失效信号（如被重定向到登录页）：下次使用前重新验证"""
+        self.logged_in = False
+        if self.session_cache and self.session_key:
+            self.session_cache.invalidate(self.session_key)
+    
     async def _check_login_status(self) -> bool:
         """检查登录状态"""
         
@@ -310,6 +702,15 @@ class XianyuAutomation(BrowserAutomation):
             elapsed_time: 耗时（秒）
             screenshot_path: 截图路径
         """
+        self._running_step = (step_index, time.time()) if status == "running" else None
+        
+        # 记录已结束步骤的耗时
+        if status in ("success", "failed", "skipped") and 0 <= step_index < len(self.PUBLISH_STEPS):
+            name = self.PUBLISH_STEPS[step_index]
+            self._item_timings.append((name, status, elapsed_time))
+            if status != "skipped":
+                self.step_latencies.setdefault(name, []).append(elapsed_time)
+        
         if self.progress_callback:
             try:
                 self.progress_callback(step_index, status, message, elapsed_time, screenshot_path)
@@ -348,9 +749,16 @@ class XianyuAutomation(BrowserAutomation):
             "success": False,
             "error": None,
             "post_id": None,
-            "post_url": None
+            "post_url": None,
+            "submitted": False,     # 是否已点击提交（之后失败时发布结果未知）
+            "screenshot_path": "",  # 出错时的缩略图
+            "trace_path": None      # 失败时的Playwright trace（trace级别）
         }
         
+        self._item_timings = []
+        self._running_step = None
+        tracing = await self.tracer.start(self.context)
+        
         try:
             print(f"📤 开始发布: {title}")
             
@@ -359,15 +767,25 @@ class XianyuAutomation(BrowserAutomation):
             step_start = time.time()
             self._update_progress(0, "running", "正在打开发布页面...")
             
-            await self.goto(self.PUBLISH_URL)
-            await asyncio.sleep(2)
+            # 标题输入框可见即表示页面可以操作；被重定向到登录页说明会话已失效
+            open_timeout = self.step_timeouts["open_page"]
+            await self.goto(self.PUBLISH_URL, timeout=open_timeout)
+            signal = await self.wait_for_any(
+                self.wait_for_selector(self.SELECTORS["title_input"], timeout=open_timeout),
+                self.wait_for_url(lambda url: "login" in url.lower(), timeout=open_timeout),
+                timeout=open_timeout
+            )
             
-            # 截图记录（用于调试）
-            screenshot_path = "data/temp/publish_step0_page.png"
-            await self.screenshot(screenshot_path)
+            if signal == 1 or "login" in self.page.url.lower():
+                self.report_auth_failure()
+                raise Exception("登录已失效，需要重新登录")
+            if signal < 0:
+                raise Exception("打开发布页面超时：标题输入框未出现")
             
             elapsed = time.time() - step_start
-            self._update_progress(0, "success", "发布页面已打开", elapsed, screenshot_path)
+            self._update_progress(0, "success", "发布页面已打开", elapsed)
+            
+            await checkpoint()
             
             # 步骤1: 上传图片
             step_start = time.time()
@@ -378,25 +796,28 @@ class XianyuAutomation(BrowserAutomation):
                 upload_success = 0
                 
                 for idx, image_path in enumerate(images[:9]):  # 最多9张
-                    if await self.upload_file(self.SELECTORS["image_upload"], image_path):
+                    # 等待图片预览出现（上传完成），而不是固定等待
+                    if await self.upload_file(
+                        self.SELECTORS["image_upload"],
+                        image_path,
+                        done_selector=self.SELECTORS["upload_done"],
+                        done_count=upload_success + 1
+                    ):
                         upload_success += 1
                         print(f"      ✓ 图片{idx+1}上传成功")
                     else:
                         print(f"      ⚠️ 图片{idx+1}上传失败: {image_path}")
-                    
-                    await asyncio.sleep(1)  # 等待上传完成
                 
                 if upload_success == 0 and len(images) > 0:
                     raise Exception("所有图片上传失败")
                 
-                screenshot_path = "data/temp/publish_step1_images.png"
-                await self.screenshot(screenshot_path)
-                
                 elapsed = time.time() - step_start
-                self._update_progress(1, "success", f"已上传 {upload_success} 张图片", elapsed, screenshot_path)
+                self._update_progress(1, "success", f"已上传 {upload_success} 张图片", elapsed)
             else:
                 self._update_progress(1, "skipped", "无图片需要上传", 0)
             
+            await checkpoint()
+            
             # 步骤2: 填写标题
             print("   ✍️  填写标题...")
             step_start = time.time()
@@ -406,10 +827,11 @@ class XianyuAutomation(BrowserAutomation):
                 self._update_progress(2, "failed", "标题填写失败", time.time() - step_start)
                 raise Exception("标题填写失败")
             
-            await asyncio.sleep(0.5)
             elapsed = time.time() - step_start
             self._update_progress(2, "success", "标题填写完成", elapsed)
             
+            await checkpoint()
+            
             # 步骤3: 填写价格
             print("   💰 填写价格...")
             step_start = time.time()
@@ -419,10 +841,11 @@ class XianyuAutomation(BrowserAutomation):
                 self._update_progress(3, "failed", "价格填写失败", time.time() - step_start)
                 raise Exception("价格填写失败")
             
-            await asyncio.sleep(0.5)
             elapsed = time.time() - step_start
             self._update_progress(3, "success", "价格填写完成", elapsed)
             
+            await checkpoint()
+            
             # 步骤4: 填写描述
             print("   📝 填写描述...")
             step_start = time.time()
@@ -435,9 +858,7 @@ class XianyuAutomation(BrowserAutomation):
                 elapsed = time.time() - step_start
                 self._update_progress(4, "success", "描述填写完成", elapsed)
             
-            await asyncio.sleep(0.5)
-            screenshot_path = "data/temp/publish_step4_content.png"
-            await self.screenshot(screenshot_path)
+            await checkpoint()
             
             # 步骤5: 选择分类
             print("   🏷️  选择分类...")
@@ -448,7 +869,8 @@ class XianyuAutomation(BrowserAutomation):
             try:
                 # 尝试点击分类按钮
                 if await self.click(self.SELECTORS["category_btn"]):
-                    await asyncio.sleep(1)
+                    # 等待分类面板弹出
+                    await self.wait_for_dom_change(timeout=self.step_timeouts["dom_change"])
                     # TODO: 根据category参数选择具体分类
                     # 这里需要根据实际页面实现
                     elapsed = time.time() - step_start
@@ -459,25 +881,41 @@ class XianyuAutomation(BrowserAutomation):
                 print(f"      ⚠️ 分类选择失败: {e}")
                 self._update_progress(5, "skipped", "使用默认分类", time.time() - step_start)
             
+            # 提交前最后一次检查取消
+            await checkpoint()
+            
             # 步骤6: 提交发布
             print("   🚀 提交发布...")
             step_start = time.time()
             self._update_progress(6, "running", "正在提交发布...")
             
+            # 点击前开始监听提交接口的响应，避免错过
+            publish_response = asyncio.ensure_future(
+                self.wait_for_response(self.PUBLISH_API, timeout=self.step_timeouts["confirm"])
+            )
+            
             if not await self.click(self.SELECTORS["publish_btn"]):
+                publish_response.cancel()
                 self._update_progress(6, "failed", "提交按钮点击失败", time.time() - step_start)
                 raise Exception("提交按钮点击失败")
             
+            result["submitted"] = True
             elapsed = time.time() - step_start
             self._update_progress(6, "success", "发布已提交", elapsed)
             
-            # 步骤7: 等待发布完成
+            # 步骤7: 等待发布完成（离开发布页、出现成功提示或提交接口返回，任一满足即可）
             print("   ⏳ 等待发布完成...")
             step_start = time.time()
             self._update_progress(7, "running", "等待服务器处理...")
-            await asyncio.sleep(3)
+            signal = await self.wait_for_any(
+                self.wait_for_url(lambda url: "publish" not in url.lower(), timeout=self.step_timeouts["confirm"]),
+                self.wait_for_selector(self.SELECTORS["success_indicator"], timeout=self.step_timeouts["confirm"]),
+                publish_response,
+                timeout=self.step_timeouts["confirm"]
+            )
             elapsed = time.time() - step_start
-            self._update_progress(7, "success", "处理完成", elapsed)
+            self._update_progress(7, "success" if signal >= 0 else "failed",
+                                  "处理完成" if signal >= 0 else "等待发布结果超时", elapsed)
             
             # 步骤8: 验证发布结果
             print("   🔍 验证发布结果...")
@@ -496,32 +934,115 @@ class XianyuAutomation(BrowserAutomation):
                     post_id = current_url.split("id=")[1].split("&")[0]
                     result["post_id"] = post_id
                 
-                screenshot_path = "data/temp/publish_success.png"
-                await self.screenshot(screenshot_path)
-                
                 elapsed = time.time() - step_start
-                self._update_progress(8, "success", "发布成功！", elapsed, screenshot_path)
+                self._update_progress(8, "success", "发布成功！", elapsed)
                 print("✅ 发布成功！")
             else:
                 elapsed = time.time() - step_start
                 self._update_progress(8, "failed", "发布验证失败", elapsed)
                 raise Exception("发布验证失败：未检测到成功标识")
         
+        except PublishCancelledError:
+            print(f"⏹️ 发布已取消: {title}")
+            raise
+        
         except Exception as e:
             error_msg = str(e)
             print(f"❌ 发布失败: {error_msg}")
             
             result["error"] = error_msg
             
-            # 错误截图
-            screenshot_path = "data/temp/publish_error.png"
-            await self.screenshot(screenshot_path)
+            # 错误缩略图（按追踪级别，正常发布不截图）
+            result["screenshot_path"] = await self.tracer.capture_error(self.page)
             
-            # 更新所有未完成步骤为失败
-            # 注意：这里只是示例，实际应该根据失败的具体步骤来更新
+            # 出错时正在执行的步骤标记为失败
+            if self._running_step:
+                step_index, started = self._running_step
+                self._update_progress(
+                    step_index, "failed", error_msg, time.time() - started, result["screenshot_path"]
+                )
+        
+        finally:
+            result["trace_path"] = await self.tracer.finish(self.context, tracing, not result["success"])
+            await self.tracer.save_timings(title, self._item_timings, result["success"])
         
         return result
     
+    async def find_published_item(
+        self,
+        title: str,
+        price: Optional[float] = None,
+        since: Optional[datetime] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        在"我发布的"列表中查找商品（上次提交结果未知时核对是否已发布）
+        
+        标题必须完全一致；提供了since时商品发布时间不能早于since（以前上架的同名商品不算），
+        提供了price时价格必须一致。标题一致但时间和价格都无法读取时无法确认，抛出异常。
+        
+        Args:
+            title: 商品标题
+            price: 商品价格（可选）
+            since: 本次发布的开始时间（本地时间，可选，如台账记录的创建时间）
+            
+        Returns:
+            找到时返回 {"success": True, "post_id": str, "post_url": str}，未找到返回None
+            
+        Raises:
+            Exception: 登录失效、页面打开失败或找到的商品无法确认（无法确认是否已发布）
+        """
+        await self.goto(self.MY_ITEMS_URL)
+        
+        if "login" in self.page.url.lower():
+            self.report_auth_failure()
+            raise Exception("登录已失效，需要重新登录")
+        
+        title = " ".join(title.split())
+        now = datetime.now()
+        unconfirmed = 0
+        
+        for item in await self.page.query_selector_all(self.SELECTORS["my_item"]):
+            lines = [" ".join(line.split()) for line in (await item.inner_text()).splitlines()]
+            item_title = await self._item_field(item, "my_item_title")
+            if (" ".join(item_title.split()) if item_title else None) != title and title not in lines:
+                continue
+            
+            # 标题一致：核对发布时间和价格（读取不到的项不作判断）
+            matched = False
+            if since is not None:
+                text = await self._item_field(item, "my_item_time")
+                times = [parse_item_time(t, now) for t in ([text] if text else lines)]
+                item_time = next((t for t in times if t is not None), None)
+                if item_time is not None:
+                    if item_time < since - ITEM_TIME_TOLERANCE:
+                        continue
+                    matched = True
+            if price is not None:
+                text = await self._item_field(item, "my_item_price")
+                item_price = parse_item_price(text or "\n".join(lines))
+                if item_price is not None:
+                    if abs(item_price - float(price)) >= 0.01:
+                        continue
+                    matched = True
+            if not matched and (since is not None or price is not None):
+                unconfirmed += 1
+                continue
+            
+            link = await item.query_selector(self.SELECTORS["my_item_link"])
+            post_url = await link.get_attribute("href") if link else None
+            post_id = post_url.split("id=")[1].split("&")[0] if post_url and "id=" in post_url else None
+            print(f"   🔍 在已发布列表中找到: {title}")
+            return {"success": True, "error": None, "post_id": post_id, "post_url": post_url}
+        
+        if unconfirmed:
+            raise Exception(f"找到 {unconfirmed} 个同名商品，但无法读取发布时间和价格，无法确认是否已发布")
+        return None
+    
+    async def _item_field(self, item, selector: str) -> Optional[str]:
+        """读取列表项中某个字段的文本（找不到时返回None）"""
+        element = await item.query_selector(self.SELECTORS[selector])
+        return (await element.inner_text()).strip() if element else None
+    
     async def _check_publish_success(self) -> bool:
         """
         检查发布是否成功
@@ -553,6 +1074,275 @@ class XianyuAutomation(BrowserAutomation):
         return False
 
 
+class _PooledContext:
+    """浏览器池中一个账号的上下文"""
+    
+    __slots__ = ("key", "context", "page", "uses", "logged_in", "lock")
+    
+    def __init__(self, key: str, context):
+        self.key = key
+        self.context = context
+        self.page = None
+        self.uses = 0
+        self.logged_in = False
+        self.lock = asyncio.Lock()
+
+
+class BrowserPool:
+    """
+    浏览器池
+    
+    整个批次只启动一次浏览器，每个账号（Cookie文件）保留一个已登录的上下文。
+    各账号的上下文相互隔离（Cookie、存储、代理），可以并发使用，总并发数受 max_sessions 限制。
+    页面使用 page_max_uses 次后，或者发布出错时关闭重建；上下文和登录状态保留。
+    提供session_cache时，上下文从保存的登录状态创建，有效期内不再检查登录，
+    start_refresher()在后台为即将过期的会话续期。
+    浏览器对象绑定事件循环，池只能在创建它的事件循环中使用。
+    
+    用法:
+        pool = BrowserPool(headless=True)
+        async with pool.session("data/xianyu_cookies.json") as automation:
+            await automation.login("data/xianyu_cookies.json")
+            await automation.publish_product(...)
+        await pool.close()
+    """
+    
+    def __init__(
+        self,
+        headless: bool = False,
+        page_max_uses: int = 20,
+        browser=None,
+        interceptor: Optional[RequestInterceptor] = None,
+        max_sessions: Optional[int] = None,
+        session_cache: Optional[SessionCache] = None
+    ):
+        """
+        初始化浏览器池
+        
+        Args:
+            headless: 是否无头模式
+            page_max_uses: 页面最多使用次数，达到后重建
+            browser: 已启动的浏览器（可选，由调用方负责关闭）
+            interceptor: 请求拦截器（可选，安装到池中的每个上下文）
+            max_sessions: 同时使用的会话数上限（None表示不限制）
+            session_cache: 登录会话缓存（可选）
+        """
+        self.headless = headless
+        self.interceptor = interceptor
+        self.session_cache = session_cache
+        self.refresher: Optional[SessionRefresher] = None
+        self.max_sessions = max_sessions
+        self._session_slots: Optional[asyncio.Semaphore] = None
+        
+        # 各账号创建上下文时的额外参数（如代理）
+        self._context_options: Dict[str, Dict[str, Any]] = {}
+        self.page_max_uses = max(1, page_max_uses)
+        
+        self.playwright = None
+        self.browser = browser
+        self._owns_browser = browser is None
+        self._contexts: Dict[str, _PooledContext] = {}
+        self._lock: Optional[asyncio.Lock] = None
+        
+        # 统计
+        self.launches = 0
+        self.contexts_created = 0
+        self.pages_created = 0
+        self.pages_recycled = 0
+        self.sessions = 0
+        self.active_sessions = 0
+        self.max_active_sessions = 0
+    
+    async def start(self):
+        """启动浏览器（已启动时直接返回）"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        
+        async with self._lock:
+            if self.browser is None:
+                self.playwright, self.browser = await launch_browser(self.headless)
+                self.launches += 1
+                print(f"✅ 浏览器池启动 (headless={self.headless})")
+    
+    def register_account(self, key: str, **context_options):
+        """
+        设置账号上下文的额外参数（需在该账号首次使用前调用）
+        
+        Args:
+            key: 账号标识
+            **context_options: 传给browser.new_context的参数（如proxy）
+        """
+        self._context_options[key] = context_options
+    
+    async def _get_context(self, key: str) -> _PooledContext:
+        """获取账号的上下文（不存在时创建）"""
+        entry = self._contexts.get(key)
+        if entry is not None:
+            return entry
+        
+        await self.start()
+        async with self._lock:
+            # 等待锁期间可能已被其他协程创建
+            entry = self._contexts.get(key)
+            if entry is None:
+                options = {**CONTEXT_OPTIONS, **self._context_options.get(key, {})}
+                if self.session_cache and self.session_cache.has_state(key):
+                    options["storage_state"] = str(self.session_cache.state_path(key))
+                context = await self.browser.new_context(**options)
+                if self.interceptor:
+                    await self.interceptor.attach(context)
+                entry = _PooledContext(key, context)
+                self._contexts[key] = entry
+                self.contexts_created += 1
+                if self.refresher:
+                    self.refresher.add(key)
+        return entry
+    
+    async def _recycle_page(self, entry: _PooledContext):
+        """关闭页面，下次使用时重建"""
+        if entry.page is not None:
+            try:
+                await entry.page.close()
+            except Exception as e:
+                print(f"⚠️ 关闭页面失败: {e}")
+            self.pages_recycled += 1
+        entry.page = None
+        entry.uses = 0
+    
+    @asynccontextmanager
+    async def session(
+        self,
+        key: str = "default",
+        automation_cls: type = None,
+        **kwargs
+    ) -> AsyncIterator["BrowserAutomation"]:
+        """
+        借用账号的上下文和页面
+        
+        同一账号的会话依次执行；不同账号可以并发。
+        
+        Args:
+            key: 账号标识（通常为Cookie文件路径）
+            automation_cls: 自动化类（默认XianyuAutomation）
+            **kwargs: 传给自动化类的其他参数（如progress_callback）
+            
+        Yields:
+            已绑定页面的自动化实例（login()在上下文已登录时直接返回）
+        """
+        entry = await self._get_context(key)
+        automation_cls = automation_cls or XianyuAutomation
+        
+        if self.max_sessions and self._session_slots is None:
+            self._session_slots = asyncio.Semaphore(self.max_sessions)
+        
+        async with entry.lock, self._session_limit():
+            self.active_sessions += 1
+            self.max_active_sessions = max(self.max_active_sessions, self.active_sessions)
+            
+            if entry.page is None or entry.page.is_closed():
+                entry.page = await entry.context.new_page()
+                entry.uses = 0
+                self.pages_created += 1
+            
+            if self.session_cache and issubclass(automation_cls, XianyuAutomation):
+                kwargs.setdefault("session_cache", self.session_cache)
+            automation = automation_cls(headless=self.headless, interceptor=self.interceptor, **kwargs)
+            automation.attach(self.browser, entry.context, entry.page)
+            # 会话过期后由login()重新验证
+            automation.logged_in = entry.logged_in and (
+                self.session_cache is None or self.session_cache.is_valid(key)
+            )
+            self.sessions += 1
+            
+            failed = False
+            try:
+                yield automation
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                self.active_sessions -= 1
+                entry.logged_in = automation.logged_in
+                entry.uses += 1
+                if failed or automation.needs_recycle or entry.uses >= self.page_max_uses:
+                    await self._recycle_page(entry)
+    
+    @asynccontextmanager
+    async def _session_limit(self):
+        """占用一个会话名额（未设置上限时直接通过）"""
+        if self._session_slots is None:
+            yield
+            return
+        async with self._session_slots:
+            yield
+    
+    def invalidate(self, key: str):
+        """标记账号需要重新登录（如Cookie失效）"""
+        entry = self._contexts.get(key)
+        if entry:
+            entry.logged_in = False
+        if self.session_cache:
+            self.session_cache.invalidate(key)
+    
+    async def refresh_session(self, key: str) -> bool:
+        """
+        重新验证账号登录并保存会话（不会等待手动登录）
+        
+        Returns:
+            是否仍然登录
+        """
+        async with self.session(key) as automation:
+            return await automation.login(key, allow_manual=False, force_check=True)
+    
+    def start_refresher(self, interval: float = 300.0, margin: float = 900.0) -> Optional[SessionRefresher]:
+        """
+        启动后台会话续期（未提供session_cache时不启动）
+        
+        Args:
+            interval: 检查间隔(秒)
+            margin: 过期前多久续期(秒)
+        """
+        if self.session_cache is None:
+            return None
+        if self.refresher is None:
+            self.refresher = SessionRefresher(
+                self.session_cache, self.refresh_session, list(self._contexts), interval, margin
+            )
+        self.refresher.start()
+        return self.refresher
+    
+    async def close(self):
+        """关闭所有上下文和浏览器"""
+        if self.refresher:
+            await self.refresher.stop()
+            self.refresher = None
+        
+        for entry in list(self._contexts.values()):
+            try:
+                await entry.context.close()
+            except Exception as e:
+                print(f"⚠️ 关闭上下文失败: {e}")
+        self._contexts.clear()
+        
+        if self._owns_browser and self.browser is not None:
+            await self.browser.close()
+            self.browser = None
+        if self.playwright is not None:
+            await self.playwright.stop()
+            self.playwright = None
+    
+    def get_stats(self) -> Dict[str, int]:
+        """获取复用统计"""
+        return {
+            "launches": self.launches,
+            "contexts": self.contexts_created,
+            "pages_created": self.pages_created,
+            "pages_recycled": self.pages_recycled,
+            "sessions": self.sessions,
+            "max_active_sessions": self.max_active_sessions,
+        }
+
+
 # 测试代码
 async def test_browser_automation():
     """测试浏览器自动化"""
@@ -0,0 +1,119 @@
+"""
+协作式取消与暂停
+
+发布任务持有一个CancellationToken，通过上下文变量传递到发布器、浏览器自动化和AI调用中。
+各步骤之间调用 checkpoint()：已取消则抛出PublishCancelledError，已暂停则原地等待恢复。
+步骤内部长时间阻塞（如等待页面加载）时，宽限期结束后直接取消正在执行的协程，保证资源及时释放。
+"""
+
+import asyncio
+import contextvars
+import threading
+from typing import Dict, Optional
+
+
+class PublishCancelledError(Exception):
+    """发布已被取消"""
+
+
+class CancellationToken:
+    """
+    取消令牌
+
+    线程安全：UI线程调用cancel/pause/resume，任务在后台线程的事件循环中执行。
+    """
+
+    def __init__(self, poll_interval: float = 0.2):
+        """
+        初始化令牌
+
+        Args:
+            poll_interval: 暂停时检查恢复/取消的间隔(秒)
+        """
+        self.poll_interval = poll_interval
+        self.reason = ""
+
+        self._cancelled = False
+        self._paused = False
+        self._tasks: Dict[asyncio.Task, asyncio.AbstractEventLoop] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def is_cancelled(self) -> bool:
+        """是否已取消"""
+        return self._cancelled
+
+    @property
+    def is_paused(self) -> bool:
+        """是否已暂停"""
+        return self._paused and not self._cancelled
+
+    def cancel(self, reason: str = "用户取消", grace_period: Optional[float] = None):
+        """
+        取消
+
+        Args:
+            reason: 取消原因
+            grace_period: 宽限期(秒)，到期后仍未在检查点退出的协程将被强制取消；
+                          None表示只做协作式取消
+        """
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            self.reason = reason
+            tasks = list(self._tasks.items())
+
+        if grace_period is None:
+            return
+
+        for task, loop in tasks:
+            if grace_period <= 0:
+                loop.call_soon_threadsafe(task.cancel)
+            else:
+                loop.call_soon_threadsafe(loop.call_later, grace_period, task.cancel)
+
+    def pause(self):
+        """暂停（在下一个检查点处等待）"""
+        self._paused = True
+
+    def resume(self):
+        """恢复"""
+        self._paused = False
+
+    def raise_if_cancelled(self):
+        """已取消时抛出PublishCancelledError"""
+        if self._cancelled:
+            raise PublishCancelledError(self.reason)
+
+    async def checkpoint(self):
+        """检查点：已取消则抛出异常，已暂停则等待恢复"""
+        self.raise_if_cancelled()
+        while self._paused:
+            await asyncio.sleep(self.poll_interval)
+            self.raise_if_cancelled()
+
+    def track(self, task: asyncio.Task):
+        """登记正在执行的协程（取消宽限期结束后会被强制取消）"""
+        loop = task.get_loop()
+        with self._lock:
+            self._tasks[task] = loop
+        task.add_done_callback(self.untrack)
+
+    def untrack(self, task: asyncio.Task):
+        """移除已结束的协程"""
+        with self._lock:
+            self._tasks.pop(task, None)
+
+
+# 当前协程所属任务的取消令牌（asyncio任务创建时自动复制上下文）
+current_token: contextvars.ContextVar[Optional[CancellationToken]] = contextvars.ContextVar(
+    "current_cancellation_token", default=None
+)
+
+
+async def checkpoint():
+    """检查当前任务的取消令牌（没有令牌时直接返回）"""
+    token = current_token.get()
+    if token is not None:
+        await token.checkpoint()
@@ -13,9 +13,92 @@ from datetime import datetime
 from pathlib import Path
 import logging
 
+try:
+    import orjson  # 可选：更快的JSON解码
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 
+# tasks表的全部字段（用于校验查询投影）
+TASK_COLUMNS = (
+    "id", "type", "name", "status", "progress",
+    "data", "result", "error",
+    "total_items", "processed_items", "success_items", "failed_items",
+    "started_at", "completed_at", "duration", "created_at",
+)
+
+# tasks表中以JSON存储的字段
+TASK_JSON_FIELDS = ("data", "result")
+
+
+def json_loads(raw):
+    """解析JSON（安装了orjson时使用orjson）"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+class LazyRow(dict):
+    """
+    延迟解析JSON字段的行对象
+    
+    JSON字段在首次访问时才解码，只读取状态、时间等字段的调用方不再为载荷解析付费。
+    解码失败时保留原始字符串。
+    """
+    
+    __slots__ = ("_pending",)
+    
+    def __init__(self, row, json_fields=TASK_JSON_FIELDS):
+        super().__init__(row)
+        self._pending = {
+            key for key in json_fields
+            if isinstance(dict.get(self, key), (str, bytes)) and dict.get(self, key)
+        }
+    
+    def _decode(self, key):
+        """解码单个待解析字段"""
+        if key in self._pending:
+            self._pending.discard(key)
+            try:
+                dict.__setitem__(self, key, json_loads(dict.__getitem__(self, key)))
+            except (ValueError, TypeError):
+                pass
+    
+    def _decode_all(self):
+        """解码全部待解析字段"""
+        for key in list(self._pending):
+            self._decode(key)
+    
+    def __getitem__(self, key):
+        self._decode(key)
+        return dict.__getitem__(self, key)
+    
+    def __setitem__(self, key, value):
+        self._pending.discard(key)
+        dict.__setitem__(self, key, value)
+    
+    def __iter__(self):
+        return dict.__iter__(self)
+    
+    def get(self, key, default=None):
+        self._decode(key)
+        return dict.get(self, key, default)
+    
+    def items(self):
+        self._decode_all()
+        return dict.items(self)
+    
+    def values(self):
+        self._decode_all()
+        return dict.values(self)
+    
+    def copy(self):
+        self._decode_all()
+        return dict(dict.items(self))
+
+
 def get_base_path():
     """获取程序基础路径"""
     if getattr(sys, 'frozen', False):
@@ -200,7 +283,7 @@ class Database:
                 # 解析images JSON
                 if product.get("images"):
                     try:
-                        product["images"] = json.loads(product["images"])
+                        product["images"] = json_loads(product["images"])
                     except:
                         product["images"] = []
                 products.append(product)
@@ -400,7 +483,8 @@ class Database:
         self,
         start_time: str,
         end_time: str,
-        status: Optional[str] = None
+        status: Optional[str] = None,
+        columns: Optional[List[str]] = None
     ) -> List[Dict[str, Any]]:
         """
         获取指定时间范围内的任务
@@ -409,20 +493,23 @@ class Database:
             start_time: 开始时间（ISO格式）
             end_time: 结束时间（ISO格式）
             status: 任务状态（可选）
+            columns: 只查询指定字段（可选，默认全部字段）
             
         Returns:
-            任务列表
+            任务列表（data/result字段在首次访问时解析）
         """
+        select = self._task_select(columns)
+        
         if status:
-            sql = """
-            SELECT * FROM tasks 
+            sql = f"""
+            SELECT {select} FROM tasks 
             WHERE created_at >= ? AND created_at <= ? AND status = ?
             ORDER BY created_at DESC
             """
             cursor = await self.conn.execute(sql, (start_time, end_time, status))
         else:
-            sql = """
-            SELECT * FROM tasks 
+            sql = f"""
+            SELECT {select} FROM tasks 
             WHERE created_at >= ? AND created_at <= ?
             ORDER BY created_at DESC
             """
@@ -430,17 +517,27 @@ class Database:
         
         rows = await cursor.fetchall()
         
-        tasks = []
-        for row in rows:
-            task = dict(row)
-            # 解析JSON字段
-            if task.get('data'):
-                task['data'] = json.loads(task['data'])
-            if task.get('result'):
-                task['result'] = json.loads(task['result'])
-            tasks.append(task)
+        return [LazyRow(row) for row in rows]
+    
+    @staticmethod
+    def _task_select(columns: Optional[List[str]]) -> str:
+        """
+        构建tasks查询的字段列表
         
-        return tasks
+        Args:
+            columns: 字段列表（None表示全部字段）
+            
+        Returns:
+            SELECT子句中的字段部分
+        """
+        if not columns:
+            return "*"
+        
+        unknown = [c for c in columns if c not in TASK_COLUMNS]
+        if unknown:
+            raise ValueError(f"未知的任务字段: {', '.join(unknown)}")
+        
+        return ", ".join(columns)
     
     async def get_tasks(
         self,
@@ -448,7 +545,8 @@ class Database:
         status: Optional[str] = None,
         platform: Optional[str] = None,
         start_date: Optional[str] = None,
-        limit: int = 100
+        limit: int = 100,
+        columns: Optional[List[str]] = None
     ) -> List[Dict[str, Any]]:
         """
         获取任务列表（支持多条件筛选）
@@ -459,11 +557,12 @@ class Database:
             platform: 平台筛选
             start_date: 开始日期（ISO格式）
             limit: 返回数量限制
+            columns: 只查询指定字段（可选，默认全部字段）
             
         Returns:
-            任务列表
+            任务列表（data/result字段在首次访问时解析）
         """
-        sql = "SELECT * FROM tasks WHERE 1=1"
+        sql = f"SELECT {self._task_select(columns)} FROM tasks WHERE 1=1"
         params = []
         
         if type:
@@ -489,21 +588,7 @@ class Database:
             cursor = await self.conn.execute(sql, params)
             rows = await cursor.fetchall()
             
-            tasks = []
-            for row in rows:
-                task = dict(row)
-                # 解析JSON字段
-                if task.get('data'):
-                    try:
-                        task['data'] = json.loads(task['data'])
-                    except:
-                        pass
-                if task.get('result'):
-                    try:
-                        task['result'] = json.loads(task['result'])
-                    except:
-                        pass
-                tasks.append(task)
+            tasks = [LazyRow(row) for row in rows]
             
             logger.info(f"✅ 查询任务成功: {len(tasks)}个")
             return tasks
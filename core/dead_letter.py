@@ -0,0 +1,400 @@
+"""
+发布死信队列
+
+批量发布中重试后仍然失败的内容保存到 dead_letters 表（完整数据 + 错误类别），
+按 内容指纹 + 平台 + 账号 去重：同一内容再次失败只更新错误和失败次数。
+DeadLetterScheduler 在低峰时段批量重新投递，重新投递仍走正常的发布流程和频率限制。
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from core.database import Database, json_loads
+from core.publish_ledger import content_fingerprint
+from core.rate_limiter import DEFAULT_ACCOUNT
+
+logger = logging.getLogger(__name__)
+
+
+# 死信状态
+DLQ_PENDING = "pending"         # 待重新投递
+DLQ_REDRIVING = "redriving"     # 重新投递中
+DLQ_HELD = "held"               # 已提交但结果未知，需人工核对后再投递（避免重复发布）
+DLQ_RECOVERED = "recovered"     # 重新投递成功
+DLQ_ABANDONED = "abandoned"     # 超过重新投递次数，放弃
+
+# 投递中超过该时间未更新的视为进程中断，可以再次领取
+STALE_REDRIVE_SECONDS = 3600
+
+
+class DeadLetterQueue:
+    """
+    死信队列
+
+    所有写操作立即提交（与发布台账一致）。
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_redrives: int = 3):
+        """
+        初始化队列
+
+        Args:
+            db_path: 数据库文件路径（可选，默认使用主数据库）
+            max_redrives: 最多重新投递次数，超过后标记为abandoned
+        """
+        self.db = Database(db_path)
+        self.max_redrives = max_redrives
+
+    async def connect(self):
+        """连接数据库（已连接时直接返回）"""
+        if self.db.conn is None:
+            await self.db.connect()
+
+    async def close(self):
+        """关闭连接"""
+        if self.db.conn is None:
+            return
+
+        await self.db.close()
+        self.db.conn = None
+
+    @staticmethod
+    def _platform_key(platform: Any) -> str:
+        """平台名称（支持PlatformType枚举或字符串）"""
+        return getattr(platform, "value", platform)
+
+    @staticmethod
+    def _row_to_entry(row) -> Dict[str, Any]:
+        entry = dict(row)
+        entry["payload"] = json_loads(entry["payload"]) or {}
+        return entry
+
+    async def add(
+        self,
+        payload: Dict[str, Any],
+        error: Optional[str],
+        platform: Any,
+        account: str = DEFAULT_ACCOUNT,
+        category: Optional[str] = None,
+        held: bool = False
+    ) -> int:
+        """
+        记录一次最终失败
+
+        已存在的记录（包括重新投递失败的）更新错误、失败次数和数据；
+        重新投递次数达到上限时标记为abandoned。
+
+        Args:
+            payload: 商品数据
+            error: 错误信息
+            platform: 平台
+            account: 账号（Cookie文件）
+            category: 错误类别
+            held: 内容可能已提交（结果未知），不参与自动重新投递
+
+        Returns:
+            记录ID
+        """
+        await self.connect()
+
+        platform = self._platform_key(platform)
+        fingerprint = content_fingerprint(payload)
+        status = DLQ_HELD if held else DLQ_PENDING
+
+        await self.db.conn.execute(
+            """
+            INSERT INTO dead_letters (fingerprint, platform, account, payload, status, error, category)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (fingerprint, platform, account) DO UPDATE SET
+                payload = excluded.payload,
+                status = CASE
+                    WHEN excluded.status = ? THEN excluded.status
+                    WHEN dead_letters.redrives >= ? THEN ?
+                    ELSE excluded.status
+                END,
+                error = excluded.error,
+                category = excluded.category,
+                failures = dead_letters.failures + 1,
+                updated_at = CURRENT_TIMESTAMP
+            """,
+            (
+                fingerprint, platform, account,
+                json.dumps(payload, ensure_ascii=False, default=str),
+                status, error, category,
+                DLQ_HELD, self.max_redrives, DLQ_ABANDONED,
+            )
+        )
+        await self.db.conn.commit()
+
+        cursor = await self.db.conn.execute(
+            "SELECT id FROM dead_letters WHERE fingerprint = ? AND platform = ? AND account = ?",
+            (fingerprint, platform, account)
+        )
+        row = await cursor.fetchone()
+        logger.info(f"📮 已加入死信队列: {payload.get('title', '')} ({category or '未知错误'})")
+        return row["id"]
+
+    async def resolve(self, payload: Dict[str, Any], platform: Any, account: str = DEFAULT_ACCOUNT) -> bool:
+        """
+        内容已发布成功（重新投递或其他途径），标记为recovered
+
+        Returns:
+            是否有对应的死信记录
+        """
+        await self.connect()
+
+        cursor = await self.db.conn.execute(
+            """
+            UPDATE dead_letters SET status = ?, error = NULL, updated_at = CURRENT_TIMESTAMP
+            WHERE fingerprint = ? AND platform = ? AND account = ? AND status != ?
+            """,
+            (DLQ_RECOVERED, content_fingerprint(payload), self._platform_key(platform), account, DLQ_RECOVERED)
+        )
+        await self.db.conn.commit()
+        return cursor.rowcount > 0
+
+    async def claim(
+        self,
+        platform: Any,
+        ids: Optional[Sequence[int]] = None,
+        limit: int = 50,
+        categories: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        领取待重新投递的记录（状态改为redriving，重新投递次数+1）
+
+        指定ids时可以领取held（人工核对后）和abandoned的记录。
+
+        Args:
+            platform: 平台
+            ids: 指定记录（可选）
+            limit: 最多领取数量
+            categories: 只领取这些错误类别（可选）
+
+        Returns:
+            记录列表（payload已解析为字典）
+        """
+        await self.connect()
+
+        platform = self._platform_key(platform)
+        stale = f"-{STALE_REDRIVE_SECONDS} seconds"
+
+        if ids is not None:
+            if not ids:
+                return []
+            placeholders = ",".join("?" * len(ids))
+            where = f"platform = ? AND id IN ({placeholders}) AND status != ?"
+            params: list = [platform, *ids, DLQ_RECOVERED]
+        else:
+            where = (
+                "platform = ? AND (status = ? OR "
+                "(status = ? AND updated_at < datetime('now', ?)))"
+            )
+            params = [platform, DLQ_PENDING, DLQ_REDRIVING, stale]
+
+        if categories:
+            where += f" AND category IN ({','.join('?' * len(categories))})"
+            params.extend(categories)
+
+        cursor = await self.db.conn.execute(
+            f"SELECT * FROM dead_letters WHERE {where} ORDER BY id LIMIT ?",
+            (*params, limit)
+        )
+        entries = [self._row_to_entry(row) for row in await cursor.fetchall()]
+        if not entries:
+            return []
+
+        await self.db.conn.executemany(
+            """
+            UPDATE dead_letters SET status = ?, redrives = redrives + 1, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+            """,
+            [(DLQ_REDRIVING, entry["id"]) for entry in entries]
+        )
+        await self.db.conn.commit()
+
+        for entry in entries:
+            entry["status"] = DLQ_REDRIVING
+            entry["redrives"] += 1
+        return entries
+
+    async def release(self, ids: Sequence[int]):
+        """把领取后未投递的记录放回待投递（如批次被取消）"""
+        await self._set_status(ids, DLQ_PENDING, only_status=DLQ_REDRIVING)
+
+    async def abandon(self, ids: Sequence[int]):
+        """放弃记录（不再自动投递）"""
+        await self._set_status(ids, DLQ_ABANDONED)
+
+    async def _set_status(self, ids: Sequence[int], status: str, only_status: Optional[str] = None):
+        await self.connect()
+
+        sql = "UPDATE dead_letters SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?"
+        if only_status:
+            sql += " AND status = ?"
+            params = [(status, id_, only_status) for id_ in ids]
+        else:
+            params = [(status, id_) for id_ in ids]
+
+        await self.db.conn.executemany(sql, params)
+        await self.db.conn.commit()
+
+    async def list(
+        self,
+        platform: Any = None,
+        status: Optional[str] = DLQ_PENDING,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """
+        查询记录
+
+        Args:
+            platform: 平台（可选）
+            status: 状态（None表示全部）
+            limit: 最多返回数量
+        """
+        await self.connect()
+
+        conditions, params = [], []
+        if platform is not None:
+            conditions.append("platform = ?")
+            params.append(self._platform_key(platform))
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        cursor = await self.db.conn.execute(
+            f"SELECT * FROM dead_letters {where} ORDER BY updated_at DESC, id DESC LIMIT ?",
+            (*params, limit)
+        )
+        return [self._row_to_entry(row) for row in await cursor.fetchall()]
+
+    async def get_stats(self, platform: Any = None) -> Dict[str, Any]:
+        """
+        统计各状态和错误类别的数量
+
+        Returns:
+            {"by_status": {状态: 数量}, "by_category": {类别: 待投递数量}}
+        """
+        await self.connect()
+
+        where, params = "", ()
+        if platform is not None:
+            where, params = "WHERE platform = ?", (self._platform_key(platform),)
+
+        cursor = await self.db.conn.execute(
+            f"SELECT status, COUNT(*) AS count FROM dead_letters {where} GROUP BY status", params
+        )
+        by_status = {row["status"]: row["count"] for row in await cursor.fetchall()}
+
+        sql = f"SELECT category, COUNT(*) AS count FROM dead_letters {where or 'WHERE 1'} AND status = ? GROUP BY category"
+        cursor = await self.db.conn.execute(sql, (*params, DLQ_PENDING))
+        by_category = {row["category"] or "未知错误": row["count"] for row in await cursor.fetchall()}
+
+        return {"by_status": by_status, "by_category": by_category}
+
+
+class DeadLetterScheduler:
+    """
+    死信定时重新投递
+
+    定期检查，当前时间处于低峰时段且有待投递记录时调用redrive(limit)批量投递。
+    只在创建它的事件循环中运行（与SessionRefresher一致）。
+    """
+
+    def __init__(
+        self,
+        queue: DeadLetterQueue,
+        redrive: Callable[[int], Awaitable[Dict[str, Any]]],
+        platform: Any = "xianyu",
+        off_peak_hours: Tuple[int, int] = (2, 6),
+        interval: float = 600.0,
+        batch_size: int = 50,
+        clock=time.localtime
+    ):
+        """
+        初始化调度器
+
+        Args:
+            queue: 死信队列
+            redrive: 投递函数 redrive(limit) -> 投递结果（如XianyuPublisher.redrive_dead_letters）
+            platform: 平台
+            off_peak_hours: 低峰时段 [开始, 结束) 的小时，开始大于结束表示跨午夜（如(23, 6)）
+            interval: 检查间隔(秒)
+            batch_size: 每次最多投递数量
+            clock: 返回struct_time的时钟函数（测试时可替换）
+        """
+        self.queue = queue
+        self.redrive = redrive
+        self.platform = platform
+        self.off_peak_hours = off_peak_hours
+        self.interval = interval
+        self.batch_size = batch_size
+        self.clock = clock
+        self._task: Optional[asyncio.Task] = None
+
+        self.stats: Dict[str, int] = {"runs": 0, "redriven": 0, "recovered": 0}
+
+    def in_off_peak(self) -> bool:
+        """当前是否处于低峰时段"""
+        start, end = self.off_peak_hours
+        hour = self.clock().tm_hour
+        if start <= end:
+            return start <= hour < end
+        return hour >= start or hour < end
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """启动后台任务（已启动时直接返回）"""
+        if not self.running:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        """停止后台任务"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def run_once(self, force: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        检查一次并投递
+
+        Args:
+            force: 忽略低峰时段限制
+
+        Returns:
+            投递结果（未投递时返回None）
+        """
+        if not force and not self.in_off_peak():
+            return None
+
+        stats = await self.queue.get_stats(self.platform)
+        if not stats["by_status"].get(DLQ_PENDING):
+            return None
+
+        logger.info(f"📮 低峰时段重新投递死信: {stats['by_status'][DLQ_PENDING]} 条待投递")
+        result = await self.redrive(self.batch_size)
+        self.stats["runs"] += 1
+        self.stats["redriven"] += result.get("total", 0)
+        self.stats["recovered"] += result.get("success", 0)
+        return result
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.warning(f"⚠️ 死信重新投递出错: {e}")
+            await asyncio.sleep(self.interval)
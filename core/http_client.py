@@ -0,0 +1,379 @@
+"""
+共享HTTP客户端
+
+各平台客户端（B站API、内容抓取、SessionManager）共用的异步HTTP层：
+- 每个事件循环一个连接池（aiohttp会话不能跨事件循环使用，UI每个任务在自己的线程和事件循环中运行）；
+  临时创建的事件循环用close_event_loop()关闭，先释放其连接池
+- 按主机限制连接数和并发请求数，DNS缓存，长连接复用
+- 统一的超时配置，连接失败/超时/429/5xx按指数退避（带抖动）重试，遵守Retry-After
+- 响应体在释放连接前读完，调用方拿到的是与连接无关的HttpResponse
+"""
+
+import asyncio
+import json as jsonlib
+import logging
+import random
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Mapping, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+from multidict import CIMultiDict
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+
+# 幂等方法：超时、连接断开和服务端错误都可以安全重试
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+# 可重试的状态码（429对所有方法重试：服务端明确表示未处理请求）
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class HostPolicy:
+    """单个主机的请求策略"""
+    max_concurrency: int = 8            # 同时进行的请求数
+    timeout: float = 30.0               # 单次请求总超时(秒)
+    connect_timeout: float = 10.0       # 建立连接超时(秒)
+    retries: int = 2                    # 最大重试次数
+    backoff: float = 0.5                # 初始退避时间(秒)
+    max_backoff: float = 8.0            # 退避时间上限(秒)
+
+
+class HttpError(Exception):
+    """HTTP状态码错误"""
+
+    def __init__(self, status: int, url: str, body: str = ""):
+        super().__init__(f"HTTP {status}: {url}")
+        self.status = status
+        self.url = url
+        self.body = body
+
+
+@dataclass
+class HttpResponse:
+    """已读取完毕的HTTP响应"""
+    status: int
+    url: str
+    headers: Mapping[str, str] = field(default_factory=CIMultiDict)     # 不区分大小写
+    body: bytes = b""
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 400
+
+    def text(self, encoding: str = "utf-8") -> str:
+        return self.body.decode(encoding, errors="replace")
+
+    def json(self) -> Any:
+        return jsonlib.loads(self.body or b"null")
+
+    def raise_for_status(self):
+        """状态码>=400时抛出HttpError"""
+        if not self.ok:
+            raise HttpError(self.status, self.url, self.text()[:200])
+
+
+class _LoopState:
+    """单个事件循环的连接池和主机并发限制"""
+
+    def __init__(self, session: aiohttp.ClientSession):
+        self.session = session
+        self.semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+class HttpClient:
+    """
+    共享HTTP客户端
+
+    线程安全：不同线程（各自的事件循环）可以共用同一个实例，每个事件循环使用独立的连接池。
+    """
+
+    def __init__(
+        self,
+        default_policy: Optional[HostPolicy] = None,
+        host_policies: Optional[Dict[str, HostPolicy]] = None,
+        limit: int = 100,
+        limit_per_host: int = 10,
+        dns_cache_ttl: int = 300,
+        keepalive_timeout: float = 30.0,
+        headers: Optional[Dict[str, str]] = None
+    ):
+        """
+        初始化客户端
+
+        Args:
+            default_policy: 默认请求策略
+            host_policies: 各主机的请求策略 {主机名: HostPolicy}
+            limit: 连接池总连接数
+            limit_per_host: 每个主机的最大连接数
+            dns_cache_ttl: DNS缓存时间(秒)
+            keepalive_timeout: 空闲长连接保留时间(秒)
+            headers: 所有请求的默认请求头
+        """
+        self.default_policy = default_policy or HostPolicy()
+        self.host_policies: Dict[str, HostPolicy] = dict(host_policies or {})
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.headers = {"User-Agent": DEFAULT_USER_AGENT, **(headers or {})}
+
+        # 会话持有事件循环的强引用，不能用WeakKeyDictionary自动清理：由close()释放，已关闭的循环在下次创建时清理
+        self._states: Dict[asyncio.AbstractEventLoop, _LoopState] = {}
+        self._lock = threading.Lock()
+        self._random = random.Random()
+
+        self.stats: Dict[str, Any] = {
+            "requests": 0,          # 发出的请求数（含重试）
+            "retries": 0,           # 重试次数
+            "errors": 0,            # 最终失败的请求数
+            "pools_created": 0,     # 创建的连接池数
+            "hosts": {},            # {主机: 请求数}
+        }
+
+    # ===== 配置 =====
+
+    def configure_host(self, host: str, policy: HostPolicy):
+        """配置主机的请求策略"""
+        with self._lock:
+            self.host_policies[host] = policy
+
+    def get_policy(self, host: str) -> HostPolicy:
+        """获取主机的请求策略（未配置时使用默认策略）"""
+        return self.host_policies.get(host, self.default_policy)
+
+    # ===== 连接池 =====
+
+    def _get_state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            # 未释放连接池就关闭的事件循环：丢弃引用，连接随会话对象回收
+            for closed_loop in [l for l in self._states if l.is_closed()]:
+                del self._states[closed_loop]
+                logger.debug("丢弃已关闭事件循环的连接池")
+
+            state = self._states.get(loop)
+            if state is None or state.session.closed:
+                connector = aiohttp.TCPConnector(
+                    limit=self.limit,
+                    limit_per_host=self.limit_per_host,
+                    ttl_dns_cache=self.dns_cache_ttl,
+                    keepalive_timeout=self.keepalive_timeout,
+                )
+                # 不保存响应中的Cookie：连接池由所有账号共用，Cookie由HttpSession按请求显式携带
+                state = _LoopState(aiohttp.ClientSession(
+                    connector=connector, headers=self.headers, cookie_jar=aiohttp.DummyCookieJar()
+                ))
+                self._states[loop] = state
+                self.stats["pools_created"] += 1
+            return state
+
+    async def session(self) -> aiohttp.ClientSession:
+        """
+        当前事件循环的aiohttp会话（用于流式上传等需要直接操作连接的场景）
+
+        不要关闭返回的会话，使用close()释放连接池。
+        """
+        return self._get_state().session
+
+    def _semaphore(self, state: _LoopState, host: str) -> asyncio.Semaphore:
+        semaphore = state.semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(max(1, self.get_policy(host).max_concurrency))
+            state.semaphores[host] = semaphore
+        return semaphore
+
+    async def close(self):
+        """关闭当前事件循环的连接池（之后的请求会创建新的连接池）"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._states.pop(loop, None)
+        if state is not None and not state.session.closed:
+            await state.session.close()
+
+    # ===== 请求 =====
+
+    def _backoff(self, policy: HostPolicy, attempt: int, retry_after: Optional[str] = None) -> float:
+        """重试等待时间：优先使用Retry-After，否则指数退避加抖动"""
+        if retry_after:
+            try:
+                return min(policy.max_backoff, max(0.0, float(retry_after)))
+            except ValueError:
+                pass
+        delay = min(policy.max_backoff, policy.backoff * (2 ** attempt))
+        return delay * (0.5 + self._random.random() / 2)
+
+    def _count(self, key: str, host: Optional[str] = None):
+        with self._lock:
+            self.stats[key] += 1
+            if host is not None:
+                self.stats["hosts"][host] = self.stats["hosts"].get(host, 0) + 1
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        json: Any = None,
+        data: Any = None,
+        timeout: Optional[float] = None,
+        retries: Optional[int] = None
+    ) -> HttpResponse:
+        """
+        发送请求（按主机策略限流、超时和重试）
+
+        Args:
+            method: 请求方法
+            url: 请求地址
+            params: 查询参数
+            headers: 请求头（与默认请求头合并）
+            json: JSON请求体
+            data: 表单或二进制请求体
+            timeout: 覆盖策略中的总超时(秒)
+            retries: 覆盖策略中的重试次数
+
+        Returns:
+            HttpResponse（重试后仍为错误状态码时返回最后一次的响应，不抛出异常）
+
+        Raises:
+            aiohttp.ClientError / asyncio.TimeoutError: 重试后仍无法完成请求
+        """
+        method = method.upper()
+        host = urlparse(url).hostname or ""
+        policy = self.get_policy(host)
+        max_retries = policy.retries if retries is None else retries
+        client_timeout = aiohttp.ClientTimeout(
+            total=timeout or policy.timeout,
+            connect=policy.connect_timeout
+        )
+
+        state = self._get_state()
+        semaphore = self._semaphore(state, host)
+
+        for attempt in range(max_retries + 1):
+            self._count("requests", host)
+            retry_after = None
+            try:
+                async with semaphore:
+                    async with state.session.request(
+                        method, url, params=params, headers=headers, json=json, data=data, timeout=client_timeout
+                    ) as resp:
+                        response = HttpResponse(
+                            status=resp.status,
+                            url=str(resp.url),
+                            headers=CIMultiDict(resp.headers),
+                            body=await resp.read(),
+                        )
+
+                retryable = response.status == 429 or (
+                    method in IDEMPOTENT_METHODS and response.status in RETRY_STATUSES
+                )
+                if not retryable or attempt >= max_retries:
+                    return response
+                retry_after = response.headers.get("Retry-After")
+                reason = f"HTTP {response.status}"
+
+            except aiohttp.ClientConnectorError as e:
+                # 连接未建立，任何方法都可以重试
+                if attempt >= max_retries:
+                    self._count("errors")
+                    raise
+                reason = str(e)
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # 请求可能已被处理，只重试幂等方法
+                if method not in IDEMPOTENT_METHODS or attempt >= max_retries:
+                    self._count("errors")
+                    raise
+                reason = str(e) or type(e).__name__
+
+            self._count("retries")
+            delay = self._backoff(policy, attempt, retry_after)
+            logger.warning(f"⚠️ {method} {host} 失败（{reason}），{delay:.1f}秒后重试 ({attempt + 1}/{max_retries})")
+            await asyncio.sleep(delay)
+
+    async def get(self, url: str, **kwargs) -> HttpResponse:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> HttpResponse:
+        return await self.request("POST", url, **kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取请求统计"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["hosts"] = dict(self.stats["hosts"])
+            stats["pools"] = len(self._states)
+        return stats
+
+
+class HttpSession:
+    """
+    带固定请求头和Cookie的会话视图（SessionManager为每个平台创建一个）
+
+    请求通过共享HttpClient发出，关闭会话不会关闭连接池。
+    """
+
+    def __init__(
+        self,
+        client: HttpClient,
+        headers: Optional[Dict[str, str]] = None,
+        cookies: Optional[Dict[str, str]] = None
+    ):
+        self.client = client
+        self.headers: Dict[str, str] = dict(headers or {})
+        self.cookies: Dict[str, str] = dict(cookies or {})
+        self.closed = False
+
+    def _headers(self, headers: Optional[Dict[str, str]]) -> Dict[str, str]:
+        merged = dict(self.headers)
+        if self.cookies:
+            merged["Cookie"] = "; ".join(f"{name}={value}" for name, value in self.cookies.items())
+        merged.update(headers or {})
+        return merged
+
+    async def request(self, method: str, url: str, headers: Optional[Dict[str, str]] = None, **kwargs) -> HttpResponse:
+        if self.closed:
+            raise RuntimeError("会话已关闭")
+        return await self.client.request(method, url, headers=self._headers(headers), **kwargs)
+
+    async def get(self, url: str, **kwargs) -> HttpResponse:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> HttpResponse:
+        return await self.request("POST", url, **kwargs)
+
+    async def close(self):
+        self.closed = True
+
+
+# 全局单例
+_http_client = None
+
+def get_http_client() -> HttpClient:
+    """获取全局共享HTTP客户端单例"""
+    global _http_client
+    if _http_client is None:
+        _http_client = HttpClient()
+    return _http_client
+
+
+def close_event_loop(loop: asyncio.AbstractEventLoop):
+    """
+    释放全局客户端在该事件循环中的连接池，然后关闭事件循环
+
+    UI后台线程每次操作新建的事件循环用它代替loop.close()，否则每次操作都会留下一个连接池和长连接。
+    """
+    if _http_client is not None and not loop.is_closed() and not loop.is_running():
+        try:
+            loop.run_until_complete(_http_client.close())
+        except Exception as e:
+            logger.warning(f"⚠️ 释放连接池失败: {e}")
+    loop.close()
@@ -0,0 +1,329 @@
+"""
+图片预处理流水线
+
+发布前在进程池中并行处理商品图片，减少上传耗时：
+- 完整解码校验（损坏或不支持的图片直接剔除，不再等到上传时失败）
+- 按EXIF方向自动旋转
+- 缩放到平台允许的最长边，重新压缩为不超过大小限制的JPEG
+- 去除EXIF/GPS等元数据
+- 结果按内容哈希保存在缓存目录，同一张图片再次发布时直接复用
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_IMAGE_CACHE_DIR = "data/cache/images"
+
+# 可以解码的图片格式（Pillow的format名称）
+SUPPORTED_FORMATS = {"JPEG", "MPO", "PNG", "GIF", "WEBP", "BMP"}
+
+
+@dataclass(frozen=True)
+class ImageSpec:
+    """图片规格"""
+    max_dimension: int = 1920           # 最长边(像素)
+    max_bytes: int = 2 * 1024 * 1024    # 单张图片大小上限
+    quality: int = 85                   # 初始JPEG质量
+    min_quality: int = 60               # 超过大小限制时最低降到的质量
+
+    @classmethod
+    def from_limits(cls, limits: Dict[str, Any], **kwargs) -> "ImageSpec":
+        """
+        从平台限制（core.publisher.PLATFORM_LIMITS）创建
+
+        Args:
+            limits: 平台限制配置，读取image_max_dimension和image_max_bytes
+        """
+        spec = cls(**kwargs)
+        return cls(
+            max_dimension=limits.get("image_max_dimension", spec.max_dimension),
+            max_bytes=limits.get("image_max_bytes", spec.max_bytes),
+            quality=spec.quality,
+            min_quality=spec.min_quality,
+        )
+
+    @property
+    def key(self) -> str:
+        """参与缓存键计算（规格变化后重新处理）"""
+        return f"{self.max_dimension}x{self.max_bytes}q{self.quality}-{self.min_quality}"
+
+
+def _encode_jpeg(image, spec: ImageSpec) -> bytes:
+    """编码为JPEG，超过大小限制时先降低质量，再缩小尺寸"""
+    from PIL import Image
+
+    for _ in range(6):
+        quality = spec.quality
+        while True:
+            buffer = BytesIO()
+            # 不传exif/icc_profile，输出中不包含任何元数据
+            image.save(buffer, "JPEG", quality=quality, optimize=True, progressive=True)
+            data = buffer.getvalue()
+            if len(data) <= spec.max_bytes or quality <= spec.min_quality:
+                break
+            quality = max(spec.min_quality, quality - 10)
+
+        if len(data) <= spec.max_bytes:
+            return data
+
+        width, height = image.size
+        image = image.resize((max(1, int(width * 0.75)), max(1, int(height * 0.75))), Image.LANCZOS)
+
+    return data
+
+
+def _to_rgb(image):
+    """转换为RGB（透明背景填充为白色）"""
+    from PIL import Image
+
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        rgba = image.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def process_image(path: str, cache_dir: str, spec: ImageSpec) -> Dict[str, Any]:
+    """
+    处理单张图片（在工作进程中执行）
+
+    Args:
+        path: 原图路径
+        cache_dir: 缓存目录
+        spec: 图片规格
+
+    Returns:
+        {"source", "path", "ok", "error", "cached", "original_bytes", "bytes", "size"}
+    """
+    result = {
+        "source": path,
+        "path": None,
+        "ok": False,
+        "error": None,
+        "cached": False,
+        "original_bytes": 0,
+        "bytes": 0,
+        "size": None,
+    }
+
+    try:
+        data = Path(path).read_bytes()
+    except FileNotFoundError:
+        result["error"] = f"图片文件不存在: {path}"
+        return result
+    except OSError as e:
+        result["error"] = f"图片读取失败: {e}"
+        return result
+
+    result["original_bytes"] = len(data)
+
+    # 内容寻址：相同内容 + 相同规格只处理一次
+    digest = hashlib.sha256(data + spec.key.encode("utf-8")).hexdigest()
+    target = Path(cache_dir) / digest[:2] / f"{digest}.jpg"
+    if target.exists():
+        result.update(path=str(target), ok=True, cached=True, bytes=target.stat().st_size)
+        return result
+
+    from PIL import Image, ImageOps
+
+    try:
+        with Image.open(BytesIO(data)) as probe:
+            if probe.format not in SUPPORTED_FORMATS:
+                raise ValueError(f"不支持的图片格式: {probe.format}")
+            probe.verify()
+
+        # verify()之后需要重新打开才能读取像素
+        with Image.open(BytesIO(data)) as image:
+            image.load()
+            image = _to_rgb(ImageOps.exif_transpose(image))
+        image.thumbnail((spec.max_dimension, spec.max_dimension), Image.LANCZOS)
+        encoded = _encode_jpeg(image, spec)
+    except Exception as e:
+        result["error"] = f"图片损坏或无法解码: {path} - {e}"
+        return result
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_bytes(encoded)
+    os.replace(tmp_path, target)
+
+    result.update(path=str(target), ok=True, bytes=len(encoded), size=image.size)
+    return result
+
+
+class ImagePipeline:
+    """
+    图片预处理流水线
+
+    同一张图片（路径、修改时间、大小相同）只提交一次，并发请求共用同一个结果；
+    结果是concurrent.futures.Future，可以被多个事件循环（UI的每个批次）等待。
+    """
+
+    def __init__(
+        self,
+        spec: Optional[ImageSpec] = None,
+        cache_dir: str = DEFAULT_IMAGE_CACHE_DIR,
+        max_workers: Optional[int] = None,
+        use_processes: Optional[bool] = None
+    ):
+        """
+        初始化流水线
+
+        Args:
+            spec: 图片规格（默认ImageSpec()）
+            cache_dir: 处理结果缓存目录
+            max_workers: 工作进程数（默认CPU核数）
+            use_processes: 是否使用进程池（False时使用线程池，适合图片很少的场景；
+                默认在PyInstaller打包的程序中使用线程池，其余情况使用进程池）
+        """
+        self.spec = spec or ImageSpec()
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.use_processes = not getattr(sys, "frozen", False) if use_processes is None else use_processes
+
+        self._executor: Optional[Executor] = None
+        self._futures: Dict[tuple, Future] = {}
+        self._lock = threading.Lock()
+
+        self.stats: Dict[str, int] = {
+            "images": 0,            # 处理的图片数
+            "cached": 0,            # 命中缓存
+            "failed": 0,            # 损坏或不存在
+            "bytes_in": 0,          # 原图总大小
+            "bytes_out": 0,         # 处理后总大小
+        }
+
+    def _get_executor(self) -> Executor:
+        """创建执行器（调用方持有锁）"""
+        if self._executor is None:
+            if self.use_processes:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="image")
+        return self._executor
+
+    @staticmethod
+    def _file_key(path: str) -> tuple:
+        try:
+            stat = os.stat(path)
+            return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return (os.path.abspath(path), None, None)
+
+    def submit(self, path: str) -> Future:
+        """
+        提交一张图片（已提交过的直接返回原来的Future）
+
+        Returns:
+            结果为process_image()返回值的Future
+        """
+        key = self._file_key(path)
+        with self._lock:
+            future = self._futures.get(key)
+            if future is None:
+                future = self._get_executor().submit(process_image, path, self.cache_dir, self.spec)
+                future.add_done_callback(self._record)
+                self._futures[key] = future
+        return future
+
+    def prefetch(self, paths: List[str]):
+        """提前提交图片，发布前再取结果（与发布并行处理）"""
+        for path in paths:
+            self.submit(path)
+
+    def _record(self, future: Future):
+        """统计一张图片的处理结果（每个Future只调用一次）"""
+        if future.cancelled():
+            return
+
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.warning(f"⚠️ 图片处理出错: {e}")
+            with self._lock:
+                self.stats["failed"] += 1
+            return
+
+        with self._lock:
+            self.stats["images"] += 1
+            if not result["ok"]:
+                self.stats["failed"] += 1
+                return
+            if result["cached"]:
+                self.stats["cached"] += 1
+            self.stats["bytes_in"] += result["original_bytes"]
+            self.stats["bytes_out"] += result["bytes"]
+
+    async def process(self, paths: List[str]) -> List[Dict[str, Any]]:
+        """
+        处理一组图片
+
+        Returns:
+            与paths顺序一致的处理结果
+        """
+        futures = [asyncio.wrap_future(self.submit(path)) for path in paths]
+        results = []
+        for path, outcome in zip(paths, await asyncio.gather(*futures, return_exceptions=True)):
+            if isinstance(outcome, Exception):
+                outcome = {"source": path, "path": None, "ok": False, "error": str(outcome)}
+            results.append(outcome)
+        return results
+
+    async def prepare(self, paths: List[str]) -> List[str]:
+        """
+        处理一组图片，返回可以上传的文件路径（剔除损坏和不存在的图片）
+
+        Args:
+            paths: 原图路径
+
+        Returns:
+            处理后的图片路径（顺序与原图一致）
+        """
+        prepared = []
+        for result in await self.process(paths):
+            if result["ok"]:
+                prepared.append(result["path"])
+            else:
+                logger.warning(f"⚠️ {result['error']}")
+        return prepared
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取处理统计（bytes_saved为压缩节省的字节数）"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats["bytes_saved"] = stats["bytes_in"] - stats["bytes_out"]
+        return stats
+
+    def close(self):
+        """关闭执行器（处理中的图片会先完成）"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._futures.clear()
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+# 全局单例（同一图片规格共用一个流水线和工作进程池）
+_image_pipelines: Dict[ImageSpec, ImagePipeline] = {}
+_image_pipelines_lock = threading.Lock()
+
+def get_image_pipeline(spec: Optional[ImageSpec] = None) -> ImagePipeline:
+    """获取该图片规格的全局流水线单例"""
+    spec = spec or ImageSpec()
+    with _image_pipelines_lock:
+        if spec not in _image_pipelines:
+            _image_pipelines[spec] = ImagePipeline(spec)
+        return _image_pipelines[spec]
@@ -0,0 +1,166 @@
+"""
+多关键词匹配器
+
+基于Aho-Corasick自动机：词典只构建一次，一次扫描文本即可找出所有关键词（包括重叠的匹配），
+耗时与文本长度和匹配数成正比，与词典大小无关。标签推荐、分区推荐、话题匹配和爆款Hook识别共用。
+
+关键词可以分组（如 {分区: 关键词列表}），同一个关键词可以属于多个分组。
+"""
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Mapping, Tuple
+
+
+@dataclass(frozen=True)
+class KeywordMatch:
+    """一次匹配"""
+    start: int          # 在原文中的起始位置
+    end: int            # 结束位置（不含）
+    keyword: str        # 匹配的关键词（词典中的原始写法）
+
+
+class KeywordMatcher:
+    """
+    多关键词匹配器
+
+    构建后只读，可以在多个线程中共用。
+    """
+
+    def __init__(self, groups: Mapping[str, Iterable[str]], case_sensitive: bool = False):
+        """
+        构建自动机
+
+        Args:
+            groups: {分组名: 关键词列表}，只有一个分组时也可以用from_keywords()创建
+            case_sensitive: 是否区分大小写
+        """
+        self.case_sensitive = case_sensitive
+
+        self.keywords: List[str] = []                                   # 关键词ID -> 关键词
+        self.groups: Dict[str, List[Tuple[int, int]]] = {}              # 分组 -> [(顺序, 关键词ID)]
+        self._keyword_groups: List[List[Tuple[str, int]]] = []          # 关键词ID -> [(分组, 顺序)]
+        keyword_ids: Dict[str, int] = {}
+
+        # 状态转移表、失败指针、输出（关键词ID列表，包含后缀状态的输出）
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+
+        for group, words in groups.items():
+            members = self.groups.setdefault(group, [])
+            for order, word in enumerate(words):
+                if not word:
+                    continue
+                keyword_id = keyword_ids.get(word)
+                if keyword_id is None:
+                    keyword_id = keyword_ids[word] = len(self.keywords)
+                    self.keywords.append(word)
+                    self._keyword_groups.append([])
+                    self._insert(self._fold(word), keyword_id)
+                members.append((order, keyword_id))
+                self._keyword_groups[keyword_id].append((group, order))
+
+        self._build_failure_links()
+
+    @classmethod
+    def from_keywords(cls, keywords: Iterable[str], case_sensitive: bool = False) -> "KeywordMatcher":
+        """从单个关键词列表创建（分组名为空字符串）"""
+        return cls({"": list(keywords)}, case_sensitive=case_sensitive)
+
+    def _fold(self, text: str) -> str:
+        """大小写归一（逐字符转换，保证位置与原文一致）"""
+        if self.case_sensitive:
+            return text
+        return "".join(ch.lower() if len(ch.lower()) == 1 else ch for ch in text)
+
+    def _insert(self, word: str, keyword_id: int):
+        state = 0
+        for ch in word:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(keyword_id)
+
+    def _build_failure_links(self):
+        """按层构建失败指针，并把后缀状态的输出合并到当前状态"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    # ===== 匹配 =====
+
+    def _scan(self, text: str) -> Iterator[Tuple[int, int]]:
+        """扫描文本，产生 (结束位置, 关键词ID)"""
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for index, ch in enumerate(self._fold(text)):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for keyword_id in output[state]:
+                yield index + 1, keyword_id
+
+    def finditer(self, text: str) -> Iterator[KeywordMatch]:
+        """所有匹配（包括重叠的匹配），按结束位置排序"""
+        for end, keyword_id in self._scan(text):
+            keyword = self.keywords[keyword_id]
+            yield KeywordMatch(end - len(keyword), end, keyword)
+
+    def find_all(self, text: str) -> List[KeywordMatch]:
+        return list(self.finditer(text))
+
+    def contains_any(self, text: str) -> bool:
+        """是否包含任意关键词（找到第一个即返回）"""
+        for _ in self._scan(text):
+            return True
+        return False
+
+    def counts(self, text: str) -> Dict[str, int]:
+        """{关键词: 出现次数}"""
+        result: Dict[str, int] = {}
+        for _, keyword_id in self._scan(text):
+            keyword = self.keywords[keyword_id]
+            result[keyword] = result.get(keyword, 0) + 1
+        return result
+
+    def matched(self, text: str) -> List[str]:
+        """出现过的关键词（按词典顺序）"""
+        found = {keyword_id for _, keyword_id in self._scan(text)}
+        return [self.keywords[keyword_id] for keyword_id in sorted(found)]
+
+    def group_matches(self, text: str) -> Dict[str, List[str]]:
+        """
+        按分组统计出现过的关键词
+
+        Returns:
+            {分组名: 出现过的关键词（按分组内的顺序）}，没有匹配的分组不出现
+        """
+        found: Dict[str, List[Tuple[int, str]]] = {}
+        for keyword_id in {keyword_id for _, keyword_id in self._scan(text)}:
+            keyword = self.keywords[keyword_id]
+            for group, order in self._keyword_groups[keyword_id]:
+                found.setdefault(group, []).append((order, keyword))
+
+        return {
+            group: [keyword for _, keyword in sorted(found[group])]
+            for group in self.groups if group in found
+        }
+
+    def group_size(self, group: str) -> int:
+        """分组中的关键词数"""
+        return len(self.groups.get(group, []))
+
@@ -0,0 +1,266 @@
+"""
+发布台账
+
+按 内容指纹 + 平台 + 账号 记录每次发布：提交前登记为 in_flight，平台确认后改为 confirmed，
+平台明确拒绝时改为 failed。超时或异常导致结果未知时保持 in_flight，
+重试前先核对台账（以及平台上的实际状态），避免同一内容被重复发布。
+in_flight 的记录只有在核对过平台、或超过有效期（提交方已崩溃）后才能被重新登记，
+同一内容同时只有一个任务能登记成功。
+confirmed 的记录只在去重期内有效，过期后（或调用方明确要求 force）同一内容可以再次发布。
+"""
+
+import hashlib
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from core.database import Database
+from core.rate_limiter import DEFAULT_ACCOUNT
+
+logger = logging.getLogger(__name__)
+
+
+# 台账状态
+LEDGER_IN_FLIGHT = "in_flight"      # 已提交，结果未确认
+LEDGER_CONFIRMED = "confirmed"      # 已确认发布成功
+LEDGER_FAILED = "failed"            # 已确认未发布（可以安全重试）
+
+# confirmed 记录默认去重期（秒）：覆盖重试和重复提交，不阻止以后再次上架同一商品
+DEFAULT_CONFIRMED_TTL = 7 * 24 * 3600
+
+# 参与指纹计算的字段（不含创建时间等与内容无关的字段）
+FINGERPRINT_FIELDS = ("title", "content", "description", "images", "video", "tags", "category", "price")
+
+
+def content_fingerprint(content: Any) -> str:
+    """
+    计算内容指纹
+
+    Args:
+        content: PublishContent 或商品字典
+
+    Returns:
+        指纹（32位十六进制）
+    """
+    if isinstance(content, dict):
+        values = {k: content.get(k) for k in FINGERPRINT_FIELDS}
+    else:
+        values = {k: getattr(content, k, None) for k in FINGERPRINT_FIELDS}
+
+    # 空值统一处理，避免 None/""/[] 产生不同指纹
+    normalized = {k: v for k, v in values.items() if v not in (None, "", [])}
+    if isinstance(normalized.get("title"), str):
+        normalized["title"] = normalized["title"].strip()
+    if normalized.get("price") is not None:
+        normalized["price"] = float(normalized["price"])
+
+    raw = json.dumps(normalized, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def ledger_time(value: Optional[str]) -> Optional[datetime]:
+    """
+    台账时间（SQLite CURRENT_TIMESTAMP，UTC）转换为本地时间
+
+    Returns:
+        本地时间（不带时区），为空时返回None
+    """
+    if not value:
+        return None
+    utc = datetime.strptime(value, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+    return utc.astimezone().replace(tzinfo=None)
+
+
+class PublishLedger:
+    """
+    发布台账
+
+    所有写操作立即提交：台账用于防止重复发布，不能像任务结果一样批量缓冲。
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        stale_after: float = 3600,
+        confirmed_ttl: Optional[float] = DEFAULT_CONFIRMED_TTL
+    ):
+        """
+        初始化台账
+
+        Args:
+            db_path: 数据库文件路径（可选，默认使用主数据库）
+            stale_after: in_flight 记录的有效期（秒），超过后视为提交方已崩溃，可以重新登记
+            confirmed_ttl: confirmed 记录的去重期（秒），超过后同一内容可以再次发布；None表示永久有效
+        """
+        self.db = Database(db_path)
+        self.stale_after = stale_after
+        self.confirmed_ttl = confirmed_ttl
+
+    @property
+    def _confirmed_expiry(self) -> Optional[str]:
+        """confirmed 记录过期时间的SQLite修饰符（永久有效时为None，datetime()返回NULL）"""
+        if self.confirmed_ttl is None:
+            return None
+        return f"-{int(self.confirmed_ttl)} seconds"
+
+    async def connect(self):
+        """连接数据库（已连接时直接返回）"""
+        if self.db.conn is None:
+            await self.db.connect()
+
+    async def close(self):
+        """关闭连接"""
+        if self.db.conn is None:
+            return
+
+        await self.db.close()
+        self.db.conn = None
+
+    @staticmethod
+    def _platform_key(platform: Any) -> str:
+        """平台名称（支持PlatformType枚举或字符串）"""
+        return getattr(platform, "value", platform)
+
+    async def get(
+        self,
+        fingerprint: str,
+        platform: Any,
+        account: str = DEFAULT_ACCOUNT
+    ) -> Optional[Dict[str, Any]]:
+        """
+        查询台账记录
+
+        Returns:
+            记录字典（status, attempts, post_id, post_url, error, created_at, updated_at），
+            不存在或 confirmed 记录已过去重期时返回None
+        """
+        await self.connect()
+
+        cursor = await self.db.conn.execute(
+            """
+            SELECT status, attempts, post_id, post_url, error, created_at, updated_at
+            FROM publish_ledger
+            WHERE fingerprint = ? AND platform = ? AND account = ?
+              AND NOT (status = ? AND IFNULL(updated_at <= datetime('now', ?), 0))
+            """,
+            (fingerprint, self._platform_key(platform), account, LEDGER_CONFIRMED, self._confirmed_expiry)
+        )
+        row = await cursor.fetchone()
+        return dict(row) if row else None
+
+    async def begin(
+        self,
+        fingerprint: str,
+        platform: Any,
+        account: str = DEFAULT_ACCOUNT,
+        verified: bool = False,
+        force: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """
+        提交发布前登记
+
+        新记录和 failed 记录直接登记为 in_flight；已有的 in_flight 记录只有在已核对平台
+        （verified=True）或超过有效期时才能重新登记；去重期内已确认发布的内容不会被改回 in_flight。
+        登记在一条语句内完成，同一内容并发登记时只有一个能成功。
+        confirmed 记录被重新登记时视为一次新的发布，created_at 和发布结果重新开始记录。
+
+        Args:
+            fingerprint: 内容指纹
+            platform: 平台
+            account: 账号
+            verified: 调用方是否已向平台核对过该内容未发布
+            force: 明确要求再次发布（忽略已有记录，允许重复发布）
+
+        Returns:
+            登记成功返回None；否则返回现有记录（confirmed 应直接使用，in_flight 表示结果未知
+            或其他任务正在发布，不能再次提交）
+        """
+        await self.connect()
+
+        cursor = await self.db.conn.execute(
+            """
+            INSERT INTO publish_ledger (fingerprint, platform, account, status, attempts)
+            VALUES (?, ?, ?, ?, 1)
+            ON CONFLICT (fingerprint, platform, account) DO UPDATE SET
+                status = excluded.status,
+                attempts = CASE WHEN publish_ledger.status = ? THEN 1 ELSE attempts + 1 END,
+                post_id = CASE WHEN publish_ledger.status = ? THEN NULL ELSE post_id END,
+                post_url = CASE WHEN publish_ledger.status = ? THEN NULL ELSE post_url END,
+                created_at = CASE WHEN publish_ledger.status = ? THEN CURRENT_TIMESTAMP ELSE created_at END,
+                error = NULL,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE ?
+               OR publish_ledger.status = ?
+               OR (publish_ledger.status = ?
+                   AND IFNULL(publish_ledger.updated_at <= datetime('now', ?), 0))
+               OR (publish_ledger.status = ?
+                   AND (? OR publish_ledger.updated_at <= datetime('now', ?)))
+            """,
+            (
+                fingerprint, self._platform_key(platform), account, LEDGER_IN_FLIGHT,
+                LEDGER_CONFIRMED, LEDGER_CONFIRMED, LEDGER_CONFIRMED, LEDGER_CONFIRMED,
+                int(force),
+                LEDGER_FAILED,
+                LEDGER_CONFIRMED, self._confirmed_expiry,
+                LEDGER_IN_FLIGHT, int(verified), f"-{int(self.stale_after)} seconds"
+            )
+        )
+        claimed = cursor.rowcount > 0
+        await self.db.conn.commit()
+
+        if claimed:
+            return None
+        return await self.get(fingerprint, platform, account)
+
+    async def confirm(
+        self,
+        fingerprint: str,
+        platform: Any,
+        account: str = DEFAULT_ACCOUNT,
+        post_id: Optional[str] = None,
+        post_url: Optional[str] = None
+    ):
+        """记录发布已确认成功"""
+        await self._set_status(fingerprint, platform, account, LEDGER_CONFIRMED, post_id, post_url, None)
+
+    async def release(
+        self,
+        fingerprint: str,
+        platform: Any,
+        account: str = DEFAULT_ACCOUNT,
+        error: Optional[str] = None
+    ):
+        """记录平台明确拒绝（内容未发布，可以安全重试）"""
+        await self._set_status(fingerprint, platform, account, LEDGER_FAILED, None, None, error)
+
+    async def _set_status(
+        self,
+        fingerprint: str,
+        platform: Any,
+        account: str,
+        status: str,
+        post_id: Optional[str],
+        post_url: Optional[str],
+        error: Optional[str]
+    ):
+        """写入最终状态"""
+        await self.connect()
+
+        await self.db.conn.execute(
+            """
+            INSERT INTO publish_ledger (fingerprint, platform, account, status, post_id, post_url, error)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (fingerprint, platform, account) DO UPDATE SET
+                status = excluded.status,
+                post_id = COALESCE(excluded.post_id, publish_ledger.post_id),
+                post_url = COALESCE(excluded.post_url, publish_ledger.post_url),
+                error = excluded.error,
+                updated_at = CURRENT_TIMESTAMP
+            """,
+            (fingerprint, self._platform_key(platform), account, status, post_id, post_url, error)
+        )
+        await self.db.conn.commit()
+
+        if status == LEDGER_CONFIRMED:
+            logger.info(f"📒 台账确认: {self._platform_key(platform)}/{account} {post_id or ''}")
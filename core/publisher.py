@@ -4,12 +4,24 @@
 提供跨平台发布的统一接口和数据模型
 """
 
+import asyncio
+import weakref
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Callable, Tuple
 from datetime import datetime
 from enum import Enum
 
+from core.cancellation import PublishCancelledError, checkpoint
+from core.publish_ledger import (
+    PublishLedger,
+    content_fingerprint,
+    ledger_time,
+    LEDGER_CONFIRMED,
+    LEDGER_IN_FLIGHT
+)
+from core.rate_limiter import DEFAULT_ACCOUNT, RateLimitScheduler, get_rate_limiter
+
 
 class PublishStatus(Enum):
     """发布状态"""
@@ -98,6 +110,51 @@ class PublishResult:
             return f"❌ {self.platform.value}: 发布失败 - {self.error}"
 
 
+# 各平台的内容限制（image_max_dimension为图片最长边像素，image_max_bytes为单张图片大小）
+PLATFORM_LIMITS: Dict[PlatformType, Dict[str, Any]] = {
+    PlatformType.XIANYU: {
+        "title_max_length": 30,
+        "description_max_length": 500,
+        "max_images": 9,
+        "supports_video": False,
+        "supports_emoji": True,
+        "max_tags": 10,
+        "image_max_dimension": 1600,
+        "image_max_bytes": 2 * 1024 * 1024,
+    },
+    PlatformType.XIAOHONGSHU: {
+        "title_max_length": 20,
+        "content_max_length": 1000,
+        "max_images": 9,
+        "supports_video": True,
+        "emoji_required": True,
+        "max_tags": 10,
+        "image_max_dimension": 2048,
+        "image_max_bytes": 5 * 1024 * 1024,
+    },
+    PlatformType.ZHIHU: {
+        "title_max_length": 50,
+        "content_max_length": 100000,
+        "max_images": 100,
+        "supports_video": True,
+        "supports_markdown": True,
+        "max_tags": 5,
+        "image_max_dimension": 2560,
+        "image_max_bytes": 5 * 1024 * 1024,
+    },
+    PlatformType.BILIBILI: {
+        "title_max_length": 80,
+        "description_max_length": 2000,
+        "max_images": 3,
+        "supports_video": True,
+        "max_tags": 10,
+        "dynamic_max_length": 233,
+        "image_max_dimension": 1920,
+        "image_max_bytes": 5 * 1024 * 1024,
+    },
+}
+
+
 class PlatformPublisher(ABC):
     """
     平台发布器基类
@@ -178,6 +235,29 @@ class PlatformPublisher(ABC):
         # 默认实现：直接返回
         return result
     
+    async def find_published(
+        self,
+        content: PublishContent,
+        since: Optional[datetime] = None
+    ) -> Optional[PublishResult]:
+        """
+        查询平台上是否已存在该内容（上次提交结果未知时，重试前核对）
+        
+        Args:
+            content: 适配后的发布内容
+            since: 本次发布的开始时间（本地时间，可选），早于此时间发布的同名内容不算
+            
+        Returns:
+            已存在时返回成功结果；不存在或平台不支持查询时返回None
+        """
+        # 默认实现：不支持查询
+        return None
+    
+    @property
+    def supports_verification(self) -> bool:
+        """是否支持查询平台上的已发布内容（子类重写了find_published）"""
+        return type(self).find_published is not PlatformPublisher.find_published
+    
     def get_platform_name(self) -> str:
         """获取平台名称"""
         platform_names = {
@@ -197,41 +277,20 @@ class PlatformPublisher(ABC):
         Returns:
             平台限制配置
         """
-        limits = {
-            PlatformType.XIANYU: {
-                "title_max_length": 30,
-                "description_max_length": 500,
-                "max_images": 9,
-                "supports_video": False,
-                "supports_emoji": True,
-                "max_tags": 10,
-            },
-            PlatformType.XIAOHONGSHU: {
-                "title_max_length": 20,
-                "content_max_length": 1000,
-                "max_images": 9,
-                "supports_video": True,
-                "emoji_required": True,
-                "max_tags": 10,
-            },
-            PlatformType.ZHIHU: {
-                "title_max_length": 50,
-                "content_max_length": 100000,
-                "max_images": 100,
-                "supports_video": True,
-                "supports_markdown": True,
-                "max_tags": 5,
-            },
-            PlatformType.BILIBILI: {
-                "title_max_length": 80,
-                "description_max_length": 2000,
-                "max_images": 3,
-                "supports_video": True,
-                "max_tags": 10,
-                "dynamic_max_length": 233,
-            },
-        }
-        return limits.get(self.platform, {})
+        return dict(PLATFORM_LIMITS.get(self.platform, {}))
+
+
+# 发布器返回该错误代码表示内容可能已提交、结果未知（重试前需核对）
+UNCERTAIN_ERROR_CODE = "uncertain"
+
+
+# 各平台单次发布（含重试）的默认超时时间（秒）
+DEFAULT_PLATFORM_TIMEOUTS: Dict[PlatformType, float] = {
+    PlatformType.XIANYU: 300.0,       # 浏览器自动化，耗时较长
+    PlatformType.XIAOHONGSHU: 120.0,
+    PlatformType.ZHIHU: 120.0,
+    PlatformType.BILIBILI: 600.0,     # 可能包含视频上传
+}
 
 
 class PublishManager:
@@ -241,9 +300,35 @@ class PublishManager:
     管理多平台发布、队列、重试等功能
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        platform_concurrency: int = 1,
+        platform_timeouts: Optional[Dict[PlatformType, float]] = None,
+        rate_limiter: Optional[RateLimitScheduler] = None,
+        ledger: Optional[PublishLedger] = None
+    ):
+        """
+        初始化发布管理器
+        
+        Args:
+            platform_concurrency: 每个平台同时进行的发布数上限
+            platform_timeouts: 各平台发布超时时间（秒），未配置的平台使用默认值
+            rate_limiter: 发布频率调度器（默认使用全局调度器）
+            ledger: 发布台账（可选，提供后重试和重复提交不会重复发布）
+        """
         self.publishers: Dict[PlatformType, PlatformPublisher] = {}
         self.publish_queue: List[tuple[PublishContent, List[PlatformType]]] = []
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.ledger = ledger
+        
+        self.platform_concurrency = max(1, platform_concurrency)
+        self.platform_timeouts = dict(DEFAULT_PLATFORM_TIMEOUTS)
+        if platform_timeouts:
+            self.platform_timeouts.update(platform_timeouts)
+        
+        # 各平台并发信号量 {loop: {platform: Semaphore}}
+        # asyncio原语绑定事件循环，UI每次发布使用新的事件循环，因此按循环分别创建
+        self._semaphores = weakref.WeakKeyDictionary()
     
     def register_publisher(self, publisher: PlatformPublisher):
         """
@@ -280,15 +365,23 @@ class PublishManager:
         self,
         content: PublishContent,
         platform: PlatformType,
-        max_retries: int = 3
+        max_retries: int = 3,
+        account: str = DEFAULT_ACCOUNT,
+        force: bool = False
     ) -> PublishResult:
         """
         发布到单个平台
         
+        配置了发布台账时：去重期内已确认发布过的内容直接返回记录的结果；
+        上一次提交结果未知（超时、异常）时，先向平台核对是否已发布，再决定是否重试；
+        平台不支持核对时停止重试，返回 uncertain 失败（error_code=UNCERTAIN_ERROR_CODE）。
+        
         Args:
             content: 发布内容
             platform: 目标平台
             max_retries: 最大重试次数
+            account: 发布账号
+            force: 明确要求再次发布（忽略台账中已有的记录，本次的重试仍然去重）
             
         Returns:
             发布结果
@@ -301,28 +394,80 @@ class PublishManager:
                 error=f"平台发布器未注册: {platform.value}"
             )
         
+        fingerprint = content_fingerprint(content) if self.ledger else None
+        uncertain = False
+        
+        if self.ledger and not force:
+            entry = await self.ledger.get(fingerprint, platform, account)
+            if entry and entry["status"] == LEDGER_CONFIRMED:
+                print(f"📒 {publisher.get_platform_name()} 已发布过该内容，跳过")
+                return self._ledger_result(platform, entry)
+            # 之前的提交（可能来自已崩溃的进程）结果未知
+            uncertain = bool(entry and entry["status"] == LEDGER_IN_FLIGHT)
+        
         # 多次重试
         for attempt in range(max_retries):
+            # 任务已取消则不再重试，暂停时在此等待
+            await checkpoint()
+            
             try:
                 # 发布前处理
                 adapted_content = await publisher.pre_publish(content)
                 
-                # 执行发布
+                # 上次提交结果未知：先核对平台状态，已发布则不再重复提交
+                verified = False
+                if uncertain:
+                    existing, verified = await self._verify_published(
+                        publisher, adapted_content, fingerprint, account
+                    )
+                    if existing:
+                        return existing
+                    if not verified and not self.ledger:
+                        return self._uncertain_result(platform)
+                
+                # 台账拒绝未核对的 in_flight 记录（结果未知，或其他任务正在发布）
+                if self.ledger:
+                    entry = await self.ledger.begin(
+                        fingerprint, platform, account, verified=verified, force=force
+                    )
+                    force = False
+                    if entry and entry["status"] == LEDGER_CONFIRMED:
+                        return self._ledger_result(platform, entry)
+                    if entry:
+                        return self._uncertain_result(platform)
+                
+                # 执行发布（此后异常都视为结果未知）
+                uncertain = True
                 result = await publisher.publish(adapted_content)
                 
                 # 发布后处理
                 result = await publisher.post_publish(result)
+                uncertain = not result.success and result.error_code == UNCERTAIN_ERROR_CODE
+                
+                if self.ledger:
+                    if result.success:
+                        await self.ledger.confirm(fingerprint, platform, account, result.post_id, result.post_url)
+                    elif not uncertain:
+                        await self.ledger.release(fingerprint, platform, account, result.error)
                 
                 # 成功则返回
                 if result.success:
                     return result
                 
+                # 发布器明确表示已提交但未确认：核对不到就不再重试，以免重复发布
+                if uncertain:
+                    existing, _ = await self._verify_published(publisher, adapted_content, fingerprint, account)
+                    return existing or result
+                
                 # 失败但不重试
                 if attempt == max_retries - 1:
                     return result
                 
                 print(f"⚠️ {publisher.get_platform_name()} 发布失败，重试 {attempt + 1}/{max_retries}")
                 
+            except PublishCancelledError:
+                raise
+                
             except Exception as e:
                 error_msg = f"发布异常: {str(e)}"
                 print(f"❌ {publisher.get_platform_name()}: {error_msg}")
@@ -331,7 +476,8 @@ class PublishManager:
                     return PublishResult(
                         platform=platform,
                         status=PublishStatus.FAILED,
-                        error=error_msg
+                        error=error_msg,
+                        error_code=UNCERTAIN_ERROR_CODE if uncertain else None
                     )
         
         # 不应该到达这里
@@ -341,11 +487,137 @@ class PublishManager:
             error="未知错误"
         )
     
+    async def _verify_published(
+        self,
+        publisher: PlatformPublisher,
+        content: PublishContent,
+        fingerprint: Optional[str],
+        account: str
+    ) -> Tuple[Optional[PublishResult], bool]:
+        """
+        核对上一次结果未知的提交是否已在平台上生效
+        
+        Returns:
+            (已发布时的成功结果（并写入台账）, 是否核对成功)；
+            平台不支持核对或核对出错时为 (None, False)
+        """
+        if not publisher.supports_verification:
+            return None, False
+        
+        try:
+            since = None
+            if self.ledger:
+                entry = await self.ledger.get(fingerprint, publisher.platform, account)
+                since = ledger_time(entry["created_at"]) if entry else None
+            existing = await publisher.find_published(content, since=since)
+        except PublishCancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ {publisher.get_platform_name()} 核对发布状态失败: {e}")
+            return None, False
+        
+        if not existing or not existing.success:
+            return None, True
+        
+        print(f"🔍 {publisher.get_platform_name()} 上次提交已生效，不再重复发布")
+        if self.ledger:
+            await self.ledger.confirm(fingerprint, publisher.platform, account, existing.post_id, existing.post_url)
+        return existing, True
+    
+    @staticmethod
+    def _uncertain_result(platform: PlatformType) -> PublishResult:
+        """提交结果未知且无法核对时的失败结果（不再重试，以免重复发布）"""
+        return PublishResult(
+            platform=platform,
+            status=PublishStatus.FAILED,
+            error="上次提交结果未知且无法核对（或其他任务正在发布），停止重试以免重复发布",
+            error_code=UNCERTAIN_ERROR_CODE
+        )
+    
+    @staticmethod
+    def _ledger_result(platform: PlatformType, entry: Dict[str, Any]) -> PublishResult:
+        """根据台账记录生成发布结果"""
+        return PublishResult(
+            platform=platform,
+            status=PublishStatus.SUCCESS,
+            post_id=entry.get("post_id"),
+            post_url=entry.get("post_url"),
+            extra_data={"from_ledger": True}
+        )
+    
+    def _get_semaphore(self, platform: PlatformType) -> asyncio.Semaphore:
+        """获取当前事件循环中该平台的并发信号量"""
+        loop = asyncio.get_running_loop()
+        semaphores = self._semaphores.setdefault(loop, {})
+        if platform not in semaphores:
+            semaphores[platform] = asyncio.Semaphore(self.platform_concurrency)
+        return semaphores[platform]
+    
+    async def publish_with_limits(
+        self,
+        content: PublishContent,
+        platform: PlatformType,
+        max_retries: int = 3,
+        account: str = DEFAULT_ACCOUNT,
+        force: bool = False
+    ) -> PublishResult:
+        """
+        在平台并发上限、发布频率和超时限制下发布到单个平台
+        
+        Args:
+            content: 发布内容
+            platform: 目标平台
+            max_retries: 最大重试次数
+            account: 发布账号
+            force: 明确要求再次发布（忽略台账中已有的记录）
+            
+        Returns:
+            发布结果（超时或异常时返回失败结果，取消时返回已取消结果，不抛出）
+        """
+        timeout = self.platform_timeouts.get(platform)
+        start_time = datetime.now()
+        
+        async with self._get_semaphore(platform):
+            try:
+                # 等待发布时间槽（不计入超时）
+                await checkpoint()
+                await self.rate_limiter.acquire(platform, account)
+                
+                return await asyncio.wait_for(
+                    self.publish_to_single_platform(content, platform, max_retries, account, force),
+                    timeout=timeout
+                )
+            except PublishCancelledError as e:
+                return PublishResult(
+                    platform=platform,
+                    status=PublishStatus.CANCELLED,
+                    error=f"已取消: {e}",
+                    error_code="cancelled",
+                    duration=(datetime.now() - start_time).total_seconds()
+                )
+            except asyncio.TimeoutError:
+                return PublishResult(
+                    platform=platform,
+                    status=PublishStatus.FAILED,
+                    error=f"发布超时（{timeout:.0f}秒）",
+                    error_code="timeout",
+                    duration=(datetime.now() - start_time).total_seconds()
+                )
+            except Exception as e:
+                return PublishResult(
+                    platform=platform,
+                    status=PublishStatus.FAILED,
+                    error=f"执行异常: {str(e)}",
+                    duration=(datetime.now() - start_time).total_seconds()
+                )
+    
     async def publish_to_multiple_platforms(
         self,
         content: PublishContent,
         platforms: List[PlatformType],
-        parallel: bool = False
+        parallel: bool = False,
+        max_retries: int = 3,
+        on_result: Optional[Callable[[PublishResult], None]] = None
     ) -> List[PublishResult]:
         """
         发布到多个平台
@@ -353,18 +625,27 @@ class PublishManager:
         Args:
             content: 发布内容
             platforms: 目标平台列表
-            parallel: 是否并行发布（暂不支持）
+            parallel: 是否并行发布（各平台相互独立，受平台并发上限和超时限制）
+            max_retries: 最大重试次数
+            on_result: 每个平台完成时的回调 on_result(result)，按完成顺序调用
             
         Returns:
-            发布结果列表
+            发布结果列表（与platforms顺序一致）
         """
-        results = []
-        
-        for platform in platforms:
+        async def run(platform: PlatformType) -> PublishResult:
             print(f"\n🚀 开始发布到 {platform.value}...")
-            result = await self.publish_to_single_platform(content, platform)
-            results.append(result)
+            result = await self.publish_with_limits(content, platform, max_retries)
             print(result)
+            if on_result:
+                on_result(result)
+            return result
+        
+        if parallel:
+            return list(await asyncio.gather(*(run(p) for p in platforms)))
+        
+        results = []
+        for platform in platforms:
+            results.append(await run(platform))
         
         return results
     
@@ -0,0 +1,266 @@
+"""
+发布频率调度器
+
+按平台和账号统一管理发布节奏：令牌桶限制总量（如每日发布上限），最小间隔限制相邻两次发布。
+发布前向调度器申请时间槽，不同平台、不同账号互不影响，空闲时间可被其他平台的任务利用。
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_ACCOUNT = "default"
+
+
+@dataclass
+class RateLimitRule:
+    """发布频率规则"""
+    min_interval: float = 2.0            # 相邻两次发布的最小间隔(秒)
+    capacity: int = 50                   # 令牌桶容量（周期内最多发布数）
+    refill_period: float = 86400.0       # 令牌桶完全填满所需时间(秒)
+
+    @property
+    def refill_rate(self) -> float:
+        """令牌填充速度（个/秒）"""
+        if self.refill_period <= 0:
+            return float("inf")
+        return self.capacity / self.refill_period
+
+    @classmethod
+    def from_platform_limits(cls, limits: Any) -> "RateLimitRule":
+        """
+        根据PlatformLimits创建规则
+
+        Args:
+            limits: PlatformLimits实例（使用publish_interval和daily_publish_limit）
+
+        Returns:
+            频率规则
+        """
+        return cls(
+            min_interval=float(limits.publish_interval),
+            capacity=int(limits.daily_publish_limit),
+            refill_period=86400.0
+        )
+
+
+# 各平台默认规则（与PlatformLimits默认值一致，闲鱼浏览器发布需要更长间隔）
+DEFAULT_RULES: Dict[str, RateLimitRule] = {
+    "xianyu": RateLimitRule(min_interval=5.0),
+    "xiaohongshu": RateLimitRule(min_interval=2.0),
+    "zhihu": RateLimitRule(min_interval=2.0),
+    "bilibili": RateLimitRule(min_interval=2.0),
+}
+
+
+class _Bucket:
+    """单个平台账号的令牌桶状态"""
+
+    __slots__ = ("rule", "tokens", "updated_at", "next_slot", "granted", "waited")
+
+    def __init__(self, rule: RateLimitRule, now: float):
+        self.rule = rule
+        self.tokens = float(rule.capacity)
+        self.updated_at = now
+        self.next_slot = now
+        self.granted = 0
+        self.waited = 0.0
+
+
+class RateLimitScheduler:
+    """
+    发布频率调度器
+
+    reserve() 同步地为调用方预留下一个可用时间槽并返回需要等待的秒数，
+    因此并发申请会按先后顺序排队，不会在同一时刻同时放行。
+    线程安全：UI中多个后台线程（各自的事件循环）可共用同一个调度器。
+    """
+
+    def __init__(
+        self,
+        rules: Optional[Dict[str, RateLimitRule]] = None,
+        default_rule: Optional[RateLimitRule] = None,
+        clock=time.monotonic
+    ):
+        """
+        初始化调度器
+
+        Args:
+            rules: 各平台规则（默认使用DEFAULT_RULES）
+            default_rule: 未配置平台使用的规则
+            clock: 时钟函数（测试时可替换）
+        """
+        self.rules: Dict[str, RateLimitRule] = dict(DEFAULT_RULES if rules is None else rules)
+        self.account_rules: Dict[Tuple[str, str], RateLimitRule] = {}
+        self.default_rule = default_rule or RateLimitRule()
+        self.clock = clock
+
+        self._buckets: Dict[Tuple[str, str], _Bucket] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _platform_key(platform: Any) -> str:
+        """平台名称（支持PlatformType枚举或字符串）"""
+        return getattr(platform, "value", platform)
+
+    def configure(
+        self,
+        platform: Any,
+        rule: Optional[RateLimitRule] = None,
+        limits: Any = None,
+        account: Optional[str] = None
+    ):
+        """
+        配置平台（或平台下某个账号）的频率规则
+
+        规则未变化时不做任何操作；规则变化时保留当前已用掉的额度。
+
+        Args:
+            platform: 平台
+            rule: 频率规则
+            limits: PlatformLimits（未提供rule时据此生成规则）
+            account: 账号（不指定则作用于该平台所有账号）
+        """
+        if rule is None:
+            if limits is None:
+                raise ValueError("需要提供rule或limits")
+            rule = RateLimitRule.from_platform_limits(limits)
+
+        key = self._platform_key(platform)
+        with self._lock:
+            if account is None:
+                if self.rules.get(key) == rule:
+                    return
+                self.rules[key] = rule
+                affected = [k for k in self._buckets if k[0] == key and k not in self.account_rules]
+            else:
+                if self.account_rules.get((key, account)) == rule:
+                    return
+                self.account_rules[(key, account)] = rule
+                affected = [(key, account)]
+
+            # 规则变化后沿用已有状态：剩余令牌按新容量等比换算，已预留的时间槽和统计保留
+            # （不能重建为满桶，否则每次重新配置都会重置每日发布上限）
+            now = self.clock()
+            for k in affected:
+                bucket = self._buckets.get(k)
+                if bucket:
+                    self._refill(bucket, now)
+                    old_capacity = bucket.rule.capacity
+                    if old_capacity > 0:
+                        bucket.tokens = bucket.tokens * rule.capacity / old_capacity
+                    else:
+                        bucket.tokens = float(rule.capacity)
+                    bucket.rule = rule
+
+    @staticmethod
+    def _refill(bucket: _Bucket, now: float):
+        """填充令牌（refill_period<=0 表示不限总量）"""
+        rule = bucket.rule
+        if rule.refill_period <= 0:
+            bucket.tokens = float(rule.capacity)
+        else:
+            bucket.tokens = min(
+                float(rule.capacity),
+                bucket.tokens + (now - bucket.updated_at) * rule.refill_rate
+            )
+        bucket.updated_at = now
+
+    def get_rule(self, platform: Any, account: str = DEFAULT_ACCOUNT) -> RateLimitRule:
+        """获取平台账号生效的规则"""
+        key = self._platform_key(platform)
+        return self.account_rules.get((key, account)) or self.rules.get(key) or self.default_rule
+
+    def reserve(self, platform: Any, account: str = DEFAULT_ACCOUNT) -> float:
+        """
+        预留下一个发布时间槽
+
+        Args:
+            platform: 平台
+            account: 账号
+
+        Returns:
+            距离时间槽还需等待的秒数
+        """
+        key = (self._platform_key(platform), account)
+
+        with self._lock:
+            now = self.clock()
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = _Bucket(self.get_rule(*key), now)
+                self._buckets[key] = bucket
+
+            rule = bucket.rule
+            self._refill(bucket, now)
+
+            # 最小间隔
+            slot = max(now, bucket.next_slot)
+
+            # 令牌不足时等待填充（令牌可以为负，表示已被预留）
+            if bucket.tokens < 1 and rule.refill_period > 0:
+                slot = max(slot, now + (1 - bucket.tokens) / rule.refill_rate)
+
+            bucket.tokens -= 1
+            bucket.next_slot = slot + rule.min_interval
+            bucket.granted += 1
+
+            delay = slot - now
+            bucket.waited += delay
+            return delay
+
+    async def acquire(self, platform: Any, account: str = DEFAULT_ACCOUNT) -> float:
+        """
+        申请发布时间槽（必要时等待）
+
+        Args:
+            platform: 平台
+            account: 账号
+
+        Returns:
+            实际等待的秒数
+        """
+        delay = self.reserve(platform, account)
+
+        if delay > 0:
+            if delay > 60:
+                logger.warning(
+                    f"⏳ {self._platform_key(platform)}/{account} 已达发布频率上限，等待 {delay:.0f} 秒"
+                )
+            await asyncio.sleep(delay)
+
+        return delay
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各平台账号的调度统计
+
+        Returns:
+            {"平台/账号": {"granted": 放行次数, "waited": 累计等待秒数, "tokens": 剩余令牌}}
+        """
+        with self._lock:
+            return {
+                f"{platform}/{account}": {
+                    "granted": bucket.granted,
+                    "waited": bucket.waited,
+                    "tokens": bucket.tokens,
+                }
+                for (platform, account), bucket in self._buckets.items()
+            }
+
+
+# 全局单例
+_rate_limiter = None
+
+def get_rate_limiter() -> RateLimitScheduler:
+    """获取全局发布频率调度器单例"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimitScheduler()
+    return _rate_limiter
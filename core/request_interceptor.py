@@ -0,0 +1,221 @@
+"""
+浏览器请求拦截
+
+自动化页面只需要能操作表单，图片、字体、统计和追踪脚本都不需要下载：
+- 按资源类型和URL片段拦截请求
+- 脚本、样式等静态资源缓存到本地目录，有效期内直接从缓存返回，
+  过期后带 ETag/Last-Modified 向服务器验证（304时继续使用缓存）
+- 统计拦截的请求数、缓存命中数和节省的流量
+登录页面（扫码需要显示二维码图片）不拦截。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# 不随缓存保存和返回的响应头：body()得到的是解压后的完整内容，
+# 保留原来的编码和长度会让浏览器按gzip解码或截断
+STRIPPED_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+
+@dataclass
+class RouteConfig:
+    """请求拦截配置"""
+    # 直接拦截的资源类型（Playwright的request.resource_type）
+    block_resource_types: Tuple[str, ...] = ("image", "media", "font")
+    # URL包含以下片段的请求直接拦截（统计、追踪、广告）
+    block_url_patterns: Tuple[str, ...] = (
+        "google-analytics.com",
+        "googletagmanager.com",
+        "doubleclick.net",
+        "hm.baidu.com",
+        "log.mmstat.com",
+        "gm.mmstat.com",
+        "arms-retcode",
+        "/beacon",
+    )
+    # 所在页面URL包含以下片段时不拦截任何请求（如登录页的二维码）
+    allow_page_patterns: Tuple[str, ...] = ("login",)
+    # 本地缓存的资源类型
+    cache_resource_types: Tuple[str, ...] = ("script", "stylesheet")
+    # 缓存目录（None表示不缓存）
+    cache_dir: Optional[str] = "data/cache/browser"
+    # 缓存有效期（秒），过期后向服务器验证
+    cache_ttl: float = 24 * 3600
+
+
+class RequestInterceptor:
+    """
+    请求拦截器
+
+    通过 attach() 安装到浏览器上下文（或页面）上，同一个拦截器可以安装到多个上下文，
+    统计数据汇总在一起。
+    """
+
+    def __init__(self, config: Optional[RouteConfig] = None):
+        """
+        初始化拦截器
+
+        Args:
+            config: 拦截配置（默认使用RouteConfig()）
+        """
+        self.config = config or RouteConfig()
+        self.cache_dir = Path(self.config.cache_dir) if self.config.cache_dir else None
+
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "requests": 0,          # 经过拦截器的请求数
+            "blocked": 0,           # 被拦截的请求数
+            "cache_hits": 0,        # 从本地缓存返回的请求数
+            "cache_misses": 0,      # 需要下载并写入缓存的请求数
+            "revalidated": 0,       # 缓存过期后服务器确认未变化(304)的请求数
+            "bytes_saved": 0,       # 缓存命中节省的字节数
+        }
+
+    async def attach(self, target):
+        """
+        安装到浏览器上下文或页面
+
+        Args:
+            target: Playwright的BrowserContext或Page
+        """
+        await target.route("**/*", self.handle)
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def should_block(self, url: str, resource_type: str, page_url: str = "") -> bool:
+        """判断请求是否应该拦截"""
+        page_url = page_url.lower()
+        if any(p in page_url for p in self.config.allow_page_patterns):
+            return False
+
+        if resource_type in self.config.block_resource_types:
+            return True
+
+        url = url.lower()
+        return any(p in url for p in self.config.block_url_patterns)
+
+    def _cache_paths(self, url: str) -> Tuple[Path, Path]:
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{key}.body", self.cache_dir / f"{key}.json"
+
+    async def handle(self, route):
+        """处理一个请求（route回调）"""
+        request = route.request
+        self._count("requests")
+
+        try:
+            page_url = request.frame.url
+        except Exception:
+            page_url = ""
+
+        if self.should_block(request.url, request.resource_type, page_url):
+            self._count("blocked")
+            await route.abort()
+            return
+
+        if (
+            self.cache_dir is None
+            or request.method != "GET"
+            or request.resource_type not in self.config.cache_resource_types
+        ):
+            await route.continue_()
+            return
+
+        body_path, meta_path = self._cache_paths(request.url)
+        cached = self._read_cache(body_path, meta_path)
+
+        # 有效期内：直接返回本地文件
+        if cached and time.time() - cached[1].get("cached_at", 0) < self.config.cache_ttl:
+            await self._fulfill_cached(route, *cached)
+            return
+
+        # 已过期：带验证头请求，未变化时继续使用缓存
+        fetch_headers = None
+        if cached:
+            fetch_headers = dict(request.headers)
+            cached_headers = {k.lower(): v for k, v in cached[1].get("headers", {}).items()}
+            if "etag" in cached_headers:
+                fetch_headers["if-none-match"] = cached_headers["etag"]
+            if "last-modified" in cached_headers:
+                fetch_headers["if-modified-since"] = cached_headers["last-modified"]
+
+        response = await route.fetch(headers=fetch_headers) if fetch_headers else await route.fetch()
+        if cached and response.status == 304:
+            self._write_cache(body_path, meta_path, None, cached[1]["status"], cached[1]["headers"])
+            self._count("revalidated")
+            await self._fulfill_cached(route, *cached)
+            return
+
+        # 未命中或已变化：下载后写入缓存
+        body = await response.body()
+        headers = self._strip_headers(response.headers)
+        if response.ok:
+            self._write_cache(body_path, meta_path, body, response.status, headers)
+        self._count("cache_misses")
+        await route.fulfill(status=response.status, headers=headers, body=body)
+
+    @staticmethod
+    def _strip_headers(headers: Dict[str, Any]) -> Dict[str, str]:
+        """去掉与解压后内容不符的响应头"""
+        return {k: v for k, v in dict(headers).items() if k.lower() not in STRIPPED_HEADERS}
+
+    def _read_cache(self, body_path: Path, meta_path: Path) -> Optional[Tuple[bytes, Dict[str, Any]]]:
+        """读取缓存（不存在或损坏时返回None）"""
+        if not (body_path.exists() and meta_path.exists()):
+            return None
+        try:
+            return body_path.read_bytes(), json.loads(meta_path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.warning(f"⚠️ 读取缓存失败，重新下载: {body_path.name} - {e}")
+            return None
+
+    async def _fulfill_cached(self, route, body: bytes, meta: Dict[str, Any]):
+        """从缓存返回"""
+        await route.fulfill(
+            status=meta.get("status", 200), headers=self._strip_headers(meta.get("headers", {})), body=body
+        )
+        self._count("cache_hits")
+        self._count("bytes_saved", len(body))
+
+    def _write_cache(
+        self,
+        body_path: Path,
+        meta_path: Path,
+        body: Optional[bytes],
+        status: int,
+        headers: Dict[str, Any]
+    ):
+        """
+        写入缓存（先写临时文件再替换，避免并发读到不完整的文件）
+
+        body为None时只更新缓存时间（服务器确认未变化）
+        """
+        meta = {"status": status, "headers": dict(headers), "cached_at": time.time()}
+        files = [(meta_path, json.dumps(meta).encode("utf-8"))]
+        if body is not None:
+            files.insert(0, (body_path, body))
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            for path, data in files:
+                tmp_path = path.with_suffix(path.suffix + f".{os.getpid()}.{threading.get_ident()}.tmp")
+                tmp_path.write_bytes(data)
+                os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"⚠️ 写入缓存失败: {e}")
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取拦截统计"""
+        with self._lock:
+            return dict(self.stats)
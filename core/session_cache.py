@@ -0,0 +1,262 @@
+"""
+登录会话缓存
+
+每个账号的登录状态保存为Playwright的storage state（Cookie + localStorage），
+并记录最近一次验证登录的时间：
+- 有效期（ttl）内直接使用保存的状态，不再打开首页检查登录
+- 过期或收到登录失效信号（如被重定向到登录页）后才重新验证
+- SessionRefresher在后台提前续期即将过期的会话
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_SESSION_DIR = "data/cache/sessions"
+DEFAULT_SESSION_TTL = 6 * 3600      # 验证后6小时内不再检查登录
+
+
+class SessionCache:
+    """
+    登录会话缓存
+
+    线程安全：同一个缓存可以被多个批次（各自的事件循环）共用。
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_SESSION_DIR,
+        ttl: float = DEFAULT_SESSION_TTL,
+        clock=time.time
+    ):
+        """
+        初始化缓存
+
+        Args:
+            cache_dir: 会话文件目录
+            ttl: 验证后的有效期(秒)
+            clock: 时钟函数（测试时可替换）
+        """
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self.clock = clock
+
+        self._index_path = self.cache_dir / "index.json"
+        self._lock = threading.Lock()
+        self._index: Dict[str, Dict[str, Any]] = self._load_index()
+
+        self.stats: Dict[str, int] = {
+            "hits": 0,              # 有效期内直接使用
+            "verifications": 0,     # 重新验证登录
+            "invalidations": 0,     # 登录失效
+            "refreshes": 0,         # 后台续期
+        }
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        if not self._index_path.exists():
+            return {}
+        try:
+            return json.loads(self._index_path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.warning(f"⚠️ 会话索引读取失败，重新验证所有账号: {e}")
+            return {}
+
+    def _save_index(self):
+        """写入索引（调用方持有锁）"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._index_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(self._index, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self._index_path)
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def state_path(self, key: str) -> Path:
+        """账号的storage state文件路径"""
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+        return self.cache_dir / f"{digest}.json"
+
+    def has_state(self, key: str) -> bool:
+        """是否保存过登录状态"""
+        return self.state_path(key).exists()
+
+    def expires_in(self, key: str) -> float:
+        """距离过期的秒数（未验证或已失效时返回0）"""
+        with self._lock:
+            entry = self._index.get(key)
+        if not entry or not entry.get("valid") or not self.has_state(key):
+            return 0.0
+        return max(0.0, entry["verified_at"] + self.ttl - self.clock())
+
+    def is_valid(self, key: str) -> bool:
+        """有效期内可以跳过登录检查"""
+        return self.expires_in(key) > 0
+
+    def use(self, key: str) -> bool:
+        """
+        准备使用会话
+
+        Returns:
+            True表示有效期内，可以直接使用保存的状态（计入命中）
+        """
+        if self.is_valid(key):
+            self._count("hits")
+            return True
+        return False
+
+    def mark_verified(self, key: str):
+        """记录刚刚验证过登录"""
+        with self._lock:
+            self._index[key] = {"verified_at": self.clock(), "valid": True}
+            self.stats["verifications"] += 1
+            self._save_index()
+
+    def invalidate(self, key: str):
+        """登录失效（下次使用时重新验证）"""
+        with self._lock:
+            entry = self._index.get(key)
+            if entry and entry.get("valid"):
+                entry["valid"] = False
+                self.stats["invalidations"] += 1
+                self._save_index()
+        logger.info(f"🔑 会话已失效: {key}")
+
+    async def save_state(self, context, key: str):
+        """
+        保存上下文的登录状态并记录验证时间
+
+        Args:
+            context: Playwright的BrowserContext
+            key: 账号标识（Cookie文件路径）
+        """
+        path = self.state_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        await context.storage_state(path=str(path))
+        self.mark_verified(key)
+
+    def load_state(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取保存的登录状态（不存在或损坏时返回None）"""
+        path = self.state_path(key)
+        if not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.warning(f"⚠️ 会话文件读取失败: {key} - {e}")
+            return None
+
+    def record_refresh(self):
+        """记录一次后台续期"""
+        self._count("refreshes")
+
+    def expiring(self, keys: List[str], margin: float) -> List[str]:
+        """
+        在margin秒内过期的账号
+
+        已失效的会话不在其中：需要手动登录，后台无法续期。
+        """
+        with self._lock:
+            valid = {key for key in keys if self._index.get(key, {}).get("valid")}
+        return [
+            key for key in keys
+            if key in valid and self.has_state(key) and self.expires_in(key) <= margin
+        ]
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取缓存统计"""
+        with self._lock:
+            return dict(self.stats)
+
+
+class SessionRefresher:
+    """
+    后台会话续期
+
+    定期检查登记的账号，在会话过期前margin秒内调用refresh(key)重新验证，
+    使发布时总能直接使用有效期内的会话。只在创建它的事件循环中运行。
+    """
+
+    def __init__(
+        self,
+        cache: SessionCache,
+        refresh: Callable[[str], Awaitable[bool]],
+        keys: Optional[List[str]] = None,
+        interval: float = 300.0,
+        margin: float = 900.0
+    ):
+        """
+        初始化续期器
+
+        Args:
+            cache: 会话缓存
+            refresh: 续期函数 refresh(key) -> 是否仍然登录
+            keys: 需要续期的账号
+            interval: 检查间隔(秒)
+            margin: 提前续期的时间(秒)
+        """
+        self.cache = cache
+        self.refresh = refresh
+        self.keys: List[str] = list(keys or [])
+        self.interval = interval
+        self.margin = margin
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, key: str):
+        """登记账号"""
+        if key not in self.keys:
+            self.keys.append(key)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """启动后台任务（已启动时直接返回）"""
+        if not self.running:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        """停止后台任务"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def refresh_due(self) -> int:
+        """
+        续期即将过期的会话
+
+        Returns:
+            续期成功的账号数
+        """
+        refreshed = 0
+        for key in self.cache.expiring(self.keys, self.margin):
+            try:
+                if await self.refresh(key):
+                    refreshed += 1
+                    self.cache.record_refresh()
+                    logger.info(f"🔄 会话已续期: {key}")
+                else:
+                    logger.warning(f"⚠️ 会话续期失败，需要重新登录: {key}")
+            except Exception as e:
+                logger.warning(f"⚠️ 会话续期出错: {key} - {e}")
+        return refreshed
+
+    async def _run(self):
+        while True:
+            await self.refresh_due()
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,290 @@
+"""
+发布步骤追踪
+
+按级别记录浏览器发布流程的调试信息，正常发布时不截图：
+- off: 不记录
+- timings: 只记录各步骤耗时（写入数据库 publish_step_timings）
+- thumbnail: 耗时 + 出错时保存裁剪后的JPEG缩略图
+- trace: 耗时 + 缩略图 + Playwright trace（只保留失败的发布）
+缩略图的缩放和写文件在线程池中执行，不阻塞事件循环。
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.database import Database
+
+logger = logging.getLogger(__name__)
+
+
+class TraceLevel(Enum):
+    """追踪级别（后面的级别包含前面级别的内容）"""
+    OFF = "off"                 # 不记录
+    TIMINGS = "timings"         # 步骤耗时
+    THUMBNAIL = "thumbnail"     # 出错时保存JPEG缩略图
+    TRACE = "trace"             # 失败时保存Playwright trace
+
+
+_LEVEL_ORDER = [TraceLevel.OFF, TraceLevel.TIMINGS, TraceLevel.THUMBNAIL, TraceLevel.TRACE]
+
+# 步骤耗时记录 (步骤名, 状态, 耗时秒数)
+StepTiming = Tuple[str, str, float]
+
+
+class StepTimingStore:
+    """步骤耗时存储（publish_step_timings表）"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        """
+        初始化存储
+
+        Args:
+            db_path: 数据库文件路径（可选，默认使用主数据库）
+        """
+        self.db = Database(db_path)
+
+    async def connect(self):
+        """连接数据库（已连接时直接返回）"""
+        if self.db.conn is None:
+            await self.db.connect()
+
+    async def close(self):
+        """关闭连接"""
+        if self.db.conn is None:
+            return
+
+        await self.db.close()
+        self.db.conn = None
+
+    async def add(
+        self,
+        run_id: str,
+        platform: str,
+        item: str,
+        timings: List[StepTiming],
+        success: bool
+    ):
+        """
+        写入一次发布的各步骤耗时（一个事务）
+
+        Args:
+            run_id: 本次发布的ID
+            platform: 平台
+            item: 商品标题
+            timings: 步骤耗时列表
+            success: 发布是否成功
+        """
+        if not timings:
+            return
+
+        await self.connect()
+        await self.db.conn.executemany(
+            """
+            INSERT INTO publish_step_timings (run_id, platform, item, step, status, elapsed, success)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            [(run_id, platform, item, step, status, elapsed, int(success)) for step, status, elapsed in timings]
+        )
+        await self.db.conn.commit()
+
+    async def get_stats(self, platform: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+        """
+        按步骤汇总耗时
+
+        Returns:
+            {步骤名: {"count": 次数, "avg": 平均秒数, "max": 最大秒数, "failed": 失败次数}}
+        """
+        await self.connect()
+
+        sql = """
+            SELECT step, COUNT(*) AS count, AVG(elapsed) AS avg, MAX(elapsed) AS max,
+                   SUM(CASE WHEN status = 'failed' THEN 1 ELSE 0 END) AS failed
+            FROM publish_step_timings
+        """
+        params: tuple = ()
+        if platform:
+            sql += " WHERE platform = ?"
+            params = (platform,)
+        sql += " GROUP BY step"
+
+        cursor = await self.db.conn.execute(sql, params)
+        rows = await cursor.fetchall()
+        return {
+            row["step"]: {"count": row["count"], "avg": row["avg"], "max": row["max"], "failed": row["failed"]}
+            for row in rows
+        }
+
+
+class StepTracer:
+    """
+    步骤追踪器
+
+    只保存配置和统计，可以被多个自动化实例（多个账号并发）共用；
+    每次发布的耗时由自动化实例自己收集，结束时交给save_timings()。
+    """
+
+    def __init__(
+        self,
+        level: TraceLevel = TraceLevel.THUMBNAIL,
+        output_dir: str = "data/temp/traces",
+        store: Optional[StepTimingStore] = None,
+        platform: str = "xianyu",
+        clip: Optional[Dict[str, int]] = None,
+        thumbnail_size: Tuple[int, int] = (640, 640),
+        jpeg_quality: int = 60
+    ):
+        """
+        初始化追踪器
+
+        Args:
+            level: 追踪级别
+            output_dir: 缩略图和trace的保存目录
+            store: 步骤耗时存储（可选，未提供时只在内存中统计）
+            platform: 平台名称（写入耗时记录）
+            clip: 截图区域（默认页面左上角1280x800）
+            thumbnail_size: 缩略图最大尺寸
+            jpeg_quality: JPEG质量
+        """
+        self.level = TraceLevel(level)
+        self.output_dir = Path(output_dir)
+        self.store = store
+        self.platform = platform
+        self.clip = clip or {"x": 0, "y": 0, "width": 1280, "height": 800}
+        self.thumbnail_size = thumbnail_size
+        self.jpeg_quality = jpeg_quality
+
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "items": 0,             # 记录耗时的发布次数
+            "thumbnails": 0,        # 保存的缩略图数
+            "traces": 0,            # 保存的trace数
+        }
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def enabled(self, level: TraceLevel) -> bool:
+        """当前级别是否包含level"""
+        return _LEVEL_ORDER.index(self.level) >= _LEVEL_ORDER.index(level)
+
+    def _output_path(self, name: str, suffix: str) -> Path:
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        return self.output_dir / f"{name}_{stamp}_{uuid.uuid4().hex[:6]}{suffix}"
+
+    async def start(self, context) -> bool:
+        """
+        开始一次发布的trace（仅trace级别）
+
+        Returns:
+            是否已开始记录（需要在finish()时传回）
+        """
+        if not self.enabled(TraceLevel.TRACE) or context is None:
+            return False
+
+        try:
+            await context.tracing.start(screenshots=True, snapshots=True)
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ 启动trace失败: {e}")
+            return False
+
+    async def finish(self, context, started: bool, failed: bool, name: str = "publish") -> Optional[str]:
+        """
+        结束trace：失败时保存，成功时丢弃
+
+        Returns:
+            trace文件路径（未保存时返回None）
+        """
+        if not started:
+            return None
+
+        try:
+            if not failed:
+                await context.tracing.stop()
+                return None
+
+            path = self._output_path(name, ".zip")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            await context.tracing.stop(path=str(path))
+            self._count("traces")
+            logger.info(f"🧾 已保存trace: {path}")
+            return str(path)
+        except Exception as e:
+            logger.warning(f"⚠️ 保存trace失败: {e}")
+            return None
+
+    async def capture_error(self, page, name: str = "publish_error") -> str:
+        """
+        出错时保存裁剪后的JPEG缩略图（thumbnail级别及以上）
+
+        Returns:
+            缩略图路径（未保存时返回空字符串）
+        """
+        if not self.enabled(TraceLevel.THUMBNAIL) or page is None:
+            return ""
+
+        try:
+            # 只截取页面可见区域的一部分，由浏览器直接编码为JPEG
+            data = await page.screenshot(type="jpeg", quality=self.jpeg_quality, clip=self.clip)
+        except Exception as e:
+            logger.warning(f"⚠️ 截图失败: {e}")
+            return ""
+
+        path = self._output_path(name, ".jpg")
+        try:
+            await asyncio.to_thread(self._save_thumbnail, data, path)
+        except Exception as e:
+            logger.warning(f"⚠️ 保存缩略图失败: {e}")
+            return ""
+
+        self._count("thumbnails")
+        return str(path)
+
+    def _save_thumbnail(self, data: bytes, path: Path):
+        """缩放并保存缩略图（在线程池中执行）"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        try:
+            from io import BytesIO
+            from PIL import Image
+        except ImportError:
+            # 没有Pillow时直接保存浏览器返回的JPEG
+            path.write_bytes(data)
+            return
+
+        with Image.open(BytesIO(data)) as image:
+            image.thumbnail(self.thumbnail_size)
+            image.convert("RGB").save(path, "JPEG", quality=self.jpeg_quality, optimize=True)
+
+    async def save_timings(self, item: str, timings: List[StepTiming], success: bool):
+        """
+        保存一次发布的步骤耗时（timings级别及以上；写入失败不影响发布）
+
+        Args:
+            item: 商品标题
+            timings: 步骤耗时列表
+            success: 发布是否成功
+        """
+        if not self.enabled(TraceLevel.TIMINGS) or not timings:
+            return
+
+        self._count("items")
+        if self.store is None:
+            return
+
+        try:
+            await self.store.add(uuid.uuid4().hex, self.platform, item, timings, success)
+        except Exception as e:
+            logger.warning(f"⚠️ 保存步骤耗时失败: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取追踪统计"""
+        with self._lock:
+            return {"level": self.level.value, **self.stats}
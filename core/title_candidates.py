@@ -0,0 +1,248 @@
+"""
+标题候选引擎
+
+模板+AI生成标题前，先用模板批量生成候选标题（A/B测试选题用）：
+- 模板预编译：解析一次，渲染时只做字符串拼接
+- 组合展开：每个模板的所有变量取值组合构成候选空间，空间过大时用可设置种子的随机数无放回抽样
+- 去重：归一化后完全相同的标题只保留一个；选取前K个时跳过与已选标题过于相似的近似重复（同一模板只换了个别词）
+- 批量评分：特征（长度、关键词命中数等）一次性提取为numpy数组，评分规则在数组上整体计算
+"""
+
+import bisect
+import math
+import random
+import re
+from dataclasses import dataclass
+from string import Formatter
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from core.keyword_matcher import KeywordMatcher
+
+
+@dataclass(frozen=True)
+class TitleCandidate:
+    """候选标题"""
+    title: str
+    style: str          # 模板风格
+    template: str       # 模板原文
+
+
+class TitleTemplate:
+    """预编译的标题模板"""
+
+    def __init__(self, template: str, style: str = ""):
+        """
+        Args:
+            template: 模板（str.format语法，如"{keyword}居然能这样{action}？"）
+            style: 模板风格
+        """
+        self.template = template
+        self.style = style
+
+        # [(文本, 变量名或None)]
+        self.parts: List[Tuple[str, Optional[str]]] = [
+            (literal, field_name) for literal, field_name, _, _ in Formatter().parse(template)
+        ]
+        self.fields: Tuple[str, ...] = tuple(dict.fromkeys(
+            field_name for _, field_name in self.parts if field_name is not None
+        ))
+
+    def render(self, values: Mapping[str, str]) -> str:
+        return "".join(
+            literal + (values[field_name] if field_name is not None else "")
+            for literal, field_name in self.parts
+        )
+
+
+def normalize_title(title: str) -> str:
+    """归一化（去掉标点、空格和emoji，英文转小写），用于判断重复"""
+    return "".join(re.findall(r"\w+", title)).lower()
+
+
+def _bigrams(text: str) -> Set[str]:
+    return {text[i:i + 2] for i in range(len(text) - 1)} or {text}
+
+
+def select_top(
+    titles: Sequence[str],
+    scores: np.ndarray,
+    k: int,
+    max_similarity: float = 0.5
+) -> List[int]:
+    """
+    按分数选取前K个标题，跳过近似重复
+
+    Args:
+        titles: 标题列表
+        scores: 对应的分数
+        k: 选取数量
+        max_similarity: 与已选标题的相似度达到该值视为近似重复
+            （共有的字符二元组数 / 较短标题的二元组数，同一模板只换了个别词的标题通常在0.5以上）
+
+    Returns:
+        选中标题的下标（按分数从高到低）；去重后不足K个时用分数最高的近似重复补足
+    """
+    selected: List[int] = []
+    skipped: List[int] = []
+    selected_grams: List[Set[str]] = []
+    seen: Set[str] = set()
+
+    for index in np.argsort(-np.asarray(scores, dtype=float), kind="stable"):
+        if len(selected) >= k:
+            break
+        index = int(index)
+        normalized = normalize_title(titles[index])
+        if normalized in seen:
+            continue
+        seen.add(normalized)
+
+        grams = _bigrams(normalized)
+        if any(len(grams & other) / min(len(grams), len(other)) >= max_similarity for other in selected_grams):
+            skipped.append(index)
+            continue
+        selected.append(index)
+        selected_grams.append(grams)
+
+    return selected + skipped[:k - len(selected)]
+
+
+def match_counts(matcher: KeywordMatcher, titles: Sequence[str]) -> np.ndarray:
+    """
+    各分组命中的关键词数
+
+    Returns:
+        形状为 (标题数, 分组数) 的数组，列顺序与matcher的分组顺序一致
+    """
+    columns = {group: column for column, group in enumerate(matcher.groups)}
+    counts = np.zeros((len(titles), len(columns)), dtype=np.int32)
+    for row, title in enumerate(titles):
+        for group, matched in matcher.group_matches(title).items():
+            counts[row, columns[group]] = len(matched)
+    return counts
+
+
+def title_lengths(titles: Sequence[str]) -> np.ndarray:
+    return np.fromiter((len(title) for title in titles), dtype=np.int32, count=len(titles))
+
+
+class TitleCandidateEngine:
+    """
+    标题候选引擎
+
+    模板在创建时编译，之后可以反复展开。
+    """
+
+    def __init__(
+        self,
+        templates: Mapping[str, Iterable[str]],
+        seed: Optional[int] = None,
+        max_length: Optional[int] = None
+    ):
+        """
+        初始化引擎
+
+        Args:
+            templates: {风格: 模板列表}
+            seed: 随机种子（相同种子和变量得到相同的候选）
+            max_length: 标题最大长度，超出时截断并加"..."
+        """
+        self.templates: Dict[str, List[TitleTemplate]] = {
+            str(style): [TitleTemplate(template, str(style)) for template in style_templates]
+            for style, style_templates in templates.items()
+        }
+        self.max_length = max_length
+        self.random = random.Random(seed)
+
+    def space_size(self, variables: Mapping[str, Any], styles: Optional[Sequence[str]] = None) -> int:
+        """候选空间大小（所有模板的变量取值组合数之和）"""
+        return sum(size for _, _, size in self._expandable(self._options(variables), styles))
+
+    @staticmethod
+    def _options(variables: Mapping[str, Any]) -> Dict[str, List[str]]:
+        """变量取值转为字符串列表（单个值视为只有一个取值）"""
+        options = {}
+        for name, values in variables.items():
+            if isinstance(values, (str, int, float)):
+                values = [values]
+            options[name] = list(dict.fromkeys(str(value) for value in values))
+        return options
+
+    def _expandable(
+        self,
+        options: Dict[str, List[str]],
+        styles: Optional[Sequence[str]]
+    ) -> List[Tuple[TitleTemplate, List[List[str]], int]]:
+        """可展开的模板（缺少变量取值的模板跳过）：[(模板, 各变量取值, 组合数)]"""
+        result = []
+        for style in (styles or list(self.templates)):
+            for template in self.templates.get(str(style), []):
+                field_options = [options.get(field, []) for field in template.fields]
+                if all(field_options):
+                    result.append((template, field_options, math.prod(len(o) for o in field_options)))
+        return result
+
+    def expand(
+        self,
+        variables: Mapping[str, Any],
+        count: int,
+        styles: Optional[Sequence[str]] = None,
+        seed: Optional[int] = None
+    ) -> List[TitleCandidate]:
+        """
+        展开候选标题
+
+        候选空间不超过count时全部展开；否则在整个空间上无放回均匀抽样。
+
+        Args:
+            variables: {变量名: 取值列表}
+            count: 最多生成的候选数
+            styles: 使用的模板风格（默认全部）
+            seed: 本次展开的随机种子（默认使用引擎的随机数生成器）
+
+        Returns:
+            候选标题列表（归一化后去重）
+        """
+        expandable = self._expandable(self._options(variables), styles)
+        total = sum(size for _, _, size in expandable)
+        if total == 0 or count <= 0:
+            return []
+
+        # 累计组合数，用于把全局编号映射到模板
+        offsets = []
+        running = 0
+        for _, _, size in expandable:
+            offsets.append(running)
+            running += size
+
+        if total <= count:
+            indices: Iterable[int] = range(total)
+        else:
+            rng = random.Random(seed) if seed is not None else self.random
+            indices = sorted(rng.sample(range(total), count))
+
+        candidates = []
+        seen: Set[str] = set()
+        for index in indices:
+            position = bisect.bisect_right(offsets, index) - 1
+            template, field_options, _ = expandable[position]
+
+            # 混合进制解码出各变量的取值
+            remainder = index - offsets[position]
+            values = {}
+            for field, field_values in zip(reversed(template.fields), reversed(field_options)):
+                remainder, choice = divmod(remainder, len(field_values))
+                values[field] = field_values[choice]
+
+            title = template.render(values)
+            if self.max_length and len(title) > self.max_length:
+                title = title[:self.max_length - 3] + "..."
+
+            normalized = normalize_title(title)
+            if normalized in seen:
+                continue
+            seen.add(normalized)
+            candidates.append(TitleCandidate(title, template.style, template.template))
+
+        return candidates
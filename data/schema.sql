@@ -329,6 +329,147 @@ GROUP BY platform;
 -- 清理90天前的AI使用记录
 -- DELETE FROM ai_usage WHERE created_at < datetime('now', '-90 days');
 
+-- ===== 批量发布持久化队列（v1.1.0新增）=====
+CREATE TABLE IF NOT EXISTS batch_jobs (
+    job_id TEXT PRIMARY KEY,                -- 任务ID（BatchPublishManager生成）
+    
+    -- 任务信息
+    status TEXT DEFAULT 'pending',          -- 状态: pending/running/completed/failed/cancelled
+    content TEXT NOT NULL,                  -- 发布内容（JSON）
+    max_retries INTEGER DEFAULT 3,          -- 最大重试次数
+    
+    -- 时间信息
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    started_at DATETIME,
+    completed_at DATETIME
+);
+
+CREATE INDEX IF NOT EXISTS idx_batch_jobs_status ON batch_jobs(status);
+
+CREATE TABLE IF NOT EXISTS batch_sub_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,                   -- 所属任务ID
+    platform TEXT NOT NULL,                 -- 目标平台
+    position INTEGER DEFAULT 0,             -- 平台顺序
+    
+    -- 执行状态
+    status TEXT DEFAULT 'pending',          -- 状态: pending/processing/success/failed/cancelled
+    attempts INTEGER DEFAULT 0,             -- 执行次数
+    result TEXT,                            -- 发布结果（JSON）
+    error TEXT,                             -- 错误信息
+    
+    -- 租约（防止多个实例同时执行同一子任务）
+    lease_owner TEXT,                       -- 持有者ID
+    lease_expires_at REAL,                  -- 租约过期时间（Unix时间戳）
+    heartbeat_at REAL,                      -- 最近心跳时间（Unix时间戳）
+    
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    
+    UNIQUE (job_id, platform),
+    FOREIGN KEY (job_id) REFERENCES batch_jobs(job_id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_batch_sub_jobs_job ON batch_sub_jobs(job_id);
+CREATE INDEX IF NOT EXISTS idx_batch_sub_jobs_status ON batch_sub_jobs(status);
+
+-- ===== 发布台账表 =====
+-- 按内容指纹 + 平台 + 账号记录发布状态，重试前核对，避免重复发布
+CREATE TABLE IF NOT EXISTS publish_ledger (
+    fingerprint TEXT NOT NULL,              -- 内容指纹
+    platform TEXT NOT NULL,                 -- 平台
+    account TEXT NOT NULL DEFAULT 'default',-- 账号
+    
+    status TEXT DEFAULT 'in_flight',        -- 状态: in_flight(已提交未确认)/confirmed(已确认发布)/failed(确认未发布)
+    attempts INTEGER DEFAULT 0,             -- 提交次数
+    post_id TEXT,                           -- 平台返回的ID
+    post_url TEXT,                          -- 发布链接
+    error TEXT,                             -- 最近一次错误
+    
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    
+    PRIMARY KEY (fingerprint, platform, account)
+);
+
+CREATE INDEX IF NOT EXISTS idx_publish_ledger_status ON publish_ledger(status);
+
+-- ===== 发布步骤耗时表 =====
+-- 浏览器发布流程各步骤的耗时，用于分析慢步骤
+CREATE TABLE IF NOT EXISTS publish_step_timings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,                   -- 一次发布的ID
+    platform TEXT NOT NULL,                 -- 平台
+    item TEXT,                              -- 商品标题
+    step TEXT NOT NULL,                     -- 步骤名称
+    status TEXT,                            -- 步骤状态: success/failed/skipped
+    elapsed REAL DEFAULT 0,                 -- 耗时（秒）
+    success INTEGER DEFAULT 0,              -- 本次发布是否成功
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_publish_step_timings_step ON publish_step_timings(platform, step);
+
+-- ===== 死信队列表 =====
+-- 批量发布中最终失败的商品，保存完整数据，可在低峰时段批量重新投递
+CREATE TABLE IF NOT EXISTS dead_letters (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fingerprint TEXT NOT NULL,              -- 内容指纹
+    platform TEXT NOT NULL,                 -- 平台
+    account TEXT NOT NULL DEFAULT 'default',-- 账号
+    payload TEXT NOT NULL,                  -- 商品数据（JSON）
+    
+    status TEXT DEFAULT 'pending',          -- 状态: pending(待投递)/redriving(投递中)/held(结果未知，需人工核对)/recovered(已恢复)/abandoned(已放弃)
+    error TEXT,                             -- 最近一次错误
+    category TEXT,                          -- 错误类别
+    failures INTEGER DEFAULT 1,             -- 失败次数
+    redrives INTEGER DEFAULT 0,             -- 重新投递次数
+    
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    
+    UNIQUE (fingerprint, platform, account)
+);
+
+CREATE INDEX IF NOT EXISTS idx_dead_letters_status ON dead_letters(platform, status);
+
+-- ===== 热榜快照表 =====
+-- 每次抓到新的热榜数据时保存一份，记录话题排名和热度的变化
+CREATE TABLE IF NOT EXISTS hot_snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source TEXT NOT NULL,                   -- 来源: zhihu/bilibili
+    rank INTEGER NOT NULL,                  -- 排名（从1开始）
+    item_key TEXT NOT NULL,                 -- 条目标识（URL）
+    title TEXT,                             -- 标题
+    heat REAL,                              -- 热度（播放量或热度值，无法解析时为空）
+    data TEXT,                              -- 完整条目（JSON）
+    captured_at REAL NOT NULL               -- 抓取时间（Unix时间戳，同一次快照相同）
+);
+
+CREATE INDEX IF NOT EXISTS idx_hot_snapshots_source ON hot_snapshots(source, captured_at);
+CREATE INDEX IF NOT EXISTS idx_hot_snapshots_item ON hot_snapshots(item_key, captured_at);
+
+-- ===== 视频下载队列 =====
+-- 参考视频下载任务，程序中断后从这里恢复
+CREATE TABLE IF NOT EXISTS downloads (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL,                      -- 视频地址
+    url_hash TEXT NOT NULL UNIQUE,          -- 规范化URL的哈希（去重）
+    output_template TEXT,                   -- 指定的保存路径（yt-dlp输出模板，为空时按任务ID保存）
+    
+    status TEXT DEFAULT 'pending',          -- 状态: pending/downloading/completed/duplicate(内容重复)/failed
+    file_path TEXT,                         -- 下载完成的文件
+    content_hash TEXT,                      -- 文件SHA256（内容去重）
+    bytes INTEGER DEFAULT 0,                -- 文件大小
+    attempts INTEGER DEFAULT 0,             -- 尝试次数
+    error TEXT,                             -- 最近一次错误
+    
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_downloads_status ON downloads(status);
+CREATE INDEX IF NOT EXISTS idx_downloads_content ON downloads(content_hash);
+
 -- ===== 数据库版本信息 =====
 CREATE TABLE IF NOT EXISTS db_version (
     version TEXT PRIMARY KEY,
@@ -337,7 +478,13 @@ CREATE TABLE IF NOT EXISTS db_version (
 );
 
 INSERT OR IGNORE INTO db_version (version, description) VALUES 
-    ('1.0.0', 'Initial database schema');
+    ('1.0.0', 'Initial database schema'),
+    ('1.1.0', 'Durable batch publish queue'),
+    ('1.2.0', 'Idempotent publish ledger'),
+    ('1.3.0', 'Publish step timings'),
+    ('1.4.0', 'Dead-letter queue'),
+    ('1.5.0', 'Hot-list snapshots'),
+    ('1.6.0', 'Video download queue');
 
 -- ===== 完成 =====
 -- Schema创建完成
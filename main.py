@@ -7,6 +7,7 @@ Version: 1.17.2
 import sys
 import os
 import asyncio
+import multiprocessing
 import traceback
 from pathlib import Path
 from datetime import datetime
@@ -179,6 +180,9 @@ def main():
 
 
 if __name__ == "__main__":
+    # 打包后的exe中，进程池的子进程会重新执行本文件，需要先交给multiprocessing处理
+    multiprocessing.freeze_support()
+    
     try:
         main()
     except KeyboardInterrupt:
@@ -82,6 +82,8 @@ class BasePlatformPlugin(ABC):
         self.platform_limits: Optional[PlatformLimits] = None  # 平台限制
         self.enabled: bool = True                       # 是否启用
         self.version: str = "1.0.0"                    # 插件版本
+        self.rate_limiter = None                        # 发布频率调度器（默认使用全局调度器）
+        self._rate_limit_configured = False
     
     # ===== 必须实现的方法 =====
     
@@ -268,6 +270,23 @@ class BasePlatformPlugin(ABC):
         
         return base_prompts.get(task_type, f"你是{self.platform_name}平台的专家。")
     
+    def get_rate_limiter(self):
+        """
+        获取发布频率调度器
+        
+        首次调用时按平台限制配置一次，之后的批次共用同一个令牌桶，每日上限跨批次生效。
+        """
+        if self.rate_limiter is None:
+            from core.rate_limiter import get_rate_limiter
+            self.rate_limiter = get_rate_limiter()
+        
+        if not self._rate_limit_configured:
+            platform = self.platform_type.value if self.platform_type else self.platform_name
+            self.rate_limiter.configure(platform, limits=self.get_platform_limits())
+            self._rate_limit_configured = True
+        
+        return self.rate_limiter
+    
     async def batch_publish(
         self,
         contents: List[Dict[str, Any]],
@@ -285,16 +304,17 @@ class BasePlatformPlugin(ABC):
         Returns:
             发布结果列表
         """
+        # 发布节奏由全局调度器按平台限制统一控制
+        platform = self.platform_type.value if self.platform_type else self.platform_name
+        account = kwargs.get("account", "default")
+        limiter = self.get_rate_limiter()
+        
         results = []
         
         for content in contents:
+            await limiter.acquire(platform, account)
             result = await self.publish(content, content_type, **kwargs)
             results.append(result)
-            
-            # 遵守发布间隔
-            import asyncio
-            limits = self.get_platform_limits()
-            await asyncio.sleep(limits.publish_interval)
         
         return results
     
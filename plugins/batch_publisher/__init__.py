@@ -5,10 +5,14 @@
 """
 
 from plugins.batch_publisher.task_manager import BatchPublishManager
+from plugins.batch_publisher.job_store import PublishJobStore
+from plugins.batch_publisher.worker_pool import PublishWorkerPool
 from core.publisher import PublishContent, PublishResult, PlatformType
 
 __all__ = [
     'BatchPublishManager',
+    'PublishJobStore',
+    'PublishWorkerPool',
     'PublishContent',
     'PublishResult',
     'PlatformType',
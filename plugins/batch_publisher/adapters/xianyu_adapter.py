@@ -12,7 +12,8 @@ from core.publisher import (
     PublishContent, 
     PublishResult,
     PlatformType,
-    PublishStatus
+    PublishStatus,
+    UNCERTAIN_ERROR_CODE
 )
 from core.content_adapter import XianyuAdapter
 
@@ -85,13 +86,7 @@ class XianyuPublisher(PlatformPublisher):
         
         try:
             # 转换为商品数据格式
-            product = {
-                "title": content.title,
-                "price": content.price or 0,
-                "description": content.body or content.title,
-                "images": content.images or [],
-                "category": content.category or "二手闲置"
-            }
+            product = self._to_product(content)
             
             if not use_browser:
                 # 模拟发布
@@ -162,6 +157,8 @@ class XianyuPublisher(PlatformPublisher):
                     platform=self.platform,
                     status=PublishStatus.FAILED,
                     error=result.get("error", "未知错误"),
+                    # 已提交但未确认：不能直接重试，由PublishManager先核对
+                    error_code=UNCERTAIN_ERROR_CODE if result.get("submitted") else None,
                     duration=duration
                 )
         
@@ -174,6 +171,53 @@ class XianyuPublisher(PlatformPublisher):
                 duration=duration
             )
     
+    async def find_published(
+        self,
+        content: PublishContent,
+        since: Optional[datetime] = None,
+        cookies_file: str = "data/xianyu_cookies.json"
+    ) -> Optional[PublishResult]:
+        """
+        在闲鱼"我发布的"列表中查找该商品（上次提交结果未知时核对）
+        
+        Args:
+            content: 适配后的发布内容
+            since: 本次发布的开始时间（本地时间，可选）
+            cookies_file: Cookie文件路径
+            
+        Returns:
+            已发布时返回成功结果，未找到返回None（查询失败时抛出异常）
+        """
+        from plugins.xianyu.publisher import XianyuPublisher
+        
+        found = await XianyuPublisher().find_published_product(self._to_product(content), cookies_file, since)
+        if not found:
+            return None
+        
+        return PublishResult(
+            platform=self.platform,
+            status=PublishStatus.SUCCESS,
+            post_id=found.get("post_id"),
+            post_url=found.get("post_url"),
+            extra_data={
+                "title": content.title,
+                "price": content.price,
+                "category": content.category,
+                "mode": "核对"
+            }
+        )
+    
+    @staticmethod
+    def _to_product(content: PublishContent) -> dict:
+        """转换为商品数据格式"""
+        return {
+            "title": content.title,
+            "price": content.price or 0,
+            "description": content.content or content.description or content.title,
+            "images": content.images or [],
+            "category": content.category or "二手闲置"
+        }
+    
     def get_publish_tips(self) -> list[str]:
         """获取发布建议"""
         return [
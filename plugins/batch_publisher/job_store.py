@@ -0,0 +1,463 @@
+"""
+批量发布持久化队列
+
+将批量发布任务及其各平台子任务保存到SQLite，支持租约、心跳和重启后恢复未完成的子任务
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from dataclasses import asdict
+from datetime import datetime
+from typing import List, Dict, Optional, Any, Tuple
+
+from core.database import Database, json_loads
+from core.publisher import (
+    PublishContent,
+    PublishResult,
+    PlatformType,
+    PublishStatus
+)
+
+logger = logging.getLogger(__name__)
+
+
+# 本安装的租约持有者标识（保存在config表中，重启后不变）
+INSTANCE_ID_KEY = "system.instance_id"
+
+# 子任务的终态（不再需要执行）
+FINISHED_SUB_JOB_STATUSES = (
+    PublishStatus.SUCCESS.value,
+    PublishStatus.FAILED.value,
+    PublishStatus.CANCELLED.value,
+)
+
+
+def content_to_json(content: PublishContent) -> str:
+    """序列化发布内容"""
+    data = asdict(content)
+    data["created_at"] = content.created_at.isoformat()
+    return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def content_from_json(raw: str) -> PublishContent:
+    """反序列化发布内容"""
+    data = json_loads(raw)
+    created_at = data.pop("created_at", None)
+    content = PublishContent(**data)
+    if created_at:
+        content.created_at = datetime.fromisoformat(created_at)
+    return content
+
+
+def result_to_json(result: PublishResult) -> str:
+    """序列化发布结果"""
+    return json.dumps({
+        "platform": result.platform.value,
+        "status": result.status.value,
+        "post_id": result.post_id,
+        "post_url": result.post_url,
+        "error": result.error,
+        "error_code": result.error_code,
+        "published_at": result.published_at.isoformat() if result.published_at else None,
+        "duration": result.duration,
+        "extra_data": result.extra_data,
+    }, ensure_ascii=False, default=str)
+
+
+def result_from_json(raw: str) -> PublishResult:
+    """反序列化发布结果"""
+    data = json_loads(raw)
+    published_at = data.get("published_at")
+    return PublishResult(
+        platform=PlatformType(data["platform"]),
+        status=PublishStatus(data["status"]),
+        post_id=data.get("post_id"),
+        post_url=data.get("post_url"),
+        error=data.get("error"),
+        error_code=data.get("error_code"),
+        published_at=datetime.fromisoformat(published_at) if published_at else None,
+        duration=data.get("duration", 0.0),
+        extra_data=data.get("extra_data") or {},
+    )
+
+
+class PublishJobStore:
+    """
+    批量发布任务存储
+
+    - 每个任务一行（batch_jobs），每个目标平台一个子任务（batch_sub_jobs）
+    - 执行子任务前先获取租约，心跳定期续约；进程崩溃后租约过期，其他实例可接手
+    - 租约持有者默认是本安装的固定标识，崩溃重启后无需等待过期即可收回自己的租约
+      （同一数据库同时只应由一个程序实例使用）
+    - 子任务结果先写入缓冲区，由心跳、缓冲区满或任务结束时统一提交
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        lease_ttl: float = 60.0,
+        flush_size: int = 20,
+        owner: Optional[str] = None
+    ):
+        """
+        初始化任务存储
+
+        Args:
+            db_path: 数据库文件路径（可选，默认使用主数据库）
+            lease_ttl: 租约有效期（秒）
+            flush_size: 缓冲写入达到该数量时立即提交
+            owner: 租约持有者标识（可选，默认使用保存在数据库中的本安装标识）
+        """
+        self.db = Database(db_path)
+        self.owner = owner
+        self.lease_ttl = lease_ttl
+        self.flush_size = flush_size
+
+        # 待提交的写入 {sql: [params, ...]}
+        self._pending_writes: Dict[str, List[tuple]] = {}
+        self._pending_count = 0
+
+        # 当前持有的租约 {(job_id, platform)}
+        self._held_leases: set = set()
+
+        # 心跳（每个事件循环一个） {loop: [task, 使用者数量]}
+        self._heartbeats: Dict[asyncio.AbstractEventLoop, list] = {}
+
+    @property
+    def heartbeat_interval(self) -> float:
+        """心跳间隔（租约有效期的1/3）"""
+        return max(self.lease_ttl / 3, 0.1)
+
+    async def connect(self):
+        """连接数据库（已连接时直接返回）"""
+        if self.db.conn is None:
+            await self.db.connect()
+        if self.owner is None:
+            self.owner = await self._load_instance_id()
+
+    async def _load_instance_id(self) -> str:
+        """读取本安装的标识（首次使用时生成）"""
+        await self.db.conn.execute(
+            "INSERT OR IGNORE INTO config (key, value, type, category, description) VALUES (?, ?, ?, ?, ?)",
+            (INSTANCE_ID_KEY, uuid.uuid4().hex, "string", "system", "本安装标识（批量发布任务租约持有者）")
+        )
+        await self.db.conn.commit()
+        return await self.db.get_config(INSTANCE_ID_KEY)
+
+    async def close(self):
+        """提交剩余写入并关闭连接"""
+        if self.db.conn is None:
+            return
+
+        await self.flush()
+        await self.db.close()
+        self.db.conn = None
+
+    # ===== 写入 =====
+
+    async def save_jobs(
+        self,
+        jobs: List[Tuple[str, PublishContent, List[PlatformType], int]]
+    ):
+        """
+        保存任务及其子任务（已存在的任务保持不变）
+
+        Args:
+            jobs: [(job_id, content, platforms, max_retries), ...]
+        """
+        if not jobs:
+            return
+
+        await self.connect()
+
+        job_rows = []
+        sub_job_rows = []
+        for job_id, content, platforms, max_retries in jobs:
+            job_rows.append((job_id, content_to_json(content), max_retries))
+            for position, platform in enumerate(platforms):
+                sub_job_rows.append((job_id, platform.value, position))
+
+        await self.db.conn.executemany(
+            "INSERT OR IGNORE INTO batch_jobs (job_id, content, max_retries) VALUES (?, ?, ?)",
+            job_rows
+        )
+        await self.db.conn.executemany(
+            "INSERT OR IGNORE INTO batch_sub_jobs (job_id, platform, position) VALUES (?, ?, ?)",
+            sub_job_rows
+        )
+        await self.db.conn.commit()
+
+    async def acquire_lease(self, job_id: str, platform: PlatformType) -> bool:
+        """
+        获取子任务租约
+
+        子任务未结束，且租约无人持有、已过期或由本实例持有时才能获取。
+
+        Args:
+            job_id: 任务ID
+            platform: 平台
+
+        Returns:
+            是否获取成功
+        """
+        await self.connect()
+
+        now = time.time()
+        cursor = await self.db.conn.execute(
+            f"""
+            UPDATE batch_sub_jobs
+            SET status = ?, attempts = attempts + 1,
+                lease_owner = ?, lease_expires_at = ?, heartbeat_at = ?,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE job_id = ? AND platform = ?
+              AND status NOT IN ({', '.join('?' * len(FINISHED_SUB_JOB_STATUSES))})
+              AND (lease_owner IS NULL OR lease_owner = ? OR lease_expires_at < ?)
+            """,
+            (
+                PublishStatus.PROCESSING.value, self.owner, now + self.lease_ttl, now,
+                job_id, platform.value,
+                *FINISHED_SUB_JOB_STATUSES,
+                self.owner, now
+            )
+        )
+        # 租约必须立即持久化，否则其他实例可能同时接手
+        await self.db.conn.commit()
+
+        acquired = cursor.rowcount == 1
+        if acquired:
+            self._held_leases.add((job_id, platform.value))
+        else:
+            logger.info(f"子任务已被占用或已结束: {job_id}/{platform.value}")
+        return acquired
+
+    async def record_result(self, job_id: str, result: PublishResult):
+        """
+        记录子任务结果并释放租约（缓冲写入）
+
+        Args:
+            job_id: 任务ID
+            result: 发布结果
+        """
+        self._held_leases.discard((job_id, result.platform.value))
+        self._buffer(
+            """
+            UPDATE batch_sub_jobs
+            SET status = ?, result = ?, error = ?,
+                lease_owner = NULL, lease_expires_at = NULL,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE job_id = ? AND platform = ?
+            """,
+            (result.status.value, result_to_json(result), result.error, job_id, result.platform.value)
+        )
+
+        if self._pending_count >= self.flush_size:
+            await self.flush()
+
+    async def mark_job_started(self, job_id: str):
+        """记录任务开始（缓冲写入）"""
+        self._buffer(
+            "UPDATE batch_jobs SET status = 'running', started_at = COALESCE(started_at, CURRENT_TIMESTAMP) WHERE job_id = ?",
+            (job_id,)
+        )
+
+    async def finish_job(self, job_id: str, status: str):
+        """
+        记录任务结束并立即提交所有缓冲写入
+
+        Args:
+            job_id: 任务ID
+            status: 任务最终状态
+        """
+        self._buffer(
+            "UPDATE batch_jobs SET status = ?, completed_at = CURRENT_TIMESTAMP WHERE job_id = ?",
+            (status, job_id)
+        )
+        await self.flush()
+
+    def _buffer(self, sql: str, params: tuple):
+        """加入写缓冲区"""
+        self._pending_writes.setdefault(sql, []).append(params)
+        self._pending_count += 1
+
+    async def flush(self):
+        """在一个事务中提交所有缓冲写入"""
+        if not self._pending_writes or self.db.conn is None:
+            return
+
+        writes, self._pending_writes = self._pending_writes, {}
+        self._pending_count = 0
+
+        try:
+            for sql, rows in writes.items():
+                await self.db.conn.executemany(sql, rows)
+            await self.db.conn.commit()
+        except Exception as e:
+            logger.error(f"❌ 提交任务状态失败: {e}")
+            # 放回缓冲区，下次心跳再试
+            for sql, rows in writes.items():
+                self._pending_writes.setdefault(sql, []).extend(rows)
+                self._pending_count += len(rows)
+
+    # ===== 心跳 =====
+
+    async def heartbeat(self):
+        """续约所有持有的租约，并顺带提交缓冲写入"""
+        if self.db.conn is None:
+            return
+
+        if self._held_leases:
+            now = time.time()
+            for job_id, platform in self._held_leases:
+                self._buffer(
+                    "UPDATE batch_sub_jobs SET lease_expires_at = ?, heartbeat_at = ? "
+                    "WHERE job_id = ? AND platform = ? AND lease_owner = ?",
+                    (now + self.lease_ttl, now, job_id, platform, self.owner)
+                )
+
+        await self.flush()
+
+    async def _heartbeat_loop(self):
+        """心跳循环"""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.heartbeat()
+            except Exception as e:
+                logger.warning(f"⚠️ 任务心跳失败: {e}")
+
+    def start_heartbeat(self):
+        """开始心跳（同一事件循环中的多个任务共用，按引用计数停止）"""
+        loop = asyncio.get_running_loop()
+        entry = self._heartbeats.get(loop)
+        if entry is None or entry[0].done():
+            entry = [loop.create_task(self._heartbeat_loop()), 0]
+            self._heartbeats[loop] = entry
+        entry[1] += 1
+
+    def stop_heartbeat(self):
+        """停止心跳（最后一个使用者退出时才真正停止）"""
+        loop = asyncio.get_running_loop()
+        entry = self._heartbeats.get(loop)
+        if entry is None:
+            return
+
+        entry[1] -= 1
+        if entry[1] <= 0:
+            entry[0].cancel()
+            del self._heartbeats[loop]
+
+    # ===== 查询 =====
+
+    async def load_unfinished_jobs(self) -> List[Dict[str, Any]]:
+        """
+        加载未结束的任务
+
+        Returns:
+            任务列表，每项包含 job_id, content, max_retries, platforms, results
+            （platforms为全部目标平台，results为已结束子任务的结果）
+        """
+        await self.connect()
+
+        cursor = await self.db.conn.execute(
+            """
+            SELECT job_id, content, max_retries FROM batch_jobs
+            WHERE status IN ('pending', 'running')
+            ORDER BY rowid
+            """
+        )
+        job_rows = await cursor.fetchall()
+        if not job_rows:
+            return []
+
+        cursor = await self.db.conn.execute(
+            """
+            SELECT s.job_id, s.platform, s.status, s.result, s.error
+            FROM batch_sub_jobs s
+            JOIN batch_jobs j ON j.job_id = s.job_id
+            WHERE j.status IN ('pending', 'running')
+            ORDER BY s.job_id, s.position
+            """
+        )
+        sub_rows = await cursor.fetchall()
+
+        sub_jobs: Dict[str, List[Any]] = {}
+        for row in sub_rows:
+            sub_jobs.setdefault(row["job_id"], []).append(row)
+
+        jobs = []
+        for row in job_rows:
+            try:
+                content = content_from_json(row["content"])
+            except Exception as e:
+                logger.error(f"❌ 任务内容无法恢复: {row['job_id']} - {e}")
+                continue
+
+            platforms = []
+            results = []
+            for sub in sub_jobs.get(row["job_id"], []):
+                platform = PlatformType(sub["platform"])
+                platforms.append(platform)
+
+                if sub["status"] not in FINISHED_SUB_JOB_STATUSES:
+                    continue
+
+                if sub["result"]:
+                    results.append(result_from_json(sub["result"]))
+                else:
+                    results.append(PublishResult(
+                        platform=platform,
+                        status=PublishStatus(sub["status"]),
+                        error=sub["error"]
+                    ))
+
+            jobs.append({
+                "job_id": row["job_id"],
+                "content": content,
+                "max_retries": row["max_retries"],
+                "platforms": platforms,
+                "results": results,
+            })
+
+        return jobs
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取任务记录
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            任务记录或None
+        """
+        await self.connect()
+
+        cursor = await self.db.conn.execute(
+            "SELECT job_id, status, max_retries, created_at, started_at, completed_at "
+            "FROM batch_jobs WHERE job_id = ?",
+            (job_id,)
+        )
+        row = await cursor.fetchone()
+        return dict(row) if row else None
+
+    async def get_sub_jobs(self, job_id: str) -> List[Dict[str, Any]]:
+        """
+        获取任务的子任务列表
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            子任务列表
+        """
+        await self.connect()
+
+        cursor = await self.db.conn.execute(
+            "SELECT * FROM batch_sub_jobs WHERE job_id = ? ORDER BY position",
+            (job_id,)
+        )
+        rows = await cursor.fetchall()
+        return [dict(row) for row in rows]
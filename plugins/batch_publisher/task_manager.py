@@ -10,6 +10,9 @@ from typing import List, Dict, Optional, Callable, Any
 from dataclasses import dataclass, field
 from enum import Enum
 
+from core.cancellation import CancellationToken, PublishCancelledError, current_token
+from core.publish_ledger import PublishLedger
+from core.rate_limiter import RateLimitScheduler
 from core.publisher import (
     PublishManager,
     PublishContent,
@@ -23,12 +26,15 @@ from plugins.batch_publisher.adapters import (
     ZhihuPublisher,
     BilibiliPublisher
 )
+from plugins.batch_publisher.job_store import PublishJobStore
+from plugins.batch_publisher.worker_pool import PublishWorkerPool
 
 
 class TaskStatus(Enum):
     """任务状态"""
     PENDING = "pending"           # 待处理
     RUNNING = "running"           # 运行中
+    PAUSED = "paused"             # 已暂停
     COMPLETED = "completed"       # 已完成
     FAILED = "failed"            # 失败
     CANCELLED = "cancelled"       # 已取消
@@ -59,6 +65,9 @@ class PublishTask:
     retry_count: int = 0
     max_retries: int = 3
     
+    # 调度优先级（数值越大越先执行）
+    priority: int = 0
+    
     def __post_init__(self):
         self.total_platforms = len(self.platforms)
     
@@ -88,6 +97,12 @@ class PublishTask:
         
         if not result.success:
             self.failed_platforms += 1
+    
+    @property
+    def pending_platforms(self) -> List[PlatformType]:
+        """尚未得到结果的平台（恢复任务时跳过已完成的平台）"""
+        done = {r.platform for r in self.results}
+        return [p for p in self.platforms if p not in done]
 
 
 class BatchPublishManager:
@@ -97,9 +112,45 @@ class BatchPublishManager:
     管理多任务、多平台的批量发布
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        job_store: Optional[PublishJobStore] = None,
+        parallel: bool = True,
+        platform_concurrency: int = 1,
+        platform_timeouts: Optional[Dict[PlatformType, float]] = None,
+        workers: int = 3,
+        rate_limiter: Optional[RateLimitScheduler] = None,
+        cancel_grace_period: float = 5.0,
+        ledger: Optional[PublishLedger] = None
+    ):
+        """
+        初始化批量发布管理器
+        
+        Args:
+            job_store: 持久化任务存储（可选，不提供则任务只保存在内存中）
+            parallel: 同一任务的各平台是否并行发布
+            platform_concurrency: 每个平台同时进行的发布数上限
+            platform_timeouts: 各平台发布超时时间（秒）
+            workers: 批量执行时同时执行的任务数
+            rate_limiter: 发布频率调度器（默认使用全局调度器）
+            cancel_grace_period: 取消运行中任务的宽限期(秒)，到期后强制中断仍在执行的发布
+            ledger: 发布台账（可选，重试或恢复任务时不会重复发布已生效的内容）
+        """
+        # 持久化存储
+        self.job_store = job_store
+        self.parallel = parallel
+        
+        # 批量执行工作池（执行批量任务时创建）
+        self.workers = workers
+        self.worker_pool: Optional[PublishWorkerPool] = None
+        
         # 发布管理器
-        self.publish_manager = PublishManager()
+        self.publish_manager = PublishManager(
+            platform_concurrency=platform_concurrency,
+            platform_timeouts=platform_timeouts,
+            rate_limiter=rate_limiter,
+            ledger=ledger
+        )
         
         # 注册所有平台发布器
         self._register_publishers()
@@ -108,6 +159,10 @@ class BatchPublishManager:
         self.tasks: Dict[str, PublishTask] = {}
         self.task_counter = 0
         
+        # 取消令牌（任务执行期间或被暂停时存在）
+        self._tokens: Dict[str, CancellationToken] = {}
+        self.cancel_grace_period = cancel_grace_period
+        
         # 进度回调
         self.progress_callbacks: List[Callable] = []
     
@@ -144,7 +199,8 @@ class BatchPublishManager:
         self,
         content: PublishContent,
         platforms: List[str],
-        max_retries: int = 3
+        max_retries: int = 3,
+        priority: int = 0
     ) -> str:
         """
         创建发布任务
@@ -153,6 +209,7 @@ class BatchPublishManager:
             content: 发布内容
             platforms: 平台名称列表（如 ["xianyu", "xiaohongshu"]）
             max_retries: 最大重试次数
+            priority: 调度优先级（数值越大越先执行）
             
         Returns:
             任务ID
@@ -177,7 +234,8 @@ class BatchPublishManager:
             task_id=task_id,
             content=content,
             platforms=platform_enums,
-            max_retries=max_retries
+            max_retries=max_retries,
+            priority=priority
         )
         
         self.tasks[task_id] = task
@@ -204,71 +262,196 @@ class BatchPublishManager:
         
         if task.is_finished:
             print(f"⚠️ 任务已结束: {task_id}")
+            if task.status == TaskStatus.CANCELLED and self.job_store:
+                # 排队期间被取消的任务，不再在下次启动时恢复
+                await self.job_store.finish_job(task_id, task.status.value)
             return task
         
+        # 持久化任务，并开始心跳续约
+        if self.job_store:
+            await self._persist_tasks([task])
+            await self.job_store.mark_job_started(task_id)
+            self.job_store.start_heartbeat()
+        
+        # 取消令牌随上下文传递到发布器、浏览器自动化和AI调用
+        token = self._tokens.setdefault(task_id, CancellationToken())
+        context_token = current_token.set(token)
+        
+        try:
+            await self._run_task(task)
+        finally:
+            current_token.reset(context_token)
+            self._tokens.pop(task_id, None)
+            
+            if self.job_store:
+                self.job_store.stop_heartbeat()
+                await self.job_store.finish_job(task_id, task.status.value)
+        
+        # 打印摘要
+        self._print_task_summary(task)
+        
+        # 通知完成
+        self._notify_progress(task_id, 100, "发布完成")
+        
+        return task
+    
+    async def _run_task(self, task: PublishTask):
+        """
+        发布任务中尚未完成的平台，并更新任务状态
+        
+        Args:
+            task: 任务对象
+        """
+        task_id = task.task_id
+        
         # 更新状态
-        task.status = TaskStatus.RUNNING
+        token = self._tokens.get(task_id)
+        task.status = TaskStatus.PAUSED if token and token.is_paused else TaskStatus.RUNNING
         task.started_at = datetime.now()
-        self._notify_progress(task_id, 0, "开始发布")
+        self._notify_progress(task_id, task.progress, "开始发布")
+        
+        pending = task.pending_platforms
         
         print(f"\n{'='*60}")
         print(f"🚀 开始执行任务: {task_id}")
         print(f"   标题: {task.content.title}")
         print(f"   平台数: {task.total_platforms}")
+        if len(pending) < task.total_platforms:
+            print(f"   跳过已完成平台: {task.total_platforms - len(pending)}个")
         print(f"{'='*60}\n")
         
-        # 逐个平台发布
-        for idx, platform in enumerate(task.platforms):
-            try:
-                # 发布到单个平台
-                result = await self.publish_manager.publish_to_single_platform(
-                    content=task.content,
-                    platform=platform,
-                    max_retries=task.max_retries
-                )
-                
-                # 记录结果
-                task.add_result(result)
-                
-                # 通知进度
-                progress = task.progress
-                status_msg = f"已完成 {platform.value} ({task.completed_platforms}/{task.total_platforms})"
-                self._notify_progress(task_id, progress, status_msg)
-                
-                # 打印结果
-                print(result)
-                
-                # 延迟（避免频率限制）
-                if idx < len(task.platforms) - 1:
-                    await asyncio.sleep(1)
-            
-            except Exception as e:
-                # 记录失败
-                failed_result = PublishResult(
-                    platform=platform,
-                    status=PublishStatus.FAILED,
-                    error=f"执行异常: {str(e)}"
-                )
-                task.add_result(failed_result)
-                print(f"❌ {platform.value}: {e}")
+        if self.parallel:
+            # 各平台相互独立，并发发布（受平台并发上限和超时限制）
+            await asyncio.gather(*(self._publish_platform(task, p) for p in pending))
+        else:
+            # 逐个平台发布（发布节奏由频率调度器控制）
+            for platform in pending:
+                await self._publish_platform(task, platform)
+        
+        # 结果按平台顺序排列（并发时按完成顺序写入）
+        order = {p: i for i, p in enumerate(task.platforms)}
+        task.results.sort(key=lambda r: order.get(r.platform, len(order)))
         
         # 更新任务状态
         task.completed_at = datetime.now()
         
-        if task.failed_platforms == 0:
+        if token and token.is_cancelled:
+            task.status = TaskStatus.CANCELLED
+        elif task.completed_platforms < task.total_platforms:
+            task.status = TaskStatus.PENDING  # 部分子任务被其他实例占用，保持未完成
+        elif task.failed_platforms == 0:
             task.status = TaskStatus.COMPLETED
         elif task.failed_platforms == task.total_platforms:
             task.status = TaskStatus.FAILED
         else:
             task.status = TaskStatus.COMPLETED  # 部分成功也算完成
+    
+    async def _publish_platform(self, task: PublishTask, platform: PlatformType) -> bool:
+        """
+        发布任务到单个平台并记录结果
         
-        # 打印摘要
-        self._print_task_summary(task)
+        Args:
+            task: 任务对象
+            platform: 目标平台
+            
+        Returns:
+            是否执行了发布（子任务被其他实例占用时返回False）
+        """
+        token = self._tokens.get(task.task_id)
         
-        # 通知完成
-        self._notify_progress(task_id, 100, "发布完成")
+        try:
+            # 暂停时在此等待；已取消则不再开始发布
+            if token:
+                await token.checkpoint()
+            
+            # 获取子任务租约（被其他实例占用时跳过）
+            if self.job_store and not await self.job_store.acquire_lease(task.task_id, platform):
+                return False
+            
+            publish = asyncio.ensure_future(self.publish_manager.publish_with_limits(
+                content=task.content,
+                platform=platform,
+                max_retries=task.max_retries
+            ))
+            if token:
+                token.track(publish)
+            
+            try:
+                result = await publish
+            except asyncio.CancelledError:
+                # 宽限期结束被强制中断；外部取消（如关闭工作池）照常向上传播
+                if not (token and token.is_cancelled and publish.cancelled()):
+                    raise
+                raise PublishCancelledError(token.reason)
+        except PublishCancelledError as e:
+            result = PublishResult(
+                platform=platform,
+                status=PublishStatus.CANCELLED,
+                error=f"已取消: {e}",
+                error_code="cancelled"
+            )
+        except Exception as e:
+            result = PublishResult(
+                platform=platform,
+                status=PublishStatus.FAILED,
+                error=f"执行异常: {str(e)}"
+            )
+        
+        await self._record_result(task, result)
+        print(result)
+        return True
+    
+    async def _record_result(self, task: PublishTask, result: PublishResult):
+        """记录平台结果，通知进度，并写入持久化存储的缓冲区"""
+        # 记录结果与读取进度之间没有await，并发时进度依然单调且与计数一致
+        task.add_result(result)
+        status_msg = f"已完成 {result.platform.value} ({task.completed_platforms}/{task.total_platforms})"
+        self._notify_progress(task.task_id, task.progress, status_msg)
+        
+        if self.job_store:
+            await self.job_store.record_result(task.task_id, result)
+    
+    async def _persist_tasks(self, tasks: List[PublishTask]):
+        """将任务保存到持久化存储（已保存的任务不会重复写入）"""
+        await self.job_store.save_jobs([
+            (t.task_id, t.content, t.platforms, t.max_retries)
+            for t in tasks
+        ])
+    
+    async def resume_unfinished_tasks(self) -> List[PublishTask]:
+        """
+        恢复并执行上次未完成的任务（启动时调用）
         
-        return task
+        已成功的平台直接使用保存的结果，只重新发布未完成的平台。
+        
+        Returns:
+            恢复执行的任务列表
+        """
+        if not self.job_store:
+            return []
+        
+        task_ids = []
+        for job in await self.job_store.load_unfinished_jobs():
+            if job["job_id"] in self.tasks:
+                continue
+            
+            task = PublishTask(
+                task_id=job["job_id"],
+                content=job["content"],
+                platforms=job["platforms"],
+                max_retries=job["max_retries"]
+            )
+            for result in job["results"]:
+                task.add_result(result)
+            
+            self.tasks[task.task_id] = task
+            task_ids.append(task.task_id)
+        
+        if not task_ids:
+            return []
+        
+        print(f"♻️ 恢复 {len(task_ids)} 个未完成任务")
+        return await self.execute_batch_tasks(task_ids)
     
     def _print_task_summary(self, task: PublishTask):
         """打印任务摘要"""
@@ -308,47 +491,146 @@ class BatchPublishManager:
         """获取运行中的任务"""
         return [t for t in self.tasks.values() if t.status == TaskStatus.RUNNING]
     
-    def cancel_task(self, task_id: str) -> bool:
+    def cancel_task(self, task_id: str, grace_period: Optional[float] = None) -> bool:
         """
-        取消任务
+        取消任务（可在其他线程调用）
+        
+        运行中的任务在下一个检查点停止，宽限期结束后仍在执行的发布会被强制中断，
+        浏览器等资源随之释放；已得到的平台结果保留，未完成的平台记为已取消。
         
         Args:
             task_id: 任务ID
+            grace_period: 宽限期(秒)，默认使用管理器配置
             
         Returns:
             是否成功取消
         """
         task = self.tasks.get(task_id)
-        if not task:
+        if not task or task.is_finished:
             return False
         
-        if task.status == TaskStatus.RUNNING:
-            print(f"⚠️ 任务正在运行，无法立即取消: {task_id}")
-            return False
+        token = self._tokens.get(task_id)
+        if token:
+            token.cancel(
+                grace_period=self.cancel_grace_period if grace_period is None else grace_period
+            )
+        
+        if task.status in (TaskStatus.RUNNING, TaskStatus.PAUSED):
+            # 由执行协程在停止后更新为已取消
+            print(f"⏹️ 正在取消任务: {task_id}")
+            return True
         
         task.status = TaskStatus.CANCELLED
         task.completed_at = datetime.now()
+        self._tokens.pop(task_id, None)
         
         print(f"✅ 任务已取消: {task_id}")
         return True
     
-    async def execute_batch_tasks(self, task_ids: List[str]) -> List[PublishTask]:
+    def pause_task(self, task_id: str) -> bool:
+        """
+        暂停任务（可在其他线程调用）
+        
+        正在进行的平台发布在下一个检查点处等待，不会开始新的步骤或重试；
+        尚未开始的任务在开始执行时即进入等待。
+        
+        Args:
+            task_id: 任务ID
+            
+        Returns:
+            是否成功暂停
+        """
+        task = self.tasks.get(task_id)
+        if not task or task.is_finished:
+            return False
+        
+        self._tokens.setdefault(task_id, CancellationToken()).pause()
+        if task.status == TaskStatus.RUNNING:
+            task.status = TaskStatus.PAUSED
+        
+        print(f"⏸️ 任务已暂停: {task_id}")
+        return True
+    
+    def resume_task(self, task_id: str) -> bool:
+        """
+        恢复已暂停的任务
+        
+        Args:
+            task_id: 任务ID
+            
+        Returns:
+            是否成功恢复
+        """
+        task = self.tasks.get(task_id)
+        token = self._tokens.get(task_id)
+        if not task or not token or not token.is_paused:
+            return False
+        
+        token.resume()
+        if task.status == TaskStatus.PAUSED:
+            task.status = TaskStatus.RUNNING
+        
+        print(f"▶️ 任务已恢复: {task_id}")
+        return True
+    
+    async def execute_batch_tasks(
+        self,
+        task_ids: List[str],
+        workers: Optional[int] = None
+    ) -> List[PublishTask]:
         """
         批量执行任务
         
+        任务按优先级进入队列，由工作池同时执行多个任务；
+        同一平台的并发仍受平台并发上限约束。
+        
         Args:
             task_ids: 任务ID列表
+            workers: 工作协程数量（默认使用管理器配置）
             
         Returns:
-            任务列表
+            任务列表（与task_ids顺序一致）
         """
-        results = []
+        # 先一次性保存整批任务，中途崩溃也能恢复剩余任务
+        if self.job_store:
+            await self._persist_tasks([self.tasks[t] for t in task_ids if t in self.tasks])
+        
+        pool = PublishWorkerPool(self, workers=workers or self.workers)
+        self.worker_pool = pool
+        pool.start()
+        
+        try:
+            for task_id in task_ids:
+                if task_id in self.tasks:
+                    pool.submit(task_id)
+                else:
+                    print(f"⚠️ 任务不存在: {task_id}")
+            
+            await pool.drain()
+        finally:
+            await pool.shutdown(drain=False)
         
-        for task_id in task_ids:
-            task = await self.execute_task(task_id)
-            results.append(task)
+        return [self.tasks[t] for t in task_ids if t in self.tasks]
+    
+    def get_queue_stats(self) -> Dict[str, Any]:
+        """
+        获取批量执行的实时统计
+        
+        Returns:
+            队列深度、执行中数量、已完成数量、吞吐量（任务/分钟）
+        """
+        if self.worker_pool:
+            return self.worker_pool.get_stats()
         
-        return results
+        return {
+            "workers": self.workers,
+            "queue_depth": 0,
+            "in_flight": 0,
+            "completed": 0,
+            "failed": 0,
+            "elapsed": 0.0,
+            "throughput": 0.0,
+        }
     
     def get_statistics(self) -> Dict[str, Any]:
         """
@@ -11,7 +11,9 @@ from typing import Optional
 from tkinter import messagebox
 
 from core.publisher import PublishContent, PlatformType
+from core.publish_ledger import PublishLedger
 from plugins.batch_publisher.task_manager import BatchPublishManager, PublishTask
+from plugins.batch_publisher.job_store import PublishJobStore
 
 
 class BatchPublishTab(ctk.CTkFrame):
@@ -20,8 +22,8 @@ class BatchPublishTab(ctk.CTkFrame):
     def __init__(self, parent):
         super().__init__(parent)
         
-        # 批量发布管理器
-        self.manager = BatchPublishManager()
+        # 批量发布管理器（任务持久化到数据库，重启后可恢复；台账防止重复发布）
+        self.manager = BatchPublishManager(job_store=PublishJobStore(), ledger=PublishLedger())
         
         # 当前任务
         self.current_task: Optional[PublishTask] = None
@@ -32,6 +34,11 @@ class BatchPublishTab(ctk.CTkFrame):
         
         # 注册进度回调
         self.manager.add_progress_callback(self._on_progress_update)
+        
+        # 后台恢复上次未完成的任务
+        thread = threading.Thread(target=self._resume_tasks_thread)
+        thread.daemon = True
+        thread.start()
     
     def _create_ui(self):
         """创建用户界面"""
@@ -450,6 +457,22 @@ class BatchPublishTab(ctk.CTkFrame):
             self.after(0, lambda: messagebox.showerror("错误", f"发布失败: {e}"))
             self.after(0, self._reset_ui)
     
+    def _resume_tasks_thread(self):
+        """在后台线程恢复未完成的任务"""
+        try:
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            
+            tasks = loop.run_until_complete(self.manager.resume_unfinished_tasks())
+            
+            loop.close()
+            
+            if tasks:
+                print(f"✅ 已恢复 {len(tasks)} 个未完成任务")
+        
+        except Exception as e:
+            print(f"⚠️ 恢复未完成任务失败: {e}")
+    
     def _on_progress_update(self, task_id: str, progress: float, status: str):
         """进度更新回调（在后台线程调用）"""
         if task_id == self.current_task_id:
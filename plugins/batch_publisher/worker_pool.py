@@ -0,0 +1,147 @@
+"""
+批量发布工作池
+
+多个工作协程从优先级队列中取任务并发执行，平台级并发上限由PublishManager保证
+"""
+
+import asyncio
+import itertools
+import time
+from typing import List, Dict, Optional, Any, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from plugins.batch_publisher.task_manager import BatchPublishManager, PublishTask
+
+
+class PublishWorkerPool:
+    """
+    发布任务工作池
+
+    - 任务按优先级出队（数值越大越优先，同优先级先进先出）
+    - 同时最多执行 workers 个任务
+    - 同一平台的并发由 PublishManager 的平台信号量限制，
+      两个工作协程不会同时操作同一平台账号
+    """
+
+    def __init__(self, manager: "BatchPublishManager", workers: int = 3):
+        """
+        初始化工作池
+
+        Args:
+            manager: 批量发布管理器
+            workers: 工作协程数量
+        """
+        self.manager = manager
+        self.workers = max(1, workers)
+
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._sequence = itertools.count()
+        self._accepting = False
+
+        # 统计
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.started_at: Optional[float] = None
+
+    @property
+    def is_running(self) -> bool:
+        """工作池是否在运行"""
+        return bool(self._worker_tasks)
+
+    @property
+    def queue_depth(self) -> int:
+        """排队中的任务数"""
+        return self._queue.qsize() if self._queue else 0
+
+    def start(self):
+        """启动工作协程（需在事件循环中调用）"""
+        if self.is_running:
+            return
+
+        self._queue = asyncio.PriorityQueue()
+        self._accepting = True
+        self.started_at = time.time()
+        self._worker_tasks = [
+            asyncio.get_running_loop().create_task(self._worker(i))
+            for i in range(self.workers)
+        ]
+
+    def submit(self, task_id: str, priority: Optional[int] = None):
+        """
+        提交任务
+
+        Args:
+            task_id: 任务ID
+            priority: 优先级（默认使用任务自身的priority）
+        """
+        if not self._accepting:
+            raise RuntimeError("工作池未启动或正在关闭")
+
+        if priority is None:
+            task = self.manager.get_task(task_id)
+            priority = task.priority if task else 0
+
+        self._queue.put_nowait((-priority, next(self._sequence), task_id))
+
+    async def _worker(self, index: int):
+        """工作协程：循环取任务执行"""
+        while True:
+            _, _, task_id = await self._queue.get()
+            self.in_flight += 1
+            try:
+                task = await self.manager.execute_task(task_id)
+                if task.failed_platforms:
+                    self.failed += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"❌ 工作协程{index} 执行任务失败: {task_id} - {e}")
+            finally:
+                self.in_flight -= 1
+                self.completed += 1
+                self._queue.task_done()
+
+    async def drain(self):
+        """等待队列中的所有任务执行完毕"""
+        if self._queue:
+            await self._queue.join()
+
+    async def shutdown(self, drain: bool = True):
+        """
+        关闭工作池
+
+        Args:
+            drain: 是否先等待已提交的任务全部完成（False则丢弃排队中的任务）
+        """
+        self._accepting = False
+
+        if drain:
+            await self.drain()
+        elif self._queue:
+            while not self._queue.empty():
+                self._queue.get_nowait()
+                self._queue.task_done()
+
+        for worker in self._worker_tasks:
+            worker.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取实时统计
+
+        Returns:
+            队列深度、执行中数量、已完成数量和吞吐量（任务/分钟）
+        """
+        elapsed = time.time() - self.started_at if self.started_at else 0.0
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "elapsed": elapsed,
+            "throughput": self.completed / elapsed * 60 if elapsed > 0 else 0.0,
+        }
@@ -17,6 +17,9 @@ import time
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 
+from core.http_client import HttpClient, get_http_client
+from .chunked_upload import ChunkedUploader, DEFAULT_UPLOAD_BASE, DEFAULT_UPLOAD_STATE_DIR
+
 
 class BilibiliAPIClient:
     """B站API客户端"""
@@ -29,7 +32,11 @@ class BilibiliAPIClient:
         self,
         access_key: str,
         secret_key: str,
-        sessdata: Optional[str] = None
+        sessdata: Optional[str] = None,
+        upload_base: str = DEFAULT_UPLOAD_BASE,
+        upload_concurrency: int = 4,
+        upload_state_dir: str = DEFAULT_UPLOAD_STATE_DIR,
+        http_client: Optional[HttpClient] = None
     ):
         """
         初始化B站API客户端
@@ -38,37 +45,54 @@ class BilibiliAPIClient:
             access_key: API访问密钥
             secret_key: API密钥
             sessdata: 会话Cookie（可选，用于部分操作）
+            upload_base: 视频预上传接口地址
+            upload_concurrency: 视频同时上传的分片数
+            upload_state_dir: 视频上传进度保存目录（中断后续传）
+            http_client: HTTP客户端（默认使用全局共享连接池）
         """
         self.access_key = access_key
         self.secret_key = secret_key
         self.sessdata = sessdata
+        self.upload_base = upload_base
+        self.upload_concurrency = upload_concurrency
+        self.upload_state_dir = upload_state_dir
+        
+        self.http = http_client or get_http_client()
+        self.headers: Dict[str, str] = {}
+        if sessdata:
+            self.headers["Cookie"] = f"SESSDATA={sessdata}"
         
-        self.session: Optional[aiohttp.ClientSession] = None
+        self.uploader: Optional[ChunkedUploader] = None
         
         print("📺 B站API客户端初始化完成")
     
     async def _get_session(self) -> aiohttp.ClientSession:
-        """获取HTTP会话"""
+        """获取HTTP会话（共享连接池中当前事件循环的会话）"""
         
-        if not self.session:
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-            }
-            
-            # 添加Cookie
-            if self.sessdata:
-                headers["Cookie"] = f"SESSDATA={self.sessdata}"
-            
-            self.session = aiohttp.ClientSession(headers=headers)
+        return await self.http.session()
+    
+    async def _get_uploader(self) -> ChunkedUploader:
+        """获取分片上传器（与当前HTTP会话绑定）"""
+        
+        session = await self._get_session()
         
-        return self.session
+        if self.uploader is None:
+            self.uploader = ChunkedUploader(
+                session,
+                upload_base=self.upload_base,
+                headers=self.headers,
+                concurrency=self.upload_concurrency,
+                state_dir=self.upload_state_dir
+            )
+        else:
+            self.uploader.session = session
+        
+        return self.uploader
     
     async def close(self):
-        """关闭会话"""
+        """释放当前事件循环的连接池"""
         
-        if self.session:
-            await self.session.close()
-            self.session = None
+        await self.http.close()
     
     def _generate_sign(self, params: Dict[str, Any]) -> str:
         """
@@ -101,8 +125,6 @@ class BilibiliAPIClient:
     ) -> Dict[str, Any]:
         """发送API请求"""
         
-        session = await self._get_session()
-        
         try:
             # 添加通用参数
             if params is None:
@@ -116,17 +138,17 @@ class BilibiliAPIClient:
             # 生成签名
             params["sign"] = self._generate_sign(params)
             
-            # 发送请求
-            async with session.request(
-                method=method,
-                url=url,
+            # 发送请求（共享连接池，失败按策略重试）
+            resp = await self.http.request(
+                method,
+                url,
                 params=params,
                 data=data,
                 json=json_data,
-                timeout=aiohttp.ClientTimeout(total=30)
-            ) as resp:
-                result = await resp.json()
-                return result
+                headers=self.headers,
+                timeout=30
+            )
+            return resp.json()
         
         except Exception as e:
             print(f"❌ API请求失败: {e}")
@@ -179,16 +201,12 @@ class BilibiliAPIClient:
         print(f"📤 开始上传视频: {title}")
         
         try:
-            # 注意：实际的视频上传流程较复杂，包括：
-            # 1. 获取上传地址
-            # 2. 分片上传视频文件
-            # 3. 提交投稿信息
-            # 
-            # 这里提供简化的模拟实现
+            # 视频文件按upos协议分片并发上传，中断后再次上传会续传；
+            # 封面上传和投稿提交目前是模拟实现
             
             # 1. 获取上传授权
             print("   1️⃣ 获取上传授权...")
-            upload_auth = await self._get_upload_auth()
+            upload_auth = await self._get_upload_auth(video_path)
             
             if not upload_auth:
                 return {
@@ -244,27 +262,46 @@ class BilibiliAPIClient:
                 "message": str(e)
             }
     
-    async def _get_upload_auth(self) -> Optional[Dict]:
-        """获取上传授权"""
+    async def _get_upload_auth(self, video_path: str) -> Optional[Dict]:
+        """
+        获取上传授权（预上传并创建上传任务，有未完成的进度时续传）
         
-        # 模拟实现
-        # 实际需要调用：POST /x/vu/web/add
-        print("      ℹ️  (模拟) 获取上传授权")
-        return {"upload_id": "mock_upload_id"}
+        Returns:
+            上传状态，失败返回None
+        """
+        
+        try:
+            uploader = await self._get_uploader()
+            return await uploader.prepare(video_path)
+        
+        except Exception as e:
+            print(f"      ❌ 获取上传授权失败: {e}")
+            return None
     
     async def _upload_video_file(
         self,
         video_path: str,
         upload_auth: Dict
     ) -> Optional[str]:
-        """上传视频文件"""
+        """
+        分片上传视频文件
         
-        # 模拟实现
-        # 实际需要：
-        # 1. 分片上传到B站存储服务器
-        # 2. 等待转码完成
-        print(f"      ℹ️  (模拟) 上传视频文件: {video_path}")
-        return "mock_video_url"
+        Returns:
+            投稿时使用的文件名，失败返回None（已上传的分片会保留，下次续传）
+        """
+        
+        def on_progress(uploaded: int, total: int):
+            print(f"      📦 已上传 {uploaded / total:.0%}", end="\r")
+        
+        try:
+            uploader = await self._get_uploader()
+            result = await uploader.upload(video_path, upload_auth, progress_callback=on_progress)
+            print(f"      ✅ 上传完成: {result['uploaded']} 个分片（续传跳过 {result['skipped']} 个）")
+            return result["filename"]
+        
+        except Exception as e:
+            print(f"      ❌ 视频文件上传失败: {e}")
+            return None
     
     async def _upload_cover(self, cover_path: str) -> Optional[str]:
         """上传封面"""
@@ -0,0 +1,379 @@
+"""
+B站视频分片上传
+
+按B站upos分片协议上传视频文件：
+1. POST {upload_base}/preupload              获取上传节点、文件路径(upos_uri)、分片大小和上传凭证
+2. POST {节点}/{路径}?uploads&output=json      创建上传任务，得到upload_id
+3. PUT  {节点}/{路径}?partNumber=..&uploadId=..  并发上传各分片（Content-MD5校验，成功时返回2xx和纯文本
+                                                  MULTIPART_PUT_SUCCESS，可能带ETag响应头）
+4. POST {节点}/{路径}?output=json&uploadId=..    提交分片列表，合并文件
+
+- 文件通过mmap按分片读取，同一时刻内存中最多有concurrency个分片
+- 每个分片独立重试，服务端ETag响应头与本地MD5不一致时重新上传
+- 每完成一个分片就把进度写入状态文件，中断后再次上传同一文件时只上传剩余分片
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import mmap
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_UPLOAD_BASE = "https://member.bilibili.com"
+DEFAULT_UPLOAD_STATE_DIR = "data/cache/uploads"
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024        # 服务端未指定时的分片大小
+
+
+class UploadError(Exception):
+    """上传失败"""
+
+
+class ChunkedUploader:
+    """
+    分片上传器
+
+    使用调用方提供的aiohttp会话（通常是共享连接池的会话），登录Cookie通过headers传入。
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        upload_base: str = DEFAULT_UPLOAD_BASE,
+        concurrency: int = 4,
+        chunk_retries: int = 3,
+        retry_delay: float = 1.0,
+        state_dir: str = DEFAULT_UPLOAD_STATE_DIR,
+        chunk_timeout: float = 120.0,
+        headers: Optional[Dict[str, str]] = None
+    ):
+        """
+        初始化上传器
+
+        Args:
+            session: HTTP会话
+            upload_base: 预上传接口地址
+            concurrency: 同时上传的分片数
+            chunk_retries: 单个分片的最大重试次数
+            retry_delay: 分片重试的初始延迟（秒，指数增长）
+            state_dir: 上传进度保存目录
+            chunk_timeout: 单个分片的超时时间（秒）
+            headers: 每个请求附加的请求头（如登录Cookie）
+        """
+        self.session = session
+        self.upload_base = upload_base.rstrip("/")
+        self.concurrency = max(1, concurrency)
+        self.chunk_retries = chunk_retries
+        self.retry_delay = retry_delay
+        self.state_dir = Path(state_dir)
+        self.chunk_timeout = chunk_timeout
+        self.headers = dict(headers or {})
+
+        self.stats: Dict[str, int] = {
+            "files": 0,             # 完成上传的文件数
+            "resumed": 0,           # 断点续传的文件数
+            "chunks": 0,            # 上传的分片数
+            "skipped": 0,           # 续传时跳过的分片数
+            "retries": 0,           # 分片重试次数
+            "bytes": 0,             # 上传的字节数
+        }
+
+    # ===== 上传进度 =====
+
+    def state_path(self, file_path: str) -> Path:
+        """文件的上传进度路径（文件内容变化后使用新的进度）"""
+        stat = os.stat(file_path)
+        key = f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        return self.state_dir / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]}.json"
+
+    def _load_state(self, file_path: str) -> Optional[Dict[str, Any]]:
+        path = self.state_path(file_path)
+        if not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.warning(f"⚠️ 上传进度读取失败，重新上传: {e}")
+            return None
+
+    def _save_state(self, state: Dict[str, Any]):
+        """原子写入上传进度"""
+        path = Path(state["state_path"])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def _clear_state(self, state: Dict[str, Any]):
+        Path(state["state_path"]).unlink(missing_ok=True)
+
+    # ===== 协议 =====
+
+    @staticmethod
+    def _upload_url(state: Dict[str, Any]) -> str:
+        """分片上传地址：节点 + upos_uri路径"""
+        endpoint = state["endpoint"]
+        if endpoint.startswith("//"):
+            endpoint = "https:" + endpoint
+        return f"{endpoint.rstrip('/')}/{state['upos_uri'].replace('upos://', '')}"
+
+    async def _call(self, method: str, url: str, **kwargs) -> Dict[str, Any]:
+        """发送请求并解析JSON（非200、响应不是JSON或OK!=1时抛出UploadError）"""
+        kwargs["headers"] = {**self.headers, **kwargs.get("headers", {})}
+        async with self.session.request(method, url, **kwargs) as resp:
+            text = await resp.text()
+            if resp.status != 200:
+                raise UploadError(f"HTTP {resp.status}: {text[:200]}")
+        try:
+            data = json.loads(text)
+        except ValueError:
+            raise UploadError(f"响应不是JSON: {text[:200]}")
+        if not isinstance(data, dict):
+            raise UploadError(f"上传接口返回错误: {data}")
+        if data.get("OK") != 1:
+            raise UploadError(data.get("message") or f"上传接口返回错误: {data}")
+        return data
+
+    async def prepare(self, file_path: str) -> Dict[str, Any]:
+        """
+        准备上传：有未完成的进度且服务端仍保留时续传，否则预上传并创建上传任务
+
+        Args:
+            file_path: 视频文件路径
+
+        Returns:
+            上传状态（传给upload()）
+
+        Raises:
+            FileNotFoundError: 文件不存在
+            UploadError: 预上传失败
+        """
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"视频文件不存在: {file_path}")
+
+        size = os.path.getsize(file_path)
+        if size == 0:
+            raise UploadError(f"视频文件为空: {file_path}")
+
+        state = self._load_state(file_path)
+        if state:
+            try:
+                server_parts = await self._list_parts(state)
+                # 只保留服务端也确认过的分片
+                state["parts"] = {
+                    number: etag for number, etag in state["parts"].items()
+                    if server_parts.get(number) == etag
+                }
+                logger.info(f"⏯️ 续传 {file_path}: 已完成 {len(state['parts'])}/{state['chunks']} 个分片")
+                return state
+            except UploadError as e:
+                logger.warning(f"⚠️ 服务端上传任务已失效，重新上传: {e}")
+                self._clear_state(state)
+
+        name = os.path.basename(file_path)
+        pre = await self._call("POST", f"{self.upload_base}/preupload", params={
+            "name": name,
+            "size": size,
+            "r": "upos",
+            "profile": "ugcupos/bup",
+        })
+
+        chunk_size = int(pre.get("chunk_size") or DEFAULT_CHUNK_SIZE)
+        state = {
+            "state_path": str(self.state_path(file_path)),
+            "file": os.path.abspath(file_path),
+            "name": name,
+            "size": size,
+            "chunk_size": chunk_size,
+            "chunks": (size + chunk_size - 1) // chunk_size,
+            "endpoint": pre["endpoint"],
+            "upos_uri": pre["upos_uri"],
+            "biz_id": pre.get("biz_id"),
+            "auth": pre.get("auth", ""),
+            "parts": {},
+            "created_at": time.time(),
+        }
+
+        init = await self._call(
+            "POST", self._upload_url(state),
+            params={"uploads": "", "output": "json"},
+            headers={"X-Upos-Auth": state["auth"]}
+        )
+        state["upload_id"] = init["upload_id"]
+        self._save_state(state)
+        return state
+
+    async def _list_parts(self, state: Dict[str, Any]) -> Dict[str, str]:
+        """服务端已接收的分片 {分片号: etag}"""
+        data = await self._call(
+            "GET", self._upload_url(state),
+            params={"uploadId": state["upload_id"], "list_parts": ""},
+            headers={"X-Upos-Auth": state["auth"]}
+        )
+        return {str(part["partNumber"]): part["eTag"] for part in data.get("parts", [])}
+
+    # ===== 上传 =====
+
+    @staticmethod
+    def _read_chunk(mapped: mmap.mmap, start: int, end: int) -> tuple:
+        """读取分片并计算MD5（在线程池中执行）"""
+        data = mapped[start:end]
+        return data, hashlib.md5(data).hexdigest()
+
+    async def _put_chunk(self, url: str, md5: str, **kwargs):
+        """
+        PUT一个分片
+
+        upos成功时返回2xx和纯文本（MULTIPART_PUT_SUCCESS），不解析响应体。
+        内容由服务端按Content-MD5校验；响应带ETag时再与本地MD5核对。
+
+        Raises:
+            UploadError: 非2xx或ETag不一致
+        """
+        kwargs["headers"] = {**self.headers, **kwargs.get("headers", {})}
+        async with self.session.put(url, **kwargs) as resp:
+            text = await resp.text()
+            if not 200 <= resp.status < 300:
+                raise UploadError(f"HTTP {resp.status}: {text[:200]}")
+            etag = resp.headers.get("ETag", "").strip('"').lower()
+        if etag and etag != md5:
+            raise UploadError(f"校验失败: 本地 {md5}，服务端 {etag}")
+
+    async def _upload_chunk(self, state: Dict[str, Any], mapped: mmap.mmap, number: int) -> int:
+        """
+        上传一个分片（失败时重试）
+
+        Returns:
+            分片字节数
+        """
+        index = number - 1
+        start = index * state["chunk_size"]
+        end = min(state["size"], start + state["chunk_size"])
+        data, md5 = await asyncio.to_thread(self._read_chunk, mapped, start, end)
+
+        params = {
+            "partNumber": number,
+            "uploadId": state["upload_id"],
+            "chunk": index,
+            "chunks": state["chunks"],
+            "size": end - start,
+            "start": start,
+            "end": end,
+            "total": state["size"],
+        }
+        headers = {"X-Upos-Auth": state["auth"], "Content-MD5": md5}
+        timeout = aiohttp.ClientTimeout(total=self.chunk_timeout)
+
+        for attempt in range(self.chunk_retries + 1):
+            try:
+                await self._put_chunk(
+                    self._upload_url(state), md5, params=params, data=data, headers=headers, timeout=timeout
+                )
+
+                state["parts"][str(number)] = md5
+                self._save_state(state)
+                return end - start
+
+            except (aiohttp.ClientError, asyncio.TimeoutError, UploadError) as e:
+                if attempt >= self.chunk_retries:
+                    raise UploadError(f"分片 {number}/{state['chunks']} 上传失败: {e}")
+                self.stats["retries"] += 1
+                delay = self.retry_delay * (2 ** attempt)
+                logger.warning(f"⚠️ 分片 {number} 上传失败，{delay:.1f}秒后重试: {e}")
+                await asyncio.sleep(delay)
+
+    async def upload(
+        self,
+        file_path: str,
+        state: Optional[Dict[str, Any]] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        上传文件（并发上传剩余分片后合并）
+
+        Args:
+            file_path: 视频文件路径
+            state: prepare()返回的上传状态（可选，默认自动准备）
+            progress_callback: 进度回调 (已上传字节数, 总字节数)
+
+        Returns:
+            {"filename": 投稿时使用的文件名, "upload_id", "chunks", "uploaded", "skipped"}
+
+        Raises:
+            UploadError: 分片重试后仍失败或合并失败（进度已保存，可以续传）
+        """
+        if state is None:
+            state = await self.prepare(file_path)
+
+        pending = [n for n in range(1, state["chunks"] + 1) if str(n) not in state["parts"]]
+        skipped = state["chunks"] - len(pending)
+        if skipped:
+            self.stats["resumed"] += 1
+            self.stats["skipped"] += skipped
+
+        done_bytes = sum(
+            min(state["chunk_size"], state["size"] - (int(n) - 1) * state["chunk_size"]) for n in state["parts"]
+        )
+        queue = iter(pending)
+
+        with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+
+            async def worker():
+                nonlocal done_bytes
+                for number in queue:
+                    size = await self._upload_chunk(state, mapped, number)
+                    self.stats["chunks"] += 1
+                    self.stats["bytes"] += size
+                    done_bytes += size
+                    if progress_callback:
+                        progress_callback(done_bytes, state["size"])
+
+            workers = [asyncio.ensure_future(worker()) for _ in range(min(self.concurrency, len(pending)))]
+            try:
+                await asyncio.gather(*workers)
+            except BaseException:
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                raise
+
+        # 合并分片
+        parts = [{"partNumber": int(n), "eTag": etag} for n, etag in sorted(state["parts"].items(), key=lambda p: int(p[0]))]
+        await self._call(
+            "POST", self._upload_url(state),
+            params={
+                "output": "json",
+                "name": state["name"],
+                "profile": "ugcupos/bup",
+                "uploadId": state["upload_id"],
+                "biz_id": state["biz_id"] or "",
+            },
+            json={"parts": parts},
+            headers={"X-Upos-Auth": state["auth"]}
+        )
+
+        self._clear_state(state)
+        self.stats["files"] += 1
+
+        # 投稿时使用不带扩展名的文件名
+        filename = os.path.splitext(os.path.basename(state["upos_uri"]))[0]
+        logger.info(f"✅ 视频上传完成: {filename}（{state['chunks']} 个分片，续传跳过 {skipped} 个）")
+        return {
+            "filename": filename,
+            "upload_id": state["upload_id"],
+            "chunks": state["chunks"],
+            "uploaded": len(pending),
+            "skipped": skipped,
+        }
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取上传统计"""
+        return dict(self.stats)
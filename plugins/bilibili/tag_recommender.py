@@ -11,6 +11,7 @@ B站标签推荐器
 import asyncio
 from typing import List, Dict, Any, Optional
 from core.ai_engine import AIEngine, TaskComplexity
+from core.keyword_matcher import KeywordMatcher
 
 
 class BilibiliTagRecommender:
@@ -57,6 +58,7 @@ class BilibiliTagRecommender:
             ai_engine: AI引擎实例
         """
         self.ai_engine = ai_engine or AIEngine()
+        self._hot_tag_matchers: Dict[str, KeywordMatcher] = {}
     
     async def recommend_tags(
         self,
@@ -118,29 +120,31 @@ class BilibiliTagRecommender:
     ) -> List[Dict[str, Any]]:
         """从热门标签库中提取相关标签"""
         
-        tags = []
-        zone_tags = self.HOT_TAGS.get(zone, self.HOT_TAGS["生活"])
-        
-        # 合并所有标签
-        all_tags = []
-        for category, tag_list in zone_tags.items():
-            all_tags.extend(tag_list)
-        
-        # 检查标签相关性
-        text = f"{title} {content}".lower()
+        matcher = self._get_hot_tag_matcher(zone)
         
-        for tag in all_tags:
-            # 简单的相关性检查
-            tag_lower = tag.lower()
-            if tag_lower in text or any(word in text for word in tag_lower.split()):
-                tags.append({
-                    "tag": tag,
-                    "hot_score": 80,  # 热门标签热度高
-                    "score": 70,
-                    "source": "热门库"
-                })
+        # 一次扫描文本，得到命中的标签（标签本身或其中的任一单词出现即相关）
+        return [
+            {
+                "tag": tag,
+                "hot_score": 80,  # 热门标签热度高
+                "score": 70,
+                "source": "热门库"
+            }
+            for tag in matcher.group_matches(f"{title} {content}")
+        ]
+    
+    def _get_hot_tag_matcher(self, zone: str) -> KeywordMatcher:
+        """分区热门标签匹配器（按分区缓存，分组为标签，成员为标签及其中的单词）"""
         
-        return tags
+        zone = zone if zone in self.HOT_TAGS else "生活"
+        matcher = self._hot_tag_matchers.get(zone)
+        if matcher is None:
+            groups = {}
+            for tag_list in self.HOT_TAGS[zone].values():
+                for tag in tag_list:
+                    groups.setdefault(tag, [tag, *tag.split()])
+            matcher = self._hot_tag_matchers[zone] = KeywordMatcher(groups)
+        return matcher
     
     async def _generate_tags_with_ai(
         self,
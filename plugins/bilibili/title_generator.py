@@ -10,9 +10,15 @@ B站标题生成器
 """
 
 import asyncio
+import re
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+
+import numpy as np
+
 from core.ai_engine import AIEngine, TaskComplexity
+from core.keyword_matcher import KeywordMatcher
+from core.title_candidates import TitleCandidateEngine, match_counts, select_top, title_lengths
 
 
 class BilibiliTitleGenerator:
@@ -46,6 +52,32 @@ class BilibiliTitleGenerator:
         ],
     }
     
+    # 模板变量取值
+    ACTION_WORDS = {
+        "游戏": ["玩", "通关", "上分", "操作"],
+        "科技": ["使用", "设置", "优化", "体验"],
+        "生活": ["做", "搞定", "实现", "完成"],
+        "知识": ["学习", "掌握", "理解", "应用"],
+    }
+    RESULT_WORDS = {
+        "游戏": ["无敌了", "起飞了", "翻盘了", "躺赢"],
+        "科技": ["神器", "好用", "完美", "香"],
+        "生活": ["太绝了", "惊了", "爱了", "服了"],
+        "知识": ["涨知识", "学到了", "懂了", "会了"],
+    }
+    SKILL_WORDS = {"游戏": "上分", "科技": "玩转", "生活": "掌握", "知识": "学会"}
+    TIME_WORDS = ["3分钟", "5分钟", "10分钟", "一键", "快速"]
+    NUMBERS = ["3", "5", "7", "10"]
+    HOW_WORDS = ["怎么样", "如何", "怎么办", "是什么"]
+    PRICES = ["99元", "199元", "999元", "千元", "百元"]
+    
+    # 评分词表
+    SUSPENSE_WORDS = ["万万没想到", "震惊", "不会吧", "居然", "竟然", "结局", "真相", "意外"]
+    CHINESE_NUMBERS = ["一", "二", "三", "五", "十"]
+    RECENCY_WORDS = ["最新", "今年", "最近", "当下"]
+    
+    TEMPLATE_POOL = 200     # generate_titles从模板展开的候选数
+    
     def __init__(self, ai_engine: Optional[AIEngine] = None):
         """
         初始化B站标题生成器
@@ -54,6 +86,7 @@ class BilibiliTitleGenerator:
             ai_engine: AI引擎实例
         """
         self.ai_engine = ai_engine or AIEngine()
+        self.candidates = TitleCandidateEngine(self.TITLE_PATTERNS, max_length=80)
         
     async def generate_titles(
         self,
@@ -78,13 +111,18 @@ class BilibiliTitleGenerator:
         Returns:
             标题列表，每个包含 title 和 score
         """
-        titles = []
+        if style not in self.TITLE_PATTERNS:
+            style = "悬念型"
         
-        # 1. 基于模板生成
-        template_titles = self._generate_from_templates(
-            topic, keywords, style, zone, count
-        )
-        titles.extend(template_titles)
+        # 1. 基于模板展开候选
+        titles = [
+            candidate.title
+            for candidate in self.candidates.expand(
+                self._template_variables(topic, keywords, zone),
+                count=max(self.TEMPLATE_POOL, count),
+                styles=[style]
+            )
+        ]
         
         # 2. AI增强生成
         if use_ai:
@@ -93,65 +131,83 @@ class BilibiliTitleGenerator:
             )
             titles.extend(ai_titles)
         
-        # 3. 评分排序
-        scored_titles = []
-        for title in titles:
-            score = self._score_title(title, keywords, zone)
-            scored_titles.append({
-                "title": title,
-                "score": score,
-                "length": len(title),
+        # 3. 批量评分，取前N个（跳过近似重复）
+        scores = self._score_titles(titles, keywords, zone)
+        return [
+            {
+                "title": titles[index],
+                "score": float(scores[index]),
+                "length": len(titles[index]),
                 "style": style
-            })
-        
-        # 排序并返回top N
-        scored_titles.sort(key=lambda x: x["score"], reverse=True)
-        return scored_titles[:count]
+            }
+            for index in select_top(titles, scores, count)
+        ]
     
-    def _generate_from_templates(
+    def generate_candidates(
         self,
         topic: str,
         keywords: List[str],
-        style: str,
-        zone: str,
-        count: int
-    ) -> List[str]:
-        """基于模板生成标题"""
+        zone: str = "生活",
+        styles: Optional[List[str]] = None,
+        count: int = 1000,
+        top_k: int = 20,
+        seed: Optional[int] = None,
+        variables: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        批量生成候选标题（只用模板，不调用AI），供A/B测试选题
         
-        templates = self.TITLE_PATTERNS.get(style, self.TITLE_PATTERNS["悬念型"])
-        titles = []
+        Args:
+            topic: 视频主题
+            keywords: 关键词列表
+            zone: 分区
+            styles: 标题风格（默认全部）
+            count: 展开的候选数
+            top_k: 返回数量
+            seed: 随机种子（相同种子得到相同结果）
+            variables: 额外的模板变量取值（覆盖默认取值，如 {"action": [...]}）
+            
+        Returns:
+            评分最高的标题列表，每个包含 title、score、length、style
+        """
+        candidates = self.candidates.expand(
+            {**self._template_variables(topic, keywords, zone), **(variables or {})},
+            count=count,
+            styles=styles,
+            seed=seed
+        )
+        titles = [candidate.title for candidate in candidates]
+        scores = self._score_titles(titles, keywords, zone)
         
-        # 提取主关键词
-        main_keyword = keywords[0] if keywords else topic
+        return [
+            {
+                "title": titles[index],
+                "score": float(scores[index]),
+                "length": len(titles[index]),
+                "style": candidates[index].style
+            }
+            for index in select_top(titles, scores, top_k)
+        ]
+    
+    def _template_variables(
+        self,
+        topic: str,
+        keywords: List[str],
+        zone: str
+    ) -> Dict[str, Any]:
+        """模板变量的所有取值"""
         
-        # 填充变量
-        variables = {
-            "keyword": main_keyword,
-            "action": self._get_action_word(zone),
-            "result": self._get_result_word(zone),
-            "time": self._get_time_word(),
-            "skill": self._get_skill_word(zone),
-            "number": self._get_number(),
-            "how": self._get_how_word(),
+        return {
+            "keyword": keywords[:3] or [topic],
+            "action": self.ACTION_WORDS.get(zone, self.ACTION_WORDS["生活"]),
+            "result": self.RESULT_WORDS.get(zone, self.RESULT_WORDS["生活"]),
+            "time": self.TIME_WORDS,
+            "skill": self.SKILL_WORDS.get(zone, "学会"),
+            "number": self.NUMBERS,
+            "how": self.HOW_WORDS,
             "year": datetime.now().year,
-            "price": self._get_price(),
+            "price": self.PRICES,
         }
-        
-        # 生成标题
-        import random
-        selected_templates = random.sample(templates, min(count, len(templates)))
-        
-        for template in selected_templates:
-            try:
-                title = template.format(**variables)
-                # 确保长度不超过80字
-                if len(title) > 80:
-                    title = title[:77] + "..."
-                titles.append(title)
-            except KeyError:
-                continue
-        
-        return titles
     
     async def _generate_with_ai(
         self,
@@ -222,7 +278,15 @@ B站标题要求：
     
     def _score_title(self, title: str, keywords: List[str], zone: str) -> float:
         """
-        评估标题质量
+        评估标题质量（0-100分）
+        
+        评分规则见_score_titles。
+        """
+        return float(self._score_titles([title], keywords, zone)[0])
+    
+    def _score_titles(self, titles: List[str], keywords: List[str], zone: str) -> np.ndarray:
+        """
+        批量评估标题质量
         
         评分维度：
         - 长度合理性 (20分)
@@ -232,99 +296,46 @@ B站标题要求：
         - 时效性 (15分)
         
         Returns:
-            0-100分
+            每个标题的分数（0-100分）
         """
-        score = 0.0
+        if not titles:
+            return np.zeros(0)
+        
+        # 一次扫描提取所有词表的命中数
+        keyword_groups = {f"关键词{i}": [kw] for i, kw in enumerate(keywords)}
+        matcher = KeywordMatcher({
+            **keyword_groups,
+            "悬念": self.SUSPENSE_WORDS,
+            "中文数字": self.CHINESE_NUMBERS,
+            "时效": [str(datetime.now().year), *self.RECENCY_WORDS],
+        }, case_sensitive=True)
+        counts = match_counts(matcher, titles)
+        keyword_hits = counts[:, :len(keyword_groups)]
+        suspense, chinese_numbers, recency = counts[:, len(keyword_groups):].T
         
         # 1. 长度评分（20分）
-        title_len = len(title)
-        if 30 <= title_len <= 60:
-            score += 20
-        elif 20 <= title_len < 30 or 60 < title_len <= 80:
-            score += 15
-        else:
-            score += 10
+        lengths = title_lengths(titles)
+        score = np.select(
+            [(lengths >= 30) & (lengths <= 60), (lengths >= 20) & (lengths <= 80)],
+            [20.0, 15.0],
+            10.0
+        )
         
         # 2. 关键词评分（30分）
-        keyword_count = sum(1 for kw in keywords if kw in title)
-        keyword_ratio = keyword_count / len(keywords) if keywords else 0
-        score += keyword_ratio * 30
+        if keywords:
+            score += (keyword_hits > 0).sum(axis=1) / len(keywords) * 30
         
         # 3. 悬念词评分（20分）
-        suspense_words = ["万万没想到", "震惊", "不会吧", "居然", "竟然", "结局", "真相", "意外"]
-        suspense_count = sum(1 for word in suspense_words if word in title)
-        score += min(suspense_count * 10, 20)
+        score += np.minimum(suspense * 10, 20)
         
         # 4. 数字化评分（15分）
-        import re
-        numbers = re.findall(r'\d+', title)
-        if numbers:
-            score += 15
-        elif any(word in title for word in ["一", "二", "三", "五", "十"]):
-            score += 10
+        has_digits = np.fromiter((bool(re.search(r'\d', title)) for title in titles), dtype=bool, count=len(titles))
+        score += np.where(has_digits, 15, np.where(chinese_numbers > 0, 10, 0))
         
         # 5. 时效性评分（15分）
-        current_year = str(datetime.now().year)
-        time_words = [current_year, "最新", "今年", "最近", "当下"]
-        if any(word in title for word in time_words):
-            score += 15
+        score += np.where(recency > 0, 15, 0)
         
-        return round(score, 1)
-    
-    # ===== 辅助方法 =====
-    
-    def _get_action_word(self, zone: str) -> str:
-        """获取动作词"""
-        actions = {
-            "游戏": ["玩", "通关", "上分", "操作"],
-            "科技": ["使用", "设置", "优化", "体验"],
-            "生活": ["做", "搞定", "实现", "完成"],
-            "知识": ["学习", "掌握", "理解", "应用"],
-        }
-        import random
-        return random.choice(actions.get(zone, actions["生活"]))
-    
-    def _get_result_word(self, zone: str) -> str:
-        """获取结果词"""
-        results = {
-            "游戏": ["无敌了", "起飞了", "翻盘了", "躺赢"],
-            "科技": ["神器", "好用", "完美", "香"],
-            "生活": ["太绝了", "惊了", "爱了", "服了"],
-            "知识": ["涨知识", "学到了", "懂了", "会了"],
-        }
-        import random
-        return random.choice(results.get(zone, results["生活"]))
-    
-    def _get_time_word(self) -> str:
-        """获取时间词"""
-        import random
-        return random.choice(["3分钟", "5分钟", "10分钟", "一键", "快速"])
-    
-    def _get_skill_word(self, zone: str) -> str:
-        """获取技能词"""
-        skills = {
-            "游戏": "上分",
-            "科技": "玩转",
-            "生活": "掌握",
-            "知识": "学会",
-        }
-        return skills.get(zone, "学会")
-    
-    def _get_number(self) -> str:
-        """获取数字"""
-        import random
-        return str(random.choice([3, 5, 7, 10]))
-    
-    def _get_how_word(self) -> str:
-        """获取疑问词"""
-        import random
-        return random.choice(["怎么样", "如何", "怎么办", "是什么"])
-    
-    def _get_price(self) -> str:
-        """获取价格词"""
-        import random
-        prices = ["99元", "199元", "999元", "千元", "百元"]
-        return random.choice(prices)
+        return np.round(score, 1)
 
 
 # ===== 测试代码 =====
@@ -9,6 +9,8 @@ B站分区优化器
 
 from typing import Dict, List, Any, Optional
 
+from core.keyword_matcher import KeywordMatcher
+
 
 class BilibiliZoneOptimizer:
     """B站分区优化器"""
@@ -107,6 +109,22 @@ class BilibiliZoneOptimizer:
         },
     }
     
+    # 分区关键词/热门话题匹配器（按分区分组，所有实例共用，首次使用时构建）
+    _keyword_matcher: Optional[KeywordMatcher] = None
+    _topic_matcher: Optional[KeywordMatcher] = None
+    
+    @classmethod
+    def _matchers(cls) -> tuple:
+        """获取 (关键词匹配器, 热门话题匹配器)"""
+        if cls._keyword_matcher is None or cls._topic_matcher is None:
+            cls._keyword_matcher = KeywordMatcher({name: info["keywords"] for name, info in cls.ZONES.items()})
+            cls._topic_matcher = KeywordMatcher({name: info["hot_topics"] for name, info in cls.ZONES.items()})
+        return cls._keyword_matcher, cls._topic_matcher
+    
+    def _resolve_zone(self, zone: str) -> str:
+        """未知分区按生活区处理（与get_zone_info一致）"""
+        return zone if zone in self.ZONES else "生活"
+    
     def get_zone_info(self, zone: str) -> Dict[str, Any]:
         """
         获取分区详细信息
@@ -135,22 +153,19 @@ class BilibiliZoneOptimizer:
             推荐分区列表，包含匹配度
         """
         
-        text = f"{title} {content}".lower()
+        keyword_matcher, _ = self._matchers()
         suggestions = []
         
-        for zone_name, zone_info in self.ZONES.items():
+        # 一次扫描得到所有分区的命中关键词
+        for zone_name, matched in keyword_matcher.group_matches(f"{title} {content}").items():
             # 计算关键词匹配度
-            keywords = zone_info["keywords"]
-            match_count = sum(1 for kw in keywords if kw in text)
-            match_score = (match_count / len(keywords)) * 100
-            
-            if match_score > 0:
-                suggestions.append({
-                    "zone": zone_name,
-                    "score": round(match_score, 1),
-                    "description": zone_info["description"],
-                    "matched_keywords": [kw for kw in keywords if kw in text]
-                })
+            match_score = (len(matched) / keyword_matcher.group_size(zone_name)) * 100
+            suggestions.append({
+                "zone": zone_name,
+                "score": round(match_score, 1),
+                "description": self.ZONES[zone_name]["description"],
+                "matched_keywords": matched
+            })
         
         # 按匹配度排序
         suggestions.sort(key=lambda x: x["score"], reverse=True)
@@ -213,9 +228,11 @@ class BilibiliZoneOptimizer:
             })
         
         # 2. 检查关键词使用
-        text = f"{title} {content.get('description', '')}".lower()
+        keyword_matcher, _ = self._matchers()
         zone_keywords = zone_info["keywords"]
-        matched = [kw for kw in zone_keywords if kw in text]
+        matched = keyword_matcher.group_matches(
+            f"{title} {content.get('description', '')}"
+        ).get(self._resolve_zone(zone), [])
         
         if len(matched) < 2:
             suggestions.append({
@@ -236,24 +253,25 @@ class BilibiliZoneOptimizer:
         return {
             "zone": zone,
             "suggestions": suggestions,
-            "score": self._calculate_zone_fit_score(content, zone_info),
+            "score": self._calculate_zone_fit_score(content, zone),
             "style_guide": zone_info["content_features"]
         }
     
     def _calculate_zone_fit_score(
         self,
         content: Dict[str, str],
-        zone_info: Dict[str, Any]
+        zone: str
     ) -> float:
         """计算内容与分区的匹配度（0-100分）"""
         
         score = 0.0
-        text = f"{content.get('title', '')} {content.get('description', '')}".lower()
+        zone = self._resolve_zone(zone)
+        keyword_matcher, topic_matcher = self._matchers()
+        text = f"{content.get('title', '')} {content.get('description', '')}"
         
         # 关键词匹配（50分）
-        keywords = zone_info["keywords"]
-        match_count = sum(1 for kw in keywords if kw in text)
-        score += (match_count / len(keywords)) * 50
+        match_count = len(keyword_matcher.group_matches(text).get(zone, []))
+        score += (match_count / keyword_matcher.group_size(zone)) * 50
         
         # 标题长度合适性（20分）
         title_len = len(content.get("title", ""))
@@ -263,9 +281,8 @@ class BilibiliZoneOptimizer:
             score += 10
         
         # 热门话题（30分）
-        hot_topics = zone_info["hot_topics"]
-        topic_match = sum(1 for topic in hot_topics if topic in text)
-        score += (topic_match / len(hot_topics)) * 30
+        topic_match = len(topic_matcher.group_matches(text).get(zone, []))
+        score += (topic_match / topic_matcher.group_size(zone)) * 30
         
         return round(score, 1)
     
@@ -1,25 +1,140 @@
 """
 内容抓取模块
 支持：今日头条、知乎热榜、B站热门视频
+
+热榜接口的响应在进程内缓存（TTL + ETag/Last-Modified条件请求），
+每次抓到新数据时保存快照到hot_snapshots表。
 """
 
-import requests
+import asyncio
 from bs4 import BeautifulSoup
 import json
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import logging
 
+from core.http_client import HttpClient, get_http_client
+from .download_manager import DL_COMPLETED, DL_DUPLICATE, DownloadManager
+from .hot_list import HotSnapshotStore, ResponseCache, get_response_cache
+
 logger = logging.getLogger(__name__)
 
 
 class ContentScraper:
     """内容抓取器"""
     
-    def __init__(self):
+    ZHIHU_HOT_URL = "https://www.zhihu.com/api/v3/feed/topstory/hot-lists/total"
+    BILIBILI_HOT_URL = "https://api.bilibili.com/x/web-interface/ranking/v2"
+    
+    def __init__(
+        self,
+        http_client: Optional[HttpClient] = None,
+        cache: Optional[ResponseCache] = None,
+        snapshots: Optional[HotSnapshotStore] = None,
+        record_snapshots: bool = True
+    ):
+        """
+        初始化抓取器
+        
+        Args:
+            http_client: HTTP客户端（默认使用全局共享连接池）
+            cache: 响应缓存（默认使用进程内共享缓存）
+            snapshots: 热榜快照存储（默认使用主数据库）
+            record_snapshots: 是否保存热榜快照
+        """
+        self.http = http_client or get_http_client()
+        self.cache = cache or get_response_cache()
+        self.snapshots = snapshots or (HotSnapshotStore() if record_snapshots else None)
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
     
+    async def _fetch_json(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        ttl: Optional[float] = None
+    ) -> tuple:
+        """
+        获取JSON（优先使用缓存）
+        
+        缓存有效时直接返回；过期后发送条件请求，304时沿用缓存；
+        请求失败但有过期缓存时返回过期数据。
+        
+        Returns:
+            (数据, 是否为新下载的数据)
+        """
+        key = self.cache.make_key(url, params)
+        entry = self.cache.get(key)
+        
+        if entry is not None and self.cache.is_fresh(entry, ttl):
+            self.cache.count("hits")
+            return entry.data, False
+        
+        headers = dict(self.headers)
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        
+        try:
+            response = await self.http.get(url, headers=headers, params=params, timeout=10)
+            
+            if response.status == 304 and entry is not None:
+                self.cache.touch(key)
+                self.cache.count("revalidated")
+                return entry.data, False
+            
+            response.raise_for_status()
+            data = response.json()
+        
+        except Exception:
+            if entry is None:
+                raise
+            logger.warning(f"⚠️ 请求失败，使用过期缓存: {url}")
+            self.cache.count("stale")
+            return entry.data, False
+        
+        self.cache.put(key, data, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        self.cache.count("misses")
+        return data, True
+    
+    async def _record_snapshot(self, source: str, items: List[Dict[str, Any]]):
+        """保存热榜快照（失败不影响抓取结果）"""
+        
+        if not self.snapshots:
+            return
+        
+        try:
+            await self.snapshots.save(source, items)
+        except Exception as e:
+            logger.warning(f"⚠️ 保存{source}热榜快照失败：{e}")
+    
+    async def scrape_all(
+        self,
+        limit: int = 10,
+        sources: Optional[List[str]] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        并发抓取多个来源的热榜
+        
+        Args:
+            limit: 每个来源的抓取数量
+            sources: 来源列表（toutiao/zhihu/bilibili，默认全部）
+            
+        Returns:
+            {来源: 条目列表}
+        """
+        scrapers = {
+            "toutiao": self.scrape_toutiao_hot,
+            "zhihu": self.scrape_zhihu_hot,
+            "bilibili": self.scrape_bilibili_hot,
+        }
+        sources = sources or list(scrapers)
+        
+        results = await asyncio.gather(*[scrapers[source](limit) for source in sources])
+        return dict(zip(sources, results))
+    
     async def scrape_toutiao_hot(self, limit: int = 10) -> List[Dict[str, Any]]:
         """
         抓取今日头条热榜
@@ -54,13 +169,10 @@ class ContentScraper:
             问题列表
         """
         try:
-            url = "https://www.zhihu.com/api/v3/feed/topstory/hot-lists/total"
-            
-            response = requests.get(url, headers=self.headers, timeout=10)
-            data = response.json()
+            data, fresh = await self._fetch_json(self.ZHIHU_HOT_URL)
             
             articles = []
-            for item in data.get('data', [])[:limit]:
+            for item in data.get('data', []):
                 target = item.get('target', {})
                 articles.append({
                     'title': target.get('title', ''),
@@ -70,8 +182,11 @@ class ContentScraper:
                     '热度': item.get('detail_text', '')
                 })
             
-            logger.info(f"✅ 抓取知乎热榜成功：{len(articles)}条")
-            return articles
+            if fresh:
+                await self._record_snapshot("zhihu", articles)
+            
+            logger.info(f"✅ 抓取知乎热榜成功：{len(articles[:limit])}条")
+            return articles[:limit]
             
         except Exception as e:
             logger.error(f"抓取知乎热榜失败：{e}")
@@ -89,17 +204,15 @@ class ContentScraper:
         """
         try:
             # B站综合热门API
-            url = "https://api.bilibili.com/x/web-interface/ranking/v2"
             params = {
                 'rid': 0,  # 0=全站，其他为分区
                 'type': 'all'
             }
             
-            response = requests.get(url, headers=self.headers, params=params, timeout=10)
-            data = response.json()
+            data, fresh = await self._fetch_json(self.BILIBILI_HOT_URL, params=params)
             
             videos = []
-            for item in data.get('data', {}).get('list', [])[:limit]:
+            for item in data.get('data', {}).get('list', []):
                 videos.append({
                     'title': item.get('title', ''),
                     'bvid': item.get('bvid', ''),
@@ -110,8 +223,11 @@ class ContentScraper:
                     'desc': item.get('desc', '')
                 })
             
-            logger.info(f"✅ 抓取B站热门成功：{len(videos)}条")
-            return videos
+            if fresh:
+                await self._record_snapshot("bilibili", videos)
+            
+            logger.info(f"✅ 抓取B站热门成功：{len(videos[:limit])}条")
+            return videos[:limit]
             
         except Exception as e:
             logger.error(f"抓取B站热门失败：{e}")
@@ -119,7 +235,7 @@ class ContentScraper:
     
     async def download_video(self, url: str, output_path: str) -> bool:
         """
-        下载视频（使用yt-dlp）
+        下载视频（yt-dlp在后台线程运行，已下载过的视频直接复用）
         
         Args:
             url: 视频URL
@@ -128,22 +244,13 @@ class ContentScraper:
         Returns:
             是否成功
         """
+        manager = DownloadManager()
         try:
-            import yt_dlp
-            
-            ydl_opts = {
-                'format': 'best',
-                'outtmpl': output_path,
-                'quiet': True
-            }
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
-            
-            logger.info(f"✅ 视频下载成功：{output_path}")
-            return True
+            result = await manager.download_to(url, output_path)
+            return result["status"] in (DL_COMPLETED, DL_DUPLICATE)
             
         except Exception as e:
             logger.error(f"视频下载失败：{e}")
             return False
-
+        finally:
+            await manager.close()
@@ -0,0 +1,497 @@
+"""
+视频下载管理器
+
+参考视频的下载队列保存在downloads表中，yt-dlp在线程池中运行，不阻塞事件循环：
+- 同时下载数有上限，其余任务排队
+- 程序中断后，下载中的任务恢复为待下载；yt-dlp保留.part文件并从断点继续
+  （下载期间定期更新updated_at，只恢复超过stale_after没有更新的任务，不会抢走其他进程正在下载的任务）
+- 同一个视频（去掉分享追踪参数后的URL相同）只入队一次；下载完成后内容哈希与已有文件相同的，
+  删除新文件并指向已有文件；download_to()需要文件在指定路径时硬链接或复制已有文件
+- 进度事件通过progress_callback通知（在下载线程中调用，UI需要用after()切回主线程）
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from core.database import Database
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_DOWNLOAD_DIR = "data/downloads"
+
+# 下载状态
+DL_PENDING = "pending"
+DL_DOWNLOADING = "downloading"
+DL_COMPLETED = "completed"
+DL_DUPLICATE = "duplicate"      # 内容与已下载的文件相同
+DL_FAILED = "failed"
+
+# 分享链接中的追踪参数（不影响视频内容）
+TRACKING_PARAMS = {"spm_id_from", "vd_source", "from", "share_source", "share_medium", "share_from",
+                   "share_plat", "share_session_id", "share_tag", "timestamp", "unique_k", "bbid", "ts"}
+
+
+def normalize_url(url: str) -> str:
+    """
+    规范化URL（去掉锚点、追踪参数和末尾斜杠，主机名小写）
+
+    Returns:
+        规范化后的URL
+    """
+    parts = urlparse(url.strip())
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if k not in TRACKING_PARAMS and not k.startswith("utm_")]
+    return urlunparse((
+        parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/") or "/",
+        "", urlencode(sorted(query)), ""
+    ))
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """分块计算文件SHA256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def ytdlp_download(url: str, output_template: str, progress_hook: Callable[[Dict[str, Any]], None]) -> str:
+    """
+    使用yt-dlp下载（在工作线程中执行）
+
+    Args:
+        url: 视频地址
+        output_template: 保存路径（yt-dlp输出模板）
+        progress_hook: yt-dlp进度回调
+
+    Returns:
+        下载完成的文件路径
+    """
+    import yt_dlp
+
+    ydl_opts = {
+        'format': 'best',
+        'outtmpl': output_template,
+        'quiet': True,
+        'noprogress': True,
+        'continuedl': True,         # 从.part文件断点续传
+        'retries': 3,
+        'progress_hooks': [progress_hook],
+    }
+
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=True)
+        downloads = info.get('requested_downloads') or []
+        if downloads and downloads[0].get('filepath'):
+            return downloads[0]['filepath']
+        return ydl.prepare_filename(info)
+
+
+def link_or_copy(source: str, target: str):
+    """把已有文件放到target（优先硬链接，跨磁盘等不支持时复制）"""
+    os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+    if os.path.exists(target):
+        os.remove(target)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+class DownloadManager:
+    """
+    视频下载管理器
+
+    所有写操作立即提交，进程随时中断都可以从数据库恢复队列。
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        output_dir: str = DEFAULT_DOWNLOAD_DIR,
+        max_concurrent: int = 2,
+        max_attempts: int = 3,
+        downloader: Callable[[str, str, Callable], str] = ytdlp_download,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+        stale_after: float = 300.0
+    ):
+        """
+        初始化下载管理器
+
+        Args:
+            db_path: 数据库文件路径（可选，默认使用主数据库）
+            output_dir: 默认保存目录
+            max_concurrent: 同时下载数
+            max_attempts: 单个任务最多尝试次数
+            downloader: 下载函数 (url, 输出模板, 进度回调) -> 文件路径（测试时可替换）
+            progress_callback: 进度回调，参数为事件字典
+                {"id", "url", "status", "downloaded_bytes", "total_bytes", "percent", "file_path", "error"}
+            stale_after: 下载中的任务超过该时间（秒）没有更新，视为进程已中断
+        """
+        self.db = Database(db_path)
+        self.output_dir = output_dir
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_attempts = max_attempts
+        self.downloader = downloader
+        self.progress_callback = progress_callback
+        self.stale_after = stale_after
+
+        self.stats: Dict[str, int] = {
+            "queued": 0,            # 新加入队列
+            "skipped": 0,           # URL重复，未重复入队
+            "completed": 0,
+            "duplicates": 0,        # 内容重复
+            "failed": 0,
+            "retried": 0,
+        }
+
+    async def connect(self):
+        """连接数据库（已连接时直接返回）"""
+        if self.db.conn is None:
+            await self.db.connect()
+
+    async def close(self):
+        """关闭连接"""
+        if self.db.conn is None:
+            return
+
+        await self.db.close()
+        self.db.conn = None
+
+    def _emit(self, job: Dict[str, Any], status: str, **extra):
+        """发送进度事件（回调异常不影响下载）"""
+        if not self.progress_callback:
+            return
+
+        event = {"id": job["id"], "url": job["url"], "status": status, **extra}
+        try:
+            self.progress_callback(event)
+        except Exception as e:
+            logger.warning(f"⚠️ 下载进度回调出错: {e}")
+
+    # ===== 队列 =====
+
+    async def enqueue(self, urls: List[str], output_template: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        加入下载队列（URL重复的返回已有任务）
+
+        Args:
+            urls: 视频地址列表
+            output_template: 保存路径（yt-dlp输出模板，可选，默认保存到output_dir）
+
+        Returns:
+            [{"id", "url", "status", "file_path", "queued"}]，queued为False表示已在队列中
+        """
+        await self.connect()
+
+        jobs = []
+        for url in urls:
+            normalized = normalize_url(url)
+            url_hash = hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+            cursor = await self.db.conn.execute(
+                "INSERT OR IGNORE INTO downloads (url, url_hash, output_template) VALUES (?, ?, ?)",
+                (url, url_hash, output_template)
+            )
+            queued = cursor.rowcount > 0
+
+            if not queued:
+                # 之前失败的任务重新加入时重置尝试次数
+                await self.db.conn.execute(
+                    """
+                    UPDATE downloads SET status = ?, attempts = 0, error = NULL, updated_at = CURRENT_TIMESTAMP
+                    WHERE url_hash = ? AND status = ?
+                    """,
+                    (DL_PENDING, url_hash, DL_FAILED)
+                )
+
+            cursor = await self.db.conn.execute(
+                "SELECT id, url, status, file_path FROM downloads WHERE url_hash = ?", (url_hash,)
+            )
+            job = dict(await cursor.fetchone())
+            job["queued"] = queued
+            jobs.append(job)
+
+            self.stats["queued" if queued else "skipped"] += 1
+
+        await self.db.conn.commit()
+        return jobs
+
+    @property
+    def heartbeat_interval(self) -> float:
+        """下载中任务的心跳间隔（stale_after的1/3）"""
+        return max(self.stale_after / 3, 0.1)
+
+    async def recover(self) -> int:
+        """
+        恢复中断的任务（超过stale_after没有更新的下载中任务 -> 待下载）
+
+        Returns:
+            恢复的任务数
+        """
+        await self.connect()
+
+        cursor = await self.db.conn.execute(
+            """
+            UPDATE downloads SET status = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE status = ? AND updated_at <= datetime('now', ?)
+            """,
+            (DL_PENDING, DL_DOWNLOADING, f"-{int(self.stale_after)} seconds")
+        )
+        await self.db.conn.commit()
+
+        if cursor.rowcount:
+            logger.info(f"⏯️ 恢复 {cursor.rowcount} 个中断的下载任务")
+        return cursor.rowcount
+
+    async def _claim(self, job_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """领取一个待下载任务（指定job_id时只领取该任务）"""
+        while True:
+            if job_id is None:
+                cursor = await self.db.conn.execute(
+                    "SELECT * FROM downloads WHERE status = ? ORDER BY id LIMIT 1", (DL_PENDING,)
+                )
+            else:
+                cursor = await self.db.conn.execute(
+                    "SELECT * FROM downloads WHERE id = ? AND status = ?", (job_id, DL_PENDING)
+                )
+            row = await cursor.fetchone()
+            if row is None:
+                return None
+
+            cursor = await self.db.conn.execute(
+                """
+                UPDATE downloads SET status = ?, attempts = attempts + 1, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND status = ?
+                """,
+                (DL_DOWNLOADING, row["id"], DL_PENDING)
+            )
+            await self.db.conn.commit()
+            if cursor.rowcount:
+                job = dict(row)
+                job["attempts"] += 1
+                return job
+            if job_id is not None:
+                return None
+
+    async def _reset_missing(self, job: Dict[str, Any]):
+        """已完成任务的文件不存在时改回待下载"""
+        logger.info(f"🔁 已下载的文件不存在，重新下载：{job['file_path']}")
+        await self.db.conn.execute(
+            """
+            UPDATE downloads SET status = ?, attempts = 0, file_path = NULL, content_hash = NULL, error = NULL,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND status IN (?, ?)
+            """,
+            (DL_PENDING, job["id"], DL_COMPLETED, DL_DUPLICATE)
+        )
+        await self.db.conn.commit()
+        job.update(status=DL_PENDING, file_path=None)
+
+    # ===== 下载 =====
+
+    def _output_template(self, job: Dict[str, Any]) -> str:
+        """保存路径（固定为任务ID，中断后yt-dlp能找到.part文件续传）"""
+        return job["output_template"] or os.path.join(self.output_dir, f"{job['id']}.%(ext)s")
+
+    async def _heartbeat(self, job_id: int):
+        """下载期间定期更新updated_at（其他进程的recover()据此判断任务仍在下载）"""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.db.conn.execute(
+                    "UPDATE downloads SET updated_at = CURRENT_TIMESTAMP WHERE id = ? AND status = ?",
+                    (job_id, DL_DOWNLOADING)
+                )
+                await self.db.conn.commit()
+            except Exception as e:
+                logger.warning(f"⚠️ 下载心跳失败: {e}")
+
+    async def _download(self, job: Dict[str, Any], executor: ThreadPoolExecutor) -> Dict[str, Any]:
+        """执行一个下载任务并更新状态"""
+        loop = asyncio.get_running_loop()
+
+        def hook(info: Dict[str, Any]):
+            total = info.get("total_bytes") or info.get("total_bytes_estimate") or 0
+            downloaded = info.get("downloaded_bytes") or 0
+            self._emit(
+                job, DL_DOWNLOADING,
+                downloaded_bytes=downloaded,
+                total_bytes=total,
+                percent=downloaded / total * 100 if total else None,
+            )
+
+        self._emit(job, DL_DOWNLOADING, downloaded_bytes=0, total_bytes=0, percent=0.0)
+        template = self._output_template(job)
+        os.makedirs(os.path.dirname(os.path.abspath(template)), exist_ok=True)
+
+        heartbeat = asyncio.create_task(self._heartbeat(job["id"]))
+        try:
+            file_path = await loop.run_in_executor(executor, self.downloader, job["url"], template, hook)
+            content_hash = await loop.run_in_executor(executor, file_sha256, file_path)
+            size = os.path.getsize(file_path)
+
+        except Exception as e:
+            error = str(e)
+            status = DL_FAILED if job["attempts"] >= self.max_attempts else DL_PENDING
+            await self.db.conn.execute(
+                "UPDATE downloads SET status = ?, error = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                (status, error, job["id"])
+            )
+            await self.db.conn.commit()
+
+            if status == DL_FAILED:
+                self.stats["failed"] += 1
+                logger.error(f"❌ 视频下载失败：{job['url']} - {error}")
+            else:
+                self.stats["retried"] += 1
+                logger.warning(f"⚠️ 视频下载失败，稍后重试 ({job['attempts']}/{self.max_attempts})：{error}")
+
+            self._emit(job, status, error=error)
+            return {**job, "status": status, "error": error}
+
+        finally:
+            heartbeat.cancel()
+
+        # 内容与已下载的文件相同：删除新文件，指向已有文件
+        cursor = await self.db.conn.execute(
+            "SELECT file_path FROM downloads WHERE content_hash = ? AND status = ? AND id != ? LIMIT 1",
+            (content_hash, DL_COMPLETED, job["id"])
+        )
+        existing = await cursor.fetchone()
+        status = DL_COMPLETED
+        if existing and os.path.exists(existing["file_path"]) \
+                and os.path.abspath(existing["file_path"]) != os.path.abspath(file_path):
+            os.remove(file_path)
+            file_path = existing["file_path"]
+            status = DL_DUPLICATE
+
+        await self.db.conn.execute(
+            """
+            UPDATE downloads SET status = ?, file_path = ?, content_hash = ?, bytes = ?, error = NULL,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+            """,
+            (status, file_path, content_hash, size, job["id"])
+        )
+        await self.db.conn.commit()
+
+        if status == DL_DUPLICATE:
+            self.stats["duplicates"] += 1
+            logger.info(f"♻️ 视频内容重复，使用已有文件：{file_path}")
+        else:
+            self.stats["completed"] += 1
+            logger.info(f"✅ 视频下载成功：{file_path}")
+
+        self._emit(job, status, file_path=file_path, downloaded_bytes=size, total_bytes=size, percent=100.0)
+        return {**job, "status": status, "file_path": file_path, "content_hash": content_hash, "error": None}
+
+    async def run(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        下载队列中的任务（先恢复中断的任务）
+
+        Args:
+            limit: 最多执行的任务数（含重试，默认直到队列为空）
+
+        Returns:
+            本次执行的任务结果
+        """
+        await self.recover()
+
+        results: List[Dict[str, Any]] = []
+        remaining = [limit]
+
+        async def worker(executor: ThreadPoolExecutor):
+            while remaining[0] is None or remaining[0] > 0:
+                if remaining[0] is not None:
+                    remaining[0] -= 1
+                job = await self._claim()
+                if job is None:
+                    return
+                results.append(await self._download(job, executor))
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="download") as executor:
+            await asyncio.gather(*[worker(executor) for _ in range(self.max_concurrent)])
+
+        return results
+
+    async def download(self, url: str, output_template: Optional[str] = None) -> Dict[str, Any]:
+        """
+        下载单个视频（已下载过的直接返回已有结果）
+
+        Args:
+            url: 视频地址
+            output_template: 保存路径（yt-dlp输出模板，可选）
+
+        Returns:
+            任务结果 {"id", "url", "status", "file_path", ...}
+        """
+        await self.recover()
+
+        job = (await self.enqueue([url], output_template))[0]
+        if job["status"] in (DL_COMPLETED, DL_DUPLICATE):
+            if job["file_path"] and os.path.exists(job["file_path"]):
+                return job
+            # 文件已被删除：重新下载
+            await self._reset_missing(job)
+
+        result = None
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="download") as executor:
+            # 失败后按max_attempts重试
+            while True:
+                claimed = await self._claim(job["id"])
+                if claimed is None:
+                    break
+                result = await self._download(claimed, executor)
+                if result["status"] != DL_PENDING:
+                    break
+
+        if result is None:
+            # 正在被其他下载进程处理
+            return job
+        return result
+
+    async def download_to(self, url: str, output_path: str) -> Dict[str, Any]:
+        """
+        下载单个视频，保证output_path处有文件
+
+        同一视频之前已下载到其他路径，或内容与已有文件重复时，把已有文件硬链接（或复制）到output_path。
+
+        Args:
+            url: 视频地址
+            output_path: 保存路径
+
+        Returns:
+            任务结果（成功时file_path为output_path）
+        """
+        result = await self.download(url, output_path)
+        if result["status"] not in (DL_COMPLETED, DL_DUPLICATE):
+            return result
+
+        if os.path.abspath(result["file_path"]) != os.path.abspath(output_path):
+            await asyncio.to_thread(link_or_copy, result["file_path"], output_path)
+        return {**result, "file_path": output_path}
+
+    async def list(self, status: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """查询下载任务（按ID倒序）"""
+        await self.connect()
+
+        if status:
+            cursor = await self.db.conn.execute(
+                "SELECT * FROM downloads WHERE status = ? ORDER BY id DESC LIMIT ?", (status, limit)
+            )
+        else:
+            cursor = await self.db.conn.execute("SELECT * FROM downloads ORDER BY id DESC LIMIT ?", (limit,))
+        return [dict(row) for row in await cursor.fetchall()]
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取本次运行的统计"""
+        return dict(self.stats)
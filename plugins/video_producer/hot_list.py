@@ -0,0 +1,245 @@
+"""
+热榜缓存与快照
+
+- ResponseCache: 热榜接口响应缓存，TTL内直接返回；过期后带ETag/Last-Modified条件请求，
+  服务端返回304时沿用缓存。进程内共享，视频生产页和ToolExecutor每次新建的ContentScraper都能命中
+- HotSnapshotStore: 每次抓到新数据时把热榜保存到hot_snapshots表，形成排名和热度的时间序列
+"""
+
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from core.database import Database, json_loads
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_HOT_TTL = 300.0     # 热榜缓存时间(秒)
+
+
+@dataclass
+class CachedResponse:
+    """缓存的响应"""
+    data: Any                           # 解析后的JSON
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float = 0.0             # 最近一次确认有效的时间
+
+
+class ResponseCache:
+    """
+    响应缓存（线程安全，按最近使用淘汰）
+    """
+
+    def __init__(self, ttl: float = DEFAULT_HOT_TTL, max_entries: int = 256, clock=time.monotonic):
+        """
+        初始化缓存
+
+        Args:
+            ttl: 缓存有效期(秒)
+            max_entries: 最多缓存的响应数
+            clock: 时钟函数（测试时可替换）
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.stats: Dict[str, int] = {
+            "hits": 0,              # TTL内直接返回
+            "revalidated": 0,       # 条件请求返回304
+            "misses": 0,            # 重新下载
+            "stale": 0,             # 请求失败时返回过期数据
+        }
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """缓存键：URL + 排序后的参数"""
+        if not params:
+            return url
+        return url + "?" + "&".join(f"{k}={v}" for k, v in sorted(params.items()))
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def is_fresh(self, entry: CachedResponse, ttl: Optional[float] = None) -> bool:
+        return self.clock() - entry.fetched_at < (self.ttl if ttl is None else ttl)
+
+    def put(self, key: str, data: Any, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        with self._lock:
+            self._entries[key] = CachedResponse(data, etag, last_modified, self.clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def touch(self, key: str):
+        """304后刷新有效期"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.fetched_at = self.clock()
+
+    def count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取缓存统计"""
+        with self._lock:
+            return {**self.stats, "entries": len(self._entries)}
+
+
+def parse_heat(value: Any) -> Optional[float]:
+    """
+    解析热度值（数字或"1234 万热度"这样的文本）
+
+    Returns:
+        数值，无法解析时返回None
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not value:
+        return None
+
+    match = re.search(r"([\d.]+)\s*([万亿]?)", str(value))
+    if not match:
+        return None
+    number = float(match.group(1))
+    return number * {"万": 1e4, "亿": 1e8}.get(match.group(2), 1)
+
+
+class HotSnapshotStore:
+    """
+    热榜快照
+
+    每次操作单独打开和关闭连接（快照写入频率很低，不常驻连接）。
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        """
+        Args:
+            db_path: 数据库文件路径（可选，默认使用主数据库）
+        """
+        self.db_path = db_path
+
+    async def _connect(self) -> Database:
+        db = Database(self.db_path)
+        await db.connect()
+        return db
+
+    async def save(self, source: str, items: List[Dict[str, Any]], captured_at: Optional[float] = None) -> int:
+        """
+        保存一次热榜快照
+
+        Args:
+            source: 来源（zhihu/bilibili）
+            items: 热榜条目（按排名顺序，需包含url和title）
+            captured_at: 抓取时间（Unix时间戳，默认当前时间）
+
+        Returns:
+            保存的条目数
+        """
+        if not items:
+            return 0
+
+        captured_at = time.time() if captured_at is None else captured_at
+        rows = [
+            (
+                source, rank, item.get("url") or item.get("title", ""), item.get("title"),
+                parse_heat(item.get("play", item.get("热度"))),
+                json.dumps(item, ensure_ascii=False, default=str), captured_at,
+            )
+            for rank, item in enumerate(items, 1)
+        ]
+
+        db = await self._connect()
+        try:
+            await db.conn.executemany(
+                """
+                INSERT INTO hot_snapshots (source, rank, item_key, title, heat, data, captured_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows
+            )
+            await db.conn.commit()
+        finally:
+            await db.close()
+
+        return len(rows)
+
+    async def latest(self, source: str) -> List[Dict[str, Any]]:
+        """
+        最近一次快照的条目（按排名）
+
+        Returns:
+            条目列表，没有快照时返回空列表
+        """
+        db = await self._connect()
+        try:
+            cursor = await db.conn.execute(
+                """
+                SELECT data FROM hot_snapshots
+                WHERE source = ? AND captured_at = (SELECT MAX(captured_at) FROM hot_snapshots WHERE source = ?)
+                ORDER BY rank
+                """,
+                (source, source)
+            )
+            rows = await cursor.fetchall()
+        finally:
+            await db.close()
+
+        return [json_loads(row["data"]) for row in rows]
+
+    async def history(self, item_key: str, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        单个条目的排名和热度变化
+
+        Args:
+            item_key: 条目标识（URL）
+            since: 起始时间（Unix时间戳，可选）
+
+        Returns:
+            [{"source", "captured_at", "rank", "heat"}]，按时间升序
+        """
+        db = await self._connect()
+        try:
+            cursor = await db.conn.execute(
+                """
+                SELECT source, captured_at, rank, heat FROM hot_snapshots
+                WHERE item_key = ? AND captured_at >= ?
+                ORDER BY captured_at
+                """,
+                (item_key, since or 0)
+            )
+            rows = await cursor.fetchall()
+        finally:
+            await db.close()
+
+        return [dict(row) for row in rows]
+
+
+# 全局单例
+_response_cache = None
+
+def get_response_cache() -> ResponseCache:
+    """获取进程内共享的热榜响应缓存"""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
@@ -397,6 +397,27 @@ class VideoProductionTab(ctk.CTkScrollableFrame):
             font=ctk.CTkFont(size=14, weight="bold")
         )
         self.generate_btn.pack(side="left", padx=5)
+        
+        # 下载参考视频按钮
+        self.download_btn = ctk.CTkButton(
+            buttons_frame,
+            text="⬇️ 下载参考",
+            command=self._download_references,
+            width=140,
+            height=45,
+            font=ctk.CTkFont(size=14, weight="bold")
+        )
+        self.download_btn.pack(side="left", padx=5)
+        
+        # 下载进度
+        self.download_status = ctk.CTkLabel(
+            frame,
+            text="",
+            font=ctk.CTkFont(size=12),
+            text_color="gray"
+        )
+        self.download_status.grid(row=2, column=0, padx=15, pady=(0, 10), sticky="w")
+        self.download_progress: dict = {}
     
     def _create_result_section(self):
         """创建结果显示区域"""
@@ -451,6 +472,9 @@ class VideoProductionTab(ctk.CTkScrollableFrame):
                     self.analysis_text.insert("1.0", "❌ 抓取失败，请检查网络")
                     return
                 
+                # 保存供"下载参考"使用
+                self.reference_videos = videos
+                
                 # 分析第一个视频
                 video = videos[0]
                 result = f"📊 B站热门视频分析\n\n"
@@ -488,7 +512,70 @@ class VideoProductionTab(ctk.CTkScrollableFrame):
             self.analysis_text.insert("1.0", f"❌ 分析失败：{str(e)}")
         finally:
             if loop:
-                loop.close()
+                # 释放本次抓取的连接池
+                from core.http_client import close_event_loop
+                close_event_loop(loop)
+    
+    def _download_references(self):
+        """下载参考热门视频（后台排队下载）"""
+        videos = getattr(self, "reference_videos", None)
+        if not videos:
+            messagebox.showinfo("提示", "请先点击「参考热门」获取热门视频")
+            return
+        
+        self.download_btn.configure(state="disabled", text="下载中...")
+        self.download_progress = {}
+        self.download_status.configure(text=f"⏳ {len(videos)} 个视频已加入下载队列")
+        
+        urls = [v.get("url") for v in videos if v.get("url")]
+        thread = threading.Thread(target=self._do_download_references, args=(urls,), daemon=True)
+        thread.start()
+    
+    def _do_download_references(self, urls):
+        """后台下载"""
+        from plugins.video_producer.download_manager import DownloadManager
+        
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        
+        # 进度回调在下载线程中调用，切回主线程更新界面
+        manager = DownloadManager(progress_callback=lambda event: self.after(0, self._on_download_progress, event))
+        
+        async def run():
+            try:
+                await manager.enqueue(urls)
+                return await manager.run()
+            finally:
+                await manager.close()
+        
+        try:
+            results = loop.run_until_complete(run())
+            done = sum(1 for r in results if r["status"] in ("completed", "duplicate"))
+            message = f"✅ 下载完成 {done}/{len(results)} 个（已下载过的视频直接跳过）"
+        except Exception as e:
+            message = f"❌ 下载失败：{e}"
+        finally:
+            loop.close()
+        
+        self.after(0, self._finish_download, message)
+    
+    def _on_download_progress(self, event):
+        """显示下载进度（主线程）"""
+        self.download_progress[event["id"]] = event
+        
+        active = [e for e in self.download_progress.values() if e["status"] == "downloading"]
+        finished = sum(1 for e in self.download_progress.values() if e["status"] in ("completed", "duplicate"))
+        
+        text = f"⬇️ 已完成 {finished} 个"
+        if active:
+            parts = [f"{e['percent']:.0f}%" if e.get("percent") is not None else "..." for e in active]
+            text += f"，下载中: {' | '.join(parts)}"
+        self.download_status.configure(text=text)
+    
+    def _finish_download(self, message):
+        """下载结束（主线程）"""
+        self.download_btn.configure(state="normal", text="⬇️ 下载参考")
+        self.download_status.configure(text=message)
     
     def _generate_video(self):
         """生成视频"""
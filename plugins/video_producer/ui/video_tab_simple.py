@@ -254,7 +254,9 @@ class VideoProductionTabSimple(ctk.CTkFrame):
                 self._show_output(f"❌ 错误：{str(e)}")
             finally:
                 self.ref_btn.configure(state="normal", text="🔍 参考热门")
-                loop.close()
+                # 释放本次抓取的连接池
+                from core.http_client import close_event_loop
+                close_event_loop(loop)
         
         threading.Thread(target=work, daemon=True).start()
     
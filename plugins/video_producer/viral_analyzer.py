@@ -7,12 +7,24 @@ import re
 from typing import Dict, List, Any, Optional
 import logging
 
+from core.keyword_matcher import KeywordMatcher
+
 logger = logging.getLogger(__name__)
 
 
 class ViralAnalyzer:
     """爆款分析器 - 类似SEO分析"""
     
+    # 标题关键词分组（关键词提取和Hook识别共用一个匹配器）
+    TITLE_KEYWORDS = {
+        "疑问": ['如何', '怎么', '为什么', '什么'],
+        "情绪": ['震惊', '惊呆', '绝了', '太牛', '必看', '火了'],
+        "情绪Hook": ['震惊', '绝了', '必看', '火了'],
+        "悬念": ['竟然', '居然', '没想到', '原来'],
+        "对比": ['vs', 'VS', '对比', '比较'],
+    }
+    _title_matcher = KeywordMatcher(TITLE_KEYWORDS, case_sensitive=True)
+    
     def __init__(self, ai_engine=None):
         """
         初始化爆款分析器
@@ -72,15 +84,10 @@ class ViralAnalyzer:
         # 数字
         numbers = re.findall(r'\d+', title)
         
-        # 疑问词
-        questions = ['如何', '怎么', '为什么', '什么']
-        found_questions = [q for q in questions if q in title]
+        # 疑问词、情绪词
+        matched = self._title_matcher.group_matches(title)
         
-        # 情绪词
-        emotions = ['震惊', '惊呆', '绝了', '太牛', '必看', '火了']
-        found_emotions = [e for e in emotions if e in title]
-        
-        return numbers + found_questions + found_emotions
+        return numbers + matched.get('疑问', []) + matched.get('情绪', [])
     
     def _identify_hooks(self, title: str) -> List[str]:
         """识别吸引点（Hook）"""
@@ -90,20 +97,22 @@ class ViralAnalyzer:
         if re.search(r'\d+', title):
             hooks.append('数字Hook（具体可信）')
         
+        matched = self._title_matcher.group_matches(title)
+        
         # 疑问Hook（引发好奇）
-        if any(q in title for q in ['如何', '怎么', '为什么', '什么']):
+        if '疑问' in matched:
             hooks.append('疑问Hook（引发好奇）')
         
         # 情绪Hook（激发情感）
-        if any(e in title for e in ['震惊', '绝了', '必看', '火了']):
+        if '情绪Hook' in matched:
             hooks.append('情绪Hook（激发点击）')
         
         # 悬念Hook（制造悬念）
-        if any(s in title for s in ['竟然', '居然', '没想到', '原来']):
+        if '悬念' in matched:
             hooks.append('悬念Hook（制造悬念）')
         
         # 对比Hook（冲突感）
-        if any(c in title for c in ['vs', 'VS', '对比', '比较']):
+        if '对比' in matched:
             hooks.append('对比Hook（制造冲突）')
         
         return hooks
@@ -0,0 +1,86 @@
+"""
+闲鱼多账号配置
+
+每个账号有独立的登录状态文件和可选的代理，发布时使用相互隔离的浏览器上下文。
+配置文件格式（config/xianyu_accounts.json）:
+[
+    {"name": "主店", "cookies_file": "data/xianyu_cookies.json"},
+    {"name": "二店", "cookies_file": "data/xianyu_cookies_2.json",
+     "proxy": {"server": "http://127.0.0.1:7890"}, "min_interval": 30}
+]
+"""
+
+import json
+import logging
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_ACCOUNTS_FILE = "config/xianyu_accounts.json"
+DEFAULT_COOKIES_FILE = "data/xianyu_cookies.json"
+
+
+@dataclass
+class AccountProfile:
+    """闲鱼账号"""
+    name: str                                   # 账号名称
+    cookies_file: str = DEFAULT_COOKIES_FILE    # 登录状态文件（同时作为限速和浏览器上下文的账号标识）
+    proxy: Optional[Dict[str, str]] = None      # Playwright代理配置 {"server", "username", "password"}
+    enabled: bool = True                        # 是否参与发布
+    min_interval: Optional[float] = None        # 该账号的发布间隔(秒)，None表示使用闲鱼默认规则
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def context_options(self) -> Dict[str, Any]:
+        """创建浏览器上下文时的额外参数"""
+        return {"proxy": self.proxy} if self.proxy else {}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AccountProfile":
+        """从配置字典创建"""
+        known = {k: data[k] for k in ("name", "cookies_file", "proxy", "enabled", "min_interval") if k in data}
+        extra = {k: v for k, v in data.items() if k not in known}
+        return cls(extra=extra, **known)
+
+
+def load_account_profiles(path: str = DEFAULT_ACCOUNTS_FILE) -> List[AccountProfile]:
+    """
+    加载账号配置
+
+    Args:
+        path: 配置文件路径
+
+    Returns:
+        启用的账号列表（配置文件不存在时返回默认账号）
+    """
+    config_path = Path(path)
+    if not config_path.exists():
+        return [AccountProfile(name="default")]
+
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception as e:
+        logger.error(f"❌ 账号配置读取失败: {path} - {e}")
+        return [AccountProfile(name="default")]
+
+    profiles = [AccountProfile.from_dict(item) for item in data]
+    return [p for p in profiles if p.enabled]
+
+
+def save_account_profiles(profiles: List[AccountProfile], path: str = DEFAULT_ACCOUNTS_FILE):
+    """保存账号配置"""
+    config_path = Path(path)
+    config_path.parent.mkdir(parents=True, exist_ok=True)
+
+    data = []
+    for profile in profiles:
+        item = asdict(profile)
+        item.update(item.pop("extra"))
+        data.append(item)
+
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
@@ -4,15 +4,20 @@ JieDimension Toolkit - Excel/CSV 数据导入器
 Version: 1.0.0
 """
 
+import asyncio
+import numpy as np
 import pandas as pd
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+DEFAULT_BATCH_SIZE = 1000   # 流式导入每批行数
+
+
 class DataImporter:
     """数据导入器"""
     
@@ -20,6 +25,7 @@ class DataImporter:
         """初始化导入器"""
         self.required_columns = ["title", "price", "category"]
         self.optional_columns = ["description", "images", "quantity", "status"]
+        self.errors: List[Dict[str, Any]] = []     # 最近一次导入的错误行
     
     def import_from_excel(self, file_path: str) -> List[Dict[str, Any]]:
         """
@@ -37,40 +43,9 @@ class DataImporter:
         """
         logger.info(f"📥 开始导入Excel: {file_path}")
         
-        # 检查文件是否存在
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"文件不存在: {file_path}")
-        
         try:
-            # 读取Excel
-            df = pd.read_excel(file_path)
-            
-            logger.info(f"读取到 {len(df)} 行数据")
-            
-            # 验证必填列
-            missing_cols = set(self.required_columns) - set(df.columns)
-            if missing_cols:
-                raise ValueError(f"缺少必填列: {', '.join(missing_cols)}")
-            
-            # 转换为字典列表
-            products = []
-            errors = []
-            
-            for idx, row in df.iterrows():
-                try:
-                    product = self._clean_product_data(row, idx)
-                    products.append(product)
-                except Exception as e:
-                    error_msg = f"第 {idx + 2} 行数据错误: {e}"
-                    logger.warning(f"⚠️ {error_msg}")
-                    errors.append(error_msg)
-            
-            logger.info(f"✅ 成功导入 {len(products)} 个商品")
-            if errors:
-                logger.warning(f"⚠️ {len(errors)} 行数据有错误")
-                for error in errors[:5]:  # 只显示前5个错误
-                    logger.warning(f"   - {error}")
-            
+            products = [p for batch in self.iter_excel_batches(file_path) for p in batch]
+            self._log_import_result(products)
             return products
             
         except Exception as e:
@@ -90,43 +65,291 @@ class DataImporter:
         """
         logger.info(f"📥 开始导入CSV: {file_path}")
         
-        # 检查文件是否存在
+        try:
+            products = [p for batch in self.iter_csv_batches(file_path, encoding=encoding) for p in batch]
+            self._log_import_result(products)
+            return products
+            
+        except Exception as e:
+            logger.error(f"❌ 导入CSV失败: {e}")
+            raise
+    
+    def _log_import_result(self, products: List[Dict[str, Any]]):
+        """输出导入结果（错误行见self.errors）"""
+        logger.info(f"✅ 成功导入 {len(products)} 个商品")
+        if self.errors:
+            logger.warning(f"⚠️ {len(self.errors)} 行数据有错误")
+            for error in self.errors[:5]:  # 只显示前5个错误
+                logger.warning(f"   - 第 {error['row_number']} 行数据错误: {error['error']}")
+    
+    # ===== 流式导入 =====
+    
+    def iter_batches(self, file_path: str, batch_size: int = DEFAULT_BATCH_SIZE, **kwargs) -> Iterator[List[Dict[str, Any]]]:
+        """
+        按文件类型分批读取商品（.csv 按CSV读取，其余按Excel读取）
+        
+        Args:
+            file_path: 文件路径
+            batch_size: 每批行数
+            
+        Yields:
+            清洗后的商品列表（错误行追加到self.errors）
+        """
+        if file_path.lower().endswith(".csv"):
+            return self.iter_csv_batches(file_path, batch_size=batch_size, **kwargs)
+        return self.iter_excel_batches(file_path, batch_size=batch_size)
+    
+    def iter_csv_batches(
+        self,
+        file_path: str,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        encoding: str = 'utf-8-sig'
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        分块读取CSV，每块整列清洗后产出
+        
+        Args:
+            file_path: CSV 文件路径
+            batch_size: 每批行数
+            encoding: 文件编码
+            
+        Yields:
+            清洗后的商品列表（错误行追加到self.errors）
+            
+        Raises:
+            FileNotFoundError: 文件不存在
+            ValueError: 缺少必填列
+        """
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"文件不存在: {file_path}")
         
-        try:
-            # 读取CSV
-            df = pd.read_csv(file_path, encoding=encoding)
+        self.errors = []
+        start_row = 0
+        
+        # 全部按文本读取，类型转换在_clean_frame中统一完成
+        reader = pd.read_csv(
+            file_path, encoding=encoding, chunksize=batch_size,
+            dtype=str, keep_default_na=False
+        )
+        with reader:
+            for chunk in reader:
+                if start_row == 0:
+                    self._check_columns(chunk.columns)
+                products, errors = self._clean_frame(chunk, start_row, "csv")
+                self.errors.extend(errors)
+                start_row += len(chunk)
+                yield products
+    
+    def iter_excel_batches(
+        self,
+        file_path: str,
+        batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        以openpyxl只读模式逐行读取Excel第一个工作表，每batch_size行整列清洗后产出
+        
+        Args:
+            file_path: Excel 文件路径
+            batch_size: 每批行数
             
-            logger.info(f"读取到 {len(df)} 行数据")
+        Yields:
+            清洗后的商品列表（错误行追加到self.errors）
             
-            # 验证必填列
-            missing_cols = set(self.required_columns) - set(df.columns)
-            if missing_cols:
-                raise ValueError(f"缺少必填列: {', '.join(missing_cols)}")
+        Raises:
+            FileNotFoundError: 文件不存在
+            ValueError: 缺少必填列
+        """
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"文件不存在: {file_path}")
+        
+        from openpyxl import load_workbook
+        
+        self.errors = []
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            columns = [str(c).strip() if c is not None else f"_unnamed_{i}" for i, c in enumerate(header)]
+            self._check_columns(columns)
             
-            # 转换为字典列表
-            products = []
-            errors = []
+            start_row = 0
+            buffer = []
+            for row in rows:
+                # 跳过整行为空的行（与pandas.read_excel一致）
+                if all(v is None for v in row):
+                    continue
+                buffer.append(row)
+                if len(buffer) >= batch_size:
+                    yield self._clean_rows(buffer, columns, start_row)
+                    start_row += len(buffer)
+                    buffer = []
             
-            for idx, row in df.iterrows():
-                try:
-                    product = self._clean_product_data(row, idx)
-                    products.append(product)
-                except Exception as e:
-                    error_msg = f"第 {idx + 2} 行数据错误: {e}"
-                    logger.warning(f"⚠️ {error_msg}")
-                    errors.append(error_msg)
+            if buffer:
+                yield self._clean_rows(buffer, columns, start_row)
+        finally:
+            workbook.close()
+    
+    def _clean_rows(self, rows: List[tuple], columns: List[str], start_row: int) -> List[Dict[str, Any]]:
+        """把一批Excel行组装成DataFrame后清洗"""
+        width = len(columns)
+        frame = pd.DataFrame(
+            [tuple(row[:width]) + (None,) * (width - len(row)) for row in rows],
+            columns=columns, dtype=object
+        )
+        products, errors = self._clean_frame(frame, start_row, "excel")
+        self.errors.extend(errors)
+        return products
+    
+    def _check_columns(self, columns):
+        """验证必填列"""
+        missing_cols = [c for c in self.required_columns if c not in set(columns)]
+        if missing_cols:
+            raise ValueError(f"缺少必填列: {', '.join(missing_cols)}")
+    
+    @staticmethod
+    def _text_column(df: pd.DataFrame, name: str) -> pd.Series:
+        """取文本列：去除首尾空白，缺失值和"nan"视为空字符串"""
+        if name not in df.columns:
+            return pd.Series("", index=df.index, dtype=object)
+        text = df[name].astype("string").fillna("").str.strip()
+        return text.mask(text == "nan", "").astype(object)
+    
+    def _clean_frame(self, df: pd.DataFrame, start_row: int, source: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        整列清洗一批商品数据（规则与_clean_product_data一致）
+        
+        Args:
+            df: 一批数据
+            start_row: 这批数据第一行在文件中的序号（从0开始，不含表头）
+            source: 导入来源（excel/csv）
             
-            logger.info(f"✅ 成功导入 {len(products)} 个商品")
-            if errors:
-                logger.warning(f"⚠️ {len(errors)} 行数据有错误")
+        Returns:
+            (商品列表, 错误行列表)，错误行包含row_number、error和原始数据
+        """
+        # 重新导入错误报告时去掉上次的错误信息列，行号以本文件为准
+        df = df.reset_index(drop=True).drop(columns=["row_number", "error"], errors="ignore")
+        row_numbers = pd.RangeIndex(start_row + 2, start_row + 2 + len(df))  # Excel行号（表头占第1行）
+        
+        # 1. 标题（必填，超过100字截断）
+        title = self._text_column(df, "title")
+        too_long = title.str.len() > 100
+        if too_long.any():
+            logger.warning(f"⚠️ {int(too_long.sum())} 个标题过长，将自动截断为100字")
+            title = title.str.slice(0, 100)
+        
+        # 2. 价格（必填，必须大于0）
+        raw_price = df["price"] if "price" in df.columns else pd.Series(None, index=df.index, dtype=object)
+        price = pd.to_numeric(raw_price, errors="coerce")
+        
+        # 3. 分类（必填）
+        category = self._text_column(df, "category")
+        
+        # 每行只报告第一个错误（顺序与_clean_product_data一致）
+        error = np.select(
+            [title == "", ~(price > 0), category == ""],
+            ["标题不能为空", "无效的价格: " + raw_price.astype("string").fillna("nan"), "分类不能为空"],
+            default=""
+        )
+        valid = error == ""
+        
+        # 4. 图片路径（支持分号或逗号分隔）
+        images = self._text_column(df, "images").str.replace(";", ",", regex=False).str.split(",")
+        
+        # 5. 数量（默认1，最小1）
+        if "quantity" in df.columns:
+            quantity = pd.to_numeric(df["quantity"], errors="coerce").fillna(1).clip(lower=1).astype(int)
+        else:
+            quantity = pd.Series(1, index=df.index)
+        
+        # 6. 状态（默认待发布）
+        status = self._text_column(df, "status")
+        status = status.mask(status == "", "待发布")
+        
+        cleaned = pd.DataFrame({
+            "title": title,
+            "price": price.astype(float),
+            "category": category,
+            "description": self._text_column(df, "description"),
+            "images": images.map(lambda parts: [p.strip() for p in parts if p.strip()]),
+            "quantity": quantity,
+            "status": status,
+            "import_time": datetime.now().isoformat(),
+            "row_number": row_numbers,
+            "import_source": source,
+        })[valid]
+        
+        errors = df[~valid].astype(object).where(df[~valid].notna(), None)
+        errors.insert(0, "error", error[~valid])
+        errors.insert(0, "row_number", row_numbers[~valid])
+        error_rows = errors.to_dict("records")
+        
+        for row in error_rows:
+            logger.warning(f"⚠️ 第 {row['row_number']} 行数据错误: {row['error']}")
+        
+        return cleaned.to_dict("records"), error_rows
+    
+    def write_error_report(self, path: str, errors: Optional[List[Dict[str, Any]]] = None) -> str:
+        """
+        把错误行写入CSV报告（可修正后重新导入）
+        
+        Args:
+            path: 报告路径
+            errors: 错误行（默认使用最近一次导入的self.errors）
             
-            return products
+        Returns:
+            报告路径
+        """
+        errors = self.errors if errors is None else errors
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        pd.DataFrame(errors).to_csv(path, index=False, encoding="utf-8-sig")
+        logger.info(f"📝 错误报告已保存: {path}（{len(errors)} 行）")
+        return path
+    
+    async def import_to_database(
+        self,
+        file_path: str,
+        db,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        error_report_path: Optional[str] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        流式导入到数据库：每批清洗后直接批量写入，不在内存中保留整个文件
+        
+        文件读取和清洗在线程池中执行，不阻塞事件循环。
+        
+        Args:
+            file_path: Excel/CSV 文件路径
+            db: 已连接的Database
+            batch_size: 每批行数
+            error_report_path: 错误报告路径（默认为 <文件名>.errors.csv，没有错误行时不生成）
             
-        except Exception as e:
-            logger.error(f"❌ 导入CSV失败: {e}")
-            raise
+        Returns:
+            {"imported": 写入数, "errors": 错误行数, "batches": 批数, "error_report": 报告路径或None}
+        """
+        logger.info(f"📥 开始流式导入: {file_path}")
+        
+        batches = self.iter_batches(file_path, batch_size=batch_size, **kwargs)
+        stats = {"imported": 0, "errors": 0, "batches": 0, "error_report": None}
+        
+        while True:
+            batch = await asyncio.to_thread(next, batches, None)
+            if batch is None:
+                break
+            stats["batches"] += 1
+            if batch:
+                await db.insert_products(batch)
+                stats["imported"] += len(batch)
+        
+        stats["errors"] = len(self.errors)
+        if self.errors:
+            path = error_report_path or f"{os.path.splitext(file_path)[0]}.errors.csv"
+            stats["error_report"] = self.write_error_report(path)
+        
+        logger.info(f"✅ 流式导入完成: {stats['imported']} 个商品，{stats['errors']} 行错误")
+        return stats
     
     def _clean_product_data(self, row: pd.Series, row_index: int) -> Dict[str, Any]:
         """
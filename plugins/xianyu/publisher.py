@@ -5,8 +5,9 @@ Version: 1.0.0
 """
 
 import asyncio
-from typing import List, Dict, Any, Optional, Callable
+from typing import List, Dict, Any, Optional, Callable, Tuple
 from datetime import datetime
+from dataclasses import replace
 import logging
 
 # 导入AI引擎
@@ -15,7 +16,20 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 from core.ai_engine import AIEngine, TaskComplexity
-from plugins.xianyu.retry_handler import RetryHandler, ErrorClassifier
+from core.browser_automation import BrowserPool
+from core.image_pipeline import ImagePipeline, ImageSpec, get_image_pipeline
+from core.publisher import PLATFORM_LIMITS, PlatformType
+from core.request_interceptor import RequestInterceptor
+from core.session_cache import SessionCache
+from core.step_tracer import StepTracer, StepTimingStore, TraceLevel
+from core.cancellation import PublishCancelledError, checkpoint
+from core.dead_letter import DeadLetterQueue
+from core.publish_ledger import (
+    PublishLedger, content_fingerprint, ledger_time, LEDGER_CONFIRMED, LEDGER_IN_FLIGHT
+)
+from core.rate_limiter import RateLimitScheduler, get_rate_limiter
+from plugins.xianyu.retry_handler import RetryHandler, RetryBudget, ErrorClassifier
+from plugins.xianyu.accounts import AccountProfile, load_account_profiles
 
 logger = logging.getLogger(__name__)
 
@@ -23,15 +37,63 @@ logger = logging.getLogger(__name__)
 class XianyuPublisher:
     """闲鱼发布器"""
     
-    def __init__(self, max_retries: int = 3):
+    def __init__(
+        self,
+        max_retries: int = 3,
+        rate_limiter: Optional[RateLimitScheduler] = None,
+        ledger: Optional[PublishLedger] = None,
+        headless: bool = False,
+        page_max_uses: int = 20,
+        block_resources: bool = True,
+        session_cache: Optional[SessionCache] = None,
+        cache_sessions: bool = True,
+        trace_level: TraceLevel = TraceLevel.THUMBNAIL,
+        timing_store: Optional[StepTimingStore] = None,
+        image_pipeline: Optional[ImagePipeline] = None,
+        preprocess_images: bool = True,
+        dead_letters: Optional[DeadLetterQueue] = None
+    ):
         """
         初始化发布器
         
         Args:
             max_retries: 最大重试次数
+            rate_limiter: 发布频率调度器（默认使用全局调度器）
+            ledger: 发布台账（可选，提供后已发布的商品不会被重复发布）
+            headless: 浏览器是否无头模式
+            page_max_uses: 批量发布时页面复用次数上限
+            block_resources: 是否拦截图片、字体、统计脚本并缓存静态资源
+            session_cache: 登录会话缓存（可选，默认使用data/cache/sessions）
+            cache_sessions: 是否缓存登录会话（有效期内跳过登录检查）
+            trace_level: 发布步骤追踪级别（off/timings/thumbnail/trace）
+            timing_store: 步骤耗时存储（可选，提供后各步骤耗时写入数据库）
+            image_pipeline: 图片预处理流水线（可选，默认使用按闲鱼图片限制创建的全局流水线）
+            preprocess_images: 上传前是否校验、缩放、压缩图片
+            dead_letters: 死信队列（可选，提供后批量发布中最终失败的商品会保存下来，可稍后批量重新投递）
         """
         self.ai_engine = AIEngine()
         self.retry_handler = RetryHandler(max_retries=max_retries)
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.ledger = ledger
+        self.dead_letters = dead_letters
+        self.headless = headless
+        self.page_max_uses = page_max_uses
+        self.interceptor = RequestInterceptor() if block_resources else None
+        self.session_cache = (session_cache or SessionCache()) if cache_sessions else None
+        self.tracer = StepTracer(trace_level, store=timing_store)
+        if preprocess_images:
+            # 默认所有发布器共用一个流水线，不会每个发布器各留一个工作进程池
+            self.image_pipeline = image_pipeline or get_image_pipeline(
+                ImageSpec.from_limits(PLATFORM_LIMITS[PlatformType.XIANYU])
+            )
+        else:
+            self.image_pipeline = None
+        
+        # 相邻两次AI优化的间隔（避免过快调用AI）
+        self.optimize_interval = 0.5
+        
+        # 浏览器池（batch_publish期间存在，也可由调用方提供以跨批次复用）
+        self.browser_pool: Optional[BrowserPool] = None
     
     async def optimize_product(self, product: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -250,7 +312,7 @@ class XianyuPublisher:
                     progress_callback(progress, product["title"])
                 
                 # 延迟（避免过快调用AI）
-                await asyncio.sleep(0.5)
+                await asyncio.sleep(self.optimize_interval)
                 
             except Exception as e:
                 logger.error(f"❌ 优化失败: {product['title']} - {e}")
@@ -266,7 +328,8 @@ class XianyuPublisher:
         use_browser: bool = True,
         cookies_file: str = "data/xianyu_cookies.json",
         enable_retry: bool = True,
-        progress_callback = None
+        progress_callback = None,
+        force: bool = False
     ) -> Dict[str, Any]:
         """
         发布单个商品到闲鱼（支持真实发布和自动重试）
@@ -277,6 +340,7 @@ class XianyuPublisher:
             cookies_file: Cookie文件路径
             enable_retry: 是否启用重试机制
             progress_callback: 进度回调函数 callback(step_index, status, message, elapsed_time, screenshot_path)
+            force: 明确要求再次发布同一商品（忽略台账中已有的记录，本次的重试仍然去重）
             
         Returns:
             发布结果字典 {
@@ -288,17 +352,174 @@ class XianyuPublisher:
         """
         logger.info(f"📤 发布商品: {product['title']}")
         
+        # 台账按商品内容和账号（Cookie文件）去重，只记录真实发布
+        ledger = self.ledger if use_browser else None
+        fingerprint = content_fingerprint(product) if ledger else None
+        
+        async def verify() -> Optional[Dict[str, Any]]:
+            entry = await ledger.get(fingerprint, "xianyu", cookies_file)
+            if entry and entry["status"] == LEDGER_CONFIRMED:
+                return self._ledger_result(entry)
+            since = ledger_time(entry["created_at"]) if entry else None
+            found, _ = await self._check_published(product, cookies_file, since)
+            return found
+        
+        if ledger:
+            entry = await ledger.get(fingerprint, "xianyu", cookies_file)
+            verified = False
+            if entry and entry["status"] == LEDGER_IN_FLIGHT and not force:
+                # 上次提交结果未知：先到闲鱼核对（只认登记之后发布的商品），已发布则直接记为确认
+                found, verified = await self._check_published(
+                    product, cookies_file, ledger_time(entry["created_at"])
+                )
+                if found:
+                    await ledger.confirm(
+                        fingerprint, "xianyu", cookies_file, found.get("post_id"), found.get("post_url")
+                    )
+                    return found
+            
+            entry = await ledger.begin(fingerprint, "xianyu", cookies_file, verified=verified, force=force)
+            if entry and entry["status"] == LEDGER_CONFIRMED:
+                logger.info("   📒 该商品已发布过，跳过")
+                return self._ledger_result(entry)
+            if entry:
+                logger.warning("   ⚠️ 该商品上次提交结果未知（或正在其他任务中发布），跳过以免重复发布")
+                return {
+                    "success": False,
+                    "error": "上次提交结果未知且无法核对，跳过以免重复发布",
+                    "post_id": None,
+                    "post_url": None,
+                    "submitted": True,
+                    "uncertain": True
+                }
+        
+        async def relogin() -> bool:
+            # 让下一次尝试重新验证登录（浏览器池中立即用Cookie文件重新登录）
+            if self.browser_pool:
+                self.browser_pool.invalidate(cookies_file)
+                return await self.browser_pool.refresh_session(cookies_file)
+            if self.session_cache:
+                self.session_cache.invalidate(cookies_file)
+            return True
+        
         # 如果启用重试，使用重试处理器
         if enable_retry and use_browser:
-            return await self.retry_handler.retry_with_backoff(
+            result = await self.retry_handler.retry_with_backoff(
                 self._publish_product_impl,
                 product,
                 use_browser,
                 cookies_file,
-                progress_callback
+                progress_callback,
+                verify=verify if ledger else None,
+                relogin=relogin
             )
         else:
-            return await self._publish_product_impl(product, use_browser, cookies_file, progress_callback)
+            result = await self._publish_product_impl(product, use_browser, cookies_file, progress_callback)
+        
+        if ledger:
+            if result.get("success"):
+                await ledger.confirm(
+                    fingerprint, "xianyu", cookies_file, result.get("post_id"), result.get("post_url")
+                )
+            elif not result.get("submitted"):
+                # 未提交即失败，可以安全重试；已提交的保持in_flight，等待核对
+                await ledger.release(fingerprint, "xianyu", cookies_file, result.get("error"))
+        
+        return result
+    
+    async def find_published_product(
+        self,
+        product: Dict[str, Any],
+        cookies_file: str = "data/xianyu_cookies.json",
+        since: Optional[datetime] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        在闲鱼"我发布的"列表中查找商品（上次提交结果未知时核对是否已发布）
+        
+        标题和价格必须一致，提供since时只认此后发布的商品。
+        
+        Args:
+            product: 商品数据
+            cookies_file: Cookie文件路径
+            since: 本次发布的开始时间（本地时间，可选）
+            
+        Returns:
+            已发布时返回发布结果字典，未找到时返回None
+            
+        Raises:
+            Exception: 登录失败或页面打开失败（无法确认是否已发布）
+        """
+        from core.browser_automation import XianyuAutomation
+        
+        if self.browser_pool:
+            async with self.browser_pool.session(cookies_file, tracer=self.tracer) as automation:
+                return await self._find_with_automation(automation, product, cookies_file, since)
+        
+        automation = XianyuAutomation(
+            headless=self.headless,
+            interceptor=self.interceptor,
+            session_cache=self.session_cache,
+            tracer=self.tracer
+        )
+        try:
+            await automation.start()
+            return await self._find_with_automation(automation, product, cookies_file, since)
+        finally:
+            await automation.stop()
+    
+    async def _find_with_automation(
+        self,
+        automation,
+        product: Dict[str, Any],
+        cookies_file: str,
+        since: Optional[datetime] = None
+    ) -> Optional[Dict[str, Any]]:
+        """使用已启动的浏览器登录并查找已发布的商品"""
+        if not await automation.login(cookies_file):
+            raise Exception("登录失败")
+        return await automation.find_published_item(
+            product.get("title", ""), price=product.get("price"), since=since
+        )
+    
+    async def _check_published(
+        self,
+        product: Dict[str, Any],
+        cookies_file: str,
+        since: Optional[datetime] = None
+    ) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        核对商品是否已发布（查询出错时视为无法核对）
+        
+        Args:
+            product: 商品数据
+            cookies_file: Cookie文件路径
+            since: 本次发布的开始时间（本地时间，可选）
+        
+        Returns:
+            (已发布时的结果, 是否核对成功)
+        """
+        try:
+            found = await self.find_published_product(product, cookies_file, since)
+        except PublishCancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"   ⚠️ 核对发布状态失败: {e}")
+            return None, False
+        
+        if found:
+            logger.info("   🔍 核对确认该商品已发布，不再重复提交")
+        return found, True
+    
+    @staticmethod
+    def _ledger_result(entry: Dict[str, Any]) -> Dict[str, Any]:
+        """根据台账记录生成发布结果"""
+        return {
+            "success": True,
+            "error": None,
+            "post_id": entry.get("post_id"),
+            "post_url": entry.get("post_url"),
+            "from_ledger": True
+        }
     
     async def _publish_product_impl(
         self, 
@@ -336,38 +557,31 @@ class XianyuPublisher:
             # 导入浏览器自动化
             from core.browser_automation import XianyuAutomation
             
+            if self.browser_pool:
+                # 复用浏览器池中已启动的浏览器和已登录的上下文
+                async with self.browser_pool.session(
+                    cookies_file, progress_callback=progress_callback, tracer=self.tracer
+                ) as automation:
+                    result = await self._publish_with_automation(automation, product, cookies_file)
+                    # 失败后页面状态不确定，归还时重建页面
+                    automation.needs_recycle = not result["success"]
+                    return result
+            
             # 创建浏览器实例（传递进度回调）
-            automation = XianyuAutomation(headless=False, progress_callback=progress_callback)
+            automation = XianyuAutomation(
+                headless=self.headless,
+                progress_callback=progress_callback,
+                interceptor=self.interceptor,
+                session_cache=self.session_cache,
+                tracer=self.tracer
+            )
             
             try:
                 # 启动浏览器
                 logger.info("   🌐 启动浏览器...")
                 await automation.start()
                 
-                # 登录
-                logger.info("   🔐 检查登录状态...")
-                login_success = await automation.login(cookies_file)
-                
-                if not login_success:
-                    raise Exception("登录失败")
-                
-                # 发布商品
-                result = await automation.publish_product(
-                    title=product.get("title", ""),
-                    price=product.get("price", 0),
-                    description=product.get("description", ""),
-                    images=product.get("images", []),
-                    category=product.get("category", "二手闲置")
-                )
-                
-                if result["success"]:
-                    logger.info(f"✅ 发布成功！")
-                    logger.info(f"   商品ID: {result.get('post_id', '未知')}")
-                    logger.info(f"   商品URL: {result.get('post_url', '未知')}")
-                else:
-                    logger.error(f"❌ 发布失败: {result.get('error', '未知错误')}")
-                
-                return result
+                return await self._publish_with_automation(automation, product, cookies_file)
             
             finally:
                 # 关闭浏览器
@@ -384,6 +598,9 @@ class XianyuPublisher:
                 "post_url": None
             }
         
+        except PublishCancelledError:
+            raise
+        
         except Exception as e:
             error_msg = str(e)
             logger.error(f"❌ 发布失败: {error_msg}")
@@ -394,31 +611,88 @@ class XianyuPublisher:
                 "post_url": None
             }
     
+    async def _publish_with_automation(
+        self,
+        automation,
+        product: Dict[str, Any],
+        cookies_file: str
+    ) -> Dict[str, Any]:
+        """
+        使用已启动的浏览器登录并发布商品
+        
+        Args:
+            automation: XianyuAutomation实例
+            product: 商品数据
+            cookies_file: Cookie文件路径
+            
+        Returns:
+            发布结果
+        """
+        # 登录（浏览器池中已登录的上下文直接跳过）
+        logger.info("   🔐 检查登录状态...")
+        login_success = await automation.login(cookies_file)
+        
+        if not login_success:
+            raise Exception("登录失败")
+        
+        await checkpoint()
+        
+        # 上传压缩后的图片（批量发布时已提前提交处理）
+        images = product.get("images", [])[:9]
+        if images and self.image_pipeline:
+            images = await self.image_pipeline.prepare(images)
+        
+        # 发布商品
+        result = await automation.publish_product(
+            title=product.get("title", ""),
+            price=product.get("price", 0),
+            description=product.get("description", ""),
+            images=images,
+            category=product.get("category", "二手闲置")
+        )
+        
+        if result["success"]:
+            logger.info(f"✅ 发布成功！")
+            logger.info(f"   商品ID: {result.get('post_id', '未知')}")
+            logger.info(f"   商品URL: {result.get('post_url', '未知')}")
+        else:
+            logger.error(f"❌ 发布失败: {result.get('error', '未知错误')}")
+        
+        return result
+    
     async def batch_publish(
         self,
         products: List[Dict[str, Any]],
         optimize: bool = True,
         use_browser: bool = True,
         cookies_file: str = "data/xianyu_cookies.json",
-        progress_callback: Optional[Callable[[float, str, str], None]] = None
+        progress_callback: Optional[Callable[[float, str, str], None]] = None,
+        pipeline_depth: int = 2
     ) -> Dict[str, Any]:
         """
         批量发布商品
         
+        需要AI优化时，优化和发布流水线执行：发布第N个商品的同时优化第N+1个。
+        已优化、等待发布的商品最多pipeline_depth个，发布较慢时优化会暂停等待。
+        
         Args:
             products: 商品列表
             optimize: 是否先进行AI优化
             use_browser: 是否使用真实浏览器发布
             cookies_file: Cookie文件路径
-            progress_callback: 进度回调 (progress, status, current_title)
+            progress_callback: 进度回调 (progress, status, current_title)，
+                               status为"优化中"/"发布中"/"发布失败"，优化和发布各占50%
+            pipeline_depth: 等待发布的已优化商品数上限
             
         Returns:
             发布结果统计 {
                 "total": int,
                 "success": int,
                 "failed": int,
+                "optimized": int,        # 已优化的商品数（optimize=True时）
                 "errors": list,
-                "published_items": list  # 成功发布的商品信息
+                "published_items": list, # 成功发布的商品信息
+                "retry_stats": dict      # 重试统计（RetryHandler.get_stats()，含批次预算使用情况）
             }
         """
         logger.info(f"🚀 开始批量发布 {len(products)} 个商品")
@@ -432,22 +706,287 @@ class XianyuPublisher:
             "published_items": []
         }
         
-        # 1. AI优化（如果需要）
         if optimize:
-            logger.info("📝 第一步：AI优化商品信息...")
+            results["optimized"] = 0
+            logger.info(f"📝 AI优化与发布流水线执行（缓冲 {pipeline_depth} 个商品）...")
+        else:
+            logger.info("📤 发布商品到闲鱼...")
+        
+        # 整个批次共用一个浏览器和已登录的上下文
+        own_pool = use_browser and self.browser_pool is None
+        if own_pool:
+            self.browser_pool = BrowserPool(
+                headless=self.headless,
+                page_max_uses=self.page_max_uses,
+                interceptor=self.interceptor,
+                session_cache=self.session_cache
+            )
+            self.browser_pool.start_refresher()
+        
+        # 图片在进程池中与优化、发布并行处理
+        if use_browser:
+            self._prefetch_images(products)
+        
+        # 整个批次共用重试预算，系统性故障时不会让每个商品都重试到上限
+        self.retry_handler.budget = RetryBudget.for_batch(len(products))
+        
+        try:
+            if optimize:
+                await self._optimize_and_publish(
+                    products, use_browser, cookies_file, progress_callback, results, pipeline_depth
+                )
+            else:
+                await self._publish_products(products, use_browser, cookies_file, optimize, progress_callback, results)
+        finally:
+            if own_pool:
+                logger.info(f"   🔒 关闭浏览器池 {self.browser_pool.get_stats()}")
+                if self.session_cache:
+                    logger.info(f"   🔑 登录会话 {self.session_cache.get_stats()}")
+                if self.interceptor:
+                    logger.info(f"   🚫 请求拦截 {self.interceptor.get_stats()}")
+                logger.info(f"   🧭 步骤追踪 {self.tracer.get_stats()}")
+                if self.image_pipeline:
+                    logger.info(f"   🖼️ 图片预处理 {self.image_pipeline.get_stats()}")
+                await self.browser_pool.close()
+                self.browser_pool = None
+            results["retry_stats"] = self.retry_handler.get_stats()
+            logger.info(f"   🔁 重试统计 {results['retry_stats']}")
+            self.retry_handler.budget = None
+        
+        logger.info(f"✅ 批量发布完成！成功 {results['success']}/{results['total']}")
+        
+        if results['errors']:
+            logger.info(f"⚠️  失败详情:")
+            for error in results['errors'][:5]:  # 只显示前5个错误
+                logger.info(f"   - {error}")
+        
+        return results
+    
+    def _prefetch_images(self, products: List[Dict[str, Any]]):
+        """提前提交所有商品的图片预处理"""
+        if not self.image_pipeline:
+            return
+        for product in products:
+            self.image_pipeline.prefetch(product.get("images", [])[:9])
+    
+    async def _optimize_and_publish(
+        self,
+        products: List[Dict[str, Any]],
+        use_browser: bool,
+        cookies_file: str,
+        progress_callback: Optional[Callable[[float, str, str], None]],
+        results: Dict[str, Any],
+        pipeline_depth: int
+    ):
+        """
+        优化和发布流水线
+        
+        优化协程把优化好的商品放入有界队列，发布协程依次取出发布；
+        队列满时优化协程等待（反压），发布协程出错退出时优化协程随之取消。
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, pipeline_depth))
+        done = object()     # 结束标记
+        total = len(products)
+        
+        async def produce():
+            try:
+                for idx, product in enumerate(products):
+                    if idx > 0:
+                        await asyncio.sleep(self.optimize_interval)
+                    
+                    try:
+                        optimized = await self.optimize_product(product)
+                    except PublishCancelledError:
+                        raise
+                    except Exception as e:
+                        logger.error(f"❌ 优化失败: {product['title']} - {e}")
+                        optimized = product
+                    
+                    results["optimized"] += 1
+                    if progress_callback:
+                        progress = (results["optimized"] + results["success"] + results["failed"]) / total * 50
+                        progress_callback(progress, "优化中", product["title"])
+                    
+                    await queue.put(optimized)
+            except Exception:
+                # 优化出错时让发布协程处理完已优化的商品后结束
+                await queue.put(done)
+                raise
+            await queue.put(done)
+        
+        producer = asyncio.ensure_future(produce())
+        try:
+            while True:
+                product = await queue.get()
+                if product is done:
+                    break
+                await self._publish_products([product], use_browser, cookies_file, True, progress_callback, results)
             
+            # 传出优化协程的异常
+            await producer
+        finally:
+            if not producer.done():
+                producer.cancel()
+                try:
+                    await producer
+                except (asyncio.CancelledError, Exception):
+                    pass
+    
+    async def batch_publish_accounts(
+        self,
+        products: List[Dict[str, Any]],
+        accounts: Optional[List[AccountProfile]] = None,
+        optimize: bool = True,
+        max_parallel: int = 3,
+        progress_callback: Optional[Callable[[float, str, str], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        多账号并行发布
+        
+        商品按 product["account"]（账号名称）分配，未指定的轮流分配给各账号。
+        每个账号使用独立的浏览器上下文（Cookie、代理相互隔离），账号内按顺序发布，
+        发布间隔由各账号自己的限速规则控制；所有账号共用一个浏览器，同时发布的账号数不超过max_parallel。
+        
+        Args:
+            products: 商品列表
+            accounts: 账号列表（默认读取 config/xianyu_accounts.json）
+            optimize: 是否先进行AI优化
+            max_parallel: 同时发布的账号数上限
+            progress_callback: 进度回调 (progress, status, current_title)
+            
+        Returns:
+            发布结果统计（同batch_publish），另含 "accounts": {账号名称: {"total", "success", "failed"}}
+        """
+        accounts = [a for a in (accounts or load_account_profiles()) if a.enabled]
+        if not accounts:
+            raise ValueError("没有可用的闲鱼账号")
+        
+        logger.info(f"🚀 开始多账号发布 {len(products)} 个商品，{len(accounts)} 个账号，并发 {max_parallel}")
+        
+        results = {
+            "total": len(products),
+            "success": 0,
+            "failed": 0,
+            "errors": [],
+            "published_items": [],
+            "accounts": {}
+        }
+        
+        # 优化期间先在进程池中处理图片
+        self._prefetch_images(products)
+        
+        # 所有账号共用一个批次重试预算
+        self.retry_handler.budget = RetryBudget.for_batch(len(products))
+        
+        if optimize:
             def opt_progress(prog, title):
                 if progress_callback:
                     progress_callback(prog * 0.5, "优化中", title)
             
             products = await self.batch_optimize(products, opt_progress)
         
-        # 2. 发布商品
-        logger.info("📤 第二步：发布商品到闲鱼...")
+        # 分配商品
+        by_name = {account.name: account for account in accounts}
+        assignments: Dict[str, List[Dict[str, Any]]] = {account.name: [] for account in accounts}
+        next_idx = 0
+        for product in products:
+            name = product.get("account")
+            if name not in by_name:
+                if name:
+                    logger.warning(f"⚠️ 未知账号 {name}，改为轮流分配: {product.get('title', '')}")
+                name = accounts[next_idx % len(accounts)].name
+                next_idx += 1
+            assignments[name].append(product)
         
-        total = len(products)
-        for idx, product in enumerate(products):
+        own_pool = self.browser_pool is None
+        if own_pool:
+            self.browser_pool = BrowserPool(
+                headless=self.headless,
+                page_max_uses=self.page_max_uses,
+                interceptor=self.interceptor,
+                max_sessions=max_parallel,
+                session_cache=self.session_cache
+            )
+            self.browser_pool.start_refresher()
+        for account in accounts:
+            self.browser_pool.register_account(account.cookies_file, **account.context_options)
+        self._apply_account_rules(accounts)
+        
+        async def run_account(account: AccountProfile):
+            account_products = assignments[account.name]
+            account_results = {"total": len(account_products), "success": 0, "failed": 0}
+            results["accounts"][account.name] = account_results
+            if account_products:
+                logger.info(f"   👤 {account.name}: {len(account_products)} 个商品")
+                await self._publish_products(
+                    account_products, True, account.cookies_file, optimize,
+                    progress_callback, results, account_results
+                )
+        
+        try:
+            await asyncio.gather(*(run_account(account) for account in accounts))
+        finally:
+            if own_pool:
+                logger.info(f"   🔒 关闭浏览器池 {self.browser_pool.get_stats()}")
+                if self.session_cache:
+                    logger.info(f"   🔑 登录会话 {self.session_cache.get_stats()}")
+                if self.image_pipeline:
+                    logger.info(f"   🖼️ 图片预处理 {self.image_pipeline.get_stats()}")
+                await self.browser_pool.close()
+                self.browser_pool = None
+            results["retry_stats"] = self.retry_handler.get_stats()
+            logger.info(f"   🔁 重试统计 {results['retry_stats']}")
+            self.retry_handler.budget = None
+        
+        logger.info(f"✅ 多账号发布完成！成功 {results['success']}/{results['total']}")
+        for name, stats in results["accounts"].items():
+            logger.info(f"   - {name}: {stats['success']}/{stats['total']}")
+        
+        return results
+    
+    def _apply_account_rules(self, accounts: List[AccountProfile]):
+        """
+        应用账号的发布间隔设置
+        
+        只在间隔与当前规则不同时重新配置（调度器会保留已用掉的每日额度），
+        多次批量发布不会重置账号的每日上限。
+        """
+        for account in accounts:
+            if account.min_interval is None:
+                continue
+            rule = self.rate_limiter.get_rule("xianyu", account.cookies_file)
+            if rule.min_interval != account.min_interval:
+                self.rate_limiter.configure(
+                    "xianyu", replace(rule, min_interval=account.min_interval), account=account.cookies_file
+                )
+    
+    async def _publish_products(
+        self,
+        products: List[Dict[str, Any]],
+        use_browser: bool,
+        cookies_file: str,
+        optimize: bool,
+        progress_callback: Optional[Callable[[float, str, str], None]],
+        results: Dict[str, Any],
+        account_results: Optional[Dict[str, int]] = None
+    ):
+        """
+        依次发布商品并汇总到results
+        
+        多账号并行时各账号共用results（进度按全部账号已完成的数量计算），
+        account_results另外记录该账号的统计。
+        """
+        def count(key: str):
+            results[key] += 1
+            if account_results is not None:
+                account_results[key] += 1
+        
+        for product in products:
             try:
+                # 等待发布时间槽（按Cookie文件区分账号；模拟发布不限速）
+                if use_browser:
+                    await self.rate_limiter.acquire("xianyu", cookies_file)
+                
                 # 发布商品
                 result = await self.publish_product(
                     product, 
@@ -456,44 +995,116 @@ class XianyuPublisher:
                 )
                 
                 if result["success"]:
-                    results["success"] += 1
+                    count("success")
                     results["published_items"].append({
                         "title": product["title"],
                         "post_id": result.get("post_id"),
-                        "post_url": result.get("post_url")
+                        "post_url": result.get("post_url"),
+                        "account": cookies_file
                     })
+                    if self.dead_letters and "dead_letter_id" in product:
+                        await self.dead_letters.resolve(self._dead_letter_payload(product), "xianyu", cookies_file)
                 else:
-                    results["failed"] += 1
+                    count("failed")
                     error_msg = f"{product.get('title', '未知')}: {result.get('error', '未知错误')}"
                     results["errors"].append(error_msg)
+                    if use_browser:
+                        await self._dead_letter(product, cookies_file, result.get("error"), bool(result.get("uncertain")))
                 
-                # 更新进度
+                # 更新进度（流水线执行时优化和发布各占50%）
+                done = (results["success"] + results["failed"]) / results["total"]
                 if optimize:
-                    progress = 50 + (idx + 1) / total * 50
+                    progress = results.get("optimized", results["total"]) / results["total"] * 50 + done * 50
                 else:
-                    progress = (idx + 1) / total * 100
+                    progress = done * 100
                 
                 if progress_callback:
                     status = "发布中" if result["success"] else "发布失败"
                     progress_callback(progress, status, product["title"])
                 
-                # 延迟（遵守闲鱼发布间隔，真实发布时需要更长间隔）
-                delay = 5 if use_browser else 2
-                await asyncio.sleep(delay)
-                
             except Exception as e:
-                results["failed"] += 1
+                count("failed")
                 error_msg = f"{product.get('title', '未知')}: {str(e)}"
                 results["errors"].append(error_msg)
                 logger.error(f"❌ 发布失败: {error_msg}")
+                if use_browser and not isinstance(e, PublishCancelledError):
+                    await self._dead_letter(product, cookies_file, str(e))
+    
+    @staticmethod
+    def _dead_letter_payload(product: Dict[str, Any]) -> Dict[str, Any]:
+        """保存到死信队列的商品数据（去掉重新投递时附加的字段）"""
+        return {k: v for k, v in product.items() if k != "dead_letter_id"}
+    
+    async def _dead_letter(self, product: Dict[str, Any], cookies_file: str, error: Optional[str], held: bool = False):
+        """最终失败的商品写入死信队列（写入失败不影响批次）"""
+        if not self.dead_letters:
+            return
         
-        logger.info(f"✅ 批量发布完成！成功 {results['success']}/{results['total']}")
+        try:
+            await self.dead_letters.add(
+                self._dead_letter_payload(product),
+                error,
+                "xianyu",
+                account=cookies_file,
+                category=ErrorClassifier.get_error_category(error or ""),
+                held=held
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ 写入死信队列失败: {e}")
+    
+    async def redrive_dead_letters(
+        self,
+        limit: int = 50,
+        ids: Optional[List[int]] = None,
+        categories: Optional[List[str]] = None,
+        progress_callback: Optional[Callable[[float, str, str], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        批量重新投递死信队列中的商品
         
-        if results['errors']:
-            logger.info(f"⚠️  失败详情:")
-            for error in results['errors'][:5]:  # 只显示前5个错误
-                logger.info(f"   - {error}")
+        按账号分组，每组走一次batch_publish（不再AI优化），共用浏览器池、频率限制、
+        重试预算和发布台账；成功的记录标记为recovered，再次失败的回到待投递（超过次数后放弃）。
+        
+        Args:
+            limit: 最多投递数量
+            ids: 指定记录（可选，可投递需人工核对的held记录）
+            categories: 只投递这些错误类别（可选）
+            progress_callback: 进度回调 (progress, status, current_title)
+            
+        Returns:
+            发布结果统计 {"total", "success", "failed", "errors", "published_items"}
+        """
+        if not self.dead_letters:
+            raise ValueError("未配置死信队列")
+        
+        entries = await self.dead_letters.claim("xianyu", ids=ids, limit=limit, categories=categories)
+        results = {"total": len(entries), "success": 0, "failed": 0, "errors": [], "published_items": []}
+        if not entries:
+            logger.info("📮 死信队列中没有待投递的商品")
+            return results
+        
+        logger.info(f"📮 重新投递 {len(entries)} 个失败商品")
+        
+        by_account: Dict[str, List[Dict[str, Any]]] = {}
+        for entry in entries:
+            by_account.setdefault(entry["account"], []).append({**entry["payload"], "dead_letter_id": entry["id"]})
+        
+        try:
+            for account, products in by_account.items():
+                account_results = await self.batch_publish(
+                    products,
+                    optimize=False,
+                    use_browser=True,
+                    cookies_file=account,
+                    progress_callback=progress_callback
+                )
+                for key in ("success", "failed", "errors", "published_items"):
+                    results[key] += account_results[key]
+        finally:
+            # 未执行到的记录（如批次被取消）放回待投递
+            await self.dead_letters.release([entry["id"] for entry in entries])
         
+        logger.info(f"✅ 死信重新投递完成！成功 {results['success']}/{results['total']}")
         return results
 
 
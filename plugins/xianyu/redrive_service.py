@@ -0,0 +1,129 @@
+"""
+闲鱼死信自动重新投递服务
+
+程序启动时在独立线程的事件循环中运行DeadLetterScheduler（UI主线程不能运行事件循环），
+低峰时段自动重新投递发布失败的商品；程序退出时stop()。
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Optional, Tuple
+
+from core.dead_letter import DeadLetterQueue, DeadLetterScheduler
+from core.http_client import close_event_loop
+from core.publish_ledger import PublishLedger
+
+logger = logging.getLogger(__name__)
+
+
+def _default_publisher(ledger: PublishLedger, dead_letters: DeadLetterQueue):
+    """无人值守投递使用无头浏览器"""
+    from plugins.xianyu.publisher import XianyuPublisher
+    return XianyuPublisher(ledger=ledger, dead_letters=dead_letters, headless=True)
+
+
+class DeadLetterRedriveService:
+    """闲鱼死信自动重新投递服务"""
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        off_peak_hours: Tuple[int, int] = (2, 6),
+        interval: float = 600.0,
+        batch_size: int = 50,
+        publisher_factory: Callable[[PublishLedger, DeadLetterQueue], Any] = _default_publisher
+    ):
+        """
+        初始化服务
+
+        Args:
+            db_path: 数据库文件路径（可选，默认使用主数据库）
+            off_peak_hours: 低峰时段 [开始, 结束) 的小时
+            interval: 检查间隔(秒)
+            batch_size: 每次最多投递数量
+            publisher_factory: 创建发布器 (台账, 死信队列) -> 带redrive_dead_letters()的发布器
+        """
+        self.db_path = db_path
+        self.off_peak_hours = off_peak_hours
+        self.interval = interval
+        self.batch_size = batch_size
+        self.publisher_factory = publisher_factory
+
+        self.scheduler: Optional[DeadLetterScheduler] = None
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop_event: Optional[asyncio.Event] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """在后台线程启动（已启动时直接返回）"""
+        if self.running:
+            return
+
+        ready = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run_thread, args=(ready,), name="dead-letter-redrive", daemon=True
+        )
+        self._thread.start()
+        ready.wait(10.0)
+        logger.info(f"📮 死信自动重新投递已启动（低峰时段 {self.off_peak_hours[0]}-{self.off_peak_hours[1]} 点）")
+
+    def stop(self, timeout: float = 10.0):
+        """
+        停止服务（正在进行的投递会被取消，未执行的记录放回待投递）
+
+        Args:
+            timeout: 等待后台线程退出的时间(秒)
+        """
+        if not self.running:
+            return
+
+        loop, event = self._loop, self._stop_event
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:
+            # 事件循环已关闭
+            pass
+        self._thread.join(timeout)
+        logger.info("📮 死信自动重新投递已停止")
+
+    def _run_thread(self, ready: threading.Event):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._stop_event = asyncio.Event()
+
+        try:
+            loop.run_until_complete(self._serve(ready))
+        except Exception as e:
+            logger.error(f"❌ 死信自动重新投递服务异常退出: {e}")
+        finally:
+            ready.set()
+            close_event_loop(loop)
+
+    async def _serve(self, ready: threading.Event):
+        """运行调度器直到stop()"""
+        ledger = PublishLedger(self.db_path)
+        dead_letters = DeadLetterQueue(self.db_path)
+
+        try:
+            publisher = self.publisher_factory(ledger, dead_letters)
+            self.scheduler = DeadLetterScheduler(
+                dead_letters,
+                lambda limit: publisher.redrive_dead_letters(limit=limit),
+                off_peak_hours=self.off_peak_hours,
+                interval=self.interval,
+                batch_size=self.batch_size
+            )
+            self.scheduler.start()
+            ready.set()
+            await self._stop_event.wait()
+        finally:
+            if self.scheduler:
+                await self.scheduler.stop()
+            await dead_letters.close()
+            await ledger.close()
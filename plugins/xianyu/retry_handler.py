@@ -6,20 +6,95 @@
 
 import asyncio
 import logging
-from typing import Dict, Any, Callable, Optional
+import math
+import random
+import threading
+from enum import Enum
+from typing import Dict, Any, Callable, Optional, Awaitable
 from datetime import datetime
 
+from core.cancellation import PublishCancelledError, checkpoint
+
 logger = logging.getLogger(__name__)
 
 
+class RetryAction(Enum):
+    """失败后的处理方式"""
+    FAIL_FAST = "fail_fast"     # 立即失败（重试也不会成功）
+    RETRY = "retry"             # 抖动退避后重试
+    RELOGIN = "relogin"         # 重新登录后立即重试
+
+
+class RetryBudget:
+    """
+    批次重试预算
+    
+    同一批次的所有商品共用，系统性故障（如网站宕机）时很快用完，
+    之后的失败不再重试，避免批次耗时成倍增加。线程安全。
+    """
+    
+    def __init__(self, max_retries: int):
+        """
+        Args:
+            max_retries: 整个批次允许的重试次数
+        """
+        self.max_retries = max_retries
+        self.used = 0
+        self.denied = 0
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def for_batch(cls, size: int, ratio: float = 0.2, minimum: int = 3) -> "RetryBudget":
+        """
+        按批次大小创建预算
+        
+        Args:
+            size: 商品数
+            ratio: 每个商品平均可用的重试次数
+            minimum: 最少重试次数（小批次）
+        """
+        return cls(max(minimum, math.ceil(size * ratio)))
+    
+    def try_acquire(self) -> bool:
+        """取一次重试机会（预算用完时返回False）"""
+        with self._lock:
+            if self.used >= self.max_retries:
+                self.denied += 1
+                return False
+            self.used += 1
+            return True
+    
+    @property
+    def remaining(self) -> int:
+        with self._lock:
+            return max(0, self.max_retries - self.used)
+    
+    def get_stats(self) -> Dict[str, int]:
+        """获取预算使用情况"""
+        with self._lock:
+            return {"max_retries": self.max_retries, "used": self.used, "denied": self.denied}
+
+
 class RetryHandler:
-    """发布重试处理器"""
+    """
+    发布重试处理器
+    
+    按错误类别决定处理方式（见ErrorClassifier.get_action）：
+    不可重试的错误立即失败，登录失效时重新登录后重试，其余错误抖动退避后重试。
+    设置budget后，每次重试都要先从批次预算中取得机会。
+    """
     
     def __init__(
         self, 
         max_retries: int = 3,
         retry_delay: float = 5.0,
-        backoff_multiplier: float = 2.0
+        backoff_multiplier: float = 2.0,
+        max_delay: float = 60.0,
+        jitter: float = 0.5,
+        category_actions: Optional[Dict[str, RetryAction]] = None,
+        max_relogins: int = 1,
+        budget: Optional[RetryBudget] = None,
+        rng: Optional[random.Random] = None
     ):
         """
         初始化重试处理器
@@ -28,85 +103,193 @@ class RetryHandler:
             max_retries: 最大重试次数
             retry_delay: 初始重试延迟（秒）
             backoff_multiplier: 延迟增长倍数
+            max_delay: 单次延迟上限（秒）
+            jitter: 抖动比例，实际延迟在 [延迟*(1-jitter), 延迟] 之间随机
+            category_actions: 按错误类别覆盖处理方式，如 {"页面结构变化": RetryAction.RETRY}
+            max_relogins: 单个商品最多重新登录次数
+            budget: 批次重试预算（可选）
+            rng: 随机数生成器（测试时可固定种子）
         """
         self.max_retries = max_retries
         self.retry_delay = retry_delay
         self.backoff_multiplier = backoff_multiplier
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.category_actions = category_actions or {}
+        self.max_relogins = max_relogins
+        self.budget = budget
+        self.rng = rng or random.Random()
+        
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Any] = {
+            "calls": 0,                 # 调用次数（商品数）
+            "attempts": 0,              # 执行次数
+            "retries": 0,               # 重试次数
+            "recovered": 0,             # 重试后成功
+            "fail_fast": 0,             # 不可重试，立即失败
+            "relogins": 0,              # 重新登录次数
+            "budget_exhausted": 0,      # 因预算用完放弃重试
+            "delay_total": 0.0,         # 退避等待总时长(秒)
+            "categories": {},           # 各错误类别的失败次数
+        }
+    
+    def _count(self, key: str, value: float = 1):
+        with self._lock:
+            self.stats[key] += value
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取重试统计（设置了预算时包含预算使用情况）"""
+        with self._lock:
+            stats = {**self.stats, "categories": dict(self.stats["categories"])}
+        if self.budget:
+            stats["budget"] = self.budget.get_stats()
+        return stats
+    
+    def compute_delay(self, retry_index: int) -> float:
+        """
+        第retry_index次重试（从0开始）前的等待时间
+        
+        指数增长并封顶，再在 [delay*(1-jitter), delay] 内随机，
+        避免多个账号或批次同时失败后在同一时刻重试。
+        """
+        delay = min(self.max_delay, self.retry_delay * (self.backoff_multiplier ** retry_index))
+        return self.rng.uniform(delay * (1 - self.jitter), delay)
     
     async def retry_with_backoff(
         self,
         func: Callable,
         *args,
+        verify: Optional[Callable[[], Awaitable[Optional[Dict[str, Any]]]]] = None,
+        relogin: Optional[Callable[[], Awaitable[bool]]] = None,
         **kwargs
     ) -> Dict[str, Any]:
         """
-        带指数退避的重试机制
+        按错误类别重试
+        
+        结果中 submitted=True 表示内容已提交但未确认成功，此时重新执行可能重复发布：
+        先调用 verify 核对，核对为已发布则直接返回；无法确认时停止重试并标记 uncertain。
         
         Args:
             func: 要重试的异步函数
             *args: 函数参数
+            verify: 核对是否已发布的异步函数（返回成功结果或None）
+            relogin: 重新登录的异步函数（返回是否登录成功；未提供时登录失效按不可重试处理）
             **kwargs: 函数关键字参数
             
         Returns:
-            函数执行结果
+            函数执行结果（放弃重试时带 retry_action，预算用完时带 retry_budget_exhausted=True）
         """
-        last_error = None
-        delay = self.retry_delay
+        self._count("calls")
+        retries = 0
+        relogins = 0
         
         for attempt in range(self.max_retries + 1):
+            # 取消后不再重试，暂停时在此等待
+            await checkpoint()
+            
+            self._count("attempts")
+            raised = False
             try:
                 logger.info(f"  🔄 尝试 {attempt + 1}/{self.max_retries + 1}...")
-                
-                # 执行函数
                 result = await func(*args, **kwargs)
-                
-                # 检查结果
-                if isinstance(result, dict) and result.get("success"):
-                    if attempt > 0:
-                        logger.info(f"  ✅ 重试成功！")
-                    return result
-                else:
-                    # 发布失败但没有抛异常
-                    error_msg = result.get("error", "未知错误") if isinstance(result, dict) else "发布失败"
-                    logger.warning(f"  ⚠️  尝试 {attempt + 1} 失败: {error_msg}")
-                    
-                    if attempt < self.max_retries:
-                        logger.info(f"  ⏳ 等待 {delay:.1f}秒 后重试...")
-                        await asyncio.sleep(delay)
-                        delay *= self.backoff_multiplier
-                    else:
-                        logger.error(f"  ❌ 已达最大重试次数")
-                        return result
+            
+            except PublishCancelledError:
+                raise
             
             except Exception as e:
-                last_error = e
+                raised = True
                 logger.error(f"  ❌ 尝试 {attempt + 1} 异常: {str(e)}")
-                
-                if attempt < self.max_retries:
-                    logger.info(f"  ⏳ 等待 {delay:.1f}秒 后重试...")
-                    await asyncio.sleep(delay)
-                    delay *= self.backoff_multiplier
-                else:
-                    logger.error(f"  ❌ 已达最大重试次数")
-                    return {
-                        "success": False,
-                        "error": f"重试失败: {str(last_error)}",
-                        "post_id": None,
-                        "post_url": None
-                    }
-        
-        # 如果所有重试都失败
-        return {
-            "success": False,
-            "error": f"所有 {self.max_retries + 1} 次尝试均失败: {str(last_error)}",
-            "post_id": None,
-            "post_url": None
-        }
+                result = {
+                    "success": False,
+                    "error": str(e),
+                    "post_id": None,
+                    "post_url": None
+                }
+            
+            if isinstance(result, dict) and result.get("success"):
+                if attempt > 0:
+                    self._count("recovered")
+                    logger.info(f"  ✅ 重试成功！")
+                return result
+            
+            if not isinstance(result, dict):
+                result = {"success": False, "error": "发布失败", "post_id": None, "post_url": None}
+            
+            error_msg = result.get("error") or "未知错误"
+            if not raised:
+                logger.warning(f"  ⚠️  尝试 {attempt + 1} 失败: {error_msg}")
+            
+            # 已提交但结果未知：核对后再决定，避免重复发布
+            if result.get("submitted"):
+                verified = await verify() if verify else None
+                if verified and verified.get("success"):
+                    logger.info(f"  🔍 核对确认已发布，不再重试")
+                    return verified
+                logger.warning(f"  ⚠️  内容已提交但无法确认结果，停止重试以免重复发布")
+                return {**result, "uncertain": True}
+            
+            category = ErrorClassifier.get_error_category(error_msg)
+            action = ErrorClassifier.get_action(error_msg, self.category_actions)
+            with self._lock:
+                categories = self.stats["categories"]
+                categories[category] = categories.get(category, 0) + 1
+            
+            if action == RetryAction.RELOGIN and (relogin is None or relogins >= self.max_relogins):
+                action = RetryAction.FAIL_FAST
+            
+            if action == RetryAction.FAIL_FAST:
+                self._count("fail_fast")
+                logger.error(f"  ❌ {category}，不再重试")
+                return {**result, "retry_action": action.value}
+            
+            if attempt >= self.max_retries:
+                logger.error(f"  ❌ 已达最大重试次数")
+                if raised:
+                    result["error"] = f"重试失败: {error_msg}"
+                return result
+            
+            if self.budget and not self.budget.try_acquire():
+                self._count("budget_exhausted")
+                logger.error(f"  ❌ 本批次重试预算已用完，不再重试")
+                return {**result, "retry_budget_exhausted": True}
+            
+            self._count("retries")
+            
+            if action == RetryAction.RELOGIN:
+                relogins += 1
+                self._count("relogins")
+                logger.info(f"  🔑 登录已失效，重新登录后重试...")
+                if not await relogin():
+                    logger.error(f"  ❌ 重新登录失败")
+                    return {**result, "retry_action": action.value}
+                continue
+            
+            delay = self.compute_delay(retries)
+            retries += 1
+            self._count("delay_total", delay)
+            logger.info(f"  ⏳ 等待 {delay:.1f}秒 后重试...")
+            await asyncio.sleep(delay)
+        
+        return result
 
 
 class ErrorClassifier:
     """错误分类器 - 判断错误是否可重试"""
     
+    # 登录失效（重新登录后可以重试）
+    RELOGIN_ERRORS = [
+        "登录已失效",
+        "需要重新登录",
+        "Cookie已过期",
+    ]
+    
+    # 各错误类别的默认处理方式（未列出的类别抖动退避后重试）
+    CATEGORY_ACTIONS = {
+        "账号问题": RetryAction.FAIL_FAST,
+        "环境问题": RetryAction.FAIL_FAST,
+        "页面结构变化": RetryAction.FAIL_FAST,
+    }
+    
     # 不可重试的错误类型
     NON_RETRYABLE_ERRORS = [
         "登录失败",
@@ -157,7 +340,9 @@ class ErrorClassifier:
         
         error_lower = error.lower()
         
-        if "登录" in error_lower or "cookie" in error_lower:
+        if "封禁" in error_lower or "封号" in error_lower:
+            return "账号问题"
+        elif "登录" in error_lower or "cookie" in error_lower:
             return "认证问题"
         elif "网络" in error_lower or "timeout" in error_lower:
             return "网络问题"
@@ -167,6 +352,35 @@ class ErrorClassifier:
             return "页面结构变化"
         else:
             return "其他错误"
+    
+    @classmethod
+    def get_action(
+        cls,
+        error: str,
+        category_actions: Optional[Dict[str, RetryAction]] = None
+    ) -> RetryAction:
+        """
+        获取错误的处理方式
+        
+        Args:
+            error: 错误信息
+            category_actions: 按错误类别覆盖的处理方式
+            
+        Returns:
+            处理方式
+        """
+        category = cls.get_error_category(error)
+        if category_actions and category in category_actions:
+            return category_actions[category]
+        
+        error_lower = (error or "").lower()
+        if any(keyword.lower() in error_lower for keyword in cls.RELOGIN_ERRORS):
+            return RetryAction.RELOGIN
+        
+        if not cls.is_retryable(error):
+            return RetryAction.FAIL_FAST
+        
+        return cls.CATEGORY_ACTIONS.get(category, RetryAction.RETRY)
 
 
 # 使用示例
@@ -221,7 +435,8 @@ async def test_retry_handler():
     for error in test_errors:
         retryable = ErrorClassifier.is_retryable(error)
         category = ErrorClassifier.get_error_category(error)
-        print(f"  {error:30s} - 可重试: {retryable:5s} - 类别: {category}")
+        action = ErrorClassifier.get_action(error)
+        print(f"  {error:30s} - 可重试: {str(retryable):5s} - 类别: {category} - 处理: {action.value}")
     
     print("\n" + "="*60)
     print("✅ 测试完成")
@@ -17,6 +17,13 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 from core.database import Database
 
 
+# 历史列表用到的任务字段（不查询统计类字段）
+HISTORY_COLUMNS = [
+    "id", "type", "status", "progress", "data", "result", "error",
+    "created_at", "started_at", "completed_at",
+]
+
+
 class PublishHistoryPanel(ctk.CTkFrame):
     """发布历史管理面板"""
     
@@ -221,6 +228,15 @@ class PublishHistoryPanel(ctk.CTkFrame):
         )
         export_btn.pack(side="left", padx=5)
         
+        # 批量重新投递失败商品（死信队列）
+        redrive_btn = ctk.CTkButton(
+            btn_frame,
+            text="📮 重新投递失败商品",
+            command=self._redrive_dead_letters,
+            width=160
+        )
+        redrive_btn.pack(side="left", padx=5)
+        
         # 清空历史按钮
         clear_btn = ctk.CTkButton(
             btn_frame,
@@ -241,7 +257,8 @@ class PublishHistoryPanel(ctk.CTkFrame):
             
             # 构建查询条件
             filters = {
-                "type": "xianyu_publish"
+                "type": "xianyu_publish",
+                "columns": HISTORY_COLUMNS
             }
             
             # 时间筛选
@@ -356,12 +373,11 @@ class PublishHistoryPanel(ctk.CTkFrame):
         info_frame = ctk.CTkFrame(item_frame, fg_color="transparent")
         info_frame.pack(side="left", fill="both", expand=True, padx=10, pady=10)
         
-        # 从任务数据中提取商品标题
-        import json
-        try:
-            data = json.loads(task.get("data", "{}"))
+        # 从任务数据中提取商品标题（data在首次访问时解析）
+        data = task.get("data")
+        if isinstance(data, dict):
             title = data.get("product", {}).get("title", "未知商品")
-        except:
+        else:
             title = "未知商品"
         
         # 标题
@@ -383,8 +399,9 @@ class PublishHistoryPanel(ctk.CTkFrame):
             error = task.get("error", "未知错误")
             detail_text += f" | 错误: {error}"
         elif status == "completed":
-            result = json.loads(task.get("result", "{}"))
-            post_url = result.get("post_url", "")
+            # 只有成功记录才展示结果，失败记录不解析result
+            result = task.get("result")
+            post_url = result.get("post_url", "") if isinstance(result, dict) else ""
             if post_url:
                 detail_text += f" | URL: {post_url}"
         
@@ -456,10 +473,10 @@ class PublishHistoryPanel(ctk.CTkFrame):
             
             # 2. 创建发布器
             from plugins.xianyu.publisher import XianyuPublisher
-            from core.ai_engine import AIEngine
+            from core.publish_ledger import PublishLedger
             
-            ai_engine = AIEngine()
-            publisher = XianyuPublisher(ai_engine)
+            # 台账：上次实际已发布成功的商品不会被重复发布
+            publisher = XianyuPublisher(ledger=PublishLedger())
             
             # 3. 重新发布
             print(f"🔄 重试发布: {product.get('title')}")
@@ -493,6 +510,61 @@ class PublishHistoryPanel(ctk.CTkFrame):
             traceback.print_exc()
             self._show_message("重试失败", f"重试出错: {str(e)}", "error")
     
+    def _redrive_dead_letters(self):
+        """批量重新投递死信队列中的商品（后台线程执行）"""
+        
+        import threading
+        
+        def run_redrive():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            try:
+                loop.run_until_complete(self._async_redrive_dead_letters())
+            finally:
+                loop.close()
+        
+        threading.Thread(target=run_redrive, daemon=True).start()
+    
+    async def _async_redrive_dead_letters(self):
+        """异步批量重新投递"""
+        
+        from plugins.xianyu.publisher import XianyuPublisher
+        from core.publish_ledger import PublishLedger
+        from core.dead_letter import DeadLetterQueue, DLQ_PENDING
+        
+        ledger = PublishLedger()
+        dead_letters = DeadLetterQueue()
+        
+        try:
+            stats = await dead_letters.get_stats("xianyu")
+            pending = stats["by_status"].get(DLQ_PENDING, 0)
+            if not pending:
+                self._show_message("重新投递", "没有待重新投递的失败商品", "info")
+                return
+            
+            print(f"📮 重新投递 {pending} 个失败商品...")
+            
+            # 走正常的批量发布流程：浏览器池、频率限制、重试预算和台账去重
+            publisher = XianyuPublisher(ledger=ledger, dead_letters=dead_letters)
+            results = await publisher.redrive_dead_letters(limit=pending)
+            
+            categories = "、".join(f"{k} {v}" for k, v in stats["by_category"].items())
+            self._show_message(
+                "重新投递完成",
+                f"✅ 成功 {results['success']}/{results['total']}\n\n失败原因: {categories or '无'}",
+                "success" if results["failed"] == 0 else "error"
+            )
+            
+            self.after(100, lambda: self._schedule_async_task(self.load_history()))
+        
+        except Exception as e:
+            print(f"❌ 重新投递失败: {e}")
+            self._show_message("重新投递失败", f"重新投递出错: {str(e)}", "error")
+        
+        finally:
+            await dead_letters.close()
+            await ledger.close()
+    
     def _show_task_detail(self, task: Dict[str, Any]):
         """显示任务详情"""
         
@@ -617,6 +689,42 @@ class PublishHistoryPanel(ctk.CTkFrame):
         self.current_time_filter = filter_map.get(value, "7days")
         asyncio.create_task(self.load_history())
     
+    def _schedule_async_task(self, coro):
+        """在主线程调度协程（没有运行中的事件循环时在后台线程执行）"""
+        
+        try:
+            asyncio.get_running_loop().create_task(coro)
+        except RuntimeError:
+            import threading
+            threading.Thread(target=asyncio.run, args=(coro,), daemon=True).start()
+    
+    def _show_message(self, title: str, message: str, msg_type: str = "info"):
+        """显示消息对话框（可在后台线程调用）"""
+        
+        def show():
+            dialog = ctk.CTkToplevel(self)
+            dialog.title(title)
+            dialog.geometry("400x200")
+            
+            icons = {
+                "info": "ℹ️",
+                "success": "✅",
+                "error": "❌",
+                "warning": "⚠️"
+            }
+            
+            label = ctk.CTkLabel(
+                dialog,
+                text=f"{icons.get(msg_type, 'ℹ️')} {message}",
+                font=ctk.CTkFont(size=14),
+                wraplength=350
+            )
+            label.pack(expand=True, padx=20)
+            
+            ctk.CTkButton(dialog, text="确定", command=dialog.destroy).pack(pady=20)
+        
+        self.after(0, show)
+    
     def _export_report(self):
         """导出Excel报告"""
         
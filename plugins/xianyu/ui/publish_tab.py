@@ -22,6 +22,9 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 from plugins.xianyu.data_importer import DataImporter
 from plugins.xianyu.publisher import XianyuPublisher
 from core.database import Database
+from core.publish_ledger import PublishLedger
+from core.dead_letter import DeadLetterQueue
+from core.step_tracer import StepTimingStore
 from core.browser_automation import XianyuAutomation
 
 
@@ -133,7 +136,11 @@ class XianyuPublishTab(ctk.CTkScrollableFrame):
         self.products: List[Dict[str, Any]] = []
         self.product_cards: List[ProductCard] = []
         self.importer = DataImporter()
-        self.publisher = XianyuPublisher()
+        self.publisher = XianyuPublisher(
+            ledger=PublishLedger(),
+            timing_store=StepTimingStore(),
+            dead_letters=DeadLetterQueue()
+        )
         self.db = Database()
         
         # 发布配置
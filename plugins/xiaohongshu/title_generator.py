@@ -6,13 +6,17 @@ Version: 1.0.0
 
 import sys
 import os
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from enum import Enum
 
+import numpy as np
+
 # 添加项目根目录到路径
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 from core.ai_engine import AIEngine, TaskComplexity
+from core.keyword_matcher import KeywordMatcher
+from core.title_candidates import TitleCandidateEngine, match_counts, select_top, title_lengths
 
 
 class TitleStyle(Enum):
@@ -91,6 +95,23 @@ class XiaohongshuTitleGenerator:
         TitleStyle.JINGYAN: ["⚠️", "❌", "⛔", "🚫", "💢"],
     }
     
+    # 模板变量取值（brand、wrong_way等与内容相关的变量需要调用方提供，否则跳过对应模板）
+    TEMPLATE_WORDS = {
+        "emotion": ["🥰", "😍", "🤩"],
+        "days": ["3", "7", "14", "30"],
+        "result": ["爱不释手", "彻底种草", "直接回购"],
+        "action": ["选对", "用好", "搞定"],
+        "point": ["3", "5", "7"],
+        "time": ["一周", "一个月", "半年"],
+        "price": ["50元", "100元", "300元"],
+    }
+    
+    # 评分用的口语/情绪词
+    HOOK_WORDS = [
+        "绝了", "爱了", "上头", "真香", "宝藏", "姐妹们", "必看", "建议收藏",
+        "手把手", "保姆级", "实测", "避坑", "千万别", "终于",
+    ]
+    
     def __init__(self, ai_engine: Optional[AIEngine] = None):
         """
         初始化标题生成器
@@ -99,6 +120,9 @@ class XiaohongshuTitleGenerator:
             ai_engine: AI引擎实例，如果不提供则创建新实例
         """
         self.ai_engine = ai_engine or AIEngine()
+        self.candidates = TitleCandidateEngine(
+            {style.value: templates for style, templates in self.TITLE_TEMPLATES.items()}
+        )
     
     async def generate_title(
         self,
@@ -223,23 +247,122 @@ class XiaohongshuTitleGenerator:
         Returns:
             标题列表
         """
-        titles = []
+        # 模板标题一次批量生成（评分最高的前几个），AI标题逐个生成，两者交替排列
+        template_titles = [
+            item["title"]
+            for item in self.generate_candidates(
+                topic, keywords, styles=[style], count=200, top_k=(count + 1) // 2
+            )
+        ]
         
+        titles = []
         for i in range(count):
-            # 混合使用模板和AI
-            use_template = (i % 2 == 0)  # 交替使用
+            # 交替使用（模板候选不够时用AI补足）
+            if i % 2 == 0 and template_titles:
+                titles.append(template_titles.pop(0))
+                continue
             
             title = await self.generate_title(
                 topic=topic,
                 keywords=keywords,
-                style=style,
-                use_template=use_template
+                style=style
             )
-            
             titles.append(title)
         
         return titles
     
+    def generate_candidates(
+        self,
+        topic: str,
+        keywords: List[str],
+        styles: Optional[List[TitleStyle]] = None,
+        count: int = 1000,
+        top_k: int = 20,
+        seed: Optional[int] = None,
+        variables: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        批量生成候选标题（只用模板，不调用AI），供A/B测试选题
+        
+        Args:
+            topic: 笔记主题
+            keywords: 关键词列表
+            styles: 标题风格（默认全部）
+            count: 展开的候选数
+            top_k: 返回数量
+            seed: 随机种子（相同种子得到相同结果）
+            variables: 额外的模板变量取值（如 {"brand": [...], "brand2": [...]}）
+            
+        Returns:
+            评分最高的标题列表，每个包含 title、score、length、style
+        """
+        styles = styles or list(self.TITLE_TEMPLATES)
+        template_variables = {
+            **self.TEMPLATE_WORDS,
+            "keyword": keywords[:3] or [topic],
+            "adj": self.ADJECTIVES["好"],
+            "emoji": [emoji for style in styles for emoji in self.EMOJI_COMBOS[style]],
+            **(variables or {}),
+        }
+        
+        candidates = self.candidates.expand(
+            template_variables,
+            count=count,
+            styles=[style.value for style in styles],
+            seed=seed
+        )
+        titles = [candidate.title for candidate in candidates]
+        scores = self._score_titles(titles, keywords)
+        
+        return [
+            {
+                "title": titles[index],
+                "score": float(scores[index]),
+                "length": len(titles[index]),
+                "style": candidates[index].style
+            }
+            for index in select_top(titles, scores, top_k)
+        ]
+    
+    def _score_titles(self, titles: List[str], keywords: List[str]) -> np.ndarray:
+        """
+        批量评估标题质量
+        
+        评分维度：
+        - 长度合理性 (25分)：15-20字最佳
+        - 关键词包含 (30分)
+        - emoji (15分)
+        - 口语/情绪词 (30分)
+        
+        Returns:
+            每个标题的分数（0-100分）
+        """
+        if not titles:
+            return np.zeros(0)
+        
+        keyword_groups = {f"关键词{i}": [kw] for i, kw in enumerate(keywords)}
+        matcher = KeywordMatcher({**keyword_groups, "口语": self.HOOK_WORDS})
+        counts = match_counts(matcher, titles)
+        keyword_hits = counts[:, :len(keyword_groups)]
+        hooks = counts[:, len(keyword_groups)]
+        
+        lengths = title_lengths(titles)
+        score = np.select(
+            [(lengths >= 15) & (lengths <= 20), (lengths >= 10) & (lengths <= 25)],
+            [25.0, 15.0],
+            5.0
+        )
+        
+        if keywords:
+            score += (keyword_hits > 0).sum(axis=1) / len(keywords) * 30
+        
+        has_emoji = np.fromiter((self._has_emoji(title) for title in titles), dtype=bool, count=len(titles))
+        score += np.where(has_emoji, 15, 0)
+        
+        score += np.minimum(hooks * 10, 30)
+        
+        return np.round(score, 1)
+    
     def _has_emoji(self, text: str) -> bool:
         """
         检查文本是否包含emoji
@@ -12,6 +12,7 @@ from typing import List, Dict, Optional, Set
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 from core.ai_engine import AIEngine, TaskComplexity
+from core.keyword_matcher import KeywordMatcher
 
 
 class TopicTagRecommender:
@@ -61,6 +62,16 @@ class TopicTagRecommender:
         ]
     }
     
+    # 分类关键词（用于自动检测分类）
+    CATEGORY_KEYWORDS = {
+        "美妆": ["化妆", "口红", "粉底", "眼影", "护肤", "面膜", "精华"],
+        "美食": ["美食", "做饭", "烹饪", "食谱", "烘焙", "蛋糕", "菜"],
+        "穿搭": ["穿搭", "衣服", "裙子", "外套", "鞋", "搭配", "服装"],
+        "旅行": ["旅游", "旅行", "景点", "游玩", "打卡", "攻略", "出游"],
+        "健身": ["健身", "运动", "减肥", "瘦身", "锻炼", "塑形", "跑步"],
+        "学习": ["学习", "考试", "备考", "笔记", "读书", "自律", "效率"],
+    }
+    
     # 季节性话题
     SEASONAL_TOPICS = {
         "春季": ["#春天", "#春游", "#踏青", "#春装", "#春日穿搭"],
@@ -92,6 +103,8 @@ class TopicTagRecommender:
             ai_engine: AI引擎实例
         """
         self.ai_engine = ai_engine or AIEngine()
+        self._category_matcher = KeywordMatcher(self.CATEGORY_KEYWORDS, case_sensitive=True)
+        self._topic_matchers: Dict[str, KeywordMatcher] = {}
     
     async def recommend_tags(
         self,
@@ -145,21 +158,9 @@ class TopicTagRecommender:
         Returns:
             分类名称
         """
-        # 关键词映射
-        keywords_map = {
-            "美妆": ["化妆", "口红", "粉底", "眼影", "护肤", "面膜", "精华"],
-            "美食": ["美食", "做饭", "烹饪", "食谱", "烘焙", "蛋糕", "菜"],
-            "穿搭": ["穿搭", "衣服", "裙子", "外套", "鞋", "搭配", "服装"],
-            "旅行": ["旅游", "旅行", "景点", "游玩", "打卡", "攻略", "出游"],
-            "健身": ["健身", "运动", "减肥", "瘦身", "锻炼", "塑形", "跑步"],
-            "学习": ["学习", "考试", "备考", "笔记", "读书", "自律", "效率"],
-        }
-        
-        # 计算每个分类的匹配度
-        scores = {}
-        for category, keywords in keywords_map.items():
-            score = sum(1 for keyword in keywords if keyword in content)
-            scores[category] = score
+        # 计算每个分类的匹配度（一次扫描）
+        matched = self._category_matcher.group_matches(content)
+        scores = {category: len(matched.get(category, [])) for category in self.CATEGORY_KEYWORDS}
         
         # 返回得分最高的分类
         if scores:
@@ -187,13 +188,8 @@ class TopicTagRecommender:
         # 获取分类的热门话题
         topics = self.HOT_TOPICS.get(category, self.HOT_TOPICS["生活"])
         
-        # 简单的关键词匹配
-        matched = []
-        for topic in topics:
-            # 移除#符号进行匹配
-            keyword = topic.replace("#", "")
-            if keyword in content:
-                matched.append(topic)
+        # 关键词匹配（话题去掉#后出现在内容中）
+        matched = list(self._get_topic_matcher(category).group_matches(content))
         
         # 如果匹配数不足，补充该分类的高频话题
         if len(matched) < 3:
@@ -203,6 +199,18 @@ class TopicTagRecommender:
         
         return matched
     
+    def _get_topic_matcher(self, category: str) -> KeywordMatcher:
+        """分类热门话题匹配器（按分类缓存，分组为话题，关键词为去掉#的话题）"""
+        category = category if category in self.HOT_TOPICS else "生活"
+        matcher = self._topic_matchers.get(category)
+        if matcher is None:
+            matcher = KeywordMatcher(
+                {topic: [topic.replace("#", "")] for topic in self.HOT_TOPICS[category]},
+                case_sensitive=True
+            )
+            self._topic_matchers[category] = matcher
+        return matcher
+    
     async def _recommend_with_ai(
         self,
         content: str,
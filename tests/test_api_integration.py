@@ -8,10 +8,20 @@ API集成测试
 2. 会话管理器  
 3. 浏览器自动化
 4. B站API客户端
+5. 综合测试
+6. 共享HTTP客户端
+7. 热榜抓取缓存与快照
+8. 视频下载队列
 """
 
 import asyncio
+import json
+import os
 import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 
 # 添加项目根目录到路径
@@ -19,7 +29,11 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from core.auth_manager import AuthManager, SessionManager
 from core.browser_automation import BrowserAutomation, XianyuAutomation
+from core.http_client import HostPolicy, HttpClient, HttpSession, close_event_loop, get_http_client
 from plugins.bilibili.api_client import BilibiliAPIClient
+from plugins.video_producer.content_scraper import ContentScraper
+from plugins.video_producer.download_manager import DownloadManager
+from plugins.video_producer.hot_list import HotSnapshotStore, ResponseCache
 
 
 async def test_auth_manager():
@@ -172,6 +186,366 @@ async def test_integration():
     print("✅ 综合测试通过")
 
 
+async def test_http_client():
+    """测试共享HTTP客户端（本地服务）"""
+    
+    print("\n" + "="*60)
+    print("🧪 测试6：共享HTTP客户端")
+    print("="*60)
+    
+    state = {"flaky": 0, "post": 0, "active": 0, "max_active": 0, "ports": set()}
+    lock = threading.Lock()
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        
+        def log_message(self, format, *args):
+            pass
+        
+        def _reply(self, status, body=b"{}", headers=None):
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def do_GET(self):
+            with lock:
+                state["ports"].add(self.client_address[1])
+            if self.path == "/flaky":
+                with lock:
+                    state["flaky"] += 1
+                    count = state["flaky"]
+                if count <= 2:
+                    self._reply(503, headers={"Retry-After": "0"})
+                else:
+                    self._reply(200, b'{"ok": true}')
+            elif self.path == "/slow":
+                with lock:
+                    state["active"] += 1
+                    state["max_active"] = max(state["max_active"], state["active"])
+                time.sleep(0.05)
+                with lock:
+                    state["active"] -= 1
+                self._reply(200)
+            elif self.path == "/login":
+                self._reply(200, headers={"Set-Cookie": "sid=account_a; Path=/"})
+            elif self.path == "/whoami":
+                cookie = self.headers.get("Cookie") or ""
+                self._reply(200, json.dumps({"cookie": cookie}).encode())
+            else:
+                self._reply(200, b'{"ok": true}')
+        
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            with lock:
+                state["post"] += 1
+            self._reply(503)
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    
+    client = HttpClient(default_policy=HostPolicy(max_concurrency=3, retries=2, backoff=0.01))
+    
+    try:
+        # 长连接复用：连续请求使用同一个连接
+        for _ in range(5):
+            resp = await client.get(f"{base_url}/ok")
+            assert resp.ok and resp.json() == {"ok": True}
+        assert len(state["ports"]) == 1, f"❌ 应该复用连接: {state['ports']}"
+        
+        # 503按Retry-After重试后成功
+        resp = await client.get(f"{base_url}/flaky")
+        assert resp.status == 200 and state["flaky"] == 3, "❌ 503应该重试"
+        
+        # 非幂等请求的5xx不重试
+        resp = await client.post(f"{base_url}/submit", json={"a": 1})
+        assert resp.status == 503 and state["post"] == 1, "❌ POST不应该重试5xx"
+        
+        # 主机并发限制
+        await asyncio.gather(*[client.get(f"{base_url}/slow") for _ in range(9)])
+        assert state["max_active"] <= 3, f"❌ 并发超过限制: {state['max_active']}"
+        
+        stats = client.get_stats()
+        assert stats["retries"] == 2 and stats["pools_created"] == 1, f"❌ 统计错误: {stats}"
+        
+        # 共用连接池的不同账号会话之间不共享服务端设置的Cookie（用域名访问，IP地址的Cookie本来就不保存）
+        named_url = f"http://localhost:{server.server_address[1]}"
+        session_a = HttpSession(client, cookies={"sid": "account_a"})
+        session_b = HttpSession(client)
+        await session_a.get(f"{named_url}/login")
+        resp = await session_b.get(f"{named_url}/whoami")
+        assert resp.json() == {"cookie": ""}, f"❌ Cookie泄漏到其他账号: {resp.json()}"
+        resp = await session_a.get(f"{named_url}/whoami")
+        assert resp.json() == {"cookie": "sid=account_a"}, f"❌ 会话Cookie错误: {resp.json()}"
+        
+        # UI每次操作新建事件循环：关闭事件循环时释放其连接池，已关闭的循环不再占用会话
+        def per_action_loops(release):
+            import gc
+            import weakref
+            shared = get_http_client()
+            sessions = []
+            for _ in range(5):
+                loop = asyncio.new_event_loop()
+                try:
+                    loop.run_until_complete(shared.get(f"{base_url}/ok"))
+                    sessions.append(weakref.ref(shared._states[loop].session))
+                finally:
+                    close_event_loop(loop) if release else loop.close()
+            if not release:
+                # 下一次创建连接池时清理已关闭的循环
+                loop = asyncio.new_event_loop()
+                loop.run_until_complete(shared.get(f"{base_url}/ok"))
+                close_event_loop(loop)
+            gc.collect()
+            return sum(ref() is not None for ref in sessions), len(shared._states)
+        
+        assert await asyncio.to_thread(per_action_loops, True) == (0, 0), "❌ 关闭事件循环后连接池未释放"
+        assert await asyncio.to_thread(per_action_loops, False) == (0, 0), "❌ 已关闭事件循环的连接池未清理"
+        
+        print(f"✅ 连接复用、重试和并发限制正常（最大并发 {state['max_active']}）")
+    
+    finally:
+        await client.close()
+        server.shutdown()
+        server.server_close()
+
+
+async def test_hot_list_cache():
+    """测试热榜抓取缓存与快照（本地服务）"""
+    
+    print("\n" + "="*60)
+    print("🧪 测试7：热榜抓取缓存与快照")
+    print("="*60)
+    
+    state = {"version": 1, "requests": 0, "not_modified": 0}
+    lock = threading.Lock()
+    
+    def payload(path):
+        play = 1000 * state["version"]
+        if path == "/zhihu":
+            return {"data": [{"target": {"id": i, "title": f"问题{i}"}, "detail_text": f"{i} 万热度"}
+                             for i in range(1, 4)]}
+        return {"data": {"list": [{"title": f"视频{i}", "bvid": f"BV{i}", "stat": {"view": play * i, "like": i}}
+                                  for i in range(1, 4)]}}
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        
+        def log_message(self, format, *args):
+            pass
+        
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            etag = f'"{path}-v{state["version"]}"'
+            with lock:
+                state["requests"] += 1
+            if self.headers.get("If-None-Match") == etag:
+                with lock:
+                    state["not_modified"] += 1
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = json.dumps(payload(path)).encode("utf-8")
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    
+    now = [0.0]
+    cache = ResponseCache(ttl=60, clock=lambda: now[0])
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = HotSnapshotStore(os.path.join(tmp_dir, "hot.db"))
+        scraper_cls = type("LocalScraper", (ContentScraper,), {
+            "ZHIHU_HOT_URL": f"{base_url}/zhihu",
+            "BILIBILI_HOT_URL": f"{base_url}/bilibili",
+        })
+        scraper = scraper_cls(http_client=HttpClient(), cache=cache, snapshots=store)
+        
+        try:
+            # 首次并发抓取所有来源
+            results = await scraper.scrape_all(limit=2)
+            assert len(results["zhihu"]) == 2 and len(results["bilibili"]) == 2, f"❌ 抓取结果错误: {results}"
+            assert state["requests"] == 2
+            
+            # TTL内（新建的抓取器共用缓存）直接返回，不发请求
+            results = await scraper_cls(http_client=scraper.http, cache=cache, snapshots=store).scrape_all(limit=2)
+            assert state["requests"] == 2 and cache.get_stats()["hits"] == 2, "❌ 缓存未命中"
+            
+            # 过期后条件请求，304沿用缓存且不重复保存快照
+            now[0] += 61
+            results = await scraper.scrape_all(limit=2)
+            assert state["not_modified"] == 2 and results["bilibili"][0]["play"] == 1000, "❌ 应该返回304"
+            
+            # 数据变化后重新下载并保存快照
+            now[0] += 61
+            state["version"] = 2
+            results = await scraper.scrape_all()
+            assert results["bilibili"][0]["play"] == 2000, "❌ 应该获取新数据"
+            
+            latest = await store.latest("bilibili")
+            assert [item["play"] for item in latest] == [2000, 4000, 6000], f"❌ 最新快照错误: {latest}"
+            
+            history = await store.history("https://www.bilibili.com/video/BV1")
+            assert [row["heat"] for row in history] == [1000, 2000], f"❌ 快照历史错误: {history}"
+            zhihu = await store.history("https://www.zhihu.com/question/2")
+            assert zhihu[0]["heat"] == 20000 and zhihu[0]["rank"] == 2
+            
+            stats = cache.get_stats()
+            assert stats["misses"] == 4 and stats["revalidated"] == 2, f"❌ 缓存统计错误: {stats}"
+            
+            print(f"✅ 并发抓取、TTL缓存、304复用和快照正常: {stats}")
+        
+        finally:
+            await scraper.http.close()
+            server.shutdown()
+            server.server_close()
+
+
+async def test_download_manager():
+    """测试视频下载队列（模拟下载器）"""
+    
+    print("\n" + "="*60)
+    print("🧪 测试8：视频下载队列")
+    print("="*60)
+    
+    contents = {"a": b"video-a" * 100, "b": b"video-b" * 100, "c": b"video-a" * 100, "d": b"video-d" * 100,
+                "e": b"video-e" * 100}
+    state = {"active": 0, "max_active": 0, "calls": [], "fail_once": {"d"}}
+    lock = threading.Lock()
+    
+    def fake_download(url, template, hook):
+        key = url.rsplit("/", 1)[-1].split("?")[0]
+        with lock:
+            state["calls"].append(key)
+            state["active"] += 1
+            state["max_active"] = max(state["max_active"], state["active"])
+        try:
+            time.sleep(0.05)
+            if key in state["fail_once"]:
+                state["fail_once"].discard(key)
+                raise RuntimeError("网络中断")
+            data = contents[key]
+            hook({"downloaded_bytes": len(data) // 2, "total_bytes": len(data)})
+            path = template.replace("%(ext)s", "mp4")
+            with open(path, "wb") as f:
+                f.write(data)
+            return path
+        finally:
+            with lock:
+                state["active"] -= 1
+    
+    events = []
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "downloads.db")
+        output_dir = os.path.join(tmp_dir, "videos")
+        
+        def make_manager():
+            return DownloadManager(db_path=db_path, output_dir=output_dir, max_concurrent=2, max_attempts=2,
+                                   downloader=fake_download, progress_callback=events.append)
+        
+        # 入队：带分享参数的同一视频只入队一次
+        manager = make_manager()
+        try:
+            jobs = await manager.enqueue([
+                "https://www.bilibili.com/video/a",
+                "https://www.bilibili.com/video/b",
+                "https://www.bilibili.com/video/a/?spm_id_from=333.1007&vd_source=x",
+                "https://www.bilibili.com/video/c",
+                "https://www.bilibili.com/video/d",
+            ])
+            assert [job["queued"] for job in jobs] == [True, True, False, True, True], f"❌ URL去重错误: {jobs}"
+            assert jobs[2]["id"] == jobs[0]["id"]
+            
+            # 模拟程序在下载中途退出
+            claimed = await manager._claim()
+            assert claimed is not None
+            
+            # 刚更新过的下载中任务可能属于仍在运行的进程，不恢复
+            assert await manager.recover() == 0, "❌ 不应恢复仍在下载的任务"
+            await manager.db.conn.execute(
+                "UPDATE downloads SET updated_at = datetime('now', '-1 hour') WHERE id = ?", (claimed["id"],)
+            )
+            await manager.db.conn.commit()
+        finally:
+            await manager.close()
+        
+        # 重新启动后恢复中断的任务并下载全部
+        manager = make_manager()
+        try:
+            results = await manager.run()
+            by_url = {r["url"].rsplit("/", 1)[-1]: r for r in results if r["status"] != "pending"}
+            
+            assert by_url["a"]["status"] == "completed" and by_url["b"]["status"] == "completed"
+            assert by_url["c"]["status"] == "duplicate", "❌ 内容相同应该标记为重复"
+            assert by_url["c"]["file_path"] == by_url["a"]["file_path"], "❌ 重复内容应指向已有文件"
+            assert not os.path.exists(os.path.join(output_dir, f"{by_url['c']['id']}.mp4")), "❌ 重复文件应删除"
+            assert by_url["d"]["status"] == "completed" and state["calls"].count("d") == 2, "❌ 失败后应重试"
+            assert state["max_active"] == 2, f"❌ 并发数错误: {state['max_active']}"
+            assert any(e["status"] == "downloading" and e.get("percent") == 50 for e in events), "❌ 缺少进度事件"
+            
+            # 已下载的视频直接返回，不再下载
+            calls = len(state["calls"])
+            result = await manager.download("https://www.bilibili.com/video/a#reply")
+            assert result["status"] == "completed" and len(state["calls"]) == calls, "❌ 不应重复下载"
+            
+            stats = manager.get_stats()
+            assert stats["completed"] == 3 and stats["duplicates"] == 1 and stats["retried"] == 1, f"❌ 统计错误: {stats}"
+            
+            # 指定保存路径：已下载过或内容重复的视频也会放到该路径
+            for key in ("a", "c"):
+                target = os.path.join(tmp_dir, "export", f"{key}.mp4")
+                result = await manager.download_to(f"https://www.bilibili.com/video/{key}", target)
+                assert result["file_path"] == target and os.path.exists(target), f"❌ 保存路径没有文件: {key}"
+                with open(target, "rb") as f:
+                    assert f.read() == contents[key]
+            assert len(state["calls"]) == calls, "❌ 不应重复下载"
+            
+            # 已下载的文件被删除后重新下载
+            os.remove(by_url["b"]["file_path"])
+            target = os.path.join(tmp_dir, "export", "b.mp4")
+            result = await manager.download_to("https://www.bilibili.com/video/b", target)
+            assert result["status"] == "completed" and os.path.exists(target), f"❌ 文件缺失时应重新下载: {result}"
+            assert len(state["calls"]) == calls + 1
+            
+            print(f"✅ 断点恢复、URL/内容去重、重试和并发限制正常: {stats}")
+        finally:
+            await manager.close()
+        
+        # 单个下载中途崩溃：之后直接下载该视频时先恢复中断的任务
+        manager = make_manager()
+        try:
+            job = (await manager.enqueue(["https://www.bilibili.com/video/e"]))[0]
+            assert await manager._claim(job["id"]) is not None
+            await manager.db.conn.execute(
+                "UPDATE downloads SET updated_at = datetime('now', '-1 hour') WHERE id = ?", (job["id"],)
+            )
+            await manager.db.conn.commit()
+        finally:
+            await manager.close()
+        
+        manager = make_manager()
+        try:
+            result = await manager.download("https://www.bilibili.com/video/e")
+            assert result["status"] == "completed" and os.path.exists(result["file_path"]), f"❌ 应恢复中断的下载: {result}"
+        finally:
+            await manager.close()
+        print("✅ 中断的单个下载和已删除的文件会重新下载")
+
+
 async def run_all_tests():
     """运行所有测试"""
     
@@ -227,13 +601,37 @@ async def run_all_tests():
         print(f"❌ 测试5失败: {e}")
         tests_failed += 1
     
+    # 测试6：共享HTTP客户端
+    try:
+        await test_http_client()
+        tests_passed += 1
+    except Exception as e:
+        print(f"❌ 测试6失败: {e}")
+        tests_failed += 1
+    
+    # 测试7：热榜抓取缓存与快照
+    try:
+        await test_hot_list_cache()
+        tests_passed += 1
+    except Exception as e:
+        print(f"❌ 测试7失败: {e}")
+        tests_failed += 1
+    
+    # 测试8：视频下载队列
+    try:
+        await test_download_manager()
+        tests_passed += 1
+    except Exception as e:
+        print(f"❌ 测试8失败: {e}")
+        tests_failed += 1
+    
     # 总结
     print("\n" + "="*60)
     print("📊 测试总结")
     print("="*60)
-    print(f"✅ 通过: {tests_passed}/5")
-    print(f"❌ 失败: {tests_failed}/5")
-    print(f"📈 通过率: {tests_passed/5*100:.0f}%")
+    print(f"✅ 通过: {tests_passed}/8")
+    print(f"❌ 失败: {tests_failed}/8")
+    print(f"📈 通过率: {tests_passed/8*100:.0f}%")
     
     if tests_failed == 0:
         print("\n🎉 所有测试通过！API集成基础框架已就绪！")
@@ -12,7 +12,9 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from core.publisher import (
+    PlatformPublisher,
     PublishContent,
+    PublishResult,
     PlatformType,
     PublishStatus
 )
@@ -23,7 +25,57 @@ from core.content_adapter import (
     ZhihuAdapter,
     BilibiliAdapter
 )
-from plugins.batch_publisher.task_manager import BatchPublishManager
+from core.rate_limiter import RateLimitScheduler, RateLimitRule
+from plugins.batch_publisher.task_manager import BatchPublishManager, TaskStatus
+from plugins.batch_publisher.job_store import PublishJobStore
+
+
+class StubPublisher(PlatformPublisher):
+    """测试用发布器：记录调用次数，立即返回成功"""
+    
+    def __init__(self, platform: PlatformType, delay: float = 0.0):
+        super().__init__(platform)
+        self.calls = 0
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.published_titles = []
+    
+    async def validate_content(self, content):
+        return True, None
+    
+    async def adapt_content(self, content):
+        return content
+    
+    async def publish(self, content):
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        self.published_titles.append(content.title)
+        return PublishResult(
+            platform=self.platform,
+            status=PublishStatus.SUCCESS,
+            post_id=f"{self.platform.value}_{self.calls}"
+        )
+
+
+def no_rate_limit() -> RateLimitScheduler:
+    """不限速的调度器（测试并发逻辑时使用）"""
+    return RateLimitScheduler(rules={}, default_rule=RateLimitRule(min_interval=0, refill_period=0))
+
+
+def install_stub_publishers(manager: BatchPublishManager, delays: dict = None) -> dict:
+    """将管理器的所有发布器替换为StubPublisher"""
+    stubs = {}
+    for platform in list(manager.publish_manager.publishers):
+        stubs[platform] = StubPublisher(platform, (delays or {}).get(platform, 0.0))
+        manager.publish_manager.publishers[platform] = stubs[platform]
+    return stubs
 
 
 async def test_content_adapter():
@@ -254,6 +306,715 @@ async def test_content_adaptation_comparison():
     print("\n✅ 测试4通过: 内容适配对比正常\n")
 
 
+async def test_durable_job_queue():
+    """测试持久化任务队列的崩溃恢复"""
+    
+    print("\n" + "="*60)
+    print("🧪 测试5: 持久化任务队列")
+    print("="*60)
+    
+    import tempfile
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "jobs.db")
+        content = PublishContent(title="持久化测试", content="正文", tags=["测试"])
+        
+        # 第一个实例：保存任务，闲鱼已发布成功后"崩溃"
+        store = PublishJobStore(db_path, lease_ttl=5, owner="instance_a")
+        manager = BatchPublishManager(job_store=store, rate_limiter=no_rate_limit())
+        task_id = manager.create_task(content, ["xianyu", "zhihu", "bilibili"])
+        task = manager.get_task(task_id)
+        
+        await manager._persist_tasks([task])
+        assert await store.acquire_lease(task_id, PlatformType.XIANYU)
+        await store.record_result(task_id, PublishResult(
+            platform=PlatformType.XIANYU,
+            status=PublishStatus.SUCCESS,
+            post_id="xianyu_done"
+        ))
+        await store.flush()
+        
+        # 知乎子任务的租约仍被崩溃实例持有（未过期）
+        assert await store.acquire_lease(task_id, PlatformType.ZHIHU)
+        await store.close()
+        
+        # 另一个实例：启动时自动恢复
+        store2 = PublishJobStore(db_path, lease_ttl=5, owner="instance_b")
+        manager2 = BatchPublishManager(job_store=store2, rate_limiter=no_rate_limit())
+        stubs = install_stub_publishers(manager2)
+        
+        resumed = await manager2.resume_unfinished_tasks()
+        assert len(resumed) == 1
+        task = resumed[0]
+        
+        # 已成功的平台被跳过，被占用的平台不执行
+        assert stubs[PlatformType.XIANYU].calls == 0
+        assert stubs[PlatformType.ZHIHU].calls == 0
+        assert stubs[PlatformType.BILIBILI].calls == 1
+        assert task.status == TaskStatus.PENDING
+        print("✅ 跳过已成功平台和被占用的子任务")
+        
+        # 租约过期后可以接手
+        await store2.db.conn.execute(
+            "UPDATE batch_sub_jobs SET lease_expires_at = 0 WHERE job_id = ?", (task_id,)
+        )
+        await store2.db.conn.commit()
+        manager3 = BatchPublishManager(job_store=store2, rate_limiter=no_rate_limit())
+        stubs = install_stub_publishers(manager3)
+        
+        resumed = await manager3.resume_unfinished_tasks()
+        assert stubs[PlatformType.ZHIHU].calls == 1
+        assert resumed[0].status == TaskStatus.COMPLETED
+        assert len(resumed[0].results) == 3
+        
+        job = await store2.get_job(task_id)
+        assert job["status"] == "completed"
+        sub_jobs = await store2.get_sub_jobs(task_id)
+        assert all(s["status"] == "success" for s in sub_jobs)
+        assert all(s["lease_owner"] is None for s in sub_jobs)
+        print("✅ 租约过期后恢复执行，任务完成")
+        
+        # 没有未完成任务
+        assert await manager3.resume_unfinished_tasks() == []
+        await store2.close()
+        
+        # 同一安装崩溃后立即重启：租约未过期也能收回自己的子任务
+        crashed = PublishJobStore(db_path, lease_ttl=60)
+        await crashed.save_jobs([("restart_job", content, [PlatformType.ZHIHU], 3)])
+        assert await crashed.acquire_lease("restart_job", PlatformType.ZHIHU)
+        await crashed.close()
+        
+        restarted = PublishJobStore(db_path, lease_ttl=60)
+        manager4 = BatchPublishManager(job_store=restarted, rate_limiter=no_rate_limit())
+        stubs = install_stub_publishers(manager4)
+        resumed = await manager4.resume_unfinished_tasks()
+        assert restarted.owner == crashed.owner
+        assert stubs[PlatformType.ZHIHU].calls == 1
+        assert resumed[0].status == TaskStatus.COMPLETED
+        await restarted.close()
+        print("✅ 重启后立即收回本安装持有的租约")
+    
+    print("\n✅ 测试5通过: 持久化任务队列工作正常\n")
+
+
+async def test_parallel_publish():
+    """测试多平台并行发布"""
+    
+    print("\n" + "="*60)
+    print("🧪 测试6: 多平台并行发布")
+    print("="*60)
+    
+    import time
+    
+    manager = BatchPublishManager(
+        parallel=True,
+        platform_timeouts={PlatformType.ZHIHU: 0.1},
+        rate_limiter=no_rate_limit()
+    )
+    install_stub_publishers(manager, delays={
+        PlatformType.XIANYU: 0.3,
+        PlatformType.XIAOHONGSHU: 0.1,
+        PlatformType.ZHIHU: 1.0,      # 超过超时时间
+        PlatformType.BILIBILI: 0.2,
+    })
+    
+    progress_log = []
+    manager.add_progress_callback(lambda task_id, progress, status: progress_log.append(progress))
+    
+    content = PublishContent(title="并行发布测试", content="正文")
+    platforms = ["xianyu", "xiaohongshu", "zhihu", "bilibili"]
+    task_id = manager.create_task(content, platforms, max_retries=1)
+    
+    start = time.time()
+    task = await manager.execute_task(task_id)
+    elapsed = time.time() - start
+    print(f"  耗时: {elapsed:.2f}秒")
+    
+    # 并行：总耗时接近最慢平台，而非各平台之和
+    assert elapsed < 0.6, f"并行发布耗时过长: {elapsed:.2f}秒"
+    
+    # 结果顺序与平台顺序一致
+    assert [r.platform.value for r in task.results] == platforms
+    
+    # 超时平台返回失败结果
+    zhihu = task.results[2]
+    assert not zhihu.success and zhihu.error_code == "timeout"
+    assert task.failed_platforms == 1
+    
+    # 进度单调递增并最终到达100
+    assert progress_log == sorted(progress_log)
+    assert progress_log[-1] == 100
+    
+    # PublishManager 直接并行发布，结果保持顺序
+    results = await manager.publish_manager.publish_to_multiple_platforms(
+        content,
+        [PlatformType.BILIBILI, PlatformType.XIAOHONGSHU],
+        parallel=True
+    )
+    assert [r.platform for r in results] == [PlatformType.BILIBILI, PlatformType.XIAOHONGSHU]
+    
+    print("\n✅ 测试6通过: 多平台并行发布正常\n")
+
+
+async def test_worker_pool():
+    """测试批量任务工作池"""
+    
+    print("\n" + "="*60)
+    print("🧪 测试7: 批量任务工作池")
+    print("="*60)
+    
+    import time
+    
+    manager = BatchPublishManager(workers=3, rate_limiter=no_rate_limit())
+    stubs = install_stub_publishers(manager, delays={
+        PlatformType.XIANYU: 0.2,
+        PlatformType.ZHIHU: 0.1,
+    })
+    
+    task_ids = []
+    for i in range(3):
+        task_ids.append(manager.create_task(
+            PublishContent(title=f"闲鱼{i}", content="正文"), ["xianyu"]
+        ))
+        task_ids.append(manager.create_task(
+            PublishContent(title=f"知乎{i}", content="正文"), ["zhihu"]
+        ))
+    
+    start = time.time()
+    tasks = await manager.execute_batch_tasks(task_ids)
+    elapsed = time.time() - start
+    print(f"  耗时: {elapsed:.2f}秒")
+    
+    # 同一平台不会被两个工作协程同时操作
+    assert stubs[PlatformType.XIANYU].max_active == 1
+    assert stubs[PlatformType.ZHIHU].max_active == 1
+    
+    # 总耗时接近最慢平台的串行时间（3×0.2秒），而非全部任务之和
+    assert elapsed < 0.8, f"工作池耗时过长: {elapsed:.2f}秒"
+    assert [t.task_id for t in tasks] == task_ids
+    assert all(t.status == TaskStatus.COMPLETED for t in tasks)
+    
+    stats = manager.get_queue_stats()
+    assert stats["completed"] == 6
+    assert stats["queue_depth"] == 0 and stats["in_flight"] == 0
+    assert stats["throughput"] > 0
+    print(f"  吞吐量: {stats['throughput']:.0f} 任务/分钟")
+    
+    # 单工作协程时按优先级执行
+    manager = BatchPublishManager(workers=1, rate_limiter=no_rate_limit())
+    stubs = install_stub_publishers(manager)
+    low = manager.create_task(PublishContent(title="低优先级"), ["zhihu"], priority=0)
+    high = manager.create_task(PublishContent(title="高优先级"), ["zhihu"], priority=5)
+    await manager.execute_batch_tasks([low, high])
+    assert stubs[PlatformType.ZHIHU].published_titles == ["高优先级", "低优先级"]
+    
+    print("\n✅ 测试7通过: 工作池工作正常\n")
+
+
+async def test_rate_limit_scheduler():
+    """测试发布频率调度器"""
+    
+    print("\n" + "="*60)
+    print("🧪 测试8: 发布频率调度器")
+    print("="*60)
+    
+    import time
+    from plugins.base_plugin import PlatformLimits
+    
+    scheduler = RateLimitScheduler(rules={
+        "xianyu": RateLimitRule(min_interval=0.2, capacity=100, refill_period=0),
+        "zhihu": RateLimitRule(min_interval=0.2, capacity=100, refill_period=0),
+    })
+    
+    # 同一平台账号：相邻发布至少间隔min_interval
+    assert scheduler.reserve("xianyu") == 0
+    assert abs(scheduler.reserve("xianyu") - 0.2) < 0.05
+    
+    # 其他平台、其他账号不受影响
+    assert scheduler.reserve("zhihu") == 0
+    assert scheduler.reserve("xianyu", "account_b") == 0
+    
+    # 令牌桶：容量用完后等待填充
+    scheduler.configure("bilibili", RateLimitRule(min_interval=0, capacity=2, refill_period=1.0))
+    assert scheduler.reserve(PlatformType.BILIBILI) == 0
+    assert scheduler.reserve(PlatformType.BILIBILI) == 0
+    assert 0.4 < scheduler.reserve(PlatformType.BILIBILI) <= 0.5
+    
+    # 根据PlatformLimits配置
+    scheduler.configure("xiaohongshu", limits=PlatformLimits(
+        title_max_length=20, content_max_length=1000, images_max_count=9,
+        publish_interval=3, daily_publish_limit=20
+    ))
+    rule = scheduler.get_rule("xiaohongshu")
+    assert rule.min_interval == 3 and rule.capacity == 20
+    
+    # 并发申请按顺序排队
+    scheduler = RateLimitScheduler(rules={
+        "xianyu": RateLimitRule(min_interval=0.1, capacity=100, refill_period=0),
+    })
+    start = time.time()
+    waits = await asyncio.gather(*(scheduler.acquire("xianyu") for _ in range(3)))
+    elapsed = time.time() - start
+    assert sorted(waits) == waits and 0.18 < elapsed < 0.4
+    assert scheduler.get_stats()["xianyu/default"]["granted"] == 3
+    
+    # 重复配置相同规则不重置令牌桶；规则变化时剩余令牌按新容量等比换算
+    clock = [0.0]
+    scheduler = RateLimitScheduler(rules={}, clock=lambda: clock[0])
+    daily = RateLimitRule(min_interval=0, capacity=2, refill_period=86400)
+    scheduler.configure("zhihu", daily)
+    assert scheduler.reserve("zhihu") == 0
+    scheduler.configure("zhihu", RateLimitRule(min_interval=0, capacity=2, refill_period=86400))
+    assert scheduler.reserve("zhihu") == 0
+    assert scheduler.reserve("zhihu") > 3600, "重复配置不应重置每日上限"
+    scheduler.configure("zhihu", RateLimitRule(min_interval=0, capacity=4, refill_period=86400))
+    assert scheduler.get_stats()["zhihu/default"]["tokens"] == -2, "剩余令牌应按新容量换算"
+    
+    # 插件多次批量发布共用每日上限
+    from plugins.base_plugin import BasePlatformPlugin, PlatformType as PluginPlatformType
+    
+    class DailyCapPlugin(BasePlatformPlugin):
+        def __init__(self):
+            super().__init__()
+            self.platform_type = PluginPlatformType.ZHIHU
+            self.platform_limits = PlatformLimits(
+                title_max_length=100, content_max_length=1000, images_max_count=9,
+                publish_interval=0, daily_publish_limit=2
+            )
+            self.rate_limiter = RateLimitScheduler(rules={})
+            self.published = 0
+        
+        async def validate_content(self, content):
+            return True, None
+        
+        async def optimize_title(self, title, content_type, **kwargs):
+            return title
+        
+        async def optimize_content(self, content, content_type, **kwargs):
+            return content
+        
+        async def generate_tags(self, content, max_tags=5):
+            return []
+        
+        async def publish(self, content, content_type=None, **kwargs):
+            self.published += 1
+            return None
+    
+    plugin = DailyCapPlugin()
+    await plugin.batch_publish([{"title": "1"}])
+    await plugin.batch_publish([{"title": "2"}])
+    try:
+        await asyncio.wait_for(plugin.batch_publish([{"title": "3"}]), timeout=0.5)
+        assert False, "超过每日上限的发布不应立即放行"
+    except asyncio.TimeoutError:
+        pass
+    assert plugin.published == 2, f"每日上限2，实际发布{plugin.published}次"
+    
+    print("\n✅ 测试8通过: 发布频率调度器工作正常\n")
+
+
+async def test_cancel_and_pause():
+    """测试运行中任务的取消与暂停/恢复"""
+    
+    print("\n" + "="*60)
+    print("🧪 测试9: 取消与暂停")
+    print("="*60)
+    
+    import tempfile
+    import time
+    
+    content = PublishContent(title="取消测试", content="正文", tags=["测试"])
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # 取消运行中的任务：已完成的平台保留结果，卡住的发布在宽限期后被中断
+        store = PublishJobStore(os.path.join(tmp_dir, "jobs.db"))
+        manager = BatchPublishManager(job_store=store, rate_limiter=no_rate_limit())
+        stubs = install_stub_publishers(manager, {PlatformType.XIANYU: 5.0})
+        task_id = manager.create_task(content, ["xianyu", "zhihu"])
+        
+        start = time.time()
+        running = asyncio.ensure_future(manager.execute_task(task_id))
+        await asyncio.sleep(0.2)
+        assert manager.get_task(task_id).status == TaskStatus.RUNNING
+        
+        assert manager.cancel_task(task_id, grace_period=0.1)
+        task = await running
+        elapsed = time.time() - start
+        
+        assert elapsed < 1.0, f"取消耗时过长: {elapsed:.2f}s"
+        assert task.status == TaskStatus.CANCELLED
+        assert stubs[PlatformType.XIANYU].active == 0
+        statuses = {r.platform: r.status for r in task.results}
+        assert statuses == {
+            PlatformType.XIANYU: PublishStatus.CANCELLED,
+            PlatformType.ZHIHU: PublishStatus.SUCCESS,
+        }
+        assert not manager.cancel_task(task_id)
+        
+        job = await store.get_job(task_id)
+        assert job["status"] == "cancelled"
+        sub_jobs = {s["platform"]: s["status"] for s in await store.get_sub_jobs(task_id)}
+        assert sub_jobs == {"xianyu": "cancelled", "zhihu": "success"}
+        assert await manager.resume_unfinished_tasks() == []
+        await store.close()
+        print(f"✅ 运行中任务 {elapsed:.2f}秒 内取消，部分结果已保存")
+    
+    # 暂停后不再开始新的发布，恢复后继续
+    manager = BatchPublishManager(rate_limiter=no_rate_limit())
+    stubs = install_stub_publishers(manager)
+    task_id = manager.create_task(content, ["xiaohongshu", "bilibili"])
+    
+    assert manager.pause_task(task_id)
+    running = asyncio.ensure_future(manager.execute_task(task_id))
+    await asyncio.sleep(0.3)
+    assert manager.get_task(task_id).status == TaskStatus.PAUSED
+    assert stubs[PlatformType.XIAOHONGSHU].calls == 0
+    
+    assert manager.resume_task(task_id)
+    task = await running
+    assert task.status == TaskStatus.COMPLETED
+    assert stubs[PlatformType.BILIBILI].calls == 1
+    print("✅ 暂停期间不发布，恢复后正常完成")
+    
+    # 暂停中的任务也可以取消
+    task_id = manager.create_task(content, ["zhihu"])
+    manager.pause_task(task_id)
+    running = asyncio.ensure_future(manager.execute_task(task_id))
+    await asyncio.sleep(0.1)
+    assert manager.cancel_task(task_id)
+    task = await asyncio.wait_for(running, timeout=2)
+    assert task.status == TaskStatus.CANCELLED
+    assert stubs[PlatformType.ZHIHU].calls == 0
+    print("✅ 暂停中的任务取消成功")
+    
+    print("\n✅ 测试9通过: 取消与暂停工作正常\n")
+
+
+async def test_publish_ledger():
+    """测试发布台账防止重复发布"""
+    
+    print("\n" + "="*60)
+    print("🧪 测试10: 发布台账")
+    print("="*60)
+    
+    import tempfile
+    from core.publisher import PublishManager, UNCERTAIN_ERROR_CODE
+    from core.publish_ledger import PublishLedger, content_fingerprint
+    
+    class FlakyPublisher(StubPublisher):
+        """第一次提交实际成功但返回异常（模拟超时），可在平台上查到已发布内容"""
+        
+        def __init__(self, platform, verifiable=True, uncertain_result=False):
+            super().__init__(platform)
+            self.posted = []
+            self.verifiable = verifiable
+            self.uncertain_result = uncertain_result
+        
+        async def publish(self, content):
+            self.calls += 1
+            self.posted.append(content.title)
+            if self.calls == 1:
+                if self.uncertain_result:
+                    return PublishResult(
+                        platform=self.platform,
+                        status=PublishStatus.FAILED,
+                        error="提交后未检测到成功标识",
+                        error_code=UNCERTAIN_ERROR_CODE
+                    )
+                raise TimeoutError("响应超时")
+            return PublishResult(platform=self.platform, status=PublishStatus.SUCCESS, post_id="p2")
+        
+        async def find_published(self, content, since=None):
+            assert since is not None        # 台账登记时间
+            if self.verifiable and content.title in self.posted:
+                return PublishResult(platform=self.platform, status=PublishStatus.SUCCESS, post_id="p1")
+            return None
+    
+    # 指纹只与内容有关
+    a = PublishContent(title="台账测试", content="正文", tags=["测试"])
+    b = PublishContent(title=" 台账测试 ", content="正文", tags=["测试"])
+    assert content_fingerprint(a) == content_fingerprint(b)
+    assert content_fingerprint(a) != content_fingerprint(PublishContent(title="台账测试", content="正文2"))
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ledger = PublishLedger(os.path.join(tmp_dir, "ledger.db"))
+        manager = PublishManager(rate_limiter=no_rate_limit(), ledger=ledger)
+        
+        # 超时后重试前先核对，已发布则不再重复提交
+        flaky = FlakyPublisher(PlatformType.ZHIHU)
+        manager.register_publisher(flaky)
+        result = await manager.publish_to_single_platform(a, PlatformType.ZHIHU, max_retries=3)
+        assert result.success and result.post_id == "p1"
+        assert flaky.posted == ["台账测试"]
+        
+        entry = await ledger.get(content_fingerprint(a), PlatformType.ZHIHU)
+        assert entry["status"] == "confirmed" and entry["post_id"] == "p1"
+        print("✅ 结果未知时先核对平台，不重复提交")
+        
+        # 同一内容再次发布直接使用台账结果；其他账号不受影响
+        result = await manager.publish_to_single_platform(a, PlatformType.ZHIHU)
+        assert result.success and result.extra_data.get("from_ledger")
+        assert flaky.calls == 1
+        result = await manager.publish_to_single_platform(a, PlatformType.ZHIHU, account="other")
+        assert result.success and flaky.calls == 2
+        print("✅ 已确认的发布不会重复执行")
+        
+        # 明确要求再次发布：忽略台账记录，重新记录本次发布
+        before = await ledger.get(content_fingerprint(a), PlatformType.ZHIHU)
+        result = await manager.publish_to_single_platform(a, PlatformType.ZHIHU, force=True)
+        assert result.success and not result.extra_data.get("from_ledger")
+        assert flaky.calls == 3
+        entry = await ledger.get(content_fingerprint(a), PlatformType.ZHIHU)
+        assert entry["status"] == "confirmed" and entry["post_id"] == "p2" and entry["attempts"] == 1
+        assert entry["created_at"] >= before["created_at"]
+        
+        # 已确认的记录过了去重期后不再阻止发布
+        expired = PublishLedger(os.path.join(tmp_dir, "ledger.db"), confirmed_ttl=0)
+        assert await expired.get(content_fingerprint(a), PlatformType.ZHIHU) is None
+        assert await expired.begin(content_fingerprint(a), PlatformType.ZHIHU) is None
+        entry = await ledger.get(content_fingerprint(a), PlatformType.ZHIHU)
+        assert entry["status"] == "in_flight" and entry["post_id"] is None
+        await ledger.confirm(content_fingerprint(a), PlatformType.ZHIHU, post_id="p3")
+        await expired.close()
+        print("✅ 可以强制再次发布，已确认记录过期后不再去重")
+        
+        # 发布器明确报告"已提交未确认"且无法核对：不再重试
+        uncertain = FlakyPublisher(PlatformType.BILIBILI, verifiable=False, uncertain_result=True)
+        manager.register_publisher(uncertain)
+        result = await manager.publish_to_single_platform(a, PlatformType.BILIBILI, max_retries=3)
+        assert not result.success and uncertain.calls == 1
+        entry = await ledger.get(content_fingerprint(a), PlatformType.BILIBILI)
+        assert entry["status"] == "in_flight"
+        print("✅ 无法确认的提交保持in_flight，不盲目重试")
+        
+        # 发布异常且平台不支持核对：不再重新提交，返回uncertain
+        class BlindPublisher(StubPublisher):
+            async def publish(self, content):
+                await super().publish(content)
+                raise TimeoutError("响应超时")
+        
+        blind = BlindPublisher(PlatformType.XIAOHONGSHU)
+        assert not blind.supports_verification and flaky.supports_verification
+        manager.register_publisher(blind)
+        result = await manager.publish_to_single_platform(a, PlatformType.XIAOHONGSHU, max_retries=3)
+        assert not result.success and result.error_code == UNCERTAIN_ERROR_CODE
+        assert blind.calls == 1
+        entry = await ledger.get(content_fingerprint(a), PlatformType.XIAOHONGSHU)
+        assert entry["status"] == "in_flight"
+        
+        # 再次发布同一内容也不会提交
+        result = await manager.publish_to_single_platform(a, PlatformType.XIAOHONGSHU)
+        assert result.error_code == UNCERTAIN_ERROR_CODE and blind.calls == 1
+        
+        # 没有台账时同样停止重试
+        no_ledger = PublishManager(rate_limiter=no_rate_limit())
+        blind_only = BlindPublisher(PlatformType.XIAOHONGSHU)
+        no_ledger.register_publisher(blind_only)
+        result = await no_ledger.publish_to_single_platform(a, PlatformType.XIAOHONGSHU, max_retries=3)
+        assert result.error_code == UNCERTAIN_ERROR_CODE and blind_only.calls == 1
+        print("✅ 异常后无法核对时不重新提交")
+        
+        # in_flight记录只有已核对或过期时才能重新登记
+        fingerprint = content_fingerprint(a)
+        entry = await ledger.begin(fingerprint, PlatformType.XIAOHONGSHU)
+        assert entry and entry["status"] == "in_flight"
+        assert await ledger.begin(fingerprint, PlatformType.XIAOHONGSHU, verified=True) is None
+        stale_ledger = PublishLedger(os.path.join(tmp_dir, "ledger.db"), stale_after=0)
+        assert await stale_ledger.begin(fingerprint, PlatformType.XIAOHONGSHU) is None
+        await stale_ledger.close()
+        print("✅ 未核对的in_flight记录被拒绝，已核对或过期的可以重新登记")
+        
+        # 同一内容并发发布只提交一次
+        slow = StubPublisher(PlatformType.DOUYIN, delay=0.05)
+        manager.register_publisher(slow)
+        c = PublishContent(title="并发测试", content="正文")
+        results = await asyncio.gather(
+            manager.publish_to_single_platform(c, PlatformType.DOUYIN),
+            manager.publish_to_single_platform(c, PlatformType.DOUYIN)
+        )
+        assert slow.calls == 1
+        assert sorted(r.success for r in results) == [False, True]
+        assert any(r.error_code == UNCERTAIN_ERROR_CODE for r in results)
+        print("✅ 并发发布同一内容只提交一次")
+        
+        await ledger.close()
+    
+    # 闲鱼适配器把发布内容转换为商品数据，到"我发布的"列表核对
+    from plugins.batch_publisher.adapters.xianyu_adapter import XianyuPublisher as XianyuAdapter
+    from plugins.xianyu.publisher import XianyuPublisher as XianyuProductPublisher
+    
+    lookups = []
+    
+    async def fake_find(self, product, cookies_file="data/xianyu_cookies.json", since=None):
+        lookups.append(product)
+        return {"success": True, "post_id": "x1", "post_url": "https://2.taobao.com/item.htm?id=x1"}
+    
+    original = XianyuProductPublisher.find_published_product
+    XianyuProductPublisher.find_published_product = fake_find
+    try:
+        adapter = XianyuAdapter()
+        assert adapter.supports_verification
+        item = PublishContent(title="闲鱼核对", content="九成新", price=99, category="数码")
+        found = await adapter.find_published(item)
+    finally:
+        XianyuProductPublisher.find_published_product = original
+    
+    assert found.success and found.post_id == "x1"
+    assert lookups[0]["description"] == "九成新" and lookups[0]["price"] == 99
+    print("✅ 闲鱼适配器可以核对已发布商品")
+    
+    # 闲鱼发布器：已发布商品跳过，force时再次发布
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ledger = PublishLedger(os.path.join(tmp_dir, "ledger.db"))
+        xianyu = XianyuProductPublisher(
+            rate_limiter=no_rate_limit(), block_resources=False, cache_sessions=False,
+            preprocess_images=False, ledger=ledger
+        )
+        posted = []
+        
+        async def fake_impl(product, use_browser, cookies_file, progress_callback=None):
+            posted.append(product["title"])
+            return {"success": True, "post_id": f"x{len(posted)}", "post_url": None}
+        
+        xianyu._publish_product_impl = fake_impl
+        product = {"title": "再次上架", "price": 10, "category": "数码"}
+        assert (await xianyu.publish_product(product, enable_retry=False))["post_id"] == "x1"
+        assert (await xianyu.publish_product(product, enable_retry=False))["from_ledger"]
+        assert (await xianyu.publish_product(product, enable_retry=False, force=True))["post_id"] == "x2"
+        assert posted == ["再次上架", "再次上架"]
+        await ledger.close()
+    print("✅ 闲鱼发布器支持强制再次发布")
+    
+    print("\n✅ 测试10通过: 发布台账工作正常\n")
+
+
+async def test_dead_letter_queue():
+    """测试死信队列和批量重新投递"""
+    
+    print("\n" + "="*60)
+    print("🧪 测试11: 死信队列")
+    print("="*60)
+    
+    import tempfile
+    import time as _time
+    from core.dead_letter import DeadLetterQueue, DeadLetterScheduler
+    from plugins.xianyu.publisher import XianyuPublisher
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        queue = DeadLetterQueue(os.path.join(tmp_dir, "dlq.db"), max_redrives=2)
+        publisher = XianyuPublisher(
+            rate_limiter=no_rate_limit(), block_resources=False, cache_sessions=False,
+            preprocess_images=False, dead_letters=queue
+        )
+        
+        # 平台故障：网络类商品失败，封禁和结果未知的单独分类
+        state = {"down": True, "calls": []}
+        
+        async def fake_publish(product, use_browser=True, cookies_file=None, **kwargs):
+            state["calls"].append((product["title"], cookies_file))
+            if product["title"] == "未知":
+                return {"success": False, "error": "提交后未检测到成功标识", "submitted": True, "uncertain": True}
+            if product["title"] == "封号" and state["down"]:
+                return {"success": False, "error": "账号被封禁"}
+            if state["down"]:
+                raise RuntimeError("网络超时")
+            return {"success": True, "post_id": product["title"], "post_url": None}
+        
+        publisher.publish_product = fake_publish
+        
+        products = [{"title": t, "price": 10, "category": "数码"} for t in ("商品1", "商品2", "封号", "未知")]
+        results = await publisher.batch_publish(products, optimize=False, use_browser=True, cookies_file="a.json")
+        assert results["failed"] == 4
+        
+        stats = await queue.get_stats("xianyu")
+        assert stats["by_status"] == {"pending": 3, "held": 1}
+        assert stats["by_category"] == {"网络问题": 2, "账号问题": 1}
+        
+        pending = await queue.list("xianyu")
+        assert {e["payload"]["title"] for e in pending} == {"商品1", "商品2", "封号"}
+        assert all(e["account"] == "a.json" for e in pending)
+        print("✅ 失败商品已保存到死信队列（含错误类别和完整数据）")
+        
+        # 同一商品再次失败只更新记录
+        await publisher.batch_publish(products[:1], optimize=False, use_browser=True, cookies_file="a.json")
+        entries = await queue.list("xianyu", status=None)
+        assert len(entries) == 4
+        assert [e["failures"] for e in entries if e["payload"]["title"] == "商品1"] == [2]
+        
+        # 低峰时段调度：非低峰不投递
+        hour = {"value": 12}
+        scheduler = DeadLetterScheduler(
+            queue, lambda limit: publisher.redrive_dead_letters(limit=limit),
+            off_peak_hours=(23, 6), clock=lambda: _time.struct_time((2025, 1, 1, hour["value"], 0, 0, 0, 1, 0))
+        )
+        assert await scheduler.run_once() is None
+        
+        # 平台恢复后批量重新投递（不投递需要人工核对的held记录）
+        state["down"] = False
+        state["calls"].clear()
+        hour["value"] = 2
+        result = await scheduler.run_once()
+        assert result["total"] == 3 and result["success"] == 3
+        assert sorted(state["calls"]) == [("商品1", "a.json"), ("商品2", "a.json"), ("封号", "a.json")]
+        
+        stats = await queue.get_stats("xianyu")
+        assert stats["by_status"] == {"recovered": 3, "held": 1}
+        assert scheduler.stats["recovered"] == 3
+        assert await scheduler.run_once() is None       # 没有待投递记录
+        print("✅ 低峰时段批量重新投递成功")
+        
+        # 人工核对后按ID投递held记录
+        held = await queue.list("xianyu", status="held")
+        publisher.publish_product = lambda product, **kwargs: fake_publish({**product, "title": "已核对"})
+        result = await publisher.redrive_dead_letters(ids=[held[0]["id"]])
+        assert result["success"] == 1
+        
+        # 反复失败超过重新投递次数后放弃
+        state["down"] = True
+        publisher.publish_product = fake_publish
+        await publisher.batch_publish([{"title": "顽固", "price": 1}], optimize=False, use_browser=True, cookies_file="b.json")
+        for _ in range(2):
+            result = await publisher.redrive_dead_letters()
+            assert result["total"] == 1 and result["failed"] == 1
+        assert (await publisher.redrive_dead_letters())["total"] == 0
+        entries = await queue.list("xianyu", status="abandoned")
+        assert [e["payload"]["title"] for e in entries] == ["顽固"]
+        print("✅ 超过重新投递次数的记录被放弃")
+        
+        # 随程序启动的后台服务：在自己的线程中按计划投递，退出时停止
+        from plugins.xianyu.redrive_service import DeadLetterRedriveService
+        await publisher.batch_publish([{"title": "待投递", "price": 1}], optimize=False, use_browser=True, cookies_file="c.json")
+        
+        import threading
+        redriven = threading.Event()
+        
+        class FakeService:
+            def __init__(self, ledger, dead_letters):
+                self.dead_letters = dead_letters
+            
+            async def redrive_dead_letters(self, limit=None):
+                entries = await self.dead_letters.list("xianyu", limit=limit)
+                for e in entries:
+                    await self.dead_letters.resolve(e["payload"], "xianyu", e["account"])
+                redriven.set()
+                return {"total": len(entries), "success": len(entries), "failed": 0}
+        
+        service = DeadLetterRedriveService(
+            os.path.join(tmp_dir, "dlq.db"), off_peak_hours=(0, 24), interval=0.05, publisher_factory=FakeService
+        )
+        service.start()
+        assert service.running and service.scheduler.running
+        assert await asyncio.to_thread(redriven.wait, 5)
+        await asyncio.to_thread(service.stop)
+        assert not service.running and not service.scheduler.running
+        assert await queue.list("xianyu") == []
+        print("✅ 死信自动重新投递服务启动和停止正常")
+        
+        await queue.close()
+    
+    print("\n✅ 测试11通过: 死信队列工作正常\n")
+
+
 async def run_all_tests():
     """运行所有测试"""
     
@@ -275,11 +1036,32 @@ async def run_all_tests():
         # 测试4: 内容适配对比
         await test_content_adaptation_comparison()
         
+        # 测试5: 持久化任务队列
+        await test_durable_job_queue()
+        
+        # 测试6: 多平台并行发布
+        await test_parallel_publish()
+        
+        # 测试7: 批量任务工作池
+        await test_worker_pool()
+        
+        # 测试8: 发布频率调度器
+        await test_rate_limit_scheduler()
+        
+        # 测试9: 取消与暂停
+        await test_cancel_and_pause()
+        
+        # 测试10: 发布台账
+        await test_publish_ledger()
+        
+        # 测试11: 死信队列
+        await test_dead_letter_queue()
+        
         # 总结
         print("\n" + "="*60)
         print("🎉 所有测试通过！批量发布系统工作正常！")
         print("="*60)
-        print(f"\n总计: 4/4 测试通过 (100%)")
+        print(f"\n总计: 11/11 测试通过 (100%)")
         print("\n")
         
         return True
@@ -2,15 +2,21 @@
 B站插件测试套件
 
 测试功能：
-- 标题生成器
+- 标题生成器（含批量候选标题）
 - 动态生成器
 - 标签推荐器
 - 分区优化器
+- 视频分片上传
 """
 
 import asyncio
+import hashlib
 import sys
 import os
+import tempfile
+import time
+
+import aiohttp
 
 # 添加项目根目录到路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -19,6 +25,9 @@ from plugins.bilibili.title_generator import BilibiliTitleGenerator
 from plugins.bilibili.dynamic_generator import BilibiliDynamicGenerator
 from plugins.bilibili.tag_recommender import BilibiliTagRecommender
 from plugins.bilibili.zone_optimizer import BilibiliZoneOptimizer
+from plugins.bilibili.api_client import BilibiliAPIClient
+from plugins.bilibili.chunked_upload import ChunkedUploader, UploadError
+from tools.bilibili_upload_standin import BilibiliUploadStandin, UploadStandinConfig
 
 
 class TestBilibiliPlugin:
@@ -87,6 +96,44 @@ class TestBilibiliPlugin:
             assert len(titles) > 0, "应该生成至少1个标题"
             print(f"✅ 生成了{len(titles)}个测评型标题")
             
+            # 测试1.4: 批量候选标题
+            print("\n1.4 批量候选标题（1000个）")
+            variables = {
+                "action": ["玩", "通关", "上分", "操作", "速通", "开荒"],
+                "number": [str(n) for n in range(3, 101)],
+            }
+            start = time.perf_counter()
+            candidates = self.title_gen.generate_candidates(
+                topic="原神新角色实战",
+                keywords=["原神", "新角色", "实战"],
+                zone="游戏",
+                count=1000,
+                top_k=20,
+                seed=42,
+                variables=variables
+            )
+            elapsed = time.perf_counter() - start
+            
+            assert len(candidates) == 20, f"应该返回20个候选，实际{len(candidates)}个"
+            scores = [c["score"] for c in candidates]
+            assert scores == sorted(scores, reverse=True), "候选应按评分排序"
+            assert len({c["title"] for c in candidates}) == 20, "候选不应重复"
+            assert all(
+                self.title_gen._score_title(c["title"], ["原神", "新角色", "实战"], "游戏") == c["score"]
+                for c in candidates
+            ), "批量评分应与单个评分一致"
+            assert candidates == self.title_gen.generate_candidates(
+                topic="原神新角色实战",
+                keywords=["原神", "新角色", "实战"],
+                zone="游戏",
+                count=1000,
+                top_k=20,
+                seed=42,
+                variables=variables
+            ), "相同种子应得到相同结果"
+            assert elapsed < 1.0, f"1000个候选耗时过长：{elapsed:.2f}秒"
+            print(f"✅ 1000个候选耗时 {elapsed * 1000:.0f}ms，最高分: {candidates[0]['title']} ({candidates[0]['score']})")
+            
             self.passed += 1
             print("\n✅ 标题生成器测试通过")
             
@@ -277,6 +324,105 @@ class TestBilibiliPlugin:
             import traceback
             traceback.print_exc()
     
+    async def test_chunked_upload(self):
+        """测试视频分片上传（本地上传替身）"""
+        
+        print("\n" + "="*60)
+        print("【测试5：视频分片上传】")
+        print("="*60)
+        
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir, BilibiliUploadStandin(
+                UploadStandinConfig(chunk_size=1024, chunk_delay=0.02)
+            ) as standin:
+                video_path = os.path.join(tmp_dir, "video.mp4")
+                content = os.urandom(10 * 1024 + 300)      # 11个分片，最后一个不满
+                with open(video_path, "wb") as f:
+                    f.write(content)
+                state_dir = os.path.join(tmp_dir, "uploads")
+                
+                # 测试5.1: 并发上传，失败和校验错误的分片单独重试
+                print("\n5.1 并发上传与分片重试")
+                standin.config.fail_parts = {3: 2}
+                standin.config.corrupt_parts = {5: 1}
+                client = BilibiliAPIClient("key", "secret", upload_base=standin.base_url,
+                                           upload_concurrency=4, upload_state_dir=state_dir)
+                try:
+                    client_uploader = await client._get_uploader()
+                    client_uploader.retry_delay = 0.01
+                    result = await client.upload_video(video_path, title="测试", desc="测试")
+                finally:
+                    await client.close()
+                
+                assert result["success"], f"上传应该成功: {result}"
+                uploaded = standin.completed["/ugc/n000001.mp4"]
+                assert uploaded["size"] == len(content), "合并后大小应一致"
+                assert uploaded["md5"] == hashlib.md5(content).hexdigest(), "合并后内容应一致"
+                assert uploaded["chunks"] == 11, "应该分为11个分片"
+                assert 1 < standin.stats["max_concurrent"] <= 4, "应该并发上传且不超过并发数"
+                assert standin.part_requests[3] == 3 and standin.part_requests[5] == 2, "只重试出错的分片"
+                assert client_uploader.get_stats()["retries"] == 3
+                assert not os.listdir(state_dir), "完成后应删除上传进度"
+                
+                print(f"✅ 11个分片上传完成，最大并发 {standin.stats['max_concurrent']}，重试 3 次")
+                
+                # 测试5.2: 中断后续传，只上传剩余分片
+                print("\n5.2 中断后续传")
+                standin.part_requests.clear()
+                standin.config.chunk_delay = 0
+                async with aiohttp.ClientSession() as session:
+                    uploader = ChunkedUploader(session, upload_base=standin.base_url, concurrency=2,
+                                               chunk_retries=0, state_dir=state_dir)
+                    standin.config.fail_parts = {7: 1}
+                    try:
+                        await uploader.upload(video_path)
+                        raise AssertionError("分片7失败时上传应该中断")
+                    except UploadError:
+                        pass
+                    
+                    interrupted = dict(standin.part_requests)
+                    assert os.listdir(state_dir), "中断后应保留上传进度"
+                    
+                    # 新的上传器（模拟程序重启）从保存的进度继续
+                    uploader = ChunkedUploader(session, upload_base=standin.base_url, concurrency=2,
+                                               state_dir=state_dir)
+                    result = await uploader.upload(video_path)
+                
+                assert result["skipped"] > 0, "应该跳过已完成的分片"
+                assert result["skipped"] + result["uploaded"] == 11
+                assert standin.stats["preuploads"] == 2, "续传不应重新预上传"
+                for number in range(1, 12):
+                    assert standin.part_requests.get(number, 0) - interrupted.get(number, 0) <= 1, \
+                        "已完成的分片不应重复上传"
+                uploaded = standin.completed["/ugc/n000002.mp4"]
+                assert uploaded["md5"] == hashlib.md5(content).hexdigest(), "续传后内容应一致"
+                
+                print(f"✅ 续传跳过 {result['skipped']} 个分片，上传剩余 {result['uploaded']} 个")
+                
+                # 测试5.3: 接口返回非JSON页面时报告UploadError（可重试），不抛出解析异常
+                print("\n5.3 非JSON响应")
+                standin.config.garbled_responses = 1
+                async with aiohttp.ClientSession() as session:
+                    uploader = ChunkedUploader(session, upload_base=standin.base_url, state_dir=state_dir)
+                    try:
+                        await uploader.upload(video_path)
+                        raise AssertionError("预上传返回HTML时应该失败")
+                    except UploadError as e:
+                        assert "不是JSON" in str(e)
+                    result = await uploader.upload(video_path)
+                assert result["uploaded"] == 11
+                
+                print("✅ 非JSON响应作为上传错误处理，重试后上传成功")
+            
+            self.passed += 1
+            print("\n✅ 视频分片上传测试通过")
+            
+        except Exception as e:
+            self.failed += 1
+            print(f"\n❌ 视频分片上传测试失败: {e}")
+            import traceback
+            traceback.print_exc()
+    
     async def run_all_tests(self):
         """运行所有测试"""
         
@@ -289,6 +435,7 @@ class TestBilibiliPlugin:
         await self.test_dynamic_generator()
         await self.test_tag_recommender()
         self.test_zone_optimizer()  # 同步测试
+        await self.test_chunked_upload()
         
         # 测试总结
         print("\n" + "="*60)
@@ -0,0 +1,948 @@
+"""
+浏览器自动化测试
+
+使用模拟的Playwright对象测试浏览器池等逻辑（不需要安装浏览器）
+"""
+
+import asyncio
+import sys
+import os
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.browser_automation import BrowserPool, XianyuAutomation
+
+
+class FakePage:
+    """模拟Playwright页面：提交后延迟跳转到商品详情页"""
+
+    def __init__(self, context, submit_delay: float = 0.05):
+        self.context = context
+        self.url = "about:blank"
+        self.closed = False
+        self.submit_delay = submit_delay
+        self.filled = {}
+        self.uploads = []
+        self.actions = []
+
+    def is_closed(self):
+        return self.closed
+
+    async def close(self):
+        self.closed = True
+
+    async def goto(self, url, wait_until=None, timeout=None):
+        self.actions.append(("goto", url, wait_until))
+        self.url = url
+        if url.endswith("/login"):
+            # 离线替身的登录页自动跳回首页
+            self.url = url[:-len("login")]
+        if self.context.browser.logged_out and "publish" in url:
+            # 会话失效：被重定向到登录页
+            self.url = "https://login.taobao.com/member/login.jhtml"
+
+    async def wait_for_selector(self, selector, state="visible", timeout=None):
+        if "success" in selector or "login" in self.url:
+            # 页面上没有成功提示元素；登录页上也没有发布页的元素
+            await asyncio.sleep(timeout / 1000)
+            raise TimeoutError(selector)
+        return object()
+
+    async def wait_for_function(self, expression, arg=None, timeout=None):
+        return True
+
+    async def evaluate(self, expression, arg=None):
+        return True
+
+    async def fill(self, selector, value, timeout=None):
+        self.filled[selector] = value
+
+    async def set_input_files(self, selector, files, timeout=None):
+        self.uploads.append(files)
+
+    async def click(self, selector, timeout=None):
+        self.actions.append(("click", selector))
+        if "publish" in selector:
+            asyncio.get_running_loop().call_later(
+                self.submit_delay, setattr, self, "url", "https://2.taobao.com/item.htm?id=123"
+            )
+
+    async def wait_for_url(self, predicate, timeout=None):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout / 1000
+        while not predicate(self.url):
+            if loop.time() > deadline:
+                raise TimeoutError("wait_for_url")
+            await asyncio.sleep(0.01)
+
+    async def wait_for_event(self, event, predicate=None, timeout=None):
+        await asyncio.sleep(timeout / 1000)
+        raise TimeoutError(event)
+
+    async def query_selector(self, selector):
+        return None
+
+    async def screenshot(self, path=None, **kwargs):
+        from io import BytesIO
+        from PIL import Image
+        self.actions.append(("screenshot", kwargs.get("type")))
+        buffer = BytesIO()
+        clip = kwargs.get("clip") or {"width": 1920, "height": 1080}
+        Image.new("RGB", (clip["width"], clip["height"]), "white").save(buffer, "JPEG")
+        return buffer.getvalue()
+
+
+class FakeTracing:
+    """模拟Playwright的context.tracing"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def start(self, **kwargs):
+        self.calls.append(("start", kwargs))
+
+    async def stop(self, path=None):
+        self.calls.append(("stop", path))
+        if path:
+            with open(path, "wb") as f:
+                f.write(b"PK")
+
+
+class FakeContext:
+    """模拟Playwright浏览器上下文"""
+
+    def __init__(self, browser, options):
+        self.browser = browser
+        self.options = options
+        self.tracing = FakeTracing()
+        self.pages = []
+        self.cookies = []
+        self.closed = False
+
+    async def route(self, pattern, handler):
+        self.routes = getattr(self, "routes", []) + [pattern]
+
+    async def add_cookies(self, cookies):
+        self.cookies.extend(cookies)
+
+    async def storage_state(self, path=None):
+        import json
+        state = {"cookies": self.cookies or [{"name": "sid", "value": "1"}], "origins": []}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        return state
+
+    async def new_page(self):
+        page = FakePage(self)
+        self.pages.append(page)
+        return page
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    """模拟Playwright浏览器"""
+
+    def __init__(self):
+        self.contexts = []
+        self.closed = False
+        self.logged_out = False
+
+    async def new_context(self, **options):
+        context = FakeContext(self, options)
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.closed = True
+
+
+async def test_browser_pool():
+    """测试浏览器池的上下文复用和页面回收"""
+
+    print("\n" + "="*60)
+    print("🧪 测试1: 浏览器池")
+    print("="*60)
+
+    browser = FakeBrowser()
+    pool = BrowserPool(headless=True, page_max_uses=2, browser=browser)
+
+    # 同一账号复用上下文和登录状态，页面使用2次后重建
+    pages = []
+    for i in range(3):
+        async with pool.session("account_a.json") as automation:
+            assert isinstance(automation, XianyuAutomation)
+            assert automation.headless
+            assert automation.logged_in == (i > 0)
+            if automation.logged_in:
+                assert await automation.login("account_a.json")   # 已登录时直接返回
+            automation.logged_in = True
+            pages.append(automation.page)
+            await automation.stop()                              # 池中的页面不会被关闭
+            assert not automation.page.closed
+
+    assert len(browser.contexts) == 1
+    assert pages[0] is pages[1] and pages[2] is not pages[0]
+    assert pages[0].closed
+    print("✅ 上下文和登录状态复用，页面按次数回收")
+
+    # 出错或标记需要回收时重建页面
+    async with pool.session("account_a.json") as automation:
+        page = automation.page
+        automation.needs_recycle = True
+    assert page.closed
+
+    try:
+        async with pool.session("account_a.json") as automation:
+            page = automation.page
+            raise RuntimeError("页面异常")
+    except RuntimeError:
+        pass
+    assert page.closed
+    print("✅ 出错后页面重建")
+
+    # 不同账号使用独立上下文，可以并发
+    async def use(key):
+        async with pool.session(key) as automation:
+            await asyncio.sleep(0.05)
+            return automation.context
+
+    contexts = await asyncio.gather(use("account_b.json"), use("account_c.json"), use("account_b.json"))
+    assert contexts[0] is contexts[2] and contexts[0] is not contexts[1]
+    assert len(browser.contexts) == 3
+
+    # 账号失效后需要重新登录
+    pool.invalidate("account_a.json")
+    async with pool.session("account_a.json") as automation:
+        assert not automation.logged_in
+
+    stats = pool.get_stats()
+    assert stats["launches"] == 0 and stats["contexts"] == 3
+
+    await pool.close()
+    assert all(c.closed for c in browser.contexts)
+    assert not browser.closed   # 外部提供的浏览器由调用方关闭
+    print(f"✅ 多账号独立上下文 {stats}")
+
+    print("\n✅ 测试1通过: 浏览器池工作正常\n")
+
+
+async def test_event_driven_waits():
+    """测试发布流程按页面状态等待，不使用固定等待"""
+
+    print("\n" + "="*60)
+    print("🧪 测试2: 事件驱动等待")
+    print("="*60)
+
+    import time
+
+    browser = FakeBrowser()
+    pool = BrowserPool(headless=True, browser=browser)
+
+    async with pool.session("account.json") as automation:
+        automation.logged_in = True
+        start = time.perf_counter()
+        result = await automation.publish_product(
+            title="测试商品",
+            price=99,
+            description="描述",
+            images=["a.jpg", "b.jpg"],
+        )
+        elapsed = time.perf_counter() - start
+        page = automation.page
+        stats = automation.get_step_stats()
+
+    assert result["success"] and result["post_id"] == "123"
+    assert result["submitted"]
+    assert page.uploads == ["a.jpg", "b.jpg"]
+    assert page.actions[0] == ("goto", XianyuAutomation.PUBLISH_URL, "domcontentloaded")
+
+    # 提交后跳转即结束等待：总耗时接近页面实际响应时间，而不是固定的数秒等待
+    assert elapsed < 1.0, f"发布耗时过长: {elapsed:.2f}s"
+    assert stats["wait_result"]["count"] == 1
+    assert 0.04 <= stats["wait_result"]["avg"] < 0.5
+    assert {"open_page", "upload_images", "fill_title", "submit", "verify"} <= set(stats)
+    print(f"✅ 发布流程耗时 {elapsed:.2f}s，步骤耗时已记录")
+
+    # wait_for_any：返回最先满足的条件，超时返回-1
+    async def after(delay, value):
+        await asyncio.sleep(delay)
+        return value
+
+    assert await automation.wait_for_any(after(0.2, True), after(0.01, True), timeout=1000) == 1
+    assert await automation.wait_for_any(after(0.01, False), after(0.05, True), timeout=1000) == 1
+    assert await automation.wait_for_any(after(1, True), timeout=50) == -1
+    print("✅ 多条件等待正常")
+
+    await pool.close()
+
+    print("\n✅ 测试2通过: 事件驱动等待工作正常\n")
+
+
+async def test_request_interceptor():
+    """测试请求拦截和静态资源缓存"""
+
+    print("\n" + "="*60)
+    print("🧪 测试3: 请求拦截")
+    print("="*60)
+
+    import tempfile
+    from core.request_interceptor import RequestInterceptor, RouteConfig
+
+    class FakeFrame:
+        def __init__(self, url):
+            self.url = url
+
+    class FakeRequest:
+        def __init__(self, url, resource_type, page_url="https://2.taobao.com/publish/index.htm"):
+            self.url = url
+            self.resource_type = resource_type
+            self.method = "GET"
+            self.headers = {"user-agent": "test"}
+            self.frame = FakeFrame(page_url)
+
+    # 服务器上的脚本（gzip传输，body()得到解压后的内容）
+    server = {"body": b"console.log('app');" * 100, "etag": '"v1"'}
+
+    class FakeResponse:
+        def __init__(self, body, status=200):
+            self._body = body
+            self.status = status
+            self.ok = status == 200
+            self.headers = {
+                "content-type": "application/javascript",
+                "content-encoding": "gzip",
+                "content-length": "42",
+                "etag": server["etag"],
+            }
+
+        async def body(self):
+            return self._body
+
+    class FakeRoute:
+        def __init__(self, request, network):
+            self.request = request
+            self.network = network
+            self.outcome = None
+            self.headers = None
+
+        async def abort(self):
+            self.outcome = "abort"
+
+        async def continue_(self):
+            self.outcome = "continue"
+            self.network.append(self.request.url)
+
+        async def fetch(self, headers=None):
+            self.network.append(self.request.url)
+            if headers and headers.get("if-none-match") == server["etag"]:
+                assert headers["user-agent"] == "test"
+                return FakeResponse(b"", status=304)
+            return FakeResponse(server["body"])
+
+        async def fulfill(self, status=200, headers=None, body=None, response=None):
+            self.outcome = ("fulfill", body)
+            self.headers = headers
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        interceptor = RequestInterceptor(RouteConfig(cache_dir=tmp_dir))
+        network = []
+
+        routes = []
+
+        async def request(url, resource_type, **kwargs):
+            route = FakeRoute(FakeRequest(url, resource_type, **kwargs), network)
+            routes.append(route)
+            await interceptor.handle(route)
+            return route.outcome
+
+        # 图片、字体和统计脚本被拦截
+        assert await request("https://img.alicdn.com/a.jpg", "image") == "abort"
+        assert await request("https://at.alicdn.com/font.woff2", "font") == "abort"
+        assert await request("https://log.mmstat.com/v.gif?x=1", "xhr") == "abort"
+
+        # 登录页不拦截（需要显示二维码）
+        assert await request(
+            "https://img.alicdn.com/qr.png", "image", page_url="https://login.taobao.com/member/login.jhtml"
+        ) == "continue"
+
+        # 接口请求正常放行
+        assert await request("https://2.taobao.com/api/publish", "xhr") == "continue"
+
+        # 脚本第一次下载并缓存，之后从缓存返回
+        first = await request("https://g.alicdn.com/app.js", "script")
+        second = await request("https://g.alicdn.com/app.js", "script")
+        assert first[0] == "fulfill" and second == first
+        assert network.count("https://g.alicdn.com/app.js") == 1
+
+        
+        # 返回的是解压后的内容，不能带原来的压缩编码和长度
+        for route in routes[-2:]:
+            assert "content-encoding" not in route.headers and "content-length" not in route.headers
+            assert route.headers["etag"] == '"v1"'
+
+        stats = interceptor.get_stats()
+        assert stats["requests"] == 7
+        assert stats["blocked"] == 3
+        assert stats["cache_misses"] == 1 and stats["cache_hits"] == 1
+        assert stats["bytes_saved"] == len(first[1])
+        print(f"✅ 拦截统计: {stats}")
+
+        # 缓存过期后向服务器验证：未变化(304)继续使用缓存，变化后重新下载
+        interceptor.config.cache_ttl = 0
+        assert await request("https://g.alicdn.com/app.js", "script") == first
+        assert network.count("https://g.alicdn.com/app.js") == 2
+
+        server.update(body=b"console.log('v2');", etag='"v2"')
+        assert await request("https://g.alicdn.com/app.js", "script") == ("fulfill", b"console.log('v2');")
+        interceptor.config.cache_ttl = 3600
+        assert await request("https://g.alicdn.com/app.js", "script") == ("fulfill", b"console.log('v2');")
+        assert network.count("https://g.alicdn.com/app.js") == 3
+
+        stats = interceptor.get_stats()
+        assert stats["revalidated"] == 1 and stats["cache_misses"] == 2 and stats["cache_hits"] == 3
+        print("✅ 过期缓存经服务器验证后使用，内容变化时更新")
+
+    print("\n✅ 测试3通过: 请求拦截工作正常\n")
+
+
+async def test_multi_account_publish():
+    """测试多账号隔离上下文并行发布"""
+
+    print("\n" + "="*60)
+    print("🧪 测试4: 多账号并行发布")
+    print("="*60)
+
+    import tempfile
+    import time
+    from core.rate_limiter import RateLimitRule, RateLimitScheduler
+    from plugins.xianyu.accounts import AccountProfile, load_account_profiles, save_account_profiles
+    from plugins.xianyu.publisher import XianyuPublisher
+
+    # 账号配置读写，停用的账号不参与发布
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "accounts.json")
+        assert [p.name for p in load_account_profiles(path)] == ["default"]
+
+        save_account_profiles([
+            AccountProfile("a", "a.json"),
+            AccountProfile("b", "b.json", proxy={"server": "http://127.0.0.1:7890"}, min_interval=0.01),
+            AccountProfile("c", "c.json", enabled=False, extra={"note": "备用"}),
+        ], path)
+        accounts = load_account_profiles(path)
+        assert [p.name for p in accounts] == ["a", "b"]
+        assert accounts[1].context_options == {"proxy": {"server": "http://127.0.0.1:7890"}}
+        print("✅ 账号配置读写正常")
+
+    accounts.append(AccountProfile("c", "c.json"))
+
+    rate_limiter = RateLimitScheduler(rules={"xianyu": RateLimitRule(min_interval=0.05)})
+    publisher = XianyuPublisher(rate_limiter=rate_limiter, headless=True, block_resources=False)
+    browser = FakeBrowser()
+    publisher.browser_pool = BrowserPool(headless=True, browser=browser, max_sessions=2)
+
+    used = []
+
+    async def fake_publish(automation, product, cookies_file):
+        used.append((cookies_file, automation.context))
+        await asyncio.sleep(0.05)
+        return {"success": True, "error": None, "post_id": product["title"], "post_url": None}
+
+    publisher._publish_with_automation = fake_publish
+
+    products = [{"title": f"商品{i}", "price": 10, "description": ""} for i in range(6)]
+    products[0]["account"] = "c"
+
+    start = time.perf_counter()
+    results = await publisher.batch_publish_accounts(products, accounts, optimize=False, max_parallel=2)
+    elapsed = time.perf_counter() - start
+
+    assert results["success"] == 6 and results["failed"] == 0
+    assert {name: s["total"] for name, s in results["accounts"].items()} == {"a": 2, "b": 2, "c": 2}
+
+    # 每个账号一个独立上下文，代理只用于对应账号
+    contexts = {key: context for key, context in used}
+    assert len(browser.contexts) == 3 and len(set(map(id, contexts.values()))) == 3
+    assert contexts["b.json"].options.get("proxy") == {"server": "http://127.0.0.1:7890"}
+    assert "proxy" not in contexts["a.json"].options
+
+    # 全局并发上限生效，且账号间并行：比顺序发布更快
+    stats = publisher.browser_pool.get_stats()
+    assert stats["max_active_sessions"] == 2
+    assert elapsed < 6 * 0.05 + 0.1, f"多账号发布耗时过长: {elapsed:.2f}s"
+
+    # 账号的发布间隔按各自的规则
+    assert rate_limiter.get_rule("xianyu", "b.json").min_interval == 0.01
+    assert rate_limiter.get_rule("xianyu", "a.json").min_interval == 0.05
+
+    await publisher.browser_pool.close()
+    print(f"✅ 多账号并行发布耗时 {elapsed:.2f}s {stats}")
+
+    print("\n✅ 测试4通过: 多账号并行发布工作正常\n")
+
+
+async def test_session_cache():
+    """测试登录会话缓存：有效期内跳过登录检查，过期或失效后重新验证"""
+
+    print("\n" + "="*60)
+    print("🧪 测试5: 登录会话缓存")
+    print("="*60)
+
+    import json
+    import tempfile
+    from core.session_cache import SessionCache
+    from core.step_tracer import StepTracer, TraceLevel
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cookies_file = os.path.join(tmp_dir, "cookies.json")
+        with open(cookies_file, "w", encoding="utf-8") as f:
+            json.dump([{"name": "sid", "value": "1", "domain": ".taobao.com", "path": "/"}], f)
+
+        now = [1000.0]
+        cache = SessionCache(os.path.join(tmp_dir, "sessions"), ttl=100, clock=lambda: now[0])
+        browser = FakeBrowser()
+
+        def home_visits(page):
+            return sum(1 for a in page.actions if a[0] == "goto" and a[1] == XianyuAutomation.XIANYU_URL)
+
+        # 第一次登录：打开首页验证，保存会话
+        pool = BrowserPool(headless=True, browser=browser, session_cache=cache)
+        async with pool.session(cookies_file) as automation:
+            assert await automation.login(cookies_file)
+            assert home_visits(automation.page) == 1
+        assert cache.is_valid(cookies_file) and cache.has_state(cookies_file)
+        await pool.close()
+
+        # 新批次：从保存的状态创建上下文，有效期内不打开首页
+        pool = BrowserPool(headless=True, browser=browser, session_cache=cache)
+        async with pool.session(cookies_file) as automation:
+            assert await automation.login(cookies_file)
+            assert home_visits(automation.page) == 0
+        assert browser.contexts[-1].options["storage_state"] == str(cache.state_path(cookies_file))
+        assert cache.get_stats()["hits"] == 1
+        print("✅ 有效期内跳过登录检查")
+
+        # 过期后重新验证
+        now[0] += 150
+        assert not cache.is_valid(cookies_file)
+        async with pool.session(cookies_file) as automation:
+            assert not automation.logged_in
+            assert await automation.login(cookies_file)
+            assert home_visits(automation.page) == 1
+        assert cache.is_valid(cookies_file)
+        print("✅ 过期后重新验证")
+
+        # 后台续期：即将过期的会话提前验证
+        now[0] += 90
+        refresher = pool.start_refresher(interval=3600, margin=20)
+        await asyncio.sleep(0.05)
+        assert cache.expires_in(cookies_file) == 100
+        assert cache.get_stats()["refreshes"] == 1
+        await refresher.stop()
+        print("✅ 后台续期正常")
+
+        # 登录失效信号：发布时被重定向到登录页，会话作废
+        browser.logged_out = True
+        tracer = StepTracer(TraceLevel.OFF)
+        async with pool.session(cookies_file, tracer=tracer) as automation:
+            assert await automation.login(cookies_file)
+            result = await automation.publish_product(title="商品", price=1, description="", images=[])
+        assert not result["success"] and not result["submitted"]
+        assert "登录已失效" in result["error"]
+        assert not cache.is_valid(cookies_file)
+        assert cache.expiring([cookies_file], margin=1000) == []   # 失效的会话不再后台续期
+
+        # 重新创建的缓存读取同一索引
+        assert not SessionCache(os.path.join(tmp_dir, "sessions"), ttl=100, clock=lambda: now[0]).is_valid(cookies_file)
+
+        stats = cache.get_stats()
+        assert stats["invalidations"] == 1
+        await pool.close()
+        print(f"✅ 登录失效后需要重新验证 {stats}")
+
+    print("\n✅ 测试5通过: 登录会话缓存工作正常\n")
+
+
+async def test_step_tracing():
+    """测试步骤追踪：正常发布不截图，失败时保存缩略图和trace，耗时写入数据库"""
+
+    print("\n" + "="*60)
+    print("🧪 测试6: 步骤追踪")
+    print("="*60)
+
+    import tempfile
+    from PIL import Image
+    from core.step_tracer import StepTracer, StepTimingStore, TraceLevel
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = StepTimingStore(os.path.join(tmp_dir, "test.db"))
+        tracer = StepTracer(
+            TraceLevel.TRACE, output_dir=os.path.join(tmp_dir, "traces"), store=store, thumbnail_size=(320, 320)
+        )
+        browser = FakeBrowser()
+        pool = BrowserPool(headless=True, browser=browser)
+
+        # 正常发布：不截图，trace丢弃
+        async with pool.session("account.json", tracer=tracer) as automation:
+            automation.logged_in = True
+            result = await automation.publish_product(title="商品A", price=1, description="", images=["a.jpg"])
+            page, context = automation.page, automation.context
+
+        assert result["success"]
+        assert not any(a[0] == "screenshot" for a in page.actions)
+        assert result["screenshot_path"] == "" and result["trace_path"] is None
+        assert context.tracing.calls == [("start", {"screenshots": True, "snapshots": True}), ("stop", None)]
+        print("✅ 正常发布没有截图开销")
+
+        # 发布失败：保存裁剪后的JPEG缩略图和trace
+        browser.logged_out = True
+        async with pool.session("account.json", tracer=tracer) as automation:
+            automation.logged_in = True
+            result = await automation.publish_product(title="商品B", price=1, description="", images=[])
+
+        assert not result["success"]
+        assert result["screenshot_path"].endswith(".jpg") and os.path.exists(result["screenshot_path"])
+        with Image.open(result["screenshot_path"]) as image:
+            assert image.format == "JPEG" and max(image.size) <= 320
+        assert result["trace_path"].endswith(".zip") and os.path.exists(result["trace_path"])
+        print("✅ 失败时保存缩略图和trace")
+
+        # 步骤耗时写入数据库
+        stats = await store.get_stats("xianyu")
+        await store.close()
+        assert stats["open_page"]["count"] == 2
+        assert stats["open_page"]["failed"] == 1      # 出错时正在执行的步骤记为失败
+        assert stats["submit"]["count"] == 1
+        assert tracer.get_stats() == {"level": "trace", "items": 2, "thumbnails": 1, "traces": 1}
+
+        # off级别：既不截图也不记录耗时
+        off = StepTracer(TraceLevel.OFF, output_dir=os.path.join(tmp_dir, "off"))
+        assert await off.capture_error(page) == ""
+        assert not await off.start(context)
+        await off.save_timings("商品C", [("open_page", "success", 0.1)], True)
+        assert off.get_stats()["items"] == 0
+
+        await pool.close()
+        print(f"✅ 步骤耗时已记录: { {k: v['count'] for k, v in stats.items()} }")
+
+    print("\n✅ 测试6通过: 步骤追踪工作正常\n")
+
+
+async def test_offline_standin():
+    """测试离线闲鱼替身和基准测试工具"""
+
+    print("\n" + "="*60)
+    print("🧪 测试7: 离线闲鱼替身")
+    print("="*60)
+
+    import json
+    import urllib.request
+    from tools.xianyu_standin import StandinConfig, XianyuStandin, load_selector_config
+    from tools.benchmark_xianyu import run_benchmark, summarize
+
+    def get(url):
+        with urllib.request.urlopen(url, timeout=5) as resp:
+            return resp.read().decode("utf-8")
+
+    def post(url, data):
+        request = urllib.request.Request(
+            url, data=json.dumps(data).encode("utf-8"), headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=5) as resp:
+            return json.loads(resp.read())
+
+    config = StandinConfig(upload_delay=0.05, submit_delay=0.01, fail_titles={"坏商品"})
+    with XianyuStandin(config) as standin:
+        automation_cls = standin.automation_class()
+        assert automation_cls.PUBLISH_URL == f"{standin.base_url}/publish/index.htm"
+
+        # 页面包含选择器需要的元素
+        page = await asyncio.to_thread(get, automation_cls.PUBLISH_URL)
+        for fragment in ('type="file"', 'placeholder="标题"', 'placeholder="价格"',
+                         'placeholder="描述"', 'class="category-btn"', 'class="publish-btn"'):
+            assert fragment in page, fragment
+        assert "var UPLOAD_DELAY = 0.05;" in page
+        assert 'class="user-info"' in await asyncio.to_thread(get, automation_cls.XIANYU_URL)
+
+        # 提交接口：成功返回商品ID，指定标题注入失败
+        ok = await asyncio.to_thread(post, f"{standin.base_url}/api/publish", {"title": "好商品", "images": 2})
+        bad = await asyncio.to_thread(post, f"{standin.base_url}/api/publish", {"title": "坏商品"})
+        assert ok == {"ok": True, "id": 1} and not bad["ok"]
+        assert standin.published == [{"title": "好商品", "images": 2}]
+
+        stats = standin.get_stats()
+        assert stats["publish_requests"] == 2 and stats["published"] == 1 and stats["failed"] == 1
+        print(f"✅ 替身服务正常 {stats}")
+
+    # 选择器配置：面板保存的文件覆盖默认值
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "selectors.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"version": "1.0", "selectors": {"title_input": "input[name='title']"}}, f)
+        selectors = load_selector_config(path)
+        assert selectors["title_input"] == "input[name='title']"
+        assert selectors["price_input"] == XianyuAutomation.SELECTORS["price_input"]
+
+    # 耗时分布
+    dist = summarize([0.1, 0.2, 0.3, 0.4, 1.0])
+    assert dist["count"] == 5 and dist["p50"] == 0.3 and dist["max"] == 1.0
+    assert abs(dist["avg"] - 0.4) < 1e-9
+
+    # 基准测试流程（使用模拟浏览器，真实环境下启动无头Chromium）
+    report = await run_benchmark(items=3, images=2, config=StandinConfig(), browser=FakeBrowser(), selectors={})
+    assert report["success"] == 3 and report["failed"] == 0
+    assert report["item_latency"]["count"] == 3
+    assert report["steps"]["upload_images"]["count"] == 3
+    assert report["pool"]["contexts"] == 1 and report["pool"]["sessions"] == 3
+    print(f"✅ 基准测试报告: {report['items_per_minute']:.0f} 个/分钟")
+
+    print("\n✅ 测试7通过: 离线闲鱼替身工作正常\n")
+
+
+async def test_image_pipeline():
+    """测试图片预处理流水线"""
+
+    print("\n" + "="*60)
+    print("🧪 测试8: 图片预处理流水线")
+    print("="*60)
+
+    import shutil
+    import tempfile
+    from PIL import Image
+    from core.image_pipeline import ImagePipeline, ImageSpec
+    from core.publisher import PLATFORM_LIMITS, PlatformType
+    from plugins.xianyu.publisher import XianyuPublisher
+
+    spec = ImageSpec.from_limits(PLATFORM_LIMITS[PlatformType.XIANYU])
+    assert spec.max_dimension == 1600 and spec.max_bytes == 2 * 1024 * 1024
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # 4000x3000 横拍原图，EXIF方向为6（需要顺时针旋转90度）并带GPS信息
+        large = os.path.join(tmp_dir, "large.jpg")
+        image = Image.effect_noise((4000, 3000), 30).convert("RGB")
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        exif[0x8825] = {1: "N", 2: (39.0, 54.0, 0.0)}
+        image.save(large, "JPEG", quality=95, exif=exif)
+
+        transparent = os.path.join(tmp_dir, "logo.png")
+        Image.new("RGBA", (300, 200), (255, 0, 0, 0)).save(transparent)
+
+        broken = os.path.join(tmp_dir, "broken.jpg")
+        with open(large, "rb") as f:
+            head = f.read(2000)
+        with open(broken, "wb") as f:
+            f.write(head)
+
+        missing = os.path.join(tmp_dir, "missing.jpg")
+
+        cache_dir = os.path.join(tmp_dir, "cache")
+        pipeline = ImagePipeline(ImageSpec(max_dimension=1600, max_bytes=500_000), cache_dir=cache_dir, max_workers=2)
+        try:
+            results = await pipeline.process([large, transparent, broken, missing])
+            assert [r["ok"] for r in results] == [True, True, False, False]
+            assert "不存在" in results[3]["error"]
+
+            with Image.open(results[0]["path"]) as out:
+                assert out.format == "JPEG"
+                assert max(out.size) <= 1600 and out.height > out.width      # 已按EXIF方向旋转
+                assert len(out.getexif()) == 0                                # 元数据已去除
+            assert results[0]["bytes"] <= 500_000 < results[0]["original_bytes"]
+
+            with Image.open(results[1]["path"]) as out:
+                assert out.mode == "RGB" and out.getpixel((0, 0)) == (255, 255, 255)
+
+            # 相同内容（即使路径不同）直接使用缓存
+            copy = os.path.join(tmp_dir, "copy.jpg")
+            shutil.copy(large, copy)
+            again = await pipeline.process([copy])
+            assert again[0]["cached"] and again[0]["path"] == results[0]["path"]
+
+            # 同一文件只提交一次
+            assert pipeline.submit(large) is pipeline.submit(large)
+
+            stats = pipeline.get_stats()
+            assert stats["images"] == 5 and stats["cached"] == 1 and stats["failed"] == 2
+            assert stats["bytes_saved"] > 0
+            print(f"✅ 图片处理正常 {stats}")
+
+            # 发布时上传处理后的图片，损坏的图片被剔除
+            publisher = XianyuPublisher(block_resources=False, cache_sessions=False, image_pipeline=pipeline)
+
+            class RecordingAutomation:
+                uploaded = None
+
+                async def login(self, cookies_file=None):
+                    return True
+
+                async def publish_product(self, title, price, description, images, category):
+                    self.uploaded = images
+                    return {"success": True, "post_id": "1", "post_url": None}
+
+            automation = RecordingAutomation()
+            product = {"title": "测试", "price": 10, "images": [large, broken, transparent]}
+            await publisher._publish_with_automation(automation, product, "a.json")
+            assert automation.uploaded == [results[0]["path"], results[1]["path"]]
+
+            # 默认所有发布器共用一个流水线；打包后的程序不使用进程池
+            first = XianyuPublisher(block_resources=False, cache_sessions=False)
+            second = XianyuPublisher(block_resources=False, cache_sessions=False)
+            assert first.image_pipeline is second.image_pipeline
+            assert first.image_pipeline.spec == spec
+            sys.frozen = True
+            try:
+                assert not ImagePipeline().use_processes
+            finally:
+                del sys.frozen
+            assert ImagePipeline().use_processes
+            print("✅ 发布器共用流水线，打包后使用线程池")
+        finally:
+            pipeline.close()
+
+    print("\n✅ 测试8通过: 图片预处理流水线工作正常\n")
+
+
+async def test_find_published_item():
+    """测试在已发布列表中核对商品"""
+
+    print("\n" + "="*60)
+    print("🧪 测试9: 核对已发布商品")
+    print("="*60)
+
+    from datetime import datetime, timedelta
+    from core.browser_automation import parse_item_time, parse_item_price
+
+    now = datetime(2025, 10, 18, 12, 0, 0)
+    assert parse_item_time("刚刚", now) == now
+    assert parse_item_time("3分钟前", now) == now - timedelta(minutes=3)
+    assert parse_item_time("今天 11:30", now) == datetime(2025, 10, 18, 11, 30, 59)
+    assert parse_item_time("昨天 23:00", now) == datetime(2025, 10, 17, 23, 0, 59)
+    assert parse_item_time("10-17", now) == datetime(2025, 10, 17, 23, 59, 59)
+    assert parse_item_time("12-31", now) == datetime(2024, 12, 31, 23, 59, 59)
+    assert parse_item_time("2025-10-18 09:05", now) == datetime(2025, 10, 18, 9, 5, 59)
+    assert parse_item_time("全新iPhone", now) is None
+    assert parse_item_price("¥ 99.5 包邮") == 99.5 and parse_item_price("面议") is None
+
+    S = XianyuAutomation.SELECTORS
+
+    class FakeElement:
+        def __init__(self, text, fields=None, href=None):
+            self.text = text
+            self.fields = fields or {}
+            self.href = href
+
+        async def inner_text(self):
+            return self.text
+
+        async def get_attribute(self, name):
+            return self.href
+
+        async def query_selector(self, selector):
+            if selector == S["my_item_link"]:
+                return self
+            for key, value in self.fields.items():
+                if selector == S[key]:
+                    return FakeElement(value)
+            return None
+
+    class ItemsPage:
+        def __init__(self, items):
+            self.items = items
+            self.url = "about:blank"
+
+        async def goto(self, url, wait_until=None, timeout=None):
+            self.url = url
+
+        async def query_selector_all(self, selector):
+            return self.items
+
+    def item(title, price, published, item_id):
+        return FakeElement(
+            f"{title}\n¥{price}\n{published}",
+            {"my_item_title": title, "my_item_price": f"¥{price}", "my_item_time": published},
+            f"https://2.taobao.com/item.htm?id={item_id}"
+        )
+
+    automation = XianyuAutomation()
+    since = datetime.now() - timedelta(minutes=10)
+    automation.page = ItemsPage([
+        item("iPhone 13 九成新 国行", 2999, "5分钟前", "1"),     # 标题包含目标标题
+        item("iPhone 13", 2999, "2025-01-01 10:00", "2"),        # 以前上架的同名商品
+        item("iPhone 13", 1999, "3分钟前", "3"),                 # 价格不同
+    ])
+    assert await automation.find_published_item("iPhone 13", price=2999, since=since) is None
+
+    automation.page.items.append(item(" iPhone  13 ", 2999, "刚刚", "4"))
+    found = await automation.find_published_item("iPhone 13", price=2999, since=since)
+    assert found["post_id"] == "4"
+
+    # 只核对价格时也能确认；标题一致但时间和价格都读不到时无法确认
+    assert (await automation.find_published_item("iPhone 13", price=1999))["post_id"] == "3"
+    automation.page.items = [FakeElement("iPhone 13\n在售", {"my_item_title": "iPhone 13"})]
+    try:
+        await automation.find_published_item("iPhone 13", price=2999, since=since)
+        assert False, "应该无法确认"
+    except Exception as e:
+        assert "无法确认" in str(e)
+    print("✅ 只认标题一致、登记后发布且价格一致的商品")
+
+    print("\n✅ 测试9通过: 核对已发布商品正常\n")
+
+
+async def run_all_tests():
+    """运行所有测试"""
+
+    print("\n")
+    print("="*60)
+    print("🚀 浏览器自动化测试套件")
+    print("="*60)
+
+    try:
+        # 测试1: 浏览器池
+        await test_browser_pool()
+
+        # 测试2: 事件驱动等待
+        await test_event_driven_waits()
+
+        # 测试3: 请求拦截
+        await test_request_interceptor()
+
+        # 测试4: 多账号并行发布
+        await test_multi_account_publish()
+
+        # 测试5: 登录会话缓存
+        await test_session_cache()
+
+        # 测试6: 步骤追踪
+        await test_step_tracing()
+
+        # 测试7: 离线闲鱼替身
+        await test_offline_standin()
+
+        # 测试8: 图片预处理流水线
+        await test_image_pipeline()
+
+        # 测试9: 核对已发布商品
+        await test_find_published_item()
+
+        print("\n" + "="*60)
+        print("🎉 所有测试通过！")
+        print("="*60)
+        print(f"\n总计: 9/9 测试通过 (100%)")
+        print("\n")
+
+        return True
+
+    except Exception as e:
+        print(f"\n❌ 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    success = asyncio.run(run_all_tests())
+    exit(0 if success else 1)
@@ -3,6 +3,7 @@
 测试Day 4和Day 5新增的数据库方法
 """
 import asyncio
+import os
 import sys
 from pathlib import Path
 
@@ -110,6 +111,60 @@ async def test_get_ai_stats_summary():
     return True
 
 
+async def test_lazy_task_rows():
+    """测试任务JSON字段延迟解析与字段投影"""
+    print("\n" + "=" * 60)
+    print("🧪 测试: get_tasks() - 延迟解析与字段投影")
+    print("=" * 60)
+    
+    import tempfile
+    from core.database import LazyRow
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = Database(os.path.join(tmp_dir, "lazy.db"))
+        await db.connect()
+        
+        task_id = await db.create_task(
+            "xianyu_publish",
+            name="延迟解析测试",
+            data={"product": {"title": "测试商品", "price": 99}}
+        )
+        await db.complete_task(task_id, result={"post_url": "https://example.com/1"})
+        
+        # 全字段查询：JSON字段首次访问时才解析
+        tasks = await db.get_tasks(type="xianyu_publish")
+        assert len(tasks) == 1
+        task = tasks[0]
+        assert isinstance(task, LazyRow)
+        assert isinstance(dict.get(task, "data"), str), "data不应提前解析"
+        assert task["status"] == "completed"
+        assert task["data"]["product"]["title"] == "测试商品"
+        assert task.get("result")["post_url"] == "https://example.com/1"
+        assert dict(task)["data"]["product"]["price"] == 99
+        print("✅ JSON字段按需解析")
+        
+        # 字段投影
+        tasks = await db.get_tasks(type="xianyu_publish", columns=["id", "status"])
+        assert set(tasks[0].keys()) == {"id", "status"}
+        
+        tasks = await db.get_tasks_by_date_range(
+            "2000-01-01", "2999-12-31", columns=["status"]
+        )
+        assert [t["status"] for t in tasks] == ["completed"]
+        print("✅ 字段投影正常")
+        
+        # 非法字段
+        try:
+            await db.get_tasks(columns=["status; DROP TABLE tasks"])
+            assert False, "应拒绝未知字段"
+        except ValueError:
+            print("✅ 拒绝未知字段")
+        
+        await db.close()
+    
+    return True
+
+
 async def main():
     """运行所有测试"""
     print("\n" + "=" * 60)
@@ -144,6 +199,14 @@ async def main():
         print(f"❌ get_ai_stats_summary 测试失败: {e}")
         results.append(("get_ai_stats_summary", False))
     
+    # 测试4: 延迟解析与字段投影
+    try:
+        result = await test_lazy_task_rows()
+        results.append(("lazy_task_rows", result))
+    except Exception as e:
+        print(f"❌ lazy_task_rows 测试失败: {e}")
+        results.append(("lazy_task_rows", False))
+    
     # 打印总结
     print("\n" + "=" * 60)
     print("📋 测试报告")
@@ -160,6 +160,260 @@ async def test_batch_import_and_optimize():
         return False
 
 
+async def test_pipelined_batch_publish():
+    """测试批量发布时AI优化与发布流水线执行"""
+    print("\n" + "=" * 60)
+    print("🧪 测试4: 优化与发布流水线")
+    print("=" * 60)
+    
+    import time
+    from plugins.xianyu.publisher import XianyuPublisher
+    
+    publisher = XianyuPublisher(block_resources=False, cache_sessions=False)
+    publisher.optimize_interval = 0
+    
+    state = {"optimized": 0, "published": 0, "max_lead": 0}
+    
+    async def fake_optimize(product):
+        await asyncio.sleep(0.1)
+        state["optimized"] += 1
+        return {**product, "title": product["title"] + "（优化）"}
+    
+    async def fake_publish(product, use_browser=True, cookies_file=None, **kwargs):
+        assert product["title"].endswith("（优化）")
+        state["max_lead"] = max(state["max_lead"], state["optimized"] - state["published"])
+        await asyncio.sleep(0.1)
+        state["published"] += 1
+        return {"success": True, "error": None, "post_id": product["title"], "post_url": None}
+    
+    publisher.optimize_product = fake_optimize
+    publisher.publish_product = fake_publish
+    
+    progress = []
+    products = [{"title": f"商品{i}", "price": 10} for i in range(6)]
+    
+    start = time.perf_counter()
+    results = await publisher.batch_publish(
+        products, optimize=True, use_browser=False,
+        progress_callback=lambda p, status, title: progress.append((p, status)),
+        pipeline_depth=2
+    )
+    elapsed = time.perf_counter() - start
+    
+    assert results["success"] == 6 and results["optimized"] == 6
+    
+    # 顺序执行需要 6*(0.1+0.1)=1.2s，流水线约 (6+1)*0.1=0.7s
+    print(f"   耗时: {elapsed:.2f}s")
+    assert elapsed < 1.0, f"流水线没有重叠执行: {elapsed:.2f}s"
+    
+    # 反压：已优化未发布的商品数有上限（队列2个 + 发布中1个 + 等待入队1个）
+    assert state["max_lead"] <= 2 + 2
+    
+    # 进度按阶段报告，单调递增到100%
+    statuses = {status for _, status in progress}
+    assert statuses == {"优化中", "发布中"}
+    values = [p for p, _ in progress]
+    assert values == sorted(values) and abs(values[-1] - 100) < 1e-6
+    
+    # 优化出错时保留原商品继续发布
+    async def broken_optimize(product):
+        raise RuntimeError("AI不可用")
+    
+    publisher.optimize_product = broken_optimize
+    publisher.publish_product = lambda product, **kwargs: fake_publish({**product, "title": product["title"] + "（优化）"})
+    results = await publisher.batch_publish(products[:2], optimize=True, use_browser=False)
+    assert results["success"] == 2
+    
+    print("✅ 优化与发布流水线执行正常")
+    return True
+
+
+async def test_streaming_import():
+    """测试流式导入：分块清洗、批量写库、错误报告"""
+    print("\n" + "=" * 60)
+    print("🧪 测试5: 流式导入")
+    print("=" * 60)
+    
+    import tempfile
+    import pandas as pd
+    
+    rows = 2500
+    data = pd.DataFrame({
+        "title": [f"商品{i}" for i in range(rows)],
+        "price": [str(10 + i % 50) for i in range(rows)],
+        "category": ["数码产品"] * rows,
+        "images": ["a.jpg; b.jpg"] * rows,
+        "quantity": [""] * rows,
+    })
+    # 注入错误行：空标题、无效价格、负价格、缺分类
+    data.loc[10, "title"] = ""
+    data.loc[1200, "price"] = "免费"
+    data.loc[1201, "price"] = "-5"
+    data.loc[2400, "category"] = ""
+    data.loc[0, "title"] = "长" * 150
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_file = f"{tmp_dir}/products.csv"
+        xlsx_file = f"{tmp_dir}/products.xlsx"
+        data.to_csv(csv_file, index=False, encoding="utf-8-sig")
+        data.to_excel(xlsx_file, index=False)
+        
+        importer = DataImporter()
+        
+        # CSV和Excel的清洗结果一致
+        for file_path in (csv_file, xlsx_file):
+            batches = list(importer.iter_batches(file_path, batch_size=1000))
+            assert [len(b) for b in batches] == [999, 998, 499], [len(b) for b in batches]
+            assert [e["row_number"] for e in importer.errors] == [12, 1202, 1203, 2402]
+            assert importer.errors[1]["error"] == "无效的价格: 免费"
+            
+            first = batches[0][0]
+            assert len(first["title"]) == 100
+            assert first["images"] == ["a.jpg", "b.jpg"]
+            assert first["quantity"] == 1 and first["status"] == "待发布"
+            assert first["row_number"] == 2
+        
+        # 分批写入数据库，错误行写入旁路报告
+        db = Database(f"{tmp_dir}/import.db")
+        await db.connect()
+        try:
+            stats = await importer.import_to_database(csv_file, db, batch_size=1000)
+            cursor = await db.conn.execute("SELECT COUNT(*) FROM products")
+            count = (await cursor.fetchone())[0]
+        finally:
+            await db.close()
+        
+        assert stats["imported"] == count == rows - 4
+        assert stats["batches"] == 3 and stats["errors"] == 4
+        report = pd.read_csv(stats["error_report"], encoding="utf-8-sig", dtype=str)
+        assert list(report["row_number"]) == ["12", "1202", "1203", "2402"]
+        assert "error" in report.columns and "title" in report.columns
+        
+        # 错误报告可以直接重新导入：上次的错误列不冲突，行号以报告本身为准
+        batches = list(importer.iter_batches(stats["error_report"]))
+        assert sum(len(b) for b in batches) == 0
+        assert [e["row_number"] for e in importer.errors] == [2, 3, 4, 5]
+        assert importer.errors[1]["error"] == "无效的价格: 免费"
+        
+        report.loc[1, "price"] = "10"
+        report.to_csv(stats["error_report"], index=False, encoding="utf-8-sig")
+        batches = list(importer.iter_batches(stats["error_report"]))
+        assert [p["row_number"] for b in batches for p in b] == [3]
+        assert "error" not in batches[0][0]
+    
+    print(f"✅ 流式导入正常: {stats}")
+    return True
+
+
+async def test_retry_policy():
+    """测试按错误类别重试和批次重试预算"""
+    print("\n" + "=" * 60)
+    print("🧪 测试6: 重试策略")
+    print("=" * 60)
+    
+    import random
+    from plugins.xianyu.retry_handler import RetryHandler, RetryBudget, RetryAction, ErrorClassifier
+    
+    assert ErrorClassifier.get_action("账号被封禁") == RetryAction.FAIL_FAST
+    assert ErrorClassifier.get_action("登录失败") == RetryAction.FAIL_FAST
+    assert ErrorClassifier.get_action("登录已失效，需要重新登录") == RetryAction.RELOGIN
+    assert ErrorClassifier.get_action("Cookie已过期") == RetryAction.RELOGIN
+    assert ErrorClassifier.get_action("网络超时") == RetryAction.RETRY
+    assert ErrorClassifier.get_action("元素未找到", {"页面结构变化": RetryAction.RETRY}) == RetryAction.RETRY
+    
+    def failing(*errors):
+        calls = []
+        
+        async def publish():
+            calls.append(1)
+            if len(calls) <= len(errors):
+                return {"success": False, "error": errors[len(calls) - 1]}
+            return {"success": True, "post_id": "ok"}
+        
+        return publish, calls
+    
+    handler = RetryHandler(max_retries=3, retry_delay=0.01, rng=random.Random(1))
+    
+    # 不可重试的错误只执行一次
+    publish, calls = failing("账号被封禁")
+    result = await handler.retry_with_backoff(publish)
+    assert not result["success"] and result["retry_action"] == "fail_fast" and len(calls) == 1
+    
+    # 登录失效：重新登录后立即重试；没有relogin时直接失败
+    relogins = []
+    
+    async def relogin():
+        relogins.append(1)
+        return True
+    
+    publish, calls = failing("登录已失效，需要重新登录")
+    result = await handler.retry_with_backoff(publish, relogin=relogin)
+    assert result["success"] and len(calls) == 2 and len(relogins) == 1
+    
+    publish, calls = failing("Cookie已过期", "Cookie已过期")
+    result = await handler.retry_with_backoff(publish, relogin=relogin)
+    assert not result["success"] and len(calls) == 2 and len(relogins) == 2      # 每个商品最多重新登录1次
+    
+    # 临时错误抖动退避后重试，异常与返回失败一样处理
+    async def flaky():
+        flaky.calls += 1
+        if flaky.calls == 1:
+            raise RuntimeError("网络超时")
+        return {"success": True}
+    flaky.calls = 0
+    assert (await handler.retry_with_backoff(flaky))["success"]
+    
+    delays = [handler.compute_delay(i) for i in range(3)]
+    assert 0.005 <= delays[0] <= 0.01 and 0.01 <= delays[1] <= 0.02 and 0.02 <= delays[2] <= 0.04
+    capped = RetryHandler(retry_delay=10, max_delay=15, jitter=0)
+    assert capped.compute_delay(5) == 15
+    
+    # 批次预算：系统性故障时重试很快停止
+    handler.budget = RetryBudget.for_batch(10, ratio=0.2, minimum=1)
+    assert handler.budget.max_retries == 2
+    attempts = 0
+    for _ in range(5):
+        publish, calls = failing("系统繁忙", "系统繁忙", "系统繁忙", "系统繁忙")
+        result = await handler.retry_with_backoff(publish)
+        attempts += len(calls)
+    assert attempts == 5 + 2 and result["retry_budget_exhausted"]
+    
+    stats = handler.get_stats()
+    assert stats["calls"] == 9 and stats["fail_fast"] == 2 and stats["relogins"] == 2
+    assert stats["recovered"] == 2 and stats["budget"]["used"] == 2 and stats["budget"]["denied"] == 5
+    assert stats["categories"]["认证问题"] == 3 and stats["categories"]["账号问题"] == 1
+    
+    print(f"✅ 重试策略正常: {stats}")
+    return True
+
+
+async def test_account_rate_rules():
+    """测试多账号发布间隔设置不重置每日上限"""
+    print("\n" + "=" * 60)
+    print("🧪 测试7: 账号发布间隔")
+    print("=" * 60)
+    
+    from core.rate_limiter import RateLimitScheduler, RateLimitRule
+    from plugins.xianyu.accounts import AccountProfile
+    from plugins.xianyu.publisher import XianyuPublisher
+    
+    limiter = RateLimitScheduler(rules={"xianyu": RateLimitRule(min_interval=0, capacity=2, refill_period=86400)})
+    publisher = XianyuPublisher(rate_limiter=limiter, cache_sessions=False, preprocess_images=False)
+    account = AccountProfile(name="A", cookies_file="a.json", min_interval=0.5)
+    
+    # 每个批次开始时都会应用账号设置
+    publisher._apply_account_rules([account])
+    assert limiter.reserve("xianyu", "a.json") == 0
+    publisher._apply_account_rules([account])
+    assert 0.4 < limiter.reserve("xianyu", "a.json") <= 0.5
+    publisher._apply_account_rules([account])
+    assert limiter.reserve("xianyu", "a.json") > 3600, "每日上限不应被账号设置重置"
+    assert limiter.get_rule("xianyu", "a.json").min_interval == 0.5
+    
+    print("✅ 账号发布间隔正常")
+    return True
+
+
 async def main():
     """运行所有测试"""
     print("\n" + "=" * 60)
@@ -194,6 +448,38 @@ async def main():
         print(f"❌ 完整流程测试失败: {e}")
         results.append(("完整流程", False))
     
+    # 测试4: 优化与发布流水线
+    try:
+        result = await test_pipelined_batch_publish()
+        results.append(("优化发布流水线", result))
+    except Exception as e:
+        print(f"❌ 优化发布流水线测试失败: {e}")
+        results.append(("优化发布流水线", False))
+    
+    # 测试5: 流式导入
+    try:
+        result = await test_streaming_import()
+        results.append(("流式导入", result))
+    except Exception as e:
+        print(f"❌ 流式导入测试失败: {e}")
+        results.append(("流式导入", False))
+    
+    # 测试6: 重试策略
+    try:
+        result = await test_retry_policy()
+        results.append(("重试策略", result))
+    except Exception as e:
+        print(f"❌ 重试策略测试失败: {e}")
+        results.append(("重试策略", False))
+    
+    # 测试7: 账号发布间隔
+    try:
+        result = await test_account_rate_rules()
+        results.append(("账号发布间隔", result))
+    except Exception as e:
+        print(f"❌ 账号发布间隔测试失败: {e}")
+        results.append(("账号发布间隔", False))
+    
     # 打印总结
     print("\n" + "=" * 60)
     print("📋 测试报告")
@@ -13,6 +13,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 from plugins.xiaohongshu.title_generator import XiaohongshuTitleGenerator, TitleStyle
 from plugins.xiaohongshu.emoji_optimizer import EmojiOptimizer
 from plugins.xiaohongshu.topic_recommender import TopicTagRecommender
+from core.keyword_matcher import KeywordMatcher
 
 
 async def test_title_generator():
@@ -139,42 +140,82 @@ async def test_topic_recommender():
     print("✅ 通过")
 
 
+def test_keyword_matcher():
+    """测试多关键词匹配器"""
+    print("\n" + "="*60)
+    print("🧪 测试4：多关键词匹配器")
+    print("="*60)
+    
+    # 重叠匹配和位置
+    print("\n📝 测试重叠匹配...")
+    matcher = KeywordMatcher.from_keywords(["he", "she", "his", "hers"])
+    found = [(m.start, m.end, m.keyword) for m in matcher.finditer("ushers")]
+    print(f"匹配: {found}")
+    assert found == [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")], f"匹配结果错误：{found}"
+    assert matcher.counts("he said she") == {"he": 2, "she": 1}
+    assert not matcher.contains_any("xyz")
+    print("✅ 通过")
+    
+    # 大小写和分组
+    print("\n📝 测试分组匹配...")
+    matcher = KeywordMatcher({"生活": ["日常", "vlog"], "科技": ["AI", "数码"], "知识": ["ai"]})
+    groups = matcher.group_matches("我的VLOG日常：用Ai修图")
+    print(f"分组: {groups}")
+    assert groups == {"生活": ["日常", "vlog"], "科技": ["AI"], "知识": ["ai"]}, f"分组结果错误：{groups}"
+    assert KeywordMatcher.from_keywords(["vs"], case_sensitive=True).matched("A VS B") == []
+    print("✅ 通过")
+    
+    # 与逐个查找的结果一致
+    print("\n📝 测试话题匹配结果...")
+    recommender = TopicTagRecommender()
+    content = "学生党必备的平价口红推荐，日常妆容分享"
+    expected = [t for t in recommender.HOT_TOPICS["美妆"] if t.replace("#", "") in content]
+    tags = recommender._match_hot_topics(content, "美妆")
+    print(f"匹配话题: {tags}")
+    assert tags[:len(expected)] == expected, f"匹配结果错误：{tags}"
+    print("✅ 通过")
+
+
 async def main():
-    """运行所有测试"""
+    """运行所有测试（每个测试单独运行，一个失败不影响后面的测试）"""
     print("\n" + "="*60)
     print("🚀 JieDimension Toolkit - 小红书插件测试套件")
     print("="*60)
     
-    try:
-        # 测试标题生成器
-        await test_title_generator()
-        
-        # 测试Emoji优化器
-        test_emoji_optimizer()
-        
-        # 测试话题推荐器
-        await test_topic_recommender()
-        
-        # 总结
-        print("\n" + "="*60)
-        print("✅ 所有测试通过！")
-        print("="*60)
-        print("\n📊 测试统计:")
-        print("  - 标题生成器: 3/3 通过")
-        print("  - Emoji优化器: 3/3 通过")
-        print("  - 话题推荐器: 4/4 通过")
-        print("  - 总计: 10/10 通过 (100%)")
-        print("\n🎉 小红书插件测试完成！")
-        
-    except AssertionError as e:
-        print(f"\n❌ 测试失败: {e}")
-        return False
-    except Exception as e:
-        print(f"\n❌ 测试错误: {e}")
-        import traceback
-        traceback.print_exc()
+    tests = [
+        ("标题生成器", test_title_generator),
+        ("Emoji优化器", test_emoji_optimizer),
+        ("话题推荐器", test_topic_recommender),
+        ("关键词匹配器", test_keyword_matcher),
+    ]
+    failed = []
+    
+    for name, test in tests:
+        try:
+            result = test()
+            if asyncio.iscoroutine(result):
+                await result
+        except AssertionError as e:
+            print(f"\n❌ {name}测试失败: {e}")
+            failed.append(name)
+        except Exception as e:
+            print(f"\n❌ {name}测试错误: {e}")
+            import traceback
+            traceback.print_exc()
+            failed.append(name)
+    
+    # 总结
+    print("\n" + "="*60)
+    print("\n📊 测试统计:")
+    for name, _ in tests:
+        print(f"  - {name}: {'❌ 失败' if name in failed else '✅ 通过'}")
+    print(f"  - 总计: {len(tests) - len(failed)}/{len(tests)} 通过")
+    
+    if failed:
+        print(f"\n❌ 失败的测试: {', '.join(failed)}")
         return False
     
+    print("\n🎉 小红书插件测试完成！")
     return True
 
 
@@ -0,0 +1,216 @@
+"""
+闲鱼发布自动化基准测试
+
+使用无头浏览器对本地替身（tools/xianyu_standin.py）批量发布商品，统计每个步骤和每个商品的耗时，
+用于验证自动化流程的优化效果（可以在没有网络的Linux CI上运行）。
+
+用法:
+    python tools/benchmark_xianyu.py --items 20 --images 3 --upload-delay 0.2 --json bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.browser_automation import BrowserPool
+from core.request_interceptor import RequestInterceptor, RouteConfig
+from tools.xianyu_standin import StandinConfig, XianyuStandin, load_selector_config
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """
+    计算耗时分布
+
+    Returns:
+        {"count", "avg", "p50", "p95", "max"}（单位：秒）
+    """
+    if not values:
+        return {"count": 0, "avg": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+
+    ordered = sorted(values)
+
+    def percentile(p: float) -> float:
+        index = min(len(ordered) - 1, max(0, int(round(p * (len(ordered) - 1)))))
+        return ordered[index]
+
+    return {
+        "count": len(ordered),
+        "avg": sum(ordered) / len(ordered),
+        "p50": percentile(0.5),
+        "p95": percentile(0.95),
+        "max": ordered[-1],
+    }
+
+
+def _create_images(directory: str, count: int) -> List[str]:
+    """生成测试图片"""
+    from PIL import Image
+
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"bench_{i}.jpg")
+        Image.new("RGB", (800, 800), (i * 40 % 255, 120, 200)).save(path, "JPEG")
+        paths.append(path)
+    return paths
+
+
+async def run_benchmark(
+    items: int = 10,
+    images: int = 3,
+    config: Optional[StandinConfig] = None,
+    page_max_uses: int = 20,
+    block_resources: bool = True,
+    step_timeouts: Optional[Dict[str, int]] = None,
+    selectors: Optional[Dict[str, str]] = None,
+    browser=None
+) -> Dict[str, Any]:
+    """
+    运行基准测试
+
+    Args:
+        items: 发布的商品数
+        images: 每个商品的图片数
+        config: 替身行为配置
+        page_max_uses: 页面复用次数上限
+        block_resources: 是否启用请求拦截
+        step_timeouts: 覆盖的步骤超时（毫秒），默认把提交确认超时缩短为3秒
+        selectors: 覆盖的选择器（默认读取config/xianyu_selectors.json）
+        browser: 已启动的浏览器（可选，默认启动无头Chromium）
+
+    Returns:
+        测试报告
+    """
+    step_timeouts = {"confirm": 3000, **(step_timeouts or {})}
+    selectors = selectors if selectors is not None else load_selector_config()
+
+    interceptor = RequestInterceptor(RouteConfig(cache_dir=None)) if block_resources else None
+    item_latencies: List[float] = []
+    step_latencies: Dict[str, List[float]] = {}
+    errors: List[str] = []
+    success = 0
+
+    with tempfile.TemporaryDirectory() as tmp_dir, XianyuStandin(config) as standin:
+        image_paths = _create_images(tmp_dir, images)
+        automation_cls = standin.automation_class(selectors)
+        pool = BrowserPool(headless=True, page_max_uses=page_max_uses, browser=browser, interceptor=interceptor)
+
+        start = time.perf_counter()
+        try:
+            for i in range(items):
+                item_start = time.perf_counter()
+                async with pool.session("benchmark", automation_cls=automation_cls) as automation:
+                    automation.step_timeouts.update(step_timeouts)
+                    if not await automation.login():
+                        raise RuntimeError("替身登录失败")
+
+                    result = await automation.publish_product(
+                        title=f"基准测试商品{i}",
+                        price=10 + i,
+                        description="离线基准测试",
+                        images=image_paths,
+                    )
+                    automation.needs_recycle = not result["success"]
+
+                    for name, values in automation.step_latencies.items():
+                        step_latencies.setdefault(name, []).extend(values)
+
+                item_latencies.append(time.perf_counter() - item_start)
+                if result["success"]:
+                    success += 1
+                else:
+                    errors.append(f"商品{i}: {result.get('error')}")
+        finally:
+            total_time = time.perf_counter() - start
+            pool_stats = pool.get_stats()
+            await pool.close()
+
+        standin_stats = standin.get_stats()
+
+    return {
+        "items": items,
+        "images_per_item": images,
+        "success": success,
+        "failed": items - success,
+        "total_time": total_time,
+        "items_per_minute": items / total_time * 60 if total_time else 0.0,
+        "item_latency": summarize(item_latencies),
+        "steps": {name: summarize(values) for name, values in step_latencies.items()},
+        "errors": errors,
+        "pool": pool_stats,
+        "interceptor": interceptor.get_stats() if interceptor else None,
+        "standin": standin_stats,
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    """打印测试报告"""
+    print("\n" + "="*70)
+    print("📊 闲鱼发布自动化基准测试")
+    print("="*70)
+    print(f"商品: {report['items']} 个 × {report['images_per_item']} 张图片")
+    print(f"成功: {report['success']}  失败: {report['failed']}")
+    print(f"总耗时: {report['total_time']:.2f}s  吞吐: {report['items_per_minute']:.1f} 个/分钟")
+
+    latency = report["item_latency"]
+    print(f"\n单个商品: 平均 {latency['avg']:.3f}s  P50 {latency['p50']:.3f}s  "
+          f"P95 {latency['p95']:.3f}s  最大 {latency['max']:.3f}s")
+
+    print(f"\n{'步骤':<18} | {'次数':>4} | {'平均':>8} | {'P95':>8} | {'最大':>8}")
+    print("-"*70)
+    for name, stats in report["steps"].items():
+        print(f"{name:<18} | {stats['count']:>4} | {stats['avg']:>7.3f}s | "
+              f"{stats['p95']:>7.3f}s | {stats['max']:>7.3f}s")
+
+    if report["errors"]:
+        print("\n⚠️  失败详情:")
+        for error in report["errors"][:5]:
+            print(f"   - {error}")
+    print("="*70)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="闲鱼发布自动化基准测试（离线替身）")
+    parser.add_argument("--items", type=int, default=10, help="发布的商品数")
+    parser.add_argument("--images", type=int, default=3, help="每个商品的图片数")
+    parser.add_argument("--page-delay", type=float, default=0.0, help="发布页响应延迟(秒)")
+    parser.add_argument("--upload-delay", type=float, default=0.2, help="图片上传延迟(秒)")
+    parser.add_argument("--submit-delay", type=float, default=0.3, help="提交接口延迟(秒)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="提交失败概率")
+    parser.add_argument("--seed", type=int, default=None, help="失败注入的随机种子")
+    parser.add_argument("--page-max-uses", type=int, default=20, help="页面复用次数上限")
+    parser.add_argument("--no-block", action="store_true", help="不启用请求拦截")
+    parser.add_argument("--json", dest="json_path", default=None, help="把报告写入JSON文件")
+    args = parser.parse_args()
+
+    config = StandinConfig(
+        page_delay=args.page_delay,
+        upload_delay=args.upload_delay,
+        submit_delay=args.submit_delay,
+        failure_rate=args.failure_rate,
+        seed=args.seed,
+    )
+    report = asyncio.run(run_benchmark(
+        items=args.items,
+        images=args.images,
+        config=config,
+        page_max_uses=args.page_max_uses,
+        block_resources=not args.no_block,
+    ))
+    print_report(report)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"✅ 报告已保存: {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+B站分片上传离线替身
+
+在本地启动一个HTTP服务，实现ChunkedUploader使用的upos分片上传协议（预上传、创建任务、
+上传分片、查询已上传分片、合并），用于在没有网络和真实账号的环境中测试上传：
+- 每个分片可延迟响应（chunk_delay），统计同时上传的最大分片数
+- 分片上传成功时与真实upos一样返回纯文本 MULTIPART_PUT_SUCCESS 和 ETag 响应头
+- 可指定分片失败次数（fail_parts）、返回错误的ETag（corrupt_parts），
+  或让接下来的JSON接口返回非JSON页面（garbled_responses，如网关错误页）
+- 合并时校验所有分片，记录合并后文件的大小和MD5，便于核对
+
+用法:
+    with BilibiliUploadStandin(UploadStandinConfig(chunk_size=1024)) as standin:
+        uploader = ChunkedUploader(session, upload_base=standin.base_url)
+        await uploader.upload("video.mp4")
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+@dataclass
+class UploadStandinConfig:
+    """替身行为配置（运行中修改立即生效）"""
+    chunk_size: int = 4 * 1024 * 1024   # 预上传返回的分片大小
+    chunk_delay: float = 0.0            # 每个分片的响应延迟(秒)
+    fail_parts: Dict[int, int] = field(default_factory=dict)       # {分片号: 返回500的次数}
+    corrupt_parts: Dict[int, int] = field(default_factory=dict)    # {分片号: 返回错误ETag的次数}
+    garbled_responses: int = 0          # 接下来的JSON接口（分片上传以外）返回200和HTML页面的次数
+
+
+class BilibiliUploadStandin:
+    """B站分片上传离线替身服务"""
+
+    def __init__(self, config: Optional[UploadStandinConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        """
+        初始化替身
+
+        Args:
+            config: 行为配置
+            host: 监听地址
+            port: 端口（0表示自动分配）
+        """
+        self.config = config or UploadStandinConfig()
+        self.host = host
+        self.port = port
+
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self.uploads: Dict[str, Dict[str, Any]] = {}      # upload_id -> {"key", "parts": {分片号: bytes}}
+        self.completed: Dict[str, Dict[str, Any]] = {}    # 文件key -> {"size", "md5", "chunks"}
+        self.part_requests: Dict[int, int] = {}           # 每个分片号收到的上传请求数
+        self._active = 0
+        self._counter = 0
+
+        self.stats: Dict[str, int] = {
+            "preuploads": 0,
+            "chunk_requests": 0,
+            "chunk_failures": 0,
+            "completed": 0,
+            "max_concurrent": 0,
+        }
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        """在后台线程启动服务"""
+        if self._server is not None:
+            return
+
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                standin._handle(self, "GET")
+
+            def do_POST(self):
+                standin._handle(self, "POST")
+
+            def do_PUT(self):
+                standin._handle(self, "PUT")
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        print(f"✅ B站上传替身已启动: {self.base_url}")
+
+    def stop(self):
+        """停止服务"""
+        if self._server is None:
+            return
+
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        self._thread = None
+
+    def __enter__(self) -> "BilibiliUploadStandin":
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _send(self, handler: BaseHTTPRequestHandler, status: int, body: Dict[str, Any]):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json; charset=utf-8")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def _send_text(
+        self,
+        handler: BaseHTTPRequestHandler,
+        status: int,
+        body: str,
+        content_type: str = "text/plain",
+        headers: Optional[Dict[str, str]] = None
+    ):
+        data = body.encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        handler.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def _handle(self, handler: BaseHTTPRequestHandler, method: str):
+        url = urlparse(handler.path)
+        query = {k: v[0] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = handler.rfile.read(length) if length else b""
+
+        with self._lock:
+            garbled = method != "PUT" and self.config.garbled_responses > 0
+            if garbled:
+                self.config.garbled_responses -= 1
+        if garbled:
+            self._send_text(handler, 200, "<html><body>502 Bad Gateway</body></html>", "text/html")
+            return
+
+        if url.path == "/preupload" and method == "POST":
+            self._send(handler, 200, self._preupload(query))
+        elif url.path == "/stats":
+            self._send(handler, 200, self.get_stats())
+        elif not url.path.startswith("/ugc/"):
+            self._send(handler, 404, {"OK": 0, "message": "not found"})
+        elif handler.headers.get("X-Upos-Auth") != "standin-auth":
+            self._send(handler, 403, {"OK": 0, "message": "auth failed"})
+        elif method == "POST" and "uploads" in query:
+            upload_id = uuid.uuid4().hex
+            with self._lock:
+                self.uploads[upload_id] = {"key": url.path, "parts": {}}
+            self._send(handler, 200, {"OK": 1, "upload_id": upload_id})
+        elif method == "PUT":
+            self._upload_part(handler, query, body)
+        elif method == "GET" and "list_parts" in query:
+            upload = self.uploads.get(query.get("uploadId"))
+            if upload is None:
+                self._send(handler, 404, {"OK": 0, "message": "upload not found"})
+                return
+            with self._lock:
+                parts = [{"partNumber": n, "eTag": hashlib.md5(data).hexdigest()}
+                         for n, data in sorted(upload["parts"].items())]
+            self._send(handler, 200, {"OK": 1, "parts": parts})
+        elif method == "POST" and "uploadId" in query:
+            self._complete(handler, query, body)
+        else:
+            self._send(handler, 400, {"OK": 0, "message": "bad request"})
+
+    def _preupload(self, query: Dict[str, str]) -> Dict[str, Any]:
+        with self._lock:
+            self.stats["preuploads"] += 1
+            self._counter += 1
+            number = self._counter
+        ext = os.path.splitext(query.get("name", ""))[1] or ".mp4"
+        return {
+            "OK": 1,
+            "endpoint": self.base_url,
+            "upos_uri": f"upos://ugc/n{number:06d}{ext}",
+            "chunk_size": self.config.chunk_size,
+            "biz_id": number,
+            "auth": "standin-auth",
+        }
+
+    def _upload_part(self, handler: BaseHTTPRequestHandler, query: Dict[str, str], body: bytes):
+        upload = self.uploads.get(query.get("uploadId"))
+        if upload is None:
+            self._send(handler, 404, {"OK": 0, "message": "upload not found"})
+            return
+
+        number = int(query["partNumber"])
+        with self._lock:
+            self.stats["chunk_requests"] += 1
+            self.part_requests[number] = self.part_requests.get(number, 0) + 1
+            self._active += 1
+            self.stats["max_concurrent"] = max(self.stats["max_concurrent"], self._active)
+
+            fail = self.config.fail_parts.get(number, 0) > 0
+            if fail:
+                self.config.fail_parts[number] -= 1
+            corrupt = not fail and self.config.corrupt_parts.get(number, 0) > 0
+            if corrupt:
+                self.config.corrupt_parts[number] -= 1
+
+        try:
+            if self.config.chunk_delay:
+                time.sleep(self.config.chunk_delay)
+
+            if fail:
+                self._count_failure()
+                self._send(handler, 500, {"OK": 0, "message": "injected failure"})
+                return
+
+            if len(body) != int(query.get("size", len(body))):
+                self._count_failure()
+                self._send(handler, 400, {"OK": 0, "message": "size mismatch"})
+                return
+
+            etag = hashlib.md5(body).hexdigest()
+            expected = handler.headers.get("Content-MD5")
+            if expected and expected != etag:
+                self._count_failure()
+                self._send(handler, 400, {"OK": 0, "message": "md5 mismatch"})
+                return
+
+            with self._lock:
+                upload["parts"][number] = body
+            returned = "0" * 32 if corrupt else etag
+            self._send_text(handler, 200, "MULTIPART_PUT_SUCCESS", headers={"ETag": f'"{returned}"'})
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def _count_failure(self):
+        with self._lock:
+            self.stats["chunk_failures"] += 1
+
+    def _complete(self, handler: BaseHTTPRequestHandler, query: Dict[str, str], body: bytes):
+        upload = self.uploads.get(query.get("uploadId"))
+        if upload is None:
+            self._send(handler, 404, {"OK": 0, "message": "upload not found"})
+            return
+
+        try:
+            parts = json.loads(body or b"{}").get("parts", [])
+        except ValueError:
+            parts = []
+
+        with self._lock:
+            stored = upload["parts"]
+            numbers = [part["partNumber"] for part in parts]
+            valid = (
+                numbers == list(range(1, len(stored) + 1))
+                and all(hashlib.md5(stored[part["partNumber"]]).hexdigest() == part["eTag"] for part in parts)
+            )
+            if valid:
+                content = b"".join(stored[n] for n in numbers)
+                self.completed[upload["key"]] = {
+                    "size": len(content),
+                    "md5": hashlib.md5(content).hexdigest(),
+                    "chunks": len(numbers),
+                }
+                self.stats["completed"] += 1
+                del self.uploads[query["uploadId"]]
+
+        if valid:
+            self._send(handler, 200, {"OK": 1, "location": upload["key"]})
+        else:
+            self._send(handler, 400, {"OK": 0, "message": "parts mismatch"})
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取请求统计"""
+        with self._lock:
+            return dict(self.stats)
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8766
+    standin = BilibiliUploadStandin(port=port)
+    standin.start()
+    print("按 Ctrl+C 停止")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        standin.stop()
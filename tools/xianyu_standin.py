@@ -0,0 +1,318 @@
+"""
+闲鱼发布流程离线替身
+
+在本地启动一个HTTP服务，提供与XianyuAutomation选择器一致的首页、登录页、发布页和商品详情页，
+用于在没有网络和真实账号的环境（如Linux CI）中测试和压测浏览器自动化：
+- 图片上传后延迟出现预览（upload_delay）
+- 提交接口延迟响应（submit_delay），可按概率或指定标题注入失败
+- 记录收到的发布请求，便于核对
+
+用法:
+    with XianyuStandin(StandinConfig(upload_delay=0.2)) as standin:
+        async with pool.session("bench", automation_cls=standin.automation_class()) as automation:
+            await automation.login()
+            await automation.publish_product(...)
+"""
+
+import json
+import os
+import random
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Set
+from urllib.parse import urlparse
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.browser_automation import XianyuAutomation
+
+
+SELECTOR_CONFIG_FILE = "config/xianyu_selectors.json"
+
+
+@dataclass
+class StandinConfig:
+    """替身行为配置（运行中修改立即生效）"""
+    page_delay: float = 0.0             # 发布页响应延迟(秒)
+    upload_delay: float = 0.2           # 每张图片上传后预览出现的延迟(秒)
+    submit_delay: float = 0.3           # 提交接口响应延迟(秒)
+    failure_rate: float = 0.0           # 提交失败概率
+    fail_titles: Set[str] = field(default_factory=set)     # 指定失败的商品标题
+    seed: Optional[int] = None          # 随机种子（失败注入可复现）
+
+
+HOME_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>闲鱼</title></head>
+<body>
+<div class="user-info"><span class="user-name">离线测试用户</span></div>
+<a href="/publish/index.htm">发闲置</a>
+</body></html>"""
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>登录</title></head>
+<body>
+<p>离线替身：自动完成登录</p>
+<script>setTimeout(function () { location.href = "/"; }, 100);</script>
+</body></html>"""
+
+# 页面元素同时满足 XianyuAutomation.SELECTORS 和 SelectorConfigPanel 的默认选择器；
+# 除发布按钮外，class中不能出现 publish/success/category 等片段，避免模糊选择器误匹配
+PUBLISH_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>发布闲置</title></head>
+<body>
+<form id="item-form" onsubmit="return false;">
+    <div class="image-picker">
+        <input type="file" accept="image/*" multiple>
+        <div class="upload-list"></div>
+    </div>
+    <input name="title" placeholder="标题">
+    <input name="price" placeholder="价格">
+    <textarea name="description" placeholder="描述"></textarea>
+    <button type="button" class="category-btn">选择分类</button>
+    <button type="button" class="publish-btn">发布</button>
+    <div class="tip"></div>
+</form>
+<script>
+var UPLOAD_DELAY = __UPLOAD_DELAY__;
+var imageCount = 0;
+
+document.querySelector("input[type='file']").addEventListener("change", function (e) {
+    Array.prototype.forEach.call(e.target.files, function (file) {
+        setTimeout(function () {
+            var item = document.createElement("div");
+            item.className = "upload-item";
+            var img = document.createElement("img");
+            img.alt = file.name;
+            item.appendChild(img);
+            document.querySelector(".upload-list").appendChild(item);
+            imageCount += 1;
+        }, UPLOAD_DELAY * 1000);
+    });
+});
+
+document.querySelector(".category-btn").addEventListener("click", function () {
+    // 与真实页面一样异步弹出分类面板
+    setTimeout(function () {
+        var panel = document.createElement("ul");
+        panel.className = "cat-panel";
+        panel.innerHTML = "<li>二手闲置</li>";
+        document.body.appendChild(panel);
+    }, 50);
+});
+
+document.querySelector(".publish-btn").addEventListener("click", function () {
+    var form = document.getElementById("item-form");
+    fetch("/api/publish", {
+        method: "POST",
+        headers: {"Content-Type": "application/json"},
+        body: JSON.stringify({
+            title: form.title.value,
+            price: form.price.value,
+            description: form.description.value,
+            images: imageCount
+        })
+    }).then(function (resp) { return resp.json(); }).then(function (data) {
+        if (data.ok) {
+            location.href = "/item/detail.htm?id=" + data.id;
+        } else {
+            document.querySelector(".tip").textContent = data.error;
+        }
+    });
+});
+</script>
+</body></html>"""
+
+DETAIL_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>商品详情</title></head>
+<body><div class="result-success">发布成功</div></body></html>"""
+
+
+def load_selector_config(path: str = SELECTOR_CONFIG_FILE) -> Dict[str, str]:
+    """
+    读取选择器配置（SelectorConfigPanel保存的文件），未配置的项使用XianyuAutomation的默认值
+
+    Returns:
+        {选择器名: CSS选择器}
+    """
+    selectors = dict(XianyuAutomation.SELECTORS)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        # 面板保存的格式为 {"version", "updated_at", "selectors": {...}}
+        selectors.update(data.get("selectors", data))
+    return selectors
+
+
+class XianyuStandin:
+    """闲鱼离线替身服务"""
+
+    def __init__(self, config: Optional[StandinConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        """
+        初始化替身
+
+        Args:
+            config: 行为配置
+            host: 监听地址
+            port: 端口（0表示自动分配）
+        """
+        self.config = config or StandinConfig()
+        self.host = host
+        self.port = port
+
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._random = random.Random(self.config.seed)
+
+        self.published: List[Dict[str, Any]] = []      # 成功发布的商品
+        self.stats: Dict[str, int] = {
+            "page_views": 0,
+            "publish_requests": 0,
+            "published": 0,
+            "failed": 0,
+        }
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        """在后台线程启动服务"""
+        if self._server is not None:
+            return
+
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                standin._handle_get(self)
+
+            def do_POST(self):
+                standin._handle_post(self)
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        print(f"✅ 闲鱼替身已启动: {self.base_url}")
+
+    def stop(self):
+        """停止服务"""
+        if self._server is None:
+            return
+
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        self._thread = None
+
+    def __enter__(self) -> "XianyuStandin":
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def automation_class(self, selectors: Optional[Dict[str, str]] = None) -> type:
+        """
+        指向替身地址的XianyuAutomation子类（可传给BrowserPool.session的automation_cls）
+
+        Args:
+            selectors: 覆盖的选择器（如load_selector_config()的结果）
+        """
+        return type("StandinXianyuAutomation", (XianyuAutomation,), {
+            "XIANYU_URL": f"{self.base_url}/",
+            "LOGIN_URL": f"{self.base_url}/login",
+            "PUBLISH_URL": f"{self.base_url}/publish/index.htm",
+            "SELECTORS": {**XianyuAutomation.SELECTORS, **(selectors or {})},
+        })
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _send(self, handler: BaseHTTPRequestHandler, status: int, body: str, content_type: str):
+        data = body.encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def _handle_get(self, handler: BaseHTTPRequestHandler):
+        path = urlparse(handler.path).path
+        self._count("page_views")
+
+        if path == "/":
+            self._send(handler, 200, HOME_PAGE, "text/html")
+        elif path == "/login":
+            self._send(handler, 200, LOGIN_PAGE, "text/html")
+        elif path == "/publish/index.htm":
+            if self.config.page_delay:
+                time.sleep(self.config.page_delay)
+            page = PUBLISH_PAGE.replace("__UPLOAD_DELAY__", str(self.config.upload_delay))
+            self._send(handler, 200, page, "text/html")
+        elif path == "/item/detail.htm":
+            self._send(handler, 200, DETAIL_PAGE, "text/html")
+        elif path == "/stats":
+            self._send(handler, 200, json.dumps(self.get_stats(), ensure_ascii=False), "application/json")
+        else:
+            self._send(handler, 404, "not found", "text/plain")
+
+    def _handle_post(self, handler: BaseHTTPRequestHandler):
+        if urlparse(handler.path).path != "/api/publish":
+            self._send(handler, 404, "not found", "text/plain")
+            return
+
+        length = int(handler.headers.get("Content-Length") or 0)
+        try:
+            item = json.loads(handler.rfile.read(length) or b"{}")
+        except ValueError:
+            item = {}
+
+        self._count("publish_requests")
+        if self.config.submit_delay:
+            time.sleep(self.config.submit_delay)
+
+        with self._lock:
+            failed = (
+                item.get("title") in self.config.fail_titles
+                or self._random.random() < self.config.failure_rate
+            )
+            if failed:
+                self.stats["failed"] += 1
+            else:
+                self.published.append(item)
+                self.stats["published"] += 1
+                item_id = len(self.published)
+
+        if failed:
+            body = {"ok": False, "error": "系统繁忙，请稍后再试"}
+        else:
+            body = {"ok": True, "id": item_id}
+        self._send(handler, 200, json.dumps(body, ensure_ascii=False), "application/json")
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取请求统计"""
+        with self._lock:
+            return dict(self.stats)
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    standin = XianyuStandin(port=port)
+    standin.start()
+    print("按 Ctrl+C 停止")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        standin.stop()
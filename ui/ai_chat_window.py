@@ -279,7 +279,9 @@ AI助手:"""
             # 恢复发送按钮
             self.send_btn.configure(state="normal", text="发送")
             if loop:
-                loop.close()
+                # 释放工具调用（如抓取热门）的连接池
+                from core.http_client import close_event_loop
+                close_event_loop(loop)
     
     async def _execute_tool_from_reply(self, reply: str, user_message: str = "") -> str:
         """从AI回复中解析并执行工具"""
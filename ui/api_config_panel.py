@@ -429,7 +429,9 @@ class APIConfigPanel(ctk.CTkScrollableFrame):
             try:
                 loop.run_until_complete(async_func(*args))
             finally:
-                loop.close()
+                # 释放测试连接等请求的连接池
+                from core.http_client import close_event_loop
+                close_event_loop(loop)
         
         thread = threading.Thread(target=run, daemon=True)
         thread.start()
@@ -443,7 +443,8 @@ class Dashboard(ctk.CTkScrollableFrame):
             today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
             tasks = await self.db.get_tasks_by_date_range(
                 today_start.isoformat(),
-                datetime.now().isoformat()
+                datetime.now().isoformat(),
+                columns=["status"]
             )
             published_today = len([t for t in tasks if t['status'] == 'completed'])
             self.stat_cards["published_today"].update_value(str(published_today))
@@ -45,9 +45,22 @@ class MainWindow(ctk.CTk):
         self.ai_assistant_frame = None
         self.ai_visible = False
         
+        # 低峰时段自动重新投递闲鱼死信
+        self.redrive_service = None
+        self._start_redrive_service()
+        
         # 窗口关闭事件
         self.protocol("WM_DELETE_WINDOW", self._on_closing)
     
+    def _start_redrive_service(self):
+        """启动闲鱼死信自动重新投递"""
+        try:
+            from plugins.xianyu.redrive_service import DeadLetterRedriveService
+            self.redrive_service = DeadLetterRedriveService()
+            self.redrive_service.start()
+        except Exception as e:
+            print(f"⚠️ 死信自动重新投递启动失败: {e}")
+    
     def _center_window(self):
         """窗口居中显示"""
         self.update_idletasks()
@@ -693,6 +706,8 @@ class MainWindow(ctk.CTk):
     def _on_closing(self):
         """窗口关闭事件"""
         # 可以在这里添加保存设置、清理资源等操作
+        if self.redrive_service:
+            self.redrive_service.stop()
         self.destroy()
 
 